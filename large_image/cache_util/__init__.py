@@ -15,12 +15,16 @@
 #############################################################################
 
 import atexit
+import contextlib
 from collections.abc import Callable
 from typing import Any
 
-from .cache import (CacheProperties, LruCacheMetaclass, getTileCache,
-                    isTileCacheSetup, methodcache, strhash)
+from .bytecache import ByteCache, sizeOf
+from .cache import (CacheProperties, LruCacheMetaclass, getCachedMany,
+                    getTileCache, isTileCacheSetup, methodcache, strhash)
 from .cachefactory import CacheFactory, pickAvailableCache
+from .diskcache import DiskCache
+from .tieredcache import TieredCache
 
 MemCache: Any
 RedisCache: Any
@@ -72,7 +76,11 @@ def cachesInfo(*args, **kwargs) -> dict[str, dict[str, int]]:
     Report on each cache.
 
     :returns: a dictionary with the cache names as the keys and values that
-        include 'maxsize' and 'used', if known.
+        include 'maxsize' and 'used', if known.  For the tile cache, these are
+        in bytes if the backend measures values (python and memcached), and
+        'items' and, if limited, 'maxitems' give the number of values.  A
+        tiered tile cache reports its shared cache, plus its in-process cache
+        under 'l1'.
     """
     info = {}
     for name in LruCacheMetaclass.namedCaches:
@@ -85,26 +93,23 @@ def cachesInfo(*args, **kwargs) -> dict[str, dict[str, int]]:
     if isTileCacheSetup():
         tileCache, tileLock = getTileCache()
         try:
-            if tileLock:
-                with tileLock:
-                    info['tileCache'] = {
-                        'maxsize': tileCache.maxsize,
-                        'used': tileCache.currsize,
-                        'items': getattr(tileCache, 'curritems' if hasattr(
-                            tileCache, 'curritems') else 'currsize', None),
-                    }
-            else:
+            with tileLock or contextlib.nullcontext():
                 info['tileCache'] = {
                     'maxsize': tileCache.maxsize,
                     'used': tileCache.currsize,
                     'items': getattr(tileCache, 'curritems' if hasattr(
                         tileCache, 'curritems') else 'currsize', None),
                 }
+                if getattr(tileCache, 'maxitems', None):
+                    info['tileCache']['maxitems'] = tileCache.maxitems
+                if hasattr(tileCache, 'l1Info'):
+                    info['tileCache']['l1'] = tileCache.l1Info()
         except Exception:
             pass
     return info
 
 
-__all__ = ('CacheFactory', 'getTileCache', 'isTileCacheSetup', 'MemCache', 'RedisCache',
+__all__ = ('ByteCache', 'CacheFactory', 'getTileCache', 'isTileCacheSetup', 'MemCache',
+           'RedisCache', 'TieredCache', 'DiskCache',
            'strhash', 'LruCacheMetaclass', 'pickAvailableCache', 'methodcache',
-           'CacheProperties')
+           'CacheProperties', 'sizeOf', 'getCachedMany')
@@ -1,4 +1,5 @@
 import hashlib
+import pickle
 import threading
 import time
 from collections.abc import Callable
@@ -12,6 +13,9 @@ _VT = TypeVar('_VT')
 class BaseCache(cachetools.Cache):
     """Base interface to cachetools.Cache for use with large-image."""
 
+    # True if getMany fetches all of its values in a single request
+    batchGets = False
+
     def __init__(
             self, maxsize: float,
             getsizeof: Callable[[_VT], float] | None = None,
@@ -66,6 +70,36 @@ class BaseCache(cachetools.Cache):
         # hashedKey = self._hashKey(key)
         raise NotImplementedError
 
+    def getMany(self, keys: list[str]) -> dict[str, Any]:
+        """
+        Get several values from the cache.  Backends override this to fetch
+        all of the values in a single request.
+
+        :param keys: the keys to get.
+        :returns: a dictionary of the keys that were found and their values.
+            Values that cannot be read are omitted.
+        """
+        results = {}
+        for key in keys:
+            try:
+                results[key] = self[key]
+            except KeyError:
+                pass
+            except (ValueError, pickle.UnpicklingError, ModuleNotFoundError):
+                # this can happen if a different version wrote the record
+                pass
+        return results
+
+    def setMany(self, items: dict[str, Any]) -> None:
+        """
+        Set several values in the cache.  Backends override this to store all
+        of the values in a single request.
+
+        :param items: a dictionary of keys and values to store.
+        """
+        for key, value in items.items():
+            self[key] = value
+
     @property
     def curritems(self) -> int:
         raise NotImplementedError
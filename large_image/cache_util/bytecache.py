@@ -0,0 +1,77 @@
+import sys
+from collections.abc import Callable
+from typing import Any
+
+import cachetools
+import numpy as np
+import PIL.Image
+
+# Bytes per band of PIL modes that use more than one byte per band
+_PILModeBandBytes = {'I': 4, 'F': 4, 'I;16': 2, 'I;16L': 2, 'I;16B': 2, 'I;16N': 2}
+
+
+def sizeOf(value: Any, depth: int = 3) -> int:
+    """
+    Estimate the memory used by a cached value.  Bytes, numpy arrays, and PIL
+    images are measured by their pixel or byte buffers; containers are
+    measured by their contents, to a limited depth.
+
+    :param value: the value to measure.
+    :param depth: how many levels of nested containers to measure.
+    :returns: an estimated size in bytes.
+    """
+    if isinstance(value, memoryview):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray)):
+        return sys.getsizeof(value)
+    if isinstance(value, np.ndarray):
+        # A view keeps its base array alive
+        base = value.base if isinstance(value.base, np.ndarray) else value
+        return max(value.nbytes, base.nbytes)
+    if isinstance(value, PIL.Image.Image):
+        return (value.width * value.height * len(value.getbands()) *
+                _PILModeBandBytes.get(value.mode, 1))
+    size = sys.getsizeof(value, 0)
+    if depth > 0:
+        if isinstance(value, dict):
+            size += sum(sizeOf(key, depth - 1) + sizeOf(item, depth - 1)
+                        for key, item in value.items())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            size += sum(sizeOf(item, depth - 1) for item in value)
+    return size
+
+
+class ByteCache(cachetools.LRUCache):
+    """
+    A least-recently-used cache limited by the total size in bytes of its
+    values and, optionally, by a number of items.  ``maxsize`` and
+    ``currsize`` are in bytes.
+    """
+
+    def __init__(
+            self, maxsize: float, maxitems: int | None = None,
+            getsizeof: Callable[[Any], float] | None = None) -> None:
+        """
+        Create a cache.
+
+        :param maxsize: the maximum total size of the values in bytes.
+        :param maxitems: if specified and positive, the maximum number of
+            values.
+        :param getsizeof: a function to measure a value.  Defaults to sizeOf.
+        """
+        super().__init__(maxsize, getsizeof=getsizeof or sizeOf)
+        self._maxitems = maxitems or None
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        super().__setitem__(key, value)
+        if self._maxitems:
+            while len(self) > self._maxitems:
+                self.popitem()
+
+    @property
+    def curritems(self) -> int:
+        return len(self)
+
+    @property
+    def maxitems(self) -> int | None:
+        return self._maxitems
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
+import concurrent.futures
 import functools
 import pickle
 import threading
 import uuid
 from collections.abc import Callable
-from typing import Any, TypeVar
+from typing import Any, TypeVar, cast
 
 import cachetools
 from typing_extensions import ParamSpec
@@ -18,7 +19,8 @@ except ImportError:
 
 import contextlib
 
-from .. import config
+from .. import config, timing
+from .base import BaseCache
 from .cachefactory import CacheFactory, pickAvailableCache
 
 P = ParamSpec('P')
@@ -29,6 +31,12 @@ _tileLock: threading.Lock | None = None
 
 _cacheLockKeyToken = '_cacheLock_key'
 
+# Calls to methodcache-wrapped functions that are being computed, keyed by
+# the id of the cache and the cache key.  Concurrent misses for the same key
+# wait for the first caller's result rather than computing it again.
+_inflight: dict[tuple[int, str], tuple[concurrent.futures.Future, int]] = {}
+_inflightLock = threading.Lock()
+
 # If we have a resource module, ask to use as many file handles as the hard
 # limit allows, then calculate how may tile sources we can have open based on
 # the actual limit.
@@ -73,6 +81,81 @@ def strhash(*args, **kwargs) -> str:
     return repr(args)
 
 
+def _finishInflight(
+        inflightKey: tuple[int, str], future: concurrent.futures.Future,
+        value: Any = None, exc: BaseException | None = None) -> None:
+    """
+    Release the callers waiting for a methodcache computation.
+
+    :param inflightKey: the key in _inflight.
+    :param future: the future the callers are waiting on.
+    :param value: the computed value.
+    :param exc: the exception raised by the computation, if any.
+    """
+    with _inflightLock:
+        if _inflight.get(inflightKey, (None, None))[0] is future:
+            del _inflight[inflightKey]
+    if future.done():
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(value)
+
+
+def _coalesce(inflightKey: tuple[int, str], compute: Callable[[], T]) -> tuple[T, bool]:
+    """
+    Compute a value, unless another thread is already computing the value for
+    the same key, in which case wait for and return that value (or raise its
+    exception).
+
+    :param inflightKey: the key in _inflight.
+    :param compute: a function that computes the value.
+    :returns: the value and True if another thread computed it.
+    """
+    thread = threading.get_ident()
+    with _inflightLock:
+        future, owner = _inflight.get(inflightKey, (None, None))
+        if future is None:
+            future = concurrent.futures.Future()
+            _inflight[inflightKey] = (future, thread)
+            owner = thread
+    # A recursive call for the key being computed on this thread must compute
+    # it rather than wait for itself.
+    if owner != thread:
+        return future.result(), True
+    try:
+        value = compute()
+    except BaseException as exc:
+        _finishInflight(inflightKey, future, exc=exc)
+        raise
+    _finishInflight(inflightKey, future, value)
+    return value, False
+
+
+def _storeCached(self, k: str, v: T) -> T:
+    """
+    Store a value in self.cache, ignoring values the cache refuses.
+
+    :param k: the cache key.
+    :param v: the value.
+    :returns: the value.
+    """
+    try:
+        if getattr(self, 'cache_lock', None):
+            with self.cache_lock:
+                self.cache[k] = v
+        else:
+            self.cache[k] = v
+    except ValueError:
+        pass  # value too large
+    except (KeyError, RuntimeError):
+        # the key was refused for some reason
+        config.getLogger().debug(
+            'Had a cache KeyError while trying to store a value to key %r' % (k))
+    return v
+
+
 def methodcache(key: Callable | None = None) -> Callable:  # noqa
     """
     Decorator to wrap a function with a memoizing callable that saves results
@@ -80,15 +163,18 @@ def methodcache(key: Callable | None = None) -> Callable:  # noqa
     from self.cache rather than a passed value.  If self.cache_lock is
     present and not none, a lock is used.
 
+    Concurrent calls that miss the cache for the same key are coalesced: the
+    first computes the value and the others wait for it and receive the same
+    value (or exception).  This applies to every cache backend, but only
+    within one process.
+
     :param key: if a function, use that for the key, otherwise use self.wrapKey.
     """
     def decorator(func: Callable[P, T]) -> Callable[..., T]:
-        @functools.wraps(func)
-        def wrapper(self, *args: P.args, **kwargs: P.kwargs) -> T:
+        def cacheKey(self, *args, **kwargs) -> str:
             k = key(*args, **kwargs) if key else self.wrapKey(*args, **kwargs)
-            lock = getattr(self, 'cache_lock', None)
             ck = getattr(self, '_classkey', None)
-            if lock:
+            if getattr(self, 'cache_lock', None):
                 with self.cache_lock:
                     if hasattr(self, '_classkeyLock'):
                         if self._classkeyLock.acquire(blocking=False):
@@ -97,35 +183,76 @@ def methodcache(key: Callable | None = None) -> Callable:  # noqa
                             ck = getattr(self, '_unlocked_classkey', ck)
             if ck:
                 k = ck + ' ' + k
+            return k
+
+        @functools.wraps(func)
+        def wrapper(self, *args: P.args, **kwargs: P.kwargs) -> T:
+            span = timing.start(func.__name__, self)
+            cached = coalesced = False
             try:
-                if lock:
-                    with self.cache_lock:
-                        return self.cache[k]
-                else:
-                    return self.cache[k]
-            except KeyError:
-                pass  # key not found
-            except (ValueError, pickle.UnpicklingError, ModuleNotFoundError):
-                # this can happen if a different version of python wrote the record
-                pass
-            v = func(self, *args, **kwargs)
-            try:
-                if lock:
-                    with self.cache_lock:
-                        self.cache[k] = v
-                else:
-                    self.cache[k] = v
-            except ValueError:
-                pass  # value too large
-            except (KeyError, RuntimeError):
-                # the key was refused for some reason
-                config.getLogger().debug(
-                    'Had a cache KeyError while trying to store a value to key %r' % (k))
-            return v
+                k = cacheKey(self, *args, **kwargs)
+                lock = getattr(self, 'cache_lock', None)
+                try:
+                    if lock:
+                        with self.cache_lock:
+                            v = self.cache[k]
+                    else:
+                        v = self.cache[k]
+                    cached = True
+                    return v
+                except KeyError:
+                    pass  # key not found
+                except (ValueError, pickle.UnpicklingError, ModuleNotFoundError):
+                    # this can happen if a different version of python wrote the record
+                    pass
+                v, coalesced = _coalesce(
+                    (id(self.cache), k),
+                    lambda: _storeCached(self, k, func(self, *args, **kwargs)))
+                cached = coalesced
+                return v
+            finally:
+                if span is not None:
+                    timing.finish(
+                        span, cached=cached, coalesced=coalesced,
+                        cache=type(self.cache).__name__)
+        wrapper.cacheKey = cacheKey  # type: ignore[attr-defined]
         return wrapper
     return decorator
 
 
+def getCachedMany(
+        method: Callable, calls: list[tuple[tuple, dict[str, Any]]]) -> dict[int, Any]:
+    """
+    Look up the cached results of several calls to a methodcache-wrapped
+    method in a single request to the cache.  This only does anything for
+    caches whose batchGets is True, such as memcached and redis; for other
+    caches, a bulk lookup would not save any round trips.
+    Nothing is computed: calls whose results are not cached are reported as
+    missing.
+
+    :param method: a bound method that is wrapped by methodcache.
+    :param calls: a list of (args, kwargs) for calls to the method.
+    :returns: a dictionary whose keys are the indices of the calls that were
+        cached and whose values are the cached results.
+    """
+    instance = getattr(method, '__self__', None)
+    cacheKey = getattr(getattr(method, '__func__', None), 'cacheKey', None)
+    cache = getattr(instance, 'cache', None)
+    if cacheKey is None or not calls or not getattr(cache, 'batchGets', False):
+        return {}
+    span = timing.start('prefetch', instance)
+    found: dict[str, Any] = {}
+    try:
+        keys = [cacheKey(instance, *args, **kwargs) for args, kwargs in calls]
+        lock = getattr(instance, 'cache_lock', None)
+        with lock or contextlib.nullcontext():
+            found = cast(BaseCache, cache).getMany(keys)
+        return {idx: found[k] for idx, k in enumerate(keys) if k in found}
+    finally:
+        if span is not None:
+            timing.finish(span, count=len(calls), cached=len(found))
+
+
 class LruCacheMetaclass(type):
     namedCaches: dict[str, Any] = {}
     classCaches: dict[type, Any] = {}
@@ -9,8 +9,11 @@ import cachetools
 
 from .. import config
 from ..exceptions import TileCacheError
+from .bytecache import ByteCache
+from .diskcache import DiskCache
 from .memcache import MemCache
 from .rediscache import RedisCache
+from .tieredcache import TieredCache
 
 # DO NOT MANUALLY ADD ANYTHING TO `_availableCaches`
 #  use entrypoints and let loadCaches fill in `_availableCaches`
@@ -46,6 +49,10 @@ def loadCaches(
         _availableCaches['memcached'] = MemCache
     if RedisCache is not None:
         _availableCaches['redis'] = RedisCache
+    # The tiered cache wraps memcached or redis and the disk cache persists
+    # between runs, so these are only used if requested
+    _availableCaches['tiered'] = TieredCache
+    _availableCaches['disk'] = DiskCache
     # NOTE: `python` cache is viewed as a fallback and isn't listed in `availableCaches`
 
 
@@ -87,6 +94,8 @@ def getFirstAvailableCache() -> tuple[cachetools.Cache | None, threading.Lock |
     loadCaches()
     cache, cacheLock = None, None
     for cacheBackend in _availableCaches:
+        if cacheBackend in {'tiered', 'disk'}:
+            continue
         try:
             cache, cacheLock = cast(
                 tuple[cachetools.Cache, Optional[threading.Lock]],
@@ -105,27 +114,63 @@ def getFirstAvailableCache() -> tuple[cachetools.Cache | None, threading.Lock |
 class CacheFactory:
     logged = False
 
+    def getMemoryPortion(self, cacheName: str | None = None) -> int:
+        """
+        Get the inverse fraction of memory a python cache may use.
+
+        :param cacheName: if specified, the portion can be affected by the
+            configuration.
+        :returns: the portion.
+        """
+        defaultPortion = 32
+        try:
+            portion = int(config.getConfig('cache_python_memory_portion', 0))
+            if cacheName:
+                portion = max(portion, int(config.getConfig(
+                    f'cache_{cacheName}_memory_portion', portion)))
+            portion = max(portion or defaultPortion, 3)
+        except ValueError:
+            portion = defaultPortion
+        return portion
+
+    def _configuredLimit(self, cacheName: str | None, setting: str) -> int:
+        """
+        Get a limit of a python cache from the configuration.
+
+        :param cacheName: the cache name.  If None, there is no configured
+            limit.
+        :param setting: the kind of limit, such as 'maximum' or 'bytes'.  The
+            configuration value is cache_<cacheName>_<setting>.
+        :returns: the limit, or 0 if it is not set to a positive integer.
+        """
+        if not cacheName:
+            return 0
+        try:
+            return max(int(config.getConfig(f'cache_{cacheName}_{setting}', 0) or 0), 0)
+        except ValueError:
+            return 0
+
     def getCacheSize(self, numItems: int | None, cacheName: str | None = None) -> int:
         if numItems is None:
-            defaultPortion = 32
-            try:
-                portion = int(config.getConfig('cache_python_memory_portion', 0))
-                if cacheName:
-                    portion = max(portion, int(config.getConfig(
-                        f'cache_{cacheName}_memory_portion', portion)))
-                portion = max(portion or defaultPortion, 3)
-            except ValueError:
-                portion = defaultPortion
-            numItems = pickAvailableCache(256**2 * 4 * 2, portion)
-        if cacheName:
-            try:
-                maxItems = int(config.getConfig(f'cache_{cacheName}_maximum', 0))
-                if maxItems > 0:
-                    numItems = min(numItems, max(maxItems, 3))
-            except ValueError:
-                pass
+            numItems = pickAvailableCache(256**2 * 4 * 2, self.getMemoryPortion(cacheName))
+        maxItems = self._configuredLimit(cacheName, 'maximum')
+        if maxItems:
+            numItems = min(numItems, max(maxItems, 3))
         return numItems
 
+    def getCacheBytes(self, cacheName: str | None = None) -> int:
+        """
+        Get the byte budget of a python cache.  This is the
+        cache_<cacheName>_bytes configuration value if it is positive, and
+        otherwise the memory portion of the total memory.
+
+        :param cacheName: if specified, the budget can be affected by the
+            configuration.
+        :returns: the budget in bytes.
+        """
+        return (self._configuredLimit(cacheName, 'bytes') or
+                int(config.total_memory() // self.getMemoryPortion(cacheName)))
+
     def getCache(
             self, numItems: int | None = None,
             cacheName: str | None = None,
@@ -146,7 +191,13 @@ class CacheFactory:
 
         if cache is None:  # fallback backend or inProcess
             cacheBackend = 'python'
-            cache = cachetools.LRUCache(self.getCacheSize(numItems, cacheName=cacheName))
+            if inProcess:
+                cache = cachetools.LRUCache(self.getCacheSize(numItems, cacheName=cacheName))
+            else:
+                # Tiles vary from small encoded images to large arrays, so
+                # the tile cache is limited by the bytes it holds.
+                maxItems = self._configuredLimit(cacheName, 'maximum') or numItems
+                cache = ByteCache(self.getCacheBytes(cacheName), maxitems=maxItems)
             cacheLock = threading.Lock()
 
         if not inProcess and not CacheFactory.logged:
@@ -0,0 +1,394 @@
+import contextlib
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Optional
+
+from .. import config
+from .base import BaseCache
+from .serialize import dumps, loads
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_Magic = b'LIdc'
+_Header = struct.Struct('<4sH')
+_Suffix = '.lic'
+# Bump this if the file or value format changes
+_FormatVersion = 1
+
+
+def versionStamp() -> bytes:
+    """
+    Get the stamp written with each value.  Values with a different stamp
+    were written by an incompatible version of large_image or python and are
+    ignored.
+
+    :returns: the stamp.
+    """
+    import large_image
+
+    return ('%d;%s;%d.%d' % (
+        _FormatVersion, getattr(large_image, '__version__', ''),
+        sys.version_info[0], sys.version_info[1])).encode()
+
+
+def defaultPath() -> str:
+    """
+    Get the default disk cache directory.  This is in the user's cache
+    directory.
+
+    :returns: a path.
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'large_image', 'tiles')
+
+
+class DiskFileStore:
+    """
+    A directory of files with a byte budget, shared by the disk tile cache
+    and other on-disk caches.
+
+    Files are kept in subdirectories and written to a temporary name and
+    renamed into place, so any number of processes can share a directory
+    without seeing partial files.  A file's modification time is updated when
+    it is used (at most once per touchInterval seconds); when the files
+    exceed the budget, the least recently used are removed until they are
+    below a fraction of it.  An flock keeps processes from evicting at the
+    same time.
+    """
+
+    def __init__(
+            self, path: str, maxsize: int, suffixes: tuple[str, ...],
+            lowWater: float = 0.9, touchInterval: float = 60) -> None:
+        """
+        Create a file store.
+
+        :param path: the directory.  This is created if needed.
+        :param maxsize: the maximum size of the files in bytes.
+        :param suffixes: the suffixes of the files in the store.  Other files
+            are ignored.
+        :param lowWater: when the store is too large, files are removed until
+            it uses this fraction of maxsize.
+        :param touchInterval: the minimum time in seconds between marking a
+            file as used.
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.maxsize = maxsize
+        self.suffixes = tuple(suffixes)
+        self.lowWater = lowWater
+        self.touchInterval = touchInterval
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._evicting = False
+        # The size and count as of the last scan plus what this process has
+        # changed since.  Other processes write too, so these are estimates.
+        entries = self.entries()
+        self._bytes = sum(size for _, size, _ in entries)
+        self._items = len(entries)
+
+    @property
+    def estimatedSize(self) -> int:
+        return self._bytes
+
+    @property
+    def estimatedItems(self) -> int:
+        return self._items
+
+    @property
+    def evicting(self) -> bool:
+        return self._evicting
+
+    def touch(self, path: str, mtime: float) -> None:
+        """
+        Mark a file as recently used, at most once per touch interval.
+
+        :param path: the file path.
+        :param mtime: the file's modification time.
+        """
+        if time.time() - mtime >= self.touchInterval:
+            with contextlib.suppress(OSError):
+                os.utime(path)
+
+    def publish(self, path: str, parts: list[bytes]) -> bool:
+        """
+        Write a file atomically, evicting old files in the background if the
+        store is over budget.
+
+        :param path: the destination path.
+        :param parts: byte strings written in order.
+        :returns: True if the file was written, False if it is larger than
+            the budget.
+        :raises OSError: if the file could not be written.
+        """
+        size = sum(len(part) for part in parts)
+        if size > self.maxsize:
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            oldSize = os.stat(path).st_size
+        except OSError:
+            oldSize = None
+        fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fptr:
+                for part in parts:
+                    fptr.write(part)
+            os.replace(tmpPath, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmpPath)
+            raise
+        with self._lock:
+            self._bytes += size - (oldSize or 0)
+            self._items += oldSize is None
+            if self._bytes <= self.maxsize or self._evicting:
+                return True
+            self._evicting = True
+        threading.Thread(target=self.evict, daemon=True, name='disk_cache_evict').start()
+        return True
+
+    def remove(self, path: str) -> None:
+        """
+        Remove a file.
+
+        :param path: the file path.
+        :raises OSError: if the file could not be removed.
+        """
+        size = os.stat(path).st_size
+        os.unlink(path)
+        with self._lock:
+            self._bytes = max(0, self._bytes - size)
+            self._items = max(0, self._items - 1)
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """
+        List the files, removing temporary files abandoned by writers that
+        crashed.
+
+        :returns: a list of (modification time, size, path).
+        """
+        entries = []
+        for shard in os.scandir(self.path):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.endswith(self.suffixes):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                elif entry.name.endswith('.tmp') and time.time() - stat.st_mtime > 3600:
+                    with contextlib.suppress(OSError):
+                        os.unlink(entry.path)
+        return entries
+
+    @contextlib.contextmanager
+    def _evictLock(self):
+        """
+        Ensure that only one process evicts files at a time.
+
+        :yields: True if this process should evict.
+        """
+        if fcntl is None:
+            yield True
+            return
+        with open(os.path.join(self.path, '.evict.lock'), 'a') as fptr:
+            try:
+                fcntl.flock(fptr.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fptr.fileno(), fcntl.LOCK_UN)
+
+    def evict(self) -> None:
+        """Remove the least recently used files until below the low water mark."""
+        try:
+            with self._evictLock() as locked:
+                if not locked:
+                    # Another process is evicting
+                    with self._lock:
+                        self._bytes = 0
+                    return
+                entries = self.entries()
+                total = sum(size for _, size, _ in entries)
+                target = int(self.maxsize * self.lowWater)
+                removed = 0
+                if total > self.maxsize:
+                    entries.sort()
+                    for _, size, path in entries:
+                        if total <= target:
+                            break
+                        with contextlib.suppress(OSError):
+                            os.unlink(path)
+                            removed += 1
+                        total -= size
+                with self._lock:
+                    self._bytes = total
+                    self._items = len(entries) - removed
+                    self.evictions += removed
+        except Exception:
+            config.getLogger('logprint').exception('Failed to evict disk cache files')
+        finally:
+            with self._lock:
+                self._evicting = False
+
+    def clear(self) -> int:
+        """
+        Remove all of the files.
+
+        :returns: the number of files removed.
+        """
+        count = 0
+        for _, _, path in self.entries():
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+                count += 1
+        with self._lock:
+            self._bytes = 0
+            self._items = 0
+        return count
+
+
+class DiskCache(BaseCache):
+    """
+    Use a directory on local disk as the backing cache, so that cached tiles
+    persist between runs.
+
+    Each value is a file named by the hash of its key in a subdirectory named
+    by the first two characters of the hash, kept within a size budget by a
+    DiskFileStore.
+    """
+
+    def __init__(
+            self, path: str | None = None, maxsize: int = 4 * 1024 ** 3,
+            lowWater: float = 0.9, touchInterval: float = 60) -> None:
+        """
+        Create a disk cache.
+
+        :param path: the cache directory.  This is created if needed.  None
+            to use defaultPath().
+        :param maxsize: the maximum size of the cached files in bytes.
+        :param lowWater: when the cache is too large, files are removed until
+            it uses this fraction of maxsize.
+        :param touchInterval: the minimum time in seconds between marking a
+            file as used.
+        """
+        super().__init__(0)
+        self._path = os.path.abspath(os.path.expanduser(path or defaultPath()))
+        self._files = DiskFileStore(self._path, maxsize, (_Suffix,), lowWater, touchInterval)
+        self._stamp = versionStamp()
+
+    def __repr__(self) -> str:
+        return 'DiskCache(%r)' % self._path
+
+    def __iter__(self):
+        # keys are not stored
+        return None
+
+    def __len__(self) -> int:
+        return len(self._files.entries())
+
+    def _filePath(self, key: str) -> str:
+        hashedKey = self._hashKey(key)
+        return os.path.join(self._path, hashedKey[:2], hashedKey + _Suffix)
+
+    def _read(self, path: str) -> bytes | None:
+        """
+        Read the value of a file if it was written by this version.
+
+        :param path: the file path.
+        :returns: the serialized value or None.
+        """
+        try:
+            with open(path, 'rb') as fptr:
+                data = fptr.read()
+                mtime = os.fstat(fptr.fileno()).st_mtime
+        except OSError:
+            return None
+        if len(data) < _Header.size:
+            return None
+        magic, stampLen = _Header.unpack_from(data)
+        stampEnd = _Header.size + stampLen
+        if magic != _Magic or data[_Header.size:stampEnd] != self._stamp:
+            return None
+        self._files.touch(path, mtime)
+        return data[stampEnd:]
+
+    def __contains__(self, key) -> bool:
+        return self._read(self._filePath(key)) is not None
+
+    def __delitem__(self, key: str) -> None:
+        try:
+            self._files.remove(self._filePath(key))
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def __getitem__(self, key: str) -> Any:
+        data = self._read(self._filePath(key))
+        if data is None:
+            return self.__missing__(key)
+        return loads(data)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        try:
+            data = dumps(value)
+        except (TypeError, AttributeError, pickle.PicklingError) as exc:
+            self.logError(
+                exc.__class__, config.getLogger('logprint').error,
+                '%s: Failed to save value with key %s' % (exc.__class__.__name__, key))
+            return
+        header = _Header.pack(_Magic, len(self._stamp)) + self._stamp
+        try:
+            self._files.publish(self._filePath(key), [header, data])
+        except OSError:
+            self.logError(OSError, config.getLogger('logprint').exception,
+                          'Failed to write disk cache file')
+
+    @property
+    def curritems(self) -> int:
+        return self._files.estimatedItems
+
+    @property
+    def currsize(self) -> int:
+        return self._files.estimatedSize
+
+    @property
+    def maxsize(self) -> int:
+        return self._files.maxsize
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def clear(self) -> None:
+        self._files.clear()
+
+    @staticmethod
+    def getCache() -> tuple[Optional['DiskCache'], None]:
+        """
+        Create a disk cache from the configuration.  cache_disk_path is the
+        directory and cache_disk_bytes the maximum size.
+
+        :returns: the cache, or None if the directory cannot be used, and
+            None, since the cache does not need a lock.
+        """
+        path = config.getConfig('cache_disk_path', None) or None
+        try:
+            maxsize = int(config.getConfig('cache_disk_bytes', 0) or 0)
+            cache = DiskCache(path, maxsize) if maxsize > 0 else DiskCache(path)
+        except (OSError, ValueError):
+            config.getLogger().info('Cannot use a disk cache for caching.')
+            return None, None
+        return cache, None
@@ -14,7 +14,9 @@
 #  limitations under the License.
 #############################################################################
 
+import contextlib
 import copy
+import pickle
 import threading
 import time
 from collections.abc import Callable
@@ -22,6 +24,7 @@ from typing import Any, Optional, TypeVar
 
 from .. import config
 from .base import BaseCache
+from .serialize import dumps, loads
 
 _VT = TypeVar('_VT')
 
@@ -29,6 +32,8 @@ _VT = TypeVar('_VT')
 class MemCache(BaseCache):
     """Use memcached as the backing cache."""
 
+    batchGets = True
+
     def __init__(
             self, url: str | list[str] = '127.0.0.1',
             username: str | None = None, password: str | None = None,
@@ -84,7 +89,7 @@ class MemCache(BaseCache):
     def __getitem__(self, key: str) -> Any:
         hashedKey = self._hashKey(key)
         try:
-            return self._client[hashedKey]
+            return loads(self._client[hashedKey])
         except KeyError:
             return self.__missing__(key)
         except self.pylibmc.ServerDown:
@@ -100,8 +105,8 @@ class MemCache(BaseCache):
     def __setitem__(self, key: str, value: Any) -> None:
         hashedKey = self._hashKey(key)
         try:
-            self._client[hashedKey] = value
-        except (TypeError, KeyError) as exc:
+            self._client[hashedKey] = dumps(value)
+        except (TypeError, KeyError, pickle.PicklingError) as exc:
             valueSize = value.shape if hasattr(value, 'shape') else (
                 value.size if hasattr(value, 'size') else (
                     len(value) if hasattr(value, '__len__') else None))
@@ -125,6 +130,57 @@ class MemCache(BaseCache):
                 self.logError(self.pylibmc.Error, config.getLogger('logprint').exception,
                               'pylibmc exception')
 
+    def getMany(self, keys: list[str]) -> dict[str, Any]:
+        """
+        Get several values with a single get_multi request.
+
+        :param keys: the keys to get.
+        :returns: a dictionary of the keys that were found and their values.
+        """
+        hashedKeys = {self._hashKey(key): key for key in keys}
+        try:
+            values = self._client.get_multi(list(hashedKeys))
+        except self.pylibmc.ServerDown:
+            self.logError(self.pylibmc.ServerDown, config.getLogger('logprint').info,
+                          'Memcached ServerDown')
+            self._reconnect()
+            return {}
+        except self.pylibmc.Error:
+            self.logError(self.pylibmc.Error, config.getLogger('logprint').exception,
+                          'pylibmc exception')
+            return {}
+        results = {}
+        for hashedKey, value in values.items():
+            # this can fail if a different version wrote the record
+            with contextlib.suppress(ValueError, pickle.UnpicklingError, ModuleNotFoundError):
+                results[hashedKeys[hashedKey]] = loads(value)
+        return results
+
+    def setMany(self, items: dict[str, Any]) -> None:
+        """
+        Set several values with a single set_multi request.  Values that
+        cannot be serialized are skipped.
+
+        :param items: a dictionary of keys and values to store.
+        """
+        data = {}
+        for key, value in items.items():
+            try:
+                data[self._hashKey(key)] = dumps(value)
+            except (TypeError, KeyError, pickle.PicklingError):
+                self.logError(TypeError, config.getLogger('logprint').error,
+                              'Failed to save value with key %s' % self._hashKey(key))
+        try:
+            self._client.set_multi(data)
+        except self.pylibmc.ServerDown:
+            self.logError(self.pylibmc.ServerDown, config.getLogger('logprint').info,
+                          'Memcached ServerDown')
+            self._reconnect()
+        except self.pylibmc.Error as exc:
+            if 'SUCCESS' not in repr(exc.args):
+                self.logError(self.pylibmc.Error, config.getLogger('logprint').exception,
+                              'pylibmc exception')
+
     @property
     def curritems(self) -> int:
         return self._getStat('curr_items')
@@ -14,16 +14,16 @@
 #  limitations under the License.
 #############################################################################
 
+import contextlib
 import pickle
 import threading
 import time
 from collections.abc import Callable, Iterable, Sized
 from typing import Any, Optional, TypeVar, cast
 
-from typing_extensions import Buffer
-
 from .. import config
 from .base import BaseCache
+from .serialize import dumps, loads
 
 _VT = TypeVar('_VT')
 
@@ -31,6 +31,8 @@ _VT = TypeVar('_VT')
 class RedisCache(BaseCache):
     """Use redis as the backing cache."""
 
+    batchGets = True
+
     def __init__(
             self, url: str | list[str] = '127.0.0.1:6379',
             username: str | None = None, password: str | None = None,
@@ -64,23 +66,23 @@ class RedisCache(BaseCache):
         return len(cast(Sized, keys))
 
     def __contains__(self, key) -> bool:
-        # cache never contains key
-        _key = self._cache_key_prefix + self._hashKey(key)
-        return bool(self._client.exists(_key))
+        return bool(self._client.exists(self._redisKey(key)))
 
     def __delitem__(self, key: str) -> None:
         if not self.__contains__(key):
             raise KeyError
-        _key = self._cache_key_prefix + self._hashKey(key)
-        self._client.delete(_key)
+        self._client.delete(self._redisKey(key))
+
+    def _redisKey(self, key: str) -> str:
+        return self._cache_key_prefix + self._hashKey(key)
 
     def __getitem__(self, key: str) -> Any:
-        _key = self._cache_key_prefix + self._hashKey(key)
+        _key = self._redisKey(key)
         try:
-            # must determine if tke key exists , otherwise cache_test can not be passed.
-            if not self.__contains__(key):
+            value = self._client.get(_key)
+            if value is None:
                 raise KeyError
-            return pickle.loads(cast(Buffer, self._client.get(_key)))
+            return loads(value)
         except KeyError:
             return self.__missing__(key)
         except self.redis.ConnectionError:
@@ -93,11 +95,10 @@ class RedisCache(BaseCache):
                           'redis RedisError')
             return self.__missing__(key)
 
-    def __setitem__(self, key: str, value: Any) -> None:
-        _key = self._cache_key_prefix + self._hashKey(key)
+    def _serialize(self, key: str, value: Any) -> bytes | None:
         try:
-            self._client.set(_key, pickle.dumps(value))
-        except (TypeError, KeyError) as exc:
+            return dumps(value)
+        except (TypeError, KeyError, pickle.PicklingError) as exc:
             valueSize = value.shape if hasattr(value, 'shape') else (
                 value.size if hasattr(value, 'size') else (
                     len(value) if hasattr(value, '__len__') else None))
@@ -108,6 +109,61 @@ class RedisCache(BaseCache):
                 exc.__class__, config.getLogger('logprint').error,
                 '%s: Failed to save value (size %r) with key %s' % (
                     exc.__class__.__name__, valueSize, key))
+        return None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        data = self._serialize(key, value)
+        if data is None:
+            return
+        try:
+            self._client.set(self._redisKey(key), data)
+        except self.redis.ConnectionError:
+            self.logError(self.redis.ConnectionError, config.getLogger('logprint').info,
+                          'redis ConnectionError')
+            self._reconnect()
+
+    def getMany(self, keys: list[str]) -> dict[str, Any]:
+        """
+        Get several values with a single MGET request.
+
+        :param keys: the keys to get.
+        :returns: a dictionary of the keys that were found and their values.
+        """
+        if not keys:
+            return {}
+        try:
+            values = cast(list, self._client.mget([self._redisKey(key) for key in keys]))
+        except self.redis.ConnectionError:
+            self.logError(self.redis.ConnectionError, config.getLogger('logprint').info,
+                          'redis ConnectionError')
+            self._reconnect()
+            return {}
+        except self.redis.RedisError:
+            self.logError(self.redis.RedisError, config.getLogger('logprint').exception,
+                          'redis RedisError')
+            return {}
+        results = {}
+        for key, value in zip(keys, values, strict=True):
+            if value is not None:
+                # this can fail if a different version wrote the record
+                with contextlib.suppress(
+                        ValueError, pickle.UnpicklingError, ModuleNotFoundError):
+                    results[key] = loads(value)
+        return results
+
+    def setMany(self, items: dict[str, Any]) -> None:
+        """
+        Set several values with a single pipelined request.
+
+        :param items: a dictionary of keys and values to store.
+        """
+        pipeline = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            data = self._serialize(key, value)
+            if data is not None:
+                pipeline.set(self._redisKey(key), data)
+        try:
+            pipeline.execute()
         except self.redis.ConnectionError:
             self.logError(self.redis.ConnectionError, config.getLogger('logprint').info,
                           'redis ConnectionError')
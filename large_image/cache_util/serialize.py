@@ -0,0 +1,81 @@
+import pickle
+import struct
+from typing import Any
+
+import numpy as np
+
+# Values written by dumps start with this prefix followed by a type code.
+# Anything else is treated as a plain pickle, which is how values used to be
+# stored.
+_Prefix = b'LIc'
+_ImageBytes = b'i'
+_Bytes = b'b'
+_Array = b'n'
+_Pickle = b'p'
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Serialize a value for a shared cache.  Encoded images and plain bytes are
+    stored as-is, numpy arrays as a dtype and shape header followed by their
+    buffer, and anything else is pickled.
+
+    :param value: the value to serialize.
+    :returns: the serialized bytes.
+    """
+    from ..tilesource.utilities import ImageBytes
+
+    if isinstance(value, ImageBytes):
+        mimetype = (value.mimetype or '').encode()
+        return b''.join((
+            _Prefix, _ImageBytes, struct.pack('<H', len(mimetype)), mimetype, value))
+    if type(value) is bytes:
+        return b''.join((_Prefix, _Bytes, value))
+    if (isinstance(value, np.ndarray) and type(value) is np.ndarray and
+            not value.dtype.hasobject and value.dtype.fields is None):
+        dtype = value.dtype.str.encode()
+        data = np.ascontiguousarray(value).reshape(-1).view(np.uint8)
+        return b''.join((
+            _Prefix, _Array, struct.pack('<BB', len(dtype), value.ndim), dtype,
+            struct.pack('<%dQ' % value.ndim, *value.shape), data))
+    return b''.join((_Prefix, _Pickle, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)))
+
+
+def loads(data: Any) -> Any:
+    """
+    Deserialize a value written by dumps.  Numpy arrays are read-only views
+    of the data rather than copies.
+
+    :param data: the serialized bytes.  Values that are not bytes are
+        returned unchanged.
+    :returns: the value.
+    """
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        return data
+    view = memoryview(data)
+    if view[:len(_Prefix)] != _Prefix:
+        return pickle.loads(data)
+    code = bytes(view[len(_Prefix):len(_Prefix) + 1])
+    offset = len(_Prefix) + 1
+    if code == _Array:
+        dtypeLen, ndim = struct.unpack_from('<BB', view, offset)
+        offset += 2
+        dtype = np.dtype(bytes(view[offset:offset + dtypeLen]).decode())
+        offset += dtypeLen
+        shape = struct.unpack_from('<%dQ' % ndim, view, offset)
+        offset += 8 * ndim
+        count = int(np.prod(shape, dtype=np.int64))
+        return np.frombuffer(data, dtype, count, offset).reshape(shape)
+    if code == _ImageBytes:
+        from ..tilesource.utilities import ImageBytes
+
+        mimetypeLen, = struct.unpack_from('<H', view, offset)
+        offset += 2
+        mimetype = bytes(view[offset:offset + mimetypeLen]).decode() or None
+        return ImageBytes(view[offset + mimetypeLen:], mimetype)
+    if code == _Bytes:
+        return bytes(view[offset:])
+    if code == _Pickle:
+        return pickle.loads(view[offset:])
+    msg = 'Unknown cache value type %r' % code
+    raise ValueError(msg)
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import contextlib
+import functools
+import threading
+from typing import Any, Optional
+
+import cachetools
+
+from .. import config
+from .base import BaseCache
+from .bytecache import ByteCache, sizeOf
+
+# Default in-process tier size, limited to the python cache's memory portion
+DefaultL1Bytes = 256 * 1024 ** 2
+
+
+class TieredCache(BaseCache):
+    """
+    A small in-process LRU cache (L1) in front of a shared cache such as
+    memcached or redis (L2).  Reads check L1 first and copy L2 hits into L1;
+    writes go to both.  With a ttl, L1 entries expire so that changes made
+    to L2 by other processes are seen within that time.
+    """
+
+    batchGets = True
+
+    def __init__(
+            self, l2: cachetools.Cache, l2Lock: threading.Lock | None = None,
+            maxsize: int = DefaultL1Bytes, ttl: float | None = None) -> None:
+        """
+        Create a tiered cache.
+
+        :param l2: the shared cache.
+        :param l2Lock: a lock required to use the shared cache, if any.
+        :param maxsize: the maximum size of the in-process cache in bytes.
+        :param ttl: if positive, the time in seconds an entry is kept in the
+            in-process cache.
+        """
+        super().__init__(0)
+        self.l1: cachetools.Cache = (
+            cachetools.TTLCache(maxsize, ttl, getsizeof=sizeOf) if ttl and ttl > 0 else
+            ByteCache(maxsize))
+        self.l2 = l2
+        self._l1Lock = threading.Lock()
+        self._l2Lock = l2Lock
+        self.l1Hits = self.l2Hits = self.misses = 0
+
+    def _l1Set(self, key: str, value: Any) -> None:
+        # A value too large for the in-process cache is not kept there
+        with self._l1Lock, contextlib.suppress(ValueError):
+            self.l1[key] = value
+
+    def __repr__(self) -> str:
+        return 'TieredCache(%r)' % self.l2
+
+    def __iter__(self):
+        return iter(self.l1)
+
+    def __len__(self) -> int:
+        return len(self.l1)
+
+    def __contains__(self, key) -> bool:
+        with self._l1Lock:
+            if key in self.l1:
+                return True
+        if self._l2Lock:
+            with self._l2Lock:
+                return key in self.l2
+        return key in self.l2
+
+    def __delitem__(self, key: str) -> None:
+        found = False
+        with self._l1Lock:
+            if key in self.l1:
+                del self.l1[key]
+                found = True
+        try:
+            if self._l2Lock:
+                with self._l2Lock:
+                    del self.l2[key]
+            else:
+                del self.l2[key]
+            found = True
+        except KeyError:
+            pass
+        if not found:
+            raise KeyError(key)
+
+    def __getitem__(self, key: str) -> Any:
+        with self._l1Lock:
+            try:
+                value = self.l1[key]
+                self.l1Hits += 1
+                return value
+            except KeyError:
+                pass
+        try:
+            if self._l2Lock:
+                with self._l2Lock:
+                    value = self.l2[key]
+            else:
+                value = self.l2[key]
+        except KeyError:
+            with self._l1Lock:
+                self.misses += 1
+            return self.__missing__(key)
+        self._l1Set(key, value)
+        with self._l1Lock:
+            self.l2Hits += 1
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._l1Set(key, value)
+        if self._l2Lock:
+            with self._l2Lock:
+                self.l2[key] = value
+        else:
+            self.l2[key] = value
+
+    def getMany(self, keys: list[str]) -> dict[str, Any]:
+        """
+        Get several values, fetching those that are not in process from the
+        shared cache in a single request.
+
+        :param keys: the keys to get.
+        :returns: a dictionary of the keys that were found and their values.
+        """
+        results = {}
+        with self._l1Lock:
+            for key in keys:
+                with contextlib.suppress(KeyError):
+                    results[key] = self.l1[key]
+            self.l1Hits += len(results)
+        remaining = [key for key in keys if key not in results]
+        if not remaining:
+            return results
+        getMany = getattr(self.l2, 'getMany', None) or functools.partial(
+            BaseCache.getMany, self.l2)
+        with self._l2Lock or contextlib.nullcontext():
+            found = getMany(remaining)
+        for key, value in found.items():
+            self._l1Set(key, value)
+        with self._l1Lock:
+            self.l2Hits += len(found)
+            self.misses += len(remaining) - len(found)
+        results.update(found)
+        return results
+
+    def setMany(self, items: dict[str, Any]) -> None:
+        """
+        Set several values in both tiers, storing them in the shared cache in
+        a single request.
+
+        :param items: a dictionary of keys and values to store.
+        """
+        for key, value in items.items():
+            self._l1Set(key, value)
+        setMany = getattr(self.l2, 'setMany', None) or functools.partial(
+            BaseCache.setMany, self.l2)
+        with self._l2Lock or contextlib.nullcontext():
+            setMany(items)
+
+    @property
+    def curritems(self) -> int:
+        return getattr(self.l2, 'curritems', self.l2.currsize)
+
+    @property
+    def currsize(self) -> int:
+        return self.l2.currsize
+
+    @property
+    def maxsize(self) -> int:
+        return self.l2.maxsize
+
+    def l1Info(self) -> dict[str, Any]:
+        """
+        Report on the in-process cache.
+
+        :returns: a dictionary of maxsize and used in bytes, items, and hit
+            and miss counts.
+        """
+        with self._l1Lock:
+            return {
+                'maxsize': self.l1.maxsize,
+                'used': self.l1.currsize,
+                'items': len(self.l1),
+                'hits': self.l1Hits,
+                'l2hits': self.l2Hits,
+                'misses': self.misses,
+            }
+
+    def clear(self) -> None:
+        with self._l1Lock:
+            self.l1.clear()
+        if self._l2Lock:
+            with self._l2Lock:
+                self.l2.clear()
+        else:
+            self.l2.clear()
+
+    @staticmethod
+    def getCache() -> tuple[Optional['TieredCache'], None]:
+        """
+        Create a tiered cache from the configuration.  cache_tiered_backend
+        selects the shared cache ('memcached' or 'redis'; by default the first
+        that is available), cache_tiered_bytes sizes the in-process cache, and
+        cache_tiered_ttl sets its expiry.
+
+        :returns: the cache, or None if no shared cache is available, and
+            None, since the cache does its own locking.
+        """
+        from .memcache import MemCache
+        from .rediscache import RedisCache
+
+        backends: dict[str, Any] = {'memcached': MemCache, 'redis': RedisCache}
+        backend = config.getConfig('cache_tiered_backend', None)
+        l2, l2Lock = None, None
+        for name in [backend.lower()] if backend else list(backends):
+            if backends.get(name) is None:
+                continue
+            l2, l2Lock = backends[name].getCache()
+            if l2 is not None:
+                break
+        if l2 is None:
+            config.getLogger().info('Cannot use a tiered cache without memcached or redis.')
+            return None, None
+        from .cachefactory import CacheFactory
+
+        maxsize = int(config.getConfig('cache_tiered_bytes', 0) or 0)
+        if maxsize <= 0:
+            maxsize = min(DefaultL1Bytes, CacheFactory().getCacheBytes())
+        ttl = float(config.getConfig('cache_tiered_ttl', 0) or 0)
+        return TieredCache(l2, l2Lock, maxsize, ttl), None
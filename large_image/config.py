@@ -44,15 +44,30 @@ ConfigValues = {
     'default_projection': 'EPSG:3857' if _in_notebook() else None,
 
     # For tiles
-    'cache_backend': None,  # 'python', 'redis' or 'memcached'
+    'cache_backend': None,  # 'python', 'redis', 'memcached', 'tiered', or 'disk'
     # 'python' cache can use 1/(val) of the available memory
     'cache_python_memory_portion': 32,
+    # If >0, the 'python' tile cache can hold this many bytes of tiles instead
+    # of the memory portion
+    'cache_tileCache_bytes': 0,
     # cache_memcached_url may be a list
     'cache_memcached_url': '127.0.0.1',
     'cache_memcached_username': None,
     'cache_memcached_password': None,
     'cache_redis_url': '127.0.0.1:6379',
     'cache_redis_password': None,
+    # 'tiered' cache keeps recent tiles in process in front of a shared cache
+    # ('memcached' or 'redis'; None for the first available).  If >0, the
+    # bytes kept in process (otherwise the smaller of 256 MiB and the python
+    # cache's memory portion) and the seconds before an in-process entry is
+    # refetched from the shared cache.
+    'cache_tiered_backend': None,
+    'cache_tiered_bytes': 0,
+    'cache_tiered_ttl': 0,
+    # 'disk' cache directory (None for ~/.cache/large_image/tiles) and the
+    # maximum bytes of cached files.
+    'cache_disk_path': None,
+    'cache_disk_bytes': 4 * 1024 ** 3,
 
     # If set to False, the default will be to not cache tile sources.  This has
     # substantial performance penalties if sources are used multiple times, so
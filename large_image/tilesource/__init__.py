@@ -7,7 +7,7 @@ from importlib.metadata import entry_points
 from pathlib import PosixPath
 from typing import Any, cast
 
-from .. import config
+from .. import config, timing
 from ..constants import NEW_IMAGE_PATH_FLAG, SourcePriority
 from ..exceptions import (TileGeneralError, TileGeneralException,
                           TileSourceAssetstoreError,
@@ -162,7 +162,11 @@ def getTileSourceFromDict(
     """
     sourceName = getSourceNameFromDict(availableSources, pathOrUri, *args, **kwargs)
     if sourceName:
-        return availableSources[sourceName](pathOrUri, *args, **kwargs)
+        span = timing.start('open', availableSources[sourceName].__name__)
+        try:
+            return availableSources[sourceName](pathOrUri, *args, **kwargs)
+        finally:
+            timing.finish(span)
     if not os.path.exists(pathOrUri) and '://' not in str(pathOrUri):
         raise TileSourceFileNotFoundError(pathOrUri)
     raise TileSourceError('No available tilesource for %s' % pathOrUri)
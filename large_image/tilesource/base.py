@@ -21,7 +21,7 @@ import PIL.ImageCms
 import PIL.ImageColor
 import PIL.ImageDraw
 
-from .. import config, exceptions
+from .. import config, exceptions, timing
 from ..cache_util import getTileCache, methodcache, strhash
 from ..constants import (TILE_FORMAT_IMAGE, TILE_FORMAT_NUMPY, TILE_FORMAT_PIL,
                          ExtraExtensionsToMimetypes, SourcePriority,
@@ -568,10 +568,16 @@ class TileSource(IPyLeafletMixin):
     def histogram(  # noqa
             self, dtype: npt.DTypeLike = None, onlyMinMax: bool = False,
             bins: int = 256, density: bool = False, format: Any = None,
-            *args, **kwargs) -> dict[str, np.ndarray | list[dict[str, Any]]]:
+            *args, max_workers: int | None = -4,
+            **kwargs) -> dict[str, np.ndarray | list[dict[str, Any]]]:
         """
         Get a histogram for a region.
 
+        Tiles are read once if they are integers of at most 16 bits (every
+        value is counted and the counts binned at the end) or if a numeric
+        range is specified; otherwise the region is read a second time to
+        bin the values once the range is known.
+
         :param dtype: if specified, the tiles must be this numpy.dtype.
         :param onlyMinMax: if True, only return the minimum and maximum value
             of the region.
@@ -589,6 +595,9 @@ class TileSource(IPyLeafletMixin):
             reduced or the bin_edges rounded to integer values for
             integer-based source data.
         :param args: parameters to pass to the tileIterator.
+        :param max_workers: maximum threads used to read and reduce tiles.  If
+            negative, use the minimum of the absolute value of this number or
+            the number of cpus.  If 0 or 1, tiles are processed serially.
         :param kwargs: parameters to pass to the tileIterator.
         :returns: if onlyMinMax is true, this is a dictionary with keys min and
             max, each of which is a numpy array with the minimum and maximum of
@@ -603,44 +612,61 @@ class TileSource(IPyLeafletMixin):
         lastlog = time.time()
         kwargs = kwargs.copy()
         histRange = kwargs.pop('range', None)
+        fixedRange = None if histRange is None or histRange == 'round' else histRange
         results: dict[str, Any] | None = None
-        for itile in self.tileIterator(format=TILE_FORMAT_NUMPY, **kwargs):
+        # Value counts per dtype, or histograms per band with a fixed range
+        counts: dict[tuple[np.dtype, int], np.ndarray] = {}
+        fixedHist: list[tuple[np.ndarray, np.ndarray] | None] = []
+        countedBands = 0
+        counted = not onlyMinMax
+        tileStats = functools.partial(
+            utilities._histogramTileStats, dtype=dtype, counts=not onlyMinMax,
+            bins=bins, histRange=fixedRange)
+        for itile, stats in utilities._mapInOrder(
+                lambda itile: tileStats(itile['tile']),
+                self.tileIterator(format=TILE_FORMAT_NUMPY, **kwargs), max_workers):
             if time.time() - lastlog > 10:
                 self.logger.info(
                     'Calculating histogram min/max for frame %d, tile %d/%d',
                     kwargs.get('frame', 0),
                     itile['tile_position']['position'], itile['iterator_range']['position'])
                 lastlog = time.time()
-            tile = itile['tile']
-            if dtype is not None and tile.dtype != dtype:
-                if tile.dtype == np.uint8 and dtype == np.uint16:
-                    tile = np.array(tile, dtype=np.uint16) * 257
-                else:
-                    continue
-            tilemin = np.array([
-                np.amin(tile[:, :, idx]) for idx in range(tile.shape[2])], tile.dtype)
-            tilemax = np.array([
-                np.amax(tile[:, :, idx]) for idx in range(tile.shape[2])], tile.dtype)
-            tilesum: np.ndarray = np.array([
-                np.sum(tile[:, :, idx]) for idx in range(tile.shape[2])], float)
-            tilesum2: np.ndarray = np.array([
-                np.sum(np.array(tile[:, :, idx], float) ** 2)
-                for idx in range(tile.shape[2])], float)
-            tilecount = tile.shape[0] * tile.shape[1]
+            if stats is None:
+                continue
             if results is None:
                 results = {
-                    'min': tilemin,
-                    'max': tilemax,
-                    'sum': tilesum,
-                    'sum2': tilesum2,
-                    'count': tilecount,
+                    'min': stats['min'],
+                    'max': stats['max'],
+                    'sum': stats['sum'],
+                    'sum2': stats['sum2'],
+                    'count': stats['count'],
                 }
+                fixedHist = [None] * len(results['min'])
+            else:
+                results['min'] = np.minimum(results['min'], stats['min'][:len(results['min'])])
+                results['max'] = np.maximum(results['max'], stats['max'][:len(results['min'])])
+                results['sum'] += stats['sum'][:len(results['min'])]
+                results['sum2'] += stats['sum2'][:len(results['min'])]
+                results['count'] += stats['count']
+            if not counted:
+                continue
+            numBands = min(len(results['min']), len(stats['min']))
+            countedBands = max(countedBands, numBands)
+            if 'counts' in stats:
+                key = (stats['dtype'], stats['offset'])
+                if key not in counts:
+                    counts[key] = np.zeros(
+                        (len(results['min']), stats['counts'].shape[1]), np.intp)
+                counts[key][:numBands] += stats['counts'][:numBands]
+            elif 'hist' in stats:
+                for idx in range(numBands):
+                    if fixedHist[idx] is None:
+                        fixedHist[idx] = stats['hist'][idx]
+                    else:
+                        hist = fixedHist[idx][0]
+                        hist += stats['hist'][idx][0]
             else:
-                results['min'] = np.minimum(results['min'], tilemin[:len(results['min'])])
-                results['max'] = np.maximum(results['max'], tilemax[:len(results['min'])])
-                results['sum'] += tilesum[:len(results['min'])]
-                results['sum2'] += tilesum2[:len(results['min'])]
-                results['count'] += tilecount
+                counted = False
         if results is None:
             return {}
         results['mean'] = results['sum'] / results['count']
@@ -671,28 +697,53 @@ class TileSource(IPyLeafletMixin):
                     rbins = int(math.ceil((record['range'][1] - record['range'][0]) / step))
                     record['range'] = (record['range'][0], record['range'][0] + step * rbins)
                     record['bins'] = rbins
-        for tile in self.tileIterator(format=TILE_FORMAT_NUMPY, **kwargs):
-            if time.time() - lastlog > 10:
-                self.logger.info(
-                    'Calculating histogram %d/%d',
-                    tile['tile_position']['position'], tile['iterator_range']['position'])
-                lastlog = time.time()
-            tile = tile['tile']
-            if dtype is not None and tile.dtype != dtype:
-                if tile.dtype == np.uint8 and dtype == np.uint16:
-                    tile = np.array(tile, dtype=np.uint16) * 257
-                else:
-                    continue
-            for idx in range(min(len(results['min']), tile.shape[-1])):
+        if counted:
+            for idx in range(countedBands):
                 entry = results['histogram'][idx]
-                hist, bin_edges = np.histogram(
-                    tile[:, :, idx], entry['bins'],
-                    (float(entry['range'][0]), float(entry['range'][1])), density=False)
-                if entry['hist'] is None:
-                    entry['hist'] = hist
-                    entry['bin_edges'] = bin_edges
-                else:
-                    entry['hist'] += hist
+                for (countDtype, offset), valueCounts in counts.items():
+                    hist, bin_edges = utilities._histogramFromCounts(
+                        valueCounts[idx], offset, countDtype, entry['bins'], entry['range'])
+                    if entry['hist'] is None:
+                        entry['hist'] = hist
+                        entry['bin_edges'] = bin_edges
+                    else:
+                        entry['hist'] += hist
+                if fixedHist[idx] is not None:
+                    hist, bin_edges = fixedHist[idx]
+                    if entry['hist'] is None:
+                        entry['hist'] = hist
+                        entry['bin_edges'] = bin_edges
+                    else:
+                        entry['hist'] += hist
+        else:
+            def tileHistograms(itile):
+                tile = itile['tile']
+                if dtype is not None and tile.dtype != dtype:
+                    if tile.dtype == np.uint8 and dtype == np.uint16:
+                        tile = np.array(tile, dtype=np.uint16) * 257
+                    else:
+                        return None
+                return [np.histogram(
+                    tile[:, :, idx], results['histogram'][idx]['bins'],
+                    (float(results['histogram'][idx]['range'][0]),
+                     float(results['histogram'][idx]['range'][1])), density=False)
+                    for idx in range(min(len(results['min']), tile.shape[-1]))]
+
+            for itile, histograms in utilities._mapInOrder(
+                    tileHistograms,
+                    self.tileIterator(format=TILE_FORMAT_NUMPY, **kwargs), max_workers):
+                if time.time() - lastlog > 10:
+                    self.logger.info(
+                        'Calculating histogram %d/%d',
+                        itile['tile_position']['position'], itile['iterator_range']['position'])
+                    lastlog = time.time()
+                for idx, (hist, bin_edges) in enumerate(histograms or []):
+                    entry = results['histogram'][idx]
+                    if entry['hist'] is None:
+                        entry['hist'] = hist
+                        entry['bin_edges'] = bin_edges
+                    else:
+                        entry['hist'] += hist
         for idx in range(len(results['min'])):
             entry = results['histogram'][idx]
             if entry['hist'] is not None:
@@ -1019,7 +1070,11 @@ class TileSource(IPyLeafletMixin):
             sc.axis = style.get('axis')
         if hasattr(self, '_iccprofiles') and sc.style.get(
                 'icc', config.getConfig('icc_correction', True)):
-            image = self._applyICCProfile(sc, frame or 0)
+            span = timing.start('icc', self)
+            try:
+                image = self._applyICCProfile(sc, frame or 0)
+            finally:
+                timing.finish(span)
         if not style or ('icc' in style and len(style) == 1):
             sc.output = image
         else:
@@ -1176,7 +1231,11 @@ class TileSource(IPyLeafletMixin):
         :param frame: the frame to use for auto-ranging.
         :returns: a numpy array and a target PIL image mode.
         """
-        tile, mode = _imageToNumpy(intile)
+        span = None if isinstance(intile, np.ndarray) else timing.start('decode', self)
+        try:
+            tile, mode = _imageToNumpy(intile)
+        finally:
+            timing.finish(span)
         if (applyStyle and (getattr(self, 'style', None) or hasattr(self, '_iccprofiles')) and
                 (not getattr(self, 'style', None) or
                  len(cast(JSONDict, self.style)) != 1 or
@@ -1244,8 +1303,12 @@ class TileSource(IPyLeafletMixin):
         mode = None
         if (numpyAllowed == 'always' or tileEncoding == TILE_FORMAT_NUMPY or
                 (applyStyle and hasStyle) or isEdge):
-            tile, mode = self._outputTileNumpyStyle(
-                tile, applyStyle, x, y, z, self._getFrame(**kwargs))
+            span = timing.start('style', self)
+            try:
+                tile, mode = self._outputTileNumpyStyle(
+                    tile, applyStyle, x, y, z, self._getFrame(**kwargs))
+            finally:
+                timing.finish(span)
         if isEdge:
             contentWidth = min(self.tileWidth,
                                sizeX - (maxX - self.tileWidth))
@@ -1695,7 +1758,9 @@ class TileSource(IPyLeafletMixin):
         :param frame: the frame number within the tile source.  None is the
             same as 0 for multi-frame sources.
         :returns: either a numpy array, a PIL image, or a memory object with an
-            image file.
+            image file.  Numpy arrays read from a memcached, redis, tiered, or
+            disk cache may be read-only; copy them before modifying them in
+            place.
         """
         raise NotImplementedError
 
@@ -1916,22 +1981,26 @@ class TileSource(IPyLeafletMixin):
             return self._encodeTiledImage(
                 cast(dict[str, Any], tiledimage), outWidth, outHeight, tileIter.info, **kwargs)
         if outWidth != regionWidth or outHeight != regionHeight:
-            dtype = cast(np.ndarray, image).dtype
-            if dtype == np.uint8 or (resample is not None and (
-                    dtype != np.uint16 or cast(np.ndarray, image).shape[-1] != 1)):
-                image = _imageToPIL(cast(np.ndarray, image), mode).resize(
-                    (outWidth, outHeight),
-                    getattr(PIL.Image, 'Resampling', PIL.Image).NEAREST
-                    if resample is None else
-                    getattr(PIL.Image, 'Resampling', PIL.Image).BICUBIC
-                    if outWidth > regionWidth else
-                    getattr(PIL.Image, 'Resampling', PIL.Image).LANCZOS)
-                if dtype == np.uint16 and TILE_FORMAT_NUMPY in format:
-                    image = _imageToNumpy(image)[0].astype(dtype) * 257
-            else:
-                cols = [int(idx * regionWidth / outWidth) for idx in range(outWidth)]
-                rows = [int(idx * regionHeight / outHeight) for idx in range(outHeight)]
-                image = np.take(np.take(cast(np.ndarray, image), rows, axis=0), cols, axis=1)
+            span = timing.start('resample', self)
+            try:
+                dtype = cast(np.ndarray, image).dtype
+                if dtype == np.uint8 or (resample is not None and (
+                        dtype != np.uint16 or cast(np.ndarray, image).shape[-1] != 1)):
+                    image = _imageToPIL(cast(np.ndarray, image), mode).resize(
+                        (outWidth, outHeight),
+                        getattr(PIL.Image, 'Resampling', PIL.Image).NEAREST
+                        if resample is None else
+                        getattr(PIL.Image, 'Resampling', PIL.Image).BICUBIC
+                        if outWidth > regionWidth else
+                        getattr(PIL.Image, 'Resampling', PIL.Image).LANCZOS)
+                    if dtype == np.uint16 and TILE_FORMAT_NUMPY in format:
+                        image = _imageToNumpy(image)[0].astype(dtype) * 257
+                else:
+                    cols = [int(idx * regionWidth / outWidth) for idx in range(outWidth)]
+                    rows = [int(idx * regionHeight / outHeight) for idx in range(outHeight)]
+                    image = np.take(np.take(cast(np.ndarray, image), rows, axis=0), cols, axis=1)
+            finally:
+                timing.finish(span)
         maxWidth = kwargs.get('output', {}).get('maxWidth')
         maxHeight = kwargs.get('output', {}).get('maxHeight')
         if kwargs.get('fill') and maxWidth and maxHeight:
@@ -6,7 +6,8 @@ import PIL.Image
 import PIL.ImageColor
 import PIL.ImageDraw
 
-from .. import exceptions
+from .. import exceptions, timing
+from ..cache_util import getCachedMany
 from ..constants import TILE_FORMAT_IMAGE, TILE_FORMAT_NUMPY, TILE_FORMAT_PIL
 from .utilities import ImageBytes, _encodeImage, _imageToNumpy, _imageToPIL
 
@@ -50,6 +51,8 @@ class LazyTileDict(dict):
         self.alwaysAllowPIL = True
         self.imageKwargs: dict[str, Any] = {}
         self.loaded = False
+        # Tile data found by prefetchTiles, keyed by the args to getTile
+        self._prefetched: dict[tuple, Any] = {}
         super().__init__(*args, **kwargs)
         # We set this initially so that they are listed in known keys using the
         # native dictionary methods
@@ -115,48 +118,77 @@ class LazyTileDict(dict):
             self.imageKwargs = imageKwargs
             self.loaded = False
 
+    def _tileCalls(self) -> list[tuple[tuple, dict[str, Any]]]:
+        """
+        List the calls to the source's getTile needed to load the tile image.
+
+        :returns: a list of (args, kwargs) for getTile.
+        """
+        if not self.retile:
+            return [((self.x, self.y, self.level), {
+                'pilImageAllowed': True,
+                'numpyAllowed': 'always' if TILE_FORMAT_NUMPY in self.format else True,
+                'sparseFallback': True,
+                'frame': self.frame,
+            })]
+        tileWidth = self.metadata['tileWidth']
+        tileHeight = self.metadata['tileHeight']
+        tx = self['x']
+        ty = self['y']
+        xmin = int(max(0, tx // tileWidth))
+        xmax = int((tx + self.width - 1) // tileWidth + 1)
+        ymin = int(max(0, ty // tileHeight))
+        ymax = int((ty + self.height - 1) // tileHeight + 1)
+        kwargs = {'numpyAllowed': 'always', 'sparseFallback': True, 'frame': self.frame}
+        return [((x, y, self.level), kwargs)
+                for y in range(ymin, ymax) for x in range(xmin, xmax)]
+
+    def _getTile(self, args: tuple, kwargs: dict[str, Any]) -> Any:
+        """
+        Get a tile from the source, using a value found by prefetchTiles if
+        there is one.
+
+        :param args: the args for getTile.
+        :param kwargs: the kwargs for getTile.
+        :returns: the tile data.
+        """
+        tileData = self._prefetched.pop(args, None)
+        if tileData is None:
+            tileData = self.source.getTile(*args, **kwargs)
+        return tileData
+
     def _retileTile(self) -> np.ndarray:
         """
         Given the tile information, create a numpy array and merge multiple
         tiles together to form a tile of a different size.
         """
-        tileWidth = self.metadata['tileWidth']
-        tileHeight = self.metadata['tileHeight']
-        level = self.level
-        frame = self.frame
         width = self.width
         height = self.height
         tx = self['x']
         ty = self['y']
 
         retile = None
-        xmin = int(max(0, tx // tileWidth))
-        xmax = int((tx + width - 1) // tileWidth + 1)
-        ymin = int(max(0, ty // tileHeight))
-        ymax = int((ty + height - 1) // tileHeight + 1)
-        for y in range(ymin, ymax):
-            for x in range(xmin, xmax):
-                tileData = self.source.getTile(
-                    x, y, level,
-                    numpyAllowed='always', sparseFallback=True, frame=frame)
-                if not isinstance(tileData, np.ndarray) or len(tileData.shape) != 3:
-                    tileData, _ = _imageToNumpy(tileData)
-                x0 = int(x * tileWidth - tx)
-                y0 = int(y * tileHeight - ty)
-                if x0 < 0:
-                    tileData = tileData[:, -x0:]
-                    x0 = 0
-                if y0 < 0:
-                    tileData = tileData[-y0:, :]
-                    y0 = 0
-                tw = min(tileData.shape[1], width - x0)
-                th = min(tileData.shape[0], height - y0)
-                if retile is None:
-                    retile = np.empty((height, width, tileData.shape[2]), dtype=tileData.dtype)
-                elif tileData.shape[2] < retile.shape[2]:
-                    retile = retile[:, :, :tileData.shape[2]]
-                retile[y0:y0 + th, x0:x0 + tw] = tileData[
-                    :th, :tw, :retile.shape[2]]
+        for args, kwargs in self._tileCalls():
+            x, y, _ = args
+            tileData = self._getTile(args, kwargs)
+            if not isinstance(tileData, np.ndarray) or len(tileData.shape) != 3:
+                tileData, _ = _imageToNumpy(tileData)
+            x0 = int(x * self.metadata['tileWidth'] - tx)
+            y0 = int(y * self.metadata['tileHeight'] - ty)
+            if x0 < 0:
+                tileData = tileData[:, -x0:]
+                x0 = 0
+            if y0 < 0:
+                tileData = tileData[-y0:, :]
+                y0 = 0
+            tw = min(tileData.shape[1], width - x0)
+            th = min(tileData.shape[0], height - y0)
+            if retile is None:
+                retile = np.empty((height, width, tileData.shape[2]), dtype=tileData.dtype)
+            elif tileData.shape[2] < retile.shape[2]:
+                retile = retile[:, :, :tileData.shape[2]]
+            retile[y0:y0 + th, x0:x0 + tw] = tileData[
+                :th, :tw, :retile.shape[2]]
         return cast(np.ndarray, retile)
 
     def _resample(self, tileData: ImageBytes | PIL.Image.Image | bytes | np.ndarray) -> tuple[
@@ -215,11 +247,7 @@ class LazyTileDict(dict):
             self.loaded = True
 
             if not self.retile:
-                tileData = self.source.getTile(
-                    self.x, self.y, self.level,
-                    pilImageAllowed=True,
-                    numpyAllowed='always' if TILE_FORMAT_NUMPY in self.format else True,
-                    sparseFallback=True, frame=self.frame)
+                tileData = self._getTile(*self._tileCalls()[0])
                 if self.crop:
                     tileData, _ = _imageToNumpy(tileData)
                     tileData = tileData[self.crop[1]:self.crop[3], self.crop[0]:self.crop[2]]
@@ -229,7 +257,11 @@ class LazyTileDict(dict):
             pilData = None
             # resample if needed
             if self.resample not in (False, None) and self.requestedScale:
-                tileData, pilData = self._resample(tileData)
+                span = timing.start('resample', self.source)
+                try:
+                    tileData, pilData = self._resample(tileData)
+                finally:
+                    timing.finish(span)
 
             tileFormat = (TILE_FORMAT_PIL if isinstance(tileData, PIL.Image.Image)
                           else (TILE_FORMAT_NUMPY if isinstance(tileData, np.ndarray)
@@ -282,3 +314,25 @@ class LazyTileDict(dict):
             self.loaded = False
             for key in self.deferredKeys:
                 self[key] = None
+
+
+def prefetchTiles(tiles: list[LazyTileDict]) -> None:
+    """
+    Look up the image data of several tiles from the same source in a single
+    request to the tile cache, before any of them are loaded.  This only has
+    an effect with caches whose batchGets is True, such as memcached and
+    redis; tiles that are not cached are read as usual when loaded.
+
+    :param tiles: a list of tiles that have not been loaded.
+    """
+    calls = []
+    owners = []
+    for tile in tiles:
+        if not tile.loaded:
+            for call in tile._tileCalls():
+                calls.append(call)
+                owners.append(tile)
+    if not calls:
+        return
+    for idx, tileData in getCachedMany(tiles[0].source.getTile, calls).items():
+        owners[idx]._prefetched[calls[idx][0]] = tileData
@@ -1,10 +1,11 @@
+import collections
 import math
 from collections.abc import Iterator
 from typing import TYPE_CHECKING, Any, cast
 
 from ..constants import TILE_FORMAT_IMAGE, TILE_FORMAT_NUMPY, TILE_FORMAT_PIL, TileOutputMimeTypes
 from . import utilities
-from .tiledict import LazyTileDict
+from .tiledict import LazyTileDict, prefetchTiles
 
 if TYPE_CHECKING:
     from .. import tilesource
@@ -14,8 +15,16 @@ class TileIterator:
     """
     A tile iterator on a TileSource.  Details about the iterator can be read
     via the `info` attribute on the iterator.
+
+    If the tile cache gets many values in one request (its batchGets is
+    True), tiles are taken from the underlying iteration in batches and their
+    image data is looked up in a single cache request before any of them are
+    loaded.
     """
 
+    # The number of underlying tiles to look up in the cache at once
+    prefetchBatchSize = 64
+
     def __init__(
             self, source: 'tilesource.TileSource',
             format: str | tuple[str] = (TILE_FORMAT_NUMPY, ),
@@ -30,6 +39,8 @@ class TileIterator:
                 raise ValueError('Invalid encoding "%s"' % encoding)
         self.format = format
         self.resample = resample
+        self._pending: collections.deque[LazyTileDict] = collections.deque()
+        self._prefetch = getattr(getattr(source, 'cache', None), 'batchGets', False)
         iterFormat = format if resample in (False, None) else (TILE_FORMAT_PIL, )
         self.info = self._tileIteratorInfo(format=iterFormat, resample=resample, **kwargs)
         if self.info is None:
@@ -45,9 +56,31 @@ class TileIterator:
     def __next__(self) -> LazyTileDict:
         if self._iter is None:
             raise StopIteration
-        tile = next(self._iter)
-        tile.setFormat(self.format, bool(self.resample), self._kwargs)
-        return tile
+        if not self._pending:
+            self._nextBatch()
+        return self._pending.popleft()
+
+    def _nextBatch(self) -> None:
+        """
+        Take the next tile or batch of tiles from the underlying iteration.
+        When prefetching, tiles are added until they need at least
+        prefetchBatchSize tiles from the source, then their image data is
+        looked up in the cache.
+        """
+        calls = 0
+        while not self._pending or (self._prefetch and calls < self.prefetchBatchSize):
+            tile = next(cast(Iterator[LazyTileDict], self._iter), None)
+            if tile is None:
+                break
+            tile.setFormat(self.format, bool(self.resample), self._kwargs)
+            self._pending.append(tile)
+            if not self._prefetch:
+                break
+            calls += len(tile._tileCalls())
+        if not self._pending:
+            raise StopIteration
+        if self._prefetch:
+            prefetchTiles(list(self._pending))
 
     def __repr__(self) -> str:
         repr = f'TileIterator<{self.source}'
@@ -15,6 +15,7 @@ import PIL.Image
 import PIL.ImageColor
 import PIL.ImageDraw
 
+from .. import timing
 from ..constants import dtypeToGValue
 
 # This was exposed here, once.
@@ -106,49 +107,53 @@ def _encodeImageBinary(
     :param tiffCompression: the compression format to use when encoding a TIFF.
     :returns: a binary image or b'' if the image is of zero size.
     """
-    encoding = TileOutputPILFormat.get(encoding, encoding)
-    if image.width == 0 or image.height == 0:
-        return b''
-    params: dict[str, Any] = {}
-    if encoding == 'JPEG':
-        if image.mode not in ({'L', 'RGB', 'RGBA'} if simplejpeg else {'L', 'RGB'}):
-            image = image.convert('RGB' if image.mode != 'LA' else 'L')
-        if simplejpeg:
-            return ImageBytes(simplejpeg.encode_jpeg(
-                _imageToNumpy(image)[0],
-                quality=jpegQuality,
-                colorspace=image.mode if image.mode in {'RGB', 'RGBA'} else 'GRAY',
-                colorsubsampling={-1: '444', 0: '444', 1: '422', 2: '420'}.get(
-                    cast(int, jpegSubsampling), str(jpegSubsampling).strip(':')),
-            ), mimetype='image/jpeg')
-        params['quality'] = jpegQuality
-        params['subsampling'] = jpegSubsampling
-    elif encoding in {'TIFF', 'TILED'}:
-        params['compression'] = {
-            'none': 'raw',
-            'lzw': 'tiff_lzw',
-            'deflate': 'tiff_adobe_deflate',
-        }.get(tiffCompression, tiffCompression)
-    elif encoding == 'PNG':
-        params['compress_level'] = 2
-    output = io.BytesIO()
+    span = timing.start('encode')
     try:
-        image.save(output, encoding, **params)
-    except Exception:
-        retry = True
-        if image.mode not in {'RGB', 'L'}:
-            image = image.convert('RGB')
-            try:
-                image.convert('RGB').save(output, encoding, **params)
-                retry = False
-            except Exception:
-                pass
-        if retry:
-            image.convert('1').save(output, encoding, **params)
-    return ImageBytes(
-        output.getvalue(),
-        mimetype=f'image/{encoding.lower().replace("tiled", "tiff")}',
-    )
+        encoding = TileOutputPILFormat.get(encoding, encoding)
+        if image.width == 0 or image.height == 0:
+            return b''
+        params: dict[str, Any] = {}
+        if encoding == 'JPEG':
+            if image.mode not in ({'L', 'RGB', 'RGBA'} if simplejpeg else {'L', 'RGB'}):
+                image = image.convert('RGB' if image.mode != 'LA' else 'L')
+            if simplejpeg:
+                return ImageBytes(simplejpeg.encode_jpeg(
+                    _imageToNumpy(image)[0],
+                    quality=jpegQuality,
+                    colorspace=image.mode if image.mode in {'RGB', 'RGBA'} else 'GRAY',
+                    colorsubsampling={-1: '444', 0: '444', 1: '422', 2: '420'}.get(
+                        cast(int, jpegSubsampling), str(jpegSubsampling).strip(':')),
+                ), mimetype='image/jpeg')
+            params['quality'] = jpegQuality
+            params['subsampling'] = jpegSubsampling
+        elif encoding in {'TIFF', 'TILED'}:
+            params['compression'] = {
+                'none': 'raw',
+                'lzw': 'tiff_lzw',
+                'deflate': 'tiff_adobe_deflate',
+            }.get(tiffCompression, tiffCompression)
+        elif encoding == 'PNG':
+            params['compress_level'] = 2
+        output = io.BytesIO()
+        try:
+            image.save(output, encoding, **params)
+        except Exception:
+            retry = True
+            if image.mode not in {'RGB', 'L'}:
+                image = image.convert('RGB')
+                try:
+                    image.convert('RGB').save(output, encoding, **params)
+                    retry = False
+                except Exception:
+                    pass
+            if retry:
+                image.convert('1').save(output, encoding, **params)
+        return ImageBytes(
+            output.getvalue(),
+            mimetype=f'image/{encoding.lower().replace("tiled", "tiff")}',
+        )
+    finally:
+        timing.finish(span, encoding=encoding)
 
 
 def _encodeImage(
@@ -1227,6 +1232,129 @@ def getTileFramesQuadInfo(
     return status
 
 
+def _histogramTileStats(
+        tile: np.ndarray, dtype: npt.DTypeLike = None, counts: bool = True,
+        bins: int = 256, histRange: tuple[float, float] | None = None,
+) -> dict[str, Any] | None:
+    """
+    Reduce a tile to the per-band values that make up a histogram.  All bands
+    are reduced together.  Integer tiles of at most 16 bits also get a count
+    of every possible value, from which a histogram with any bins and range
+    can be made later without reading the tile again.
+
+    :param tile: a numpy tile of shape (height, width, bands).
+    :param dtype: if specified, the tile must be this numpy.dtype.  uint8
+        tiles are scaled to uint16 if that is requested; other tiles that
+        don't match are skipped.
+    :param counts: if True, count values or compute a histogram.
+    :param bins: the number of bins, used only with histRange.
+    :param histRange: if not None, a fixed histogram range.  Tiles that can't
+        be counted get a histogram with this range instead.
+    :returns: None if the tile is skipped, otherwise a dictionary with min,
+        max, sum, sum2 and count, and, if counted, either offset (the lowest
+        possible value) and counts (an array of bands x values) or hist (a
+        list of (hist, bin_edges) per band).
+    """
+    if dtype is not None and tile.dtype != dtype:
+        if tile.dtype == np.uint8 and dtype == np.uint16:
+            tile = np.array(tile, dtype=np.uint16) * 257
+        else:
+            return None
+    # One contiguous row per band makes per-band reductions fast
+    planes = np.ascontiguousarray(np.moveaxis(tile, 2, 0)).reshape(tile.shape[2], -1)
+    result: dict[str, Any] = {
+        'dtype': tile.dtype,
+        'min': planes.min(axis=1),
+        'max': planes.max(axis=1),
+        'count': planes.shape[1],
+    }
+    small = np.issubdtype(tile.dtype, np.integer) and tile.dtype.itemsize <= 2
+    if small:
+        # Integer sums are exact in any order
+        wide = planes.astype(np.int64)
+        result['sum'] = wide.sum(axis=1).astype(float)
+        result['sum2'] = (wide * wide).sum(axis=1).astype(float)
+    else:
+        # Float sums depend on summation order, so keep the per-band order
+        result['sum'] = np.array([
+            np.sum(tile[:, :, idx]) for idx in range(tile.shape[2])], float)
+        result['sum2'] = np.array([
+            np.sum(np.array(tile[:, :, idx], float) ** 2)
+            for idx in range(tile.shape[2])], float)
+    if not counts:
+        return result
+    if small:
+        offset = int(np.iinfo(tile.dtype).min)
+        span = 1 << (8 * tile.dtype.itemsize)
+        result['offset'] = offset
+        result['counts'] = np.stack([
+            np.bincount(plane if not offset else plane.astype(np.int64) - offset,
+                        minlength=span)
+            for plane in planes])
+    elif histRange is not None:
+        result['hist'] = [np.histogram(
+            tile[:, :, idx], bins, (float(histRange[0]), float(histRange[1])),
+        ) for idx in range(tile.shape[2])]
+    return result
+
+
+def _histogramFromCounts(
+        counts: np.ndarray, offset: int, dtype: np.dtype, bins: int,
+        histRange: tuple[float, float]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a count of every value of one band to a histogram.  The result is
+    the same as calling numpy.histogram on the original values.
+
+    :param counts: an array with the number of occurrences of each value.
+    :param offset: the value of the first entry of counts.
+    :param dtype: the numpy dtype of the original values.
+    :param bins: the number of bins.
+    :param histRange: the range of the histogram.
+    :returns: hist, bin_edges: as from numpy.histogram.
+    """
+    values = np.arange(offset, offset + len(counts)).astype(dtype)
+    hist, bin_edges = np.histogram(
+        values, bins, (float(histRange[0]), float(histRange[1])), weights=counts)
+    return hist.astype(np.intp), bin_edges
+
+
+def _mapInOrder(func: Any, iterable: Any, max_workers: int | None = None) -> Any:
+    """
+    Apply a function to each item of an iterable on a pool of threads,
+    yielding the results in order.  Only a few more items than there are
+    workers are taken from the iterable at a time.
+
+    :param func: a function that takes one item.
+    :param iterable: an iterable of items.
+    :param max_workers: maximum workers for parallelism.  If negative, use
+        the minimum of the absolute value of this number or the number of
+        cpus.  If 0 or 1, process items in the calling thread.
+    :yields: item, result: each item and the result of func(item).
+    """
+    import collections
+    import concurrent.futures
+
+    from .. import config
+
+    if max_workers is not None and max_workers < 0:
+        max_workers = min(-max_workers, config.cpu_count(False))
+    if max_workers is not None and max_workers <= 1:
+        for item in iterable:
+            yield item, func(item)
+        return
+    window = (max_workers or config.cpu_count()) * 2
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending: collections.deque = collections.deque()
+        for item in iterable:
+            pending.append((item, pool.submit(func, item)))
+            if len(pending) > window:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+
+
 _recentThresholds: dict[tuple, Any] = {}
 
 
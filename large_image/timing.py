@@ -0,0 +1,251 @@
+"""
+Lightweight timing hooks for the tile pipeline.
+
+Instrumented code brackets a stage with ``start`` and ``finish``.  When no
+observer is registered, ``start`` returns None and ``finish`` returns
+immediately, so an instrumentation point costs two function calls.  When
+observers are registered, each finished stage is reported to every observer
+as a dictionary with:
+
+    stage: the stage name, such as 'getTile', 'style', or 'encode'.
+    source: the class name of the tile source, if known.
+    seconds: the wall-clock duration of the stage.
+    selfSeconds: the duration less that of stages nested within it on the
+        same thread.
+    stack: a tuple of frames for the enclosing stages and this stage,
+        outermost first.  A frame is '<source class>.<stage>', or just the
+        stage name if the source is not known when the stage starts.
+
+plus any keyword arguments passed to ``finish``.  Observers are called on
+the thread that ran the stage and must be fast and thread safe.
+
+The instrumented stages are 'open' (constructing a tile source),
+'getTile' (reading a tile, including any nested stages), 'decode'
+(converting an encoded tile to a numpy array), 'icc', 'style', 'resample',
+'encode', and 'prefetch' (looking up a batch of tiles in a shared cache),
+plus other cached methods such as 'getThumbnail' and 'histogram'.  To
+profile a block of code, use a Trace::
+
+    with large_image.timing.Trace() as trace:
+        source.getRegion(...)
+    print(trace.summary())
+    trace.writeCollapsed('profile.txt')  # for flamegraph.pl or speedscope
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from typing_extensions import Self
+
+from . import config
+
+Observer = Callable[[dict[str, Any]], None]
+
+_observers: tuple[Observer, ...] = ()
+_observersLock = threading.Lock()
+_local = threading.local()
+
+
+class Span:
+    """A stage that has been started but not finished."""
+
+    __slots__ = ('children', 'parent', 'source', 'stage', 'started')
+
+    def __init__(self, stage: str, parent: 'Span | None', source: str | None = None) -> None:
+        self.stage = stage
+        self.parent = parent
+        self.source = source
+        self.children = 0.0
+        self.started = time.perf_counter()
+
+    def stack(self) -> tuple[str, ...]:
+        """
+        Get the frames of this stage and the stages enclosing it.
+
+        :returns: a tuple of frames, outermost first.
+        """
+        stages = []
+        span: Span | None = self
+        while span is not None:
+            stages.append(span.stage if span.source is None else
+                          f'{span.source}.{span.stage}')
+            span = span.parent
+        return tuple(reversed(stages))
+
+
+def addObserver(observer: Observer) -> None:
+    """
+    Register a function to be called with the record of each finished stage.
+
+    :param observer: a function that takes a record dictionary.
+    """
+    global _observers
+
+    with _observersLock:
+        if observer not in _observers:
+            _observers = (*_observers, observer)
+
+
+def removeObserver(observer: Observer) -> None:
+    """
+    Unregister a function added with addObserver.
+
+    :param observer: the function to remove.
+    """
+    global _observers
+
+    with _observersLock:
+        _observers = tuple(entry for entry in _observers if entry != observer)
+
+
+def isEnabled() -> bool:
+    """
+    Check if any observer is registered.
+
+    :returns: True if stages are being timed.
+    """
+    return bool(_observers)
+
+
+def _sourceName(source: Any) -> str | None:
+    return source if source is None or isinstance(source, str) else source.__class__.__name__
+
+
+def start(stage: str, source: Any = None) -> Span | None:
+    """
+    Start timing a stage.  Every non-None result must be passed to finish on
+    the same thread, typically in a finally clause.
+
+    :param stage: the name of the stage.
+    :param source: the tile source or the name of its class, if known.
+    :returns: a span, or None if timing is disabled.
+    """
+    if not _observers:
+        return None
+    span = Span(stage, getattr(_local, 'span', None), _sourceName(source))
+    _local.span = span
+    return span
+
+
+def finish(span: Span | None, source: Any = None, **kwargs) -> None:
+    """
+    Finish timing a stage and report it to the observers.
+
+    :param span: the result of start.  If None, nothing is done.
+    :param source: the tile source or the name of its class.  If None, the
+        source passed to start is used.
+    :param kwargs: additional values to include in the record.
+    """
+    if span is None:
+        return
+    elapsed = time.perf_counter() - span.started
+    _local.span = span.parent
+    if span.parent is not None:
+        span.parent.children += elapsed
+    record = {
+        'stage': span.stage,
+        'source': span.source if source is None else _sourceName(source),
+        'seconds': elapsed,
+        'selfSeconds': max(0.0, elapsed - span.children),
+        'stack': span.stack(),
+        **kwargs,
+    }
+    for observer in _observers:
+        try:
+            observer(record)
+        except Exception:
+            config.getLogger().exception('Timing observer failed')
+
+
+class Trace:
+    """
+    Collect the records of all stages finished while active, on any thread.
+    Use as a context manager, or call ``start`` and ``stop``.
+
+    Records can be summarized per source class and stage, or exported as
+    collapsed stacks, the text format read by flamegraph.pl, speedscope, and
+    similar flame graph tools.
+    """
+
+    def __init__(self) -> None:
+        self.records: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def start(self) -> Self:
+        """
+        Start collecting records.
+
+        :returns: this trace.
+        """
+        addObserver(self)
+        return self
+
+    def stop(self) -> None:
+        """Stop collecting records."""
+        removeObserver(self)
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def summary(self) -> list[dict[str, Any]]:
+        """
+        Summarize the collected records per source class and stage.
+
+        :returns: a list of dictionaries with source, stage, count, seconds
+            (total), selfSeconds (total), meanSeconds, and maxSeconds, and,
+            for cached methods, hits.  The list is sorted by descending
+            selfSeconds.
+        """
+        entries: dict[tuple[str | None, str], dict[str, Any]] = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            key = (record['source'], record['stage'])
+            entry = entries.get(key)
+            if entry is None:
+                entry = entries[key] = {
+                    'source': key[0], 'stage': key[1], 'count': 0,
+                    'seconds': 0.0, 'selfSeconds': 0.0, 'maxSeconds': 0.0}
+            entry['count'] += 1
+            entry['seconds'] += record['seconds']
+            entry['selfSeconds'] += record['selfSeconds']
+            entry['maxSeconds'] = max(entry['maxSeconds'], record['seconds'])
+            if record.get('cached'):
+                entry['hits'] = entry.get('hits', 0) + 1
+        for entry in entries.values():
+            entry['meanSeconds'] = entry['seconds'] / entry['count']
+        return sorted(entries.values(), key=lambda entry: -entry['selfSeconds'])
+
+    def collapsed(self) -> Iterator[str]:
+        """
+        Export the collected records as collapsed stacks.
+
+        :returns: an iterator of lines of the form 'frame;frame;... value',
+            where value is the self time of that stack in microseconds.
+        """
+        totals: dict[tuple[str, ...], float] = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            totals[record['stack']] = totals.get(record['stack'], 0.0) + record['selfSeconds']
+        for stack, seconds in sorted(totals.items()):
+            yield '%s %d' % (';'.join(stack), round(seconds * 1e6))
+
+    def writeCollapsed(self, path: str) -> None:
+        """
+        Write the collected records as collapsed stacks to a file.
+
+        :param path: the output file path.
+        """
+        with open(path, 'w') as fptr:
+            for line in self.collapsed():
+                fptr.write(line + '\n')
@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark tile sources and the tile server.
+
+Each operation (getTile, getRegion, getThumbnail, histogram, tileIterator) is
+run on a seeded, repeatable list of calls, once with cleared caches (cold) and
+once more with the caches that run left behind (warm), with one or more
+thread counts.  With --server, a pan/zoom trace is replayed against the tile
+server's ASGI app in process.
+
+Results are written as JSON and can be compared with an earlier run; the
+command exits with a non-zero status if any p50 or p99 latency regressed by
+more than the tolerance.  For example::
+
+    python test/lisource_benchmark.py test --fixtures --server --output base.json
+    # ... change something ...
+    python test/lisource_benchmark.py test --fixtures --server --compare base.json
+
+Cold runs clear large_image's caches but not the operating system's file
+cache, so they measure decoding rather than storage.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import large_image
+from large_image.cache_util import cachesClear
+
+OPERATIONS = ('getTile', 'getRegion', 'getThumbnail', 'histogram', 'tileIterator')
+
+# Calls per operation for --scale 1
+OPERATION_CALLS = {
+    'getTile': 200,
+    'getRegion': 20,
+    'getThumbnail': 6,
+    'histogram': 2,
+    'tileIterator': 2,
+}
+
+# The deterministic test source used for the 'test' source name
+TEST_SOURCE_OPTIONS = {
+    'sizeX': 16384, 'sizeY': 12288, 'tileWidth': 256, 'tileHeight': 256, 'fractal': True}
+
+FIXTURE_SUFFIXES = ('.tiff', '.ome.tiff', '.zarr.zip')
+
+
+def percentile(values, pct):
+    """
+    Get a percentile of a list of values by linear interpolation.
+
+    :param values: a non-empty list of numbers.
+    :param pct: the percentile, 0 to 100.
+    :returns: the percentile value.
+    """
+    values = sorted(values)
+    pos = (len(values) - 1) * pct / 100
+    low = math.floor(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def summarize(durations, wall, errors=0):
+    """
+    Summarize call durations.
+
+    :param durations: a list of per-call durations in seconds.
+    :param wall: the wall-clock duration of all calls in seconds.
+    :param errors: the number of failed calls.
+    :returns: a dictionary of count, errors, mean, p50, p90, p99, and max in
+        seconds, and throughput in calls per second.
+    """
+    result = {'count': len(durations), 'errors': errors}
+    if durations:
+        result.update({
+            'mean': sum(durations) / len(durations),
+            'p50': percentile(durations, 50),
+            'p90': percentile(durations, 90),
+            'p99': percentile(durations, 99),
+            'max': max(durations),
+            'throughput': len(durations) / wall if wall else None,
+        })
+    return result
+
+
+def open_source(spec):
+    """
+    Open a source to benchmark.
+
+    :param spec: 'test' for the deterministic test source, or a file path.
+    :returns: a tile source.
+    """
+    if spec == 'test':
+        import large_image_source_test
+
+        return large_image_source_test.open(None, **TEST_SOURCE_OPTIONS)
+    return large_image.open(spec)
+
+
+def source_name(spec):
+    return spec if spec == 'test' else os.path.basename(spec)
+
+
+def _pyramid(image, tileSize):
+    levels = [image]
+    while max(levels[-1].shape[:2]) > tileSize:
+        levels.append(levels[-1][::2, ::2])
+    return levels
+
+
+def _write_tiff(path, image, tileSize, ome):
+    import tifffile
+
+    try:
+        import imagecodecs  # noqa: F401
+
+        compression = 'jpeg'
+    except ImportError:
+        compression = 'zlib'
+    levels = _pyramid(image, tileSize)
+    opts = {'tile': (tileSize, tileSize), 'compression': compression, 'photometric': 'rgb'}
+    with tifffile.TiffWriter(path, ome=ome) as tiff:
+        if ome:
+            tiff.write(levels[0], subifds=len(levels) - 1, **opts)
+            for level in levels[1:]:
+                tiff.write(level, subfiletype=1, **opts)
+        else:
+            for idx, level in enumerate(levels):
+                tiff.write(level, subfiletype=1 if idx else 0, **opts)
+
+
+def _write_zarr(path, image, tileSize):
+    import large_image_source_zarr
+
+    sink = large_image_source_zarr.new()
+    for y in range(0, image.shape[0], tileSize * 8):
+        for x in range(0, image.shape[1], tileSize * 8):
+            sink.addTile(image[y:y + tileSize * 8, x:x + tileSize * 8], x, y)
+    sink.write(path)
+
+
+def make_fixtures(directory, size=8192, tileSize=256):
+    """
+    Write pyramidal fixtures with the test source's image content.  A fixture
+    whose writer is not installed (tifffile for TIFF and OME-TIFF, the zarr
+    source for Zarr) is skipped.
+
+    :param directory: the directory for the fixtures.
+    :param size: the width and height of the fixtures.
+    :param tileSize: the tile size of the fixtures.
+    :returns: a list of fixture paths.
+    """
+    import large_image_source_test
+
+    logger = large_image.config.getLogger()
+    image = None
+    paths = []
+    for suffix in FIXTURE_SUFFIXES:
+        path = os.path.join(directory, f'fixture-{size}{suffix}')
+        if not os.path.exists(path):
+            if image is None:
+                image, _ = large_image_source_test.open(
+                    None, sizeX=size, sizeY=size, tileWidth=tileSize, tileHeight=tileSize,
+                    fractal=True).getRegion(format=large_image.constants.TILE_FORMAT_NUMPY)
+                image = np.ascontiguousarray(image[:, :, :3])
+            try:
+                if suffix == '.zarr.zip':
+                    _write_zarr(path, image, tileSize)
+                else:
+                    _write_tiff(path, image, tileSize, ome=suffix == '.ome.tiff')
+            except ImportError as exc:
+                logger.warning('Skipping %s fixture: %s', suffix, exc)
+                continue
+        paths.append(path)
+    return paths
+
+
+def plan_calls(source, operation, count, rng):
+    """
+    Build a repeatable list of calls for one operation.
+
+    :param source: the tile source.
+    :param operation: one of OPERATIONS.
+    :param count: the number of calls.
+    :param rng: a seeded random.Random instance.
+    :returns: a list of zero-argument functions.
+    """
+    metadata = source.getMetadata()
+    sizeX, sizeY = metadata['sizeX'], metadata['sizeY']
+    calls = []
+    for _ in range(count):
+        if operation == 'getTile':
+            z = rng.randrange(metadata['levels'])
+            scale = 2 ** (metadata['levels'] - 1 - z)
+            x = rng.randrange(max(1, math.ceil(sizeX / scale / metadata['tileWidth'])))
+            y = rng.randrange(max(1, math.ceil(sizeY / scale / metadata['tileHeight'])))
+            calls.append(lambda x=x, y=y, z=z: source.getTile(x, y, z))
+        elif operation == 'getRegion':
+            width = min(sizeX, 2048 * 2 ** rng.randrange(3))
+            height = min(sizeY, width)
+            region = {
+                'left': rng.randrange(sizeX - width + 1),
+                'top': rng.randrange(sizeY - height + 1),
+                'width': width, 'height': height}
+            calls.append(lambda region=region: source.getRegion(
+                region=region, output={'maxWidth': 1024, 'maxHeight': 1024}, encoding='JPEG'))
+        elif operation == 'getThumbnail':
+            width = rng.choice((128, 256, 512))
+            calls.append(lambda width=width: source.getThumbnail(width=width, height=width))
+        elif operation == 'histogram':
+            calls.append(lambda: source.histogram(
+                output={'maxWidth': 2048, 'maxHeight': 2048}, resample=False))
+        elif operation == 'tileIterator':
+            def iterate():
+                for tile in source.tileIterator(
+                        format=large_image.constants.TILE_FORMAT_NUMPY,
+                        output={'maxWidth': 4096, 'maxHeight': 4096}, resample=False):
+                    tile['tile']
+            calls.append(iterate)
+        else:
+            msg = f'Unknown operation {operation}'
+            raise ValueError(msg)
+    return calls
+
+
+def run_calls(calls, threads=1):
+    """
+    Time a list of calls.
+
+    :param calls: a list of zero-argument functions.
+    :param threads: the number of threads to run the calls on.
+    :returns: a summary from summarize.  Calls that raise are timed and
+        counted as errors.
+    """
+    errors = 0
+    errorsLock = threading.Lock()
+
+    def timed(call):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            call()
+        except Exception:
+            large_image.config.getLogger().debug('Benchmark call failed', exc_info=True)
+            with errorsLock:
+                errors += 1
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if threads <= 1:
+        durations = [timed(call) for call in calls]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+            durations = list(pool.map(timed, calls))
+    return summarize(durations, time.perf_counter() - start, errors)
+
+
+def bench_source(spec, operations=OPERATIONS, threads=(1, ), scale=1.0, seed=0):
+    """
+    Benchmark library operations on one source.
+
+    :param spec: the source, as for open_source.
+    :param operations: the operations to run.
+    :param threads: a list of thread counts to run with.
+    :param scale: a multiplier for the number of calls per operation.
+    :param seed: the random seed for the call lists.
+    :returns: a dictionary of results keyed by
+        '<source>/<operation>/<cold|warm>/t<threads>'.
+    """
+    results = {}
+    for operation in operations:
+        count = max(1, round(OPERATION_CALLS[operation] * scale))
+        for threadCount in threads:
+            cachesClear()
+            source = open_source(spec)
+            calls = plan_calls(source, operation, count, random.Random(f'{seed}:{operation}'))
+            prefix = f'{source_name(spec)}/{operation}'
+            for state in ('cold', 'warm'):
+                result = run_calls(calls, threadCount)
+                result['source'] = source.name
+                results[f'{prefix}/{state}/t{threadCount}'] = result
+    return results
+
+
+def synthetic_trace(metadata, steps=40, viewport=(1600, 900), seed=0):
+    """
+    Generate a pan/zoom trace like that of a viewer exploring a slide: start
+    zoomed out, then repeatedly zoom in or out or pan by part of a viewport.
+
+    :param metadata: the tile source metadata.
+    :param steps: the number of viewport changes.
+    :param viewport: the viewport width and height in screen pixels.
+    :param seed: the random seed.
+    :returns: a list of steps, each a list of tile request paths with an
+        '{image}' placeholder, requested concurrently.
+    """
+    rng = random.Random(seed)
+    tileWidth, tileHeight = metadata['tileWidth'], metadata['tileHeight']
+    maxZ = metadata['levels'] - 1
+    z = max(0, min(maxZ, maxZ - math.ceil(math.log2(max(
+        metadata['sizeX'] / viewport[0], metadata['sizeY'] / viewport[1], 1)))))
+    centerX, centerY = metadata['sizeX'] / 2, metadata['sizeY'] / 2
+    trace = []
+    for _ in range(steps):
+        scale = 2 ** (maxZ - z)
+        left = max(0, int((centerX / scale - viewport[0] / 2) // tileWidth))
+        top = max(0, int((centerY / scale - viewport[1] / 2) // tileHeight))
+        right = min(math.ceil(metadata['sizeX'] / scale / tileWidth),
+                    int((centerX / scale + viewport[0] / 2) // tileWidth) + 1)
+        bottom = min(math.ceil(metadata['sizeY'] / scale / tileHeight),
+                     int((centerY / scale + viewport[1] / 2) // tileHeight) + 1)
+        trace.append([
+            f'/tiles/{{image}}/{z}/{x}/{y}.jpeg'
+            for y in range(top, bottom) for x in range(left, right)])
+        action = rng.random()
+        if action < 0.3 and z < maxZ:
+            z += 1
+        elif action < 0.45 and z > 0:
+            z -= 1
+        else:
+            centerX += rng.uniform(-0.5, 0.5) * viewport[0] * scale
+            centerY += rng.uniform(-0.5, 0.5) * viewport[1] * scale
+        centerX = min(max(centerX, 0), metadata['sizeX'])
+        centerY = min(max(centerY, 0), metadata['sizeY'])
+    return trace
+
+
+async def _replay(app, steps, concurrency):
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+    errors = 0
+
+    async def fetch(client, path):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path)
+            durations.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        start = time.perf_counter()
+        for step in steps:
+            await asyncio.gather(*(fetch(client, path) for path in step))
+        wall = time.perf_counter() - start
+    return summarize(durations, wall, errors)
+
+
+def bench_server(path, trace=None, concurrency=6, seed=0):
+    """
+    Replay a pan/zoom trace against the tile server in process.
+
+    :param path: the image file to serve.
+    :param trace: a list of steps as from synthetic_trace.  If None, a
+        synthetic trace is generated.
+    :param concurrency: the maximum number of requests in flight, as a
+        browser limits requests per host.
+    :param seed: the random seed for a synthetic trace.
+    :returns: a dictionary of cold and warm results keyed by
+        'server:<image>/replay/<cold|warm>/c<concurrency>'.
+    """
+    from urllib.parse import quote
+
+    from large_image_server import create_app
+
+    imageId = os.path.basename(path)
+    if trace is None:
+        trace = synthetic_trace(large_image.open(path).getMetadata(), seed=seed)
+    steps = [[entry.replace('{image}', quote(imageId)) for entry in step] for step in trace]
+    results = {}
+    cachesClear()
+    app = create_app(image_dir=os.path.dirname(os.path.abspath(path)))
+    for state in ('cold', 'warm'):
+        results[f'server:{imageId}/replay/{state}/c{concurrency}'] = asyncio.run(
+            _replay(app, steps, concurrency))
+    return results
+
+
+def environment():
+    """
+    Describe the environment of a benchmark run.
+
+    :returns: a dictionary of the git commit, versions, and machine.
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'large_image': getattr(large_image, '__version__', None),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance=0.2, minDelta=0.001, stats=('p50', 'p99')):
+    """
+    Compare results with a baseline.
+
+    :param results: the current results.
+    :param baseline: earlier results.
+    :param tolerance: the allowed fractional increase in latency.
+    :param minDelta: increases of less than this many seconds are ignored as
+        noise.
+    :param stats: the statistics to compare.
+    :returns: a list of (key, stat, baseline value, current value, ratio) for
+        every compared value, and a list of the same for regressions.
+    """
+    rows = []
+    regressions = []
+    for key in sorted(set(results) & set(baseline)):
+        for stat in stats:
+            old = baseline[key].get(stat)
+            new = results[key].get(stat)
+            if old is None or new is None:
+                continue
+            ratio = new / old if old else math.inf if new else 1.0
+            row = (key, stat, old, new, ratio)
+            rows.append(row)
+            if new - old > minDelta and ratio > 1 + tolerance:
+                regressions.append(row)
+    return rows, regressions
+
+
+def main(opts):
+    logger = large_image.config.getLogger()
+    results = {}
+    sources = list(opts.source)
+    if opts.fixtures:
+        fixtureDir = opts.fixture_dir or tempfile.mkdtemp(prefix='lisource_benchmark_')
+        os.makedirs(fixtureDir, exist_ok=True)
+        sources.extend(make_fixtures(fixtureDir, opts.fixture_size))
+    threads = [int(val) for val in opts.threads.split(',')]
+    operations = opts.operation or OPERATIONS
+    for spec in sources:
+        logger.info('Benchmarking %s', spec)
+        results.update(bench_source(spec, operations, threads, opts.scale, opts.seed))
+    if opts.server:
+        trace = None
+        if opts.trace:
+            with open(opts.trace) as fptr:
+                trace = json.load(fptr)
+        for spec in sources:
+            if spec != 'test':
+                logger.info('Replaying trace against %s', spec)
+                results.update(bench_server(spec, trace, opts.concurrency, opts.seed))
+    output = {'environment': environment(), 'results': results}
+    if opts.output:
+        with open(opts.output, 'w') as fptr:
+            json.dump(output, fptr, indent=1, sort_keys=True)
+    print('%-56s %8s %10s %10s %10s' % ('benchmark', 'count', 'p50 ms', 'p99 ms', 'per sec'))
+    for key, result in sorted(results.items()):
+        print('%-56s %8d %10.2f %10.2f %10.1f' % (
+            key, result['count'], result.get('p50', 0) * 1000, result.get('p99', 0) * 1000,
+            result.get('throughput') or 0))
+        if result['errors']:
+            logger.warning('%s: %d requests failed', key, result['errors'])
+    if opts.compare:
+        with open(opts.compare) as fptr:
+            baseline = json.load(fptr)
+        rows, regressions = compare(
+            results, baseline['results'], opts.tolerance, opts.min_delta)
+        print('\nCompared with %s (%s)' % (opts.compare, baseline['environment'].get('commit')))
+        for key, stat, old, new, ratio in rows:
+            flag = ' REGRESSION' if (key, stat, old, new, ratio) in regressions else ''
+            print('%-56s %4s %10.2f %10.2f %6.2fx%s' % (
+                key, stat, old * 1000, new * 1000, ratio, flag))
+        if regressions:
+            return 1
+    return 0
+
+
+def command():
+    parser = argparse.ArgumentParser(
+        description='Benchmark large_image tile sources and the tile server.  '
+        'Results can be saved as a JSON baseline and compared with later runs.')
+    parser.add_argument(
+        'source', nargs='*', default=['test'],
+        help='Image files to benchmark.  "test" is the deterministic test '
+        'source.  Default is "test".')
+    parser.add_argument(
+        '--fixtures', action='store_true',
+        help='Also benchmark generated pyramidal TIFF, OME-TIFF, and Zarr '
+        'fixtures.')
+    parser.add_argument(
+        '--fixture-dir',
+        help='Directory for generated fixtures; existing fixtures are reused.  '
+        'Default is a new temporary directory.')
+    parser.add_argument(
+        '--fixture-size', type=int, default=8192,
+        help='Width and height of generated fixtures.')
+    parser.add_argument(
+        '--operation', '--op', action='append', choices=OPERATIONS,
+        help='Operation to benchmark.  Can be specified multiple times.  '
+        'Default is all operations.')
+    parser.add_argument(
+        '--threads', default='1,4',
+        help='Comma-separated thread counts to run each operation with.')
+    parser.add_argument(
+        '--scale', type=float, default=1.0,
+        help='Multiplier for the number of calls per operation.')
+    parser.add_argument(
+        '--seed', type=int, default=0, help='Random seed for calls and traces.')
+    parser.add_argument(
+        '--server', action='store_true',
+        help='Replay a pan/zoom trace against the tile server for each image '
+        'file.  Requires large_image_server and httpx.')
+    parser.add_argument(
+        '--trace',
+        help='JSON file with a recorded trace: a list of steps, each a list '
+        'of request paths with "{image}" in place of the image ID.  Default '
+        'is a synthetic trace.')
+    parser.add_argument(
+        '--concurrency', type=int, default=6,
+        help='Maximum concurrent requests during trace replay.')
+    parser.add_argument(
+        '--output', '-o', help='Write results to a JSON file.')
+    parser.add_argument(
+        '--compare', '-c',
+        help='Compare results with a JSON file from an earlier run and exit '
+        'with a non-zero status on a regression.')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help='Allowed fractional increase in p50 and p99 latency.')
+    parser.add_argument(
+        '--min-delta', type=float, default=0.001,
+        help='Latency increases smaller than this many seconds are not '
+        'regressions.')
+    parser.add_argument(
+        '--verbose', '-v', action='count', default=0, help='Increase verbosity')
+    opts = parser.parse_args()
+    li_logger = large_image.config.getConfig('logger')
+    li_logger.setLevel(max(1, logging.WARNING - opts.verbose * 10))
+    li_logger.addHandler(logging.StreamHandler(sys.stderr))
+    sys.exit(main(opts))
+
+
+if __name__ == '__main__':
+    command()
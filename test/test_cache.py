@@ -1,16 +1,20 @@
 import concurrent.futures
 import os
+import pickle
 import threading
 import time
 
 import cachetools
+import numpy
+import PIL.Image
 import pytest
 
 import large_image.cache_util.cache
 from large_image import config
-from large_image.cache_util import (LruCacheMetaclass, MemCache, RedisCache,
-                                    cachesClear, cachesInfo, getTileCache,
-                                    methodcache, strhash)
+from large_image.cache_util import (ByteCache, CacheFactory, DiskCache,
+                                    LruCacheMetaclass, MemCache, RedisCache,
+                                    TieredCache, cachesClear, cachesInfo,
+                                    getTileCache, methodcache, sizeOf, strhash)
 
 
 class Fib:
@@ -92,6 +96,314 @@ def testGetTileCachePython():
     assert 'tileCache' in cachesInfo()
 
 
+@pytest.mark.singular
+def testGetTileCachePythonBytes():
+    large_image.cache_util.cache._tileCache = None
+    large_image.cache_util.cache._tileLock = None
+    config.setConfig('cache_backend', 'python')
+    config.setConfig('cache_tileCache_bytes', 1000000)
+    try:
+        tileCache, tileLock = getTileCache()
+        assert isinstance(tileCache, ByteCache)
+        for idx in range(5):
+            tileCache[idx] = numpy.zeros((300, 300, 3), dtype=numpy.uint8)
+        info = cachesInfo()['tileCache']
+        assert info['maxsize'] == 1000000
+        assert info['items'] == 3
+        assert info['used'] == 3 * 270000
+    finally:
+        config.setConfig('cache_tileCache_bytes', 0)
+        large_image.cache_util.cache._tileCache = None
+        large_image.cache_util.cache._tileLock = None
+
+
+@pytest.mark.singular
+def testCacheFactoryBytesFallback():
+    factory = CacheFactory()
+    default = factory.getCacheBytes()
+    try:
+        for value in ('not a number', -5):
+            config.setConfig('cache_tileCache_bytes', value)
+            assert factory.getCacheBytes('tileCache') == factory.getCacheBytes(None)
+        config.setConfig('cache_tileCache_bytes', 5000)
+        assert factory.getCacheBytes('tileCache') == 5000
+        assert factory.getCacheBytes() == default
+    finally:
+        config.setConfig('cache_tileCache_bytes', 0)
+
+
+def testByteCache():
+    cache = ByteCache(1000, maxitems=3)
+    cache['a'] = b'x' * 400
+    cache['b'] = numpy.zeros(400, dtype=numpy.uint8)
+    assert cache.currsize >= 800
+    cache['a']
+    cache['c'] = PIL.Image.new('L', (20, 20))
+    # 'b' was least recently used
+    assert set(cache) == {'a', 'c'}
+    cache['d'] = b''
+    cache['e'] = b''
+    assert set(cache) == {'c', 'd', 'e'}
+    assert cache.curritems == 3
+    with pytest.raises(ValueError):
+        cache['f'] = numpy.zeros(2000, dtype=numpy.uint8)
+
+
+def testSizeOf():
+    array = numpy.zeros((100, 100, 4), dtype=numpy.float32)
+    assert sizeOf(array) == 160000
+    # A view holds its base array
+    assert sizeOf(array[:1, :1]) == 160000
+    assert sizeOf(PIL.Image.new('RGB', (10, 20))) == 600
+    assert sizeOf(PIL.Image.new('I;16', (10, 20))) == 400
+    assert sizeOf((b'x' * 1000, 'image/png')) > 1000
+    assert sizeOf({'hist': [array]}) > 160000
+
+
+def testTieredCache():
+    shared = cachetools.LRUCache(100)
+    cache = TieredCache(shared, threading.Lock(), maxsize=10000)
+    cache['a'] = b'x' * 100
+    assert shared['a'] == b'x' * 100
+    assert cache['a'] == b'x' * 100
+    # Values another process wrote to the shared cache are copied in process
+    shared['b'] = b'y' * 100
+    assert 'b' not in cache.l1
+    assert cache['b'] == b'y' * 100
+    assert 'b' in cache.l1
+    with pytest.raises(KeyError):
+        cache['c']
+    # Values too large for the in-process cache are only shared
+    cache['d'] = b'z' * 20000
+    assert 'd' not in cache.l1
+    assert cache['d'] == b'z' * 20000
+    info = cache.l1Info()
+    assert (info['hits'], info['l2hits'], info['misses']) == (1, 2, 1)
+    del cache['a']
+    assert 'a' not in cache
+    cache.clear()
+    assert not len(shared)
+    assert not len(cache.l1)
+
+
+def testTieredCacheTTL():
+    shared = cachetools.LRUCache(100)
+    cache = TieredCache(shared, maxsize=10000, ttl=0.05)
+    cache['a'] = 1
+    shared['a'] = 2
+    assert cache['a'] == 1
+    time.sleep(0.1)
+    assert cache['a'] == 2
+
+
+@pytest.mark.singular
+def testGetTileCacheTieredFallback():
+    large_image.cache_util.cache._tileCache = None
+    large_image.cache_util.cache._tileLock = None
+    config.setConfig('cache_backend', 'tiered')
+    config.setConfig('cache_tiered_backend', 'memcached')
+    config.setConfig('cache_memcached_url', 'nosuchhost')
+    try:
+        tileCache, tileLock = getTileCache()
+        # Without a shared cache, the python cache is used
+        assert isinstance(tileCache, ByteCache)
+    finally:
+        config.setConfig('cache_tiered_backend', None)
+        config.setConfig('cache_memcached_url', '127.0.0.1')
+        large_image.cache_util.cache._tileCache = None
+        large_image.cache_util.cache._tileLock = None
+
+
+class CountingCache(cachetools.LRUCache):
+    """An in-process cache that can get many values and counts requests."""
+
+    batchGets = True
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.getManyCalls = 0
+
+    def getMany(self, keys):
+        self.getManyCalls += 1
+        return {key: self[key] for key in keys if key in self}
+
+
+def testTieredCacheGetMany():
+    shared = CountingCache(100)
+    cache = TieredCache(shared, maxsize=10000)
+    cache.setMany({'a': 1, 'b': 2})
+    shared['c'] = 3
+    assert cache.getMany(['a', 'c', 'd']) == {'a': 1, 'c': 3}
+    assert shared.getManyCalls == 1
+    assert 'c' in cache.l1
+    assert cache.getMany(['a', 'b', 'c']) == {'a': 1, 'b': 2, 'c': 3}
+    assert shared.getManyCalls == 1
+
+
+def testSerialize():
+    from large_image.cache_util.serialize import dumps, loads
+    from large_image.tilesource.utilities import ImageBytes
+
+    value = loads(dumps(ImageBytes(b'abc', 'image/png')))
+    assert isinstance(value, ImageBytes)
+    assert value == b'abc'
+    assert value.mimetype == 'image/png'
+    assert loads(dumps(ImageBytes(b'abc'))).mimetype is None
+    assert type(loads(dumps(b'abc'))) is bytes
+    for array in (
+            numpy.arange(24, dtype=numpy.uint16).reshape(2, 3, 4),
+            numpy.arange(24, dtype='>f4').reshape(4, 6)[:, ::2],
+            numpy.array(3.5),
+            numpy.zeros((0, 4), dtype=bool)):
+        value = loads(dumps(array))
+        assert value.dtype == array.dtype
+        assert value.shape == array.shape
+        assert (value == array).all()
+        assert not value.flags.writeable
+    assert loads(dumps({'a': [1, 2]})) == {'a': [1, 2]}
+    # Values stored by earlier versions were pickled
+    assert loads(pickle.dumps({'a': 1})) == {'a': 1}
+    assert loads(7) == 7
+    with pytest.raises(ValueError):
+        loads(b'LIcz')
+
+
+def testRegionPrefetch(tmp_path):
+    import large_image_source_test
+
+    source = large_image_source_test.TestTileSource(
+        None, tileWidth=256, tileHeight=256, sizeX=2048, sizeY=2048, noCache=True)
+    source.cache, source.cache_lock = CountingCache(1000), None
+    region, _ = source.getRegion(format='numpy')
+    assert source.cache.getManyCalls == 1
+    tiles = large_image_source_test._counters['tiles']
+    # A warm read of the 64 tiles in the region is a single cache request
+    region2, _ = source.getRegion(format='numpy')
+    assert source.cache.getManyCalls == 2
+    assert large_image_source_test._counters['tiles'] == tiles
+    assert (region == region2).all()
+    # The iterator looks tiles up in batches
+    assert len(list(source.tileIterator(format='numpy'))) == 64
+    assert source.cache.getManyCalls == 3
+    assert len(list(source.tileIterator(format='numpy', tile_size={'width': 128}))) == 256
+    assert source.cache.getManyCalls == 7
+    assert large_image_source_test._counters['tiles'] == tiles
+    # Caches without bulk requests read tiles as they are loaded
+    source.cache = DiskCache(str(tmp_path))
+    assert not source.tileIterator(format='numpy')._prefetch
+
+
+@pytest.mark.singular
+@pytest.mark.skipif(os.getenv('REDIS_TEST_URL') is None, reason='REDIS_TEST_URL is not set')
+def testRedisGetMany():
+    config.setConfig('cache_redis_url', os.getenv('REDIS_TEST_URL'))
+    cache = RedisCache()
+    array = numpy.arange(12, dtype=numpy.uint8).reshape(2, 2, 3)
+    cache.setMany({'a': array, 'b': 'text'})
+    values = cache.getMany(['a', 'b', 'missing'])
+    assert set(values) == {'a', 'b'}
+    assert (values['a'] == array).all()
+    assert values['b'] == 'text'
+    assert cache['b'] == 'text'
+
+
+def testDiskCache(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache_test(cache)
+    assert cache['(2,)'] == 1
+    array = numpy.arange(12, dtype=numpy.uint16).reshape(2, 2, 3)
+    cache['array'] = array
+    # Another process sharing the directory sees the values
+    other = DiskCache(str(tmp_path))
+    assert (other['array'] == array).all()
+    assert 'array' in other
+    del other['array']
+    assert 'array' not in cache
+    with pytest.raises(KeyError):
+        del cache['array']
+    assert len(cache) == 100
+    # The size is an estimate; only other knows that array was deleted
+    assert cache.curritems == 101
+    assert other.curritems == 100
+    assert other.currsize == sum(size for _, size, _ in other._files.entries())
+    cache.clear()
+    assert cache.curritems == 0
+    assert len(other) == 0
+
+
+def testDiskCacheVersion(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache['a'] = 1
+    other = DiskCache(str(tmp_path))
+    other._stamp = b'other version'
+    with pytest.raises(KeyError):
+        other['a']
+    other['a'] = 2
+    assert other['a'] == 2
+    with pytest.raises(KeyError):
+        cache['a']
+
+
+def testDiskCacheEviction(tmp_path):
+    cache = DiskCache(str(tmp_path), maxsize=40000, touchInterval=0)
+    for idx in range(30):
+        cache[str(idx)] = b'x' * 1000
+        os.utime(cache._filePath(str(idx)), (idx, idx))
+    # Reading a value marks it as recently used
+    assert cache['0'] == b'x' * 1000
+    cache._files.maxsize = 20000
+    cache._files.evict()
+    assert cache.currsize <= 20000 * 0.9
+    assert cache.curritems == len(cache)
+    assert '0' in cache
+    assert '1' not in cache
+    assert '29' in cache
+    # Writing past the size evicts in the background
+    for idx in range(30, 60):
+        cache[str(idx)] = b'x' * 1000
+    for _ in range(100):
+        if not cache._files.evicting:
+            break
+        time.sleep(0.01)
+    assert len(cache) < 47
+
+
+def testRegionPrefetchBadValue(tmp_path):
+    import large_image_source_test
+
+    source = large_image_source_test.TestTileSource(
+        None, tileWidth=256, tileHeight=256, sizeX=1024, sizeY=1024, noCache=True)
+    disk = DiskCache(str(tmp_path))
+    source.cache, source.cache_lock = TieredCache(disk, maxsize=10 ** 8), None
+    region, _ = source.getRegion(format='numpy')
+    # Replace a stored value with one that cannot be decoded
+    source.cache.l1.clear()
+    path = next(path for _, _, path in disk._files.entries())
+    with open(path, 'rb') as fptr:
+        data = fptr.read()
+    header = data[:len(data) - len(disk._read(path))]
+    with open(path, 'wb') as fptr:
+        fptr.write(header + b'LIcz')
+    region2, _ = source.getRegion(format='numpy')
+    assert (region == region2).all()
+
+
+@pytest.mark.singular
+def testGetTileCacheDisk(tmp_path):
+    large_image.cache_util.cache._tileCache = None
+    large_image.cache_util.cache._tileLock = None
+    config.setConfig('cache_backend', 'disk')
+    config.setConfig('cache_disk_path', str(tmp_path))
+    try:
+        tileCache, tileLock = getTileCache()
+        assert isinstance(tileCache, DiskCache)
+        assert tileCache.path == str(tmp_path)
+    finally:
+        config.setConfig('cache_disk_path', None)
+        large_image.cache_util.cache._tileCache = None
+        large_image.cache_util.cache._tileLock = None
+
+
 @pytest.mark.singular
 def testGetTileCacheMemcached():
     large_image.cache_util.cache._tileCache = None
@@ -163,6 +475,57 @@ class TestClass:
         for sum in sums:
             assert sum == loopSize * (loopSize - 1) / 2 + loopSize * sumDelta
 
+    def testMethodcacheCoalesces(self):
+        self.cache = cachetools.LRUCache(10)
+        self.cache_lock = threading.Lock()
+        calls = []
+        release = threading.Event()
+
+        @methodcache(lambda x: str(x))
+        def slow(self, x):
+            calls.append(x)
+            release.wait(5)
+            if x < 0:
+                msg = 'negative'
+                raise ValueError(msg)
+            return [x]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(slow, self, 3) for _ in range(8)]
+            time.sleep(0.1)
+            release.set()
+            results = [future.result() for future in futures]
+        assert calls == [3]
+        assert all(result is results[0] for result in results)
+        assert not large_image.cache_util.cache._inflight
+
+        # Exceptions are shared with the waiting callers and not cached
+        release.clear()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(slow, self, -1) for _ in range(4)]
+            time.sleep(0.1)
+            release.set()
+            for future in futures:
+                with pytest.raises(ValueError):
+                    future.result()
+        assert calls == [3, -1]
+        assert not large_image.cache_util.cache._inflight
+        with pytest.raises(ValueError):
+            slow(self, -1)
+        assert calls == [3, -1, -1]
+
+    def testMethodcacheRecursion(self):
+        self.cache = cachetools.LRUCache(10)
+        self.cache_lock = None
+
+        @methodcache(lambda x, depth=0: str(x))
+        def recurse(self, x, depth=0):
+            # The same key on the same thread computes instead of waiting
+            return x if depth else recurse(self, x, depth=1) + 1
+
+        assert recurse(self, 1) == 2
+        assert not large_image.cache_util.cache._inflight
+
     class ExampleWithMetaclass(metaclass=LruCacheMetaclass):
         cacheName = 'test'
         cacheMaxSize = 4
@@ -0,0 +1,59 @@
+import pytest
+
+from . import lisource_benchmark
+
+
+def testBenchSource():
+    results = lisource_benchmark.bench_source(
+        'test', ['getTile', 'getThumbnail'], threads=(1, 2), scale=0.05)
+    assert set(results) == {
+        f'test/{operation}/{state}/t{threads}'
+        for operation in ('getTile', 'getThumbnail')
+        for state in ('cold', 'warm') for threads in (1, 2)}
+    result = results['test/getTile/cold/t1']
+    assert result['count'] == 10
+    assert result['errors'] == 0
+    assert result['source'] == 'test'
+    assert result['p50'] <= result['p99'] <= result['max']
+
+
+def testRunCallsErrors():
+    def fail():
+        raise ValueError
+
+    for threads in (1, 2):
+        result = lisource_benchmark.run_calls([fail, lambda: None, fail], threads)
+        assert result['count'] == 3
+        assert result['errors'] == 2
+
+
+def testPlanCallsRepeatable():
+    source = lisource_benchmark.open_source('test')
+    first = lisource_benchmark.plan_calls(
+        source, 'getTile', 5, lisource_benchmark.random.Random(1))
+    second = lisource_benchmark.plan_calls(
+        source, 'getTile', 5, lisource_benchmark.random.Random(1))
+    assert [call.__defaults__ for call in first] == [call.__defaults__ for call in second]
+
+
+def testSyntheticTrace():
+    metadata = lisource_benchmark.open_source('test').getMetadata()
+    trace = lisource_benchmark.synthetic_trace(metadata, steps=10, seed=3)
+    assert len(trace) == 10
+    assert trace == lisource_benchmark.synthetic_trace(metadata, steps=10, seed=3)
+    assert all(step and path.startswith('/tiles/{image}/') for step in trace for path in step)
+
+
+def testCompare():
+    baseline = {'a': {'p50': 0.010, 'p99': 0.020}, 'b': {'p50': 0.010, 'p99': 0.020}}
+    results = {'a': {'p50': 0.011, 'p99': 0.030}, 'b': {'p50': 0.0101, 'p99': 0.0205},
+               'c': {'p50': 1, 'p99': 1}}
+    rows, regressions = lisource_benchmark.compare(results, baseline, tolerance=0.2)
+    assert len(rows) == 4
+    assert [(row[0], row[1]) for row in regressions] == [('a', 'p99')]
+
+
+def testPercentile():
+    assert lisource_benchmark.percentile([3, 1, 2], 50) == 2
+    assert lisource_benchmark.percentile([1, 2], 50) == pytest.approx(1.5)
+    assert lisource_benchmark.percentile([5], 99) == 5
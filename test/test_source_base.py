@@ -864,3 +864,42 @@ def testKnownExtensionList():
     assert len(large_image.tilesource.listSources()['extensions']) > 100
     assert len(large_image.listExtensions()) > 100
     assert len(large_image.listMimeTypes()) > 10
+
+
+@pytest.mark.parametrize('bands', [
+    None,
+    'red=0-1000,green=10-60000',
+    'red=-5.5-10,green=0-1',
+])
+def testHistogramMatchesNumpy(bands):
+    import large_image_source_test
+
+    ts = large_image_source_test.TestTileSource(
+        sizeX=2000, sizeY=1500, fractal=True, bands=bands)
+    tiles = [tile['tile'] for tile in ts.tileIterator(
+        format=large_image.constants.TILE_FORMAT_NUMPY, output={'maxWidth': 1000},
+        resample=False)]
+    values = np.concatenate([tile.reshape(-1, tile.shape[2]) for tile in tiles])
+    iterations = []
+    original = ts.tileIterator
+
+    def tileIterator(*args, **kwargs):
+        iterations.append(kwargs)
+        return original(*args, **kwargs)
+
+    ts.tileIterator = tileIterator
+    hist = ts.histogram(bins=17, output={'maxWidth': 1000}, resample=False)
+    # Integer sources are read once; float sources need a second pass
+    assert len(iterations) == (1 if values.dtype.kind in 'iu' else 2)
+    assert hist['min'].tolist() == values.min(axis=0).tolist()
+    assert hist['max'].tolist() == values.max(axis=0).tolist()
+    for idx, entry in enumerate(hist['histogram']):
+        expected, edges = np.histogram(values[:, idx], 17, entry['range'])
+        assert entry['hist'].tolist() == expected.tolist()
+        assert entry['bin_edges'].tolist() == edges.tolist()
+        assert entry['samples'] == values.shape[0]
+    serial = large_image_source_test.TestTileSource(
+        sizeX=2000, sizeY=1500, fractal=True, bands=bands).histogram(
+        bins=17, output={'maxWidth': 1000}, resample=False, max_workers=1)
+    assert serial['mean'].tolist() == hist['mean'].tolist()
+    assert serial['histogram'][0]['hist'].tolist() == hist['histogram'][0]['hist'].tolist()
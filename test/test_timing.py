@@ -0,0 +1,90 @@
+import io
+
+import numpy as np
+import PIL.Image
+
+from large_image import timing
+from large_image.cache_util import LruCacheMetaclass, methodcache
+from large_image.constants import TILE_FORMAT_IMAGE, TILE_FORMAT_NUMPY
+from large_image.tilesource import TileSource
+
+
+def _jpeg():
+    output = io.BytesIO()
+    PIL.Image.fromarray(np.full((256, 256, 3), 128, dtype=np.uint8)).save(output, 'JPEG')
+    return output.getvalue()
+
+
+class JpegTileSource(TileSource, metaclass=LruCacheMetaclass):
+    cacheName = 'tilesource'
+    name = 'jpegtest'
+    tile = _jpeg()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tileWidth = self.tileHeight = 256
+        self.sizeX = self.sizeY = 1024
+        self.levels = 3
+
+    @methodcache()
+    def getTile(self, x, y, z, **kwargs):
+        return self._outputTile(self.tile, TILE_FORMAT_IMAGE, x, y, z, **kwargs)
+
+
+def testTimingDisabledByDefault():
+    assert not timing.isEnabled()
+    assert timing.start('getTile') is None
+    timing.finish(None)
+
+
+def testTimingNestedStages():
+    records = []
+    timing.addObserver(records.append)
+    try:
+        outer = timing.start('outer', 'Source')
+        inner = timing.start('inner')
+        timing.finish(inner, extra=1)
+        timing.finish(outer)
+    finally:
+        timing.removeObserver(records.append)
+    assert not timing.isEnabled()
+    assert [record['stage'] for record in records] == ['inner', 'outer']
+    assert records[0]['stack'] == ('Source.outer', 'inner')
+    assert records[0]['source'] is None
+    assert records[0]['extra'] == 1
+    assert records[1]['source'] == 'Source'
+    assert records[1]['selfSeconds'] <= records[1]['seconds'] - records[0]['seconds'] + 1e-6
+
+
+def testTraceTileSource():
+    source = JpegTileSource()
+    with timing.Trace() as trace:
+        source.getTile(0, 0, 2, numpyAllowed='always')
+        source.getTile(0, 0, 2, numpyAllowed='always')
+        region, _ = source.getRegion(output={'maxWidth': 300}, format=TILE_FORMAT_NUMPY)
+    assert region.shape[1] == 300
+    assert not timing.isEnabled()
+
+    summary = {(entry['source'], entry['stage']): entry for entry in trace.summary()}
+    assert summary['JpegTileSource', 'getTile']['hits'] >= 1
+    assert summary['JpegTileSource', 'decode']['count'] >= 1
+    assert summary['JpegTileSource', 'resample']['count'] == 1
+    assert summary['JpegTileSource', 'getTile']['seconds'] >= (
+        summary['JpegTileSource', 'getTile']['selfSeconds'])
+
+    lines = list(trace.collapsed())
+    assert any(line.startswith(
+        'JpegTileSource.getTile;JpegTileSource.style;JpegTileSource.decode ')
+        for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+
+def testTraceWriteCollapsed(tmp_path):
+    trace = timing.Trace().start()
+    timing.finish(timing.start('stage'))
+    trace.stop()
+    timing.finish(timing.start('ignored'))
+    path = tmp_path / 'profile.txt'
+    trace.writeCollapsed(str(path))
+    assert path.read_text().startswith('stage ')
+    assert len(trace.records) == 1
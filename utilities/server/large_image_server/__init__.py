@@ -20,21 +20,33 @@ Or from command line:
 """
 
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 
 logger = logging.getLogger(__name__)
 
+from . import db
 from .auth import CurrentUser, JWTPayload, jwt_bearer
 from .config import ServerSettings, configure_settings, get_settings
+from .derived_store import DerivedImageStore, configure_derived_store, get_derived_store
+from .jobs import JobEngine, configure_job_engine, get_job_engine
+from .metrics import (MetricsMiddleware, ServerMetrics, collect_component_stats,
+                      configure_metrics, get_metrics)
 from .models import HealthResponse
 from .routes import api_router
+from .prefetch import TilePrefetcher, configure_prefetcher, get_prefetcher
 from .routes.ingest import router as ingest_router
 from .source_manager import SourceManager, configure_source_manager, get_source_manager
+from .stats_store import StatisticsStore, configure_stats_store, get_stats_store
+from .tile_cache import DiskTileCache, configure_tile_cache, get_tile_cache
+from .tile_executor import TileExecutor, configure_tile_executor, get_tile_executor
+from .warm import WarmJobManager, configure_warm_manager, get_warm_manager
 
 __all__ = [
     'create_app',
@@ -44,6 +56,30 @@ __all__ = [
     'configure_settings',
     'get_source_manager',
     'configure_source_manager',
+    'TileExecutor',
+    'TilePrefetcher',
+    'DiskTileCache',
+    'get_tile_cache',
+    'configure_tile_cache',
+    'DerivedImageStore',
+    'get_derived_store',
+    'configure_derived_store',
+    'StatisticsStore',
+    'get_stats_store',
+    'configure_stats_store',
+    'get_tile_executor',
+    'configure_tile_executor',
+    'get_prefetcher',
+    'configure_prefetcher',
+    'WarmJobManager',
+    'get_warm_manager',
+    'configure_warm_manager',
+    'JobEngine',
+    'get_job_engine',
+    'configure_job_engine',
+    'ServerMetrics',
+    'get_metrics',
+    'configure_metrics',
     'jwt_bearer',
     'JWTPayload',
     'CurrentUser',
@@ -58,6 +94,13 @@ except Exception:
     __version__ = '0.0.0'
 
 
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Release resources that must be closed on the event loop."""
+    yield
+    await db.close_async_pool()
+
+
 def create_app(
     image_dir: str | Path | None = None,
     settings: ServerSettings | None = None,
@@ -90,6 +133,36 @@ def create_app(
         max_sources=settings.source_cache_size,
     )
 
+    # Configure persistent tile cache (disabled unless tile_disk_cache_dir is set)
+    configure_tile_cache()
+
+    # Configure stored thumbnails, labels and macros (disabled unless derived_image_dir is set)
+    configure_derived_store()
+
+    # Configure per-slide statistics (persisted only if stats_dir is set)
+    configure_stats_store()
+
+    # Configure tile executor
+    configure_tile_executor(
+        max_workers=settings.tile_workers,
+        per_source_limit=settings.tile_source_concurrency,
+    )
+
+    # Configure source warming jobs
+    configure_warm_manager(max_workers=settings.warm_workers)
+
+    # Configure admin verify/backfill jobs (the process pool starts on first use)
+    configure_job_engine(max_workers=settings.job_workers)
+
+    # Configure background tile prefetch
+    configure_prefetcher(
+        max_workers=settings.prefetch_workers,
+        client_budget=settings.prefetch_client_budget,
+    )
+
+    # Configure Prometheus metrics (large_image timing hooks stay off unless enabled)
+    metrics = configure_metrics(settings.metrics_enabled)
+
     # Configure large_image caching
     try:
         import large_image
@@ -119,6 +192,7 @@ def create_app(
         docs_url='/docs' if settings.docs_enabled else None,
         redoc_url='/redoc' if settings.docs_enabled else None,
         openapi_url='/openapi.json' if settings.docs_enabled else None,
+        lifespan=_lifespan,
     )
 
     # Add CORS middleware
@@ -131,6 +205,14 @@ def create_app(
             allow_headers=['*'],
         )
 
+    # Add request timing (outermost, so it covers the other middleware)
+    if metrics is not None:
+        app.add_middleware(
+            MetricsMiddleware,
+            metrics=metrics,
+            timing_allow_origin=', '.join(settings.cors_origins) if settings.cors_enabled else None,
+        )
+
     # Include API routes
     app.include_router(api_router, prefix=settings.api_prefix)
 
@@ -161,7 +243,38 @@ def create_app(
     async def cache_info() -> dict:
         """Get cache information."""
         source_manager = get_source_manager()
-        return source_manager.cache_info()
+        info = dict(source_manager.cache_info())
+        tile_cache = get_tile_cache()
+        if tile_cache is not None:
+            info['tile_disk_cache'] = tile_cache.stats()
+        derived_store = get_derived_store()
+        if derived_store is not None:
+            info['derived_image_store'] = derived_store.stats()
+        info['stats_store'] = get_stats_store().stats()
+        return info
+
+    @app.get('/executor', tags=['Cache'])
+    async def executor_info() -> dict:
+        """Get tile executor queue depth and latency gauges."""
+        info = get_tile_executor().stats()
+        info['prefetch'] = get_prefetcher().stats()
+        return info
+
+    @app.get('/metrics', response_class=PlainTextResponse, tags=['Cache'])
+    async def metrics_info() -> PlainTextResponse:
+        """Get Prometheus metrics (404 unless metrics are enabled)."""
+        current = get_metrics()
+        if current is None:
+            raise HTTPException(status_code=404, detail='Metrics are disabled')
+        return PlainTextResponse(
+            current.render(collect_component_stats(get_source_manager())),
+            media_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+    @app.get('/db/pool', tags=['Cache'])
+    async def db_pool_info() -> dict:
+        """Get database pool sizing and connection wait-time metrics."""
+        return db.pool_stats()
 
     # Root endpoint with viewer example
     @app.get('/', response_class=HTMLResponse, include_in_schema=False)
@@ -5,10 +5,50 @@ import sys
 from pathlib import Path
 
 
+def _print_job_result(kind: str, status: str, entry: dict) -> None:
+    """Print one slide's result from an offline job."""
+    slide_id = entry['slideId']
+    if status in ('verified', 'processed'):
+        if kind == 'backfill-hmac':
+            print(f'  OK   {slide_id}: {entry["hmac"][:16]}...')
+        elif kind == 'backfill-metadata':
+            meta = entry['metadata']
+            w = meta.get('width_px')
+            h = meta.get('height_px')
+            mag = meta.get('magnification')
+            print(f'  OK   {slide_id}: {w}x{h} @ {mag}x')
+        else:
+            print(f'  OK   {slide_id}')
+    elif status == 'missing':
+        print(f'  MISS {slide_id}: file not found')
+    elif status == 'skipped':
+        print(f'  SKIP {slide_id}: {entry["reason"]}')
+    elif status == 'failed' and 'mismatchedChunks' in entry:
+        if not entry['manifestValid']:
+            reason = 'manifest does not match HMAC key'
+        elif entry['sizeBytes'] != entry['expectedSizeBytes']:
+            reason = f'size={entry["sizeBytes"]} expected={entry["expectedSizeBytes"]}'
+        else:
+            reason = f'chunks {entry["mismatchedChunks"]}'
+        print(f'  FAIL {slide_id}: {reason}')
+    elif status == 'failed' and not entry.get('actual', 'error: ').startswith('error: '):
+        print(f'  FAIL {slide_id}: expected={entry["expected"][:16]}... '
+              f'actual={entry["actual"][:16]}...')
+    else:
+        error = entry.get('error') or entry['actual'][len('error: '):]
+        print(f'  ERR  {slide_id}: {error}', file=sys.stderr)
+
+
 def _run_offline_command(args) -> int:
-    """Run --backfill-hmac, --verify-all, or --backfill-metadata without starting the server."""
+    """Run --backfill-hmac, --verify-all, --spot-check or --backfill-metadata offline.
+
+    The work runs through the same job engine as the admin endpoints, so it
+    uses the job process pool and throughput limits and is checkpointed to
+    the database; an interrupted run continues with --resume-job.
+    """
     from .config import get_settings
     from . import db
+    from .jobs import JobEngine
 
     settings = get_settings()
 
@@ -18,7 +58,7 @@ def _run_offline_command(args) -> int:
     if not settings.storage_clinical_root:
         print('Error: --clinical-root is required for offline commands', file=sys.stderr)
         return 1
-    if (args.backfill_hmac or args.verify_all) and not settings.hmac_key:
+    if (args.backfill_hmac or args.verify_all or args.spot_check) and not settings.hmac_key:
         print('Error: --hmac-key is required for HMAC commands', file=sys.stderr)
         return 1
 
@@ -26,120 +66,55 @@ def _run_offline_command(args) -> int:
         print('Error: Could not connect to database', file=sys.stderr)
         return 1
 
-    if args.backfill_hmac:
-        from .hmac_util import compute_file_hmac
-        slides = db.list_slides_missing_hmac()
-        print(f'Found {len(slides)} slides with NULL hmac')
-
-        processed = 0
-        skipped = 0
-        errors = 0
-        for slide in slides:
-            slide_id = slide['slide_id']
-            file_path = settings.storage_clinical_root / slide['relative_path']
-
-            if not file_path.exists():
-                print(f'  SKIP {slide_id}: file not found')
-                skipped += 1
-                continue
-
-            try:
-                hmac_hex = compute_file_hmac(file_path, settings.hmac_key)
-                db.update_slide_hmac(slide_id, hmac_hex)
-                processed += 1
-                print(f'  OK   {slide_id}: {hmac_hex[:16]}...')
-            except Exception as e:
-                print(f'  ERR  {slide_id}: {e}', file=sys.stderr)
-                errors += 1
-
-        print(f'\nBackfill complete: {processed} processed, {skipped} skipped, {errors} errors')
-        return 1 if errors else 0
-
-    if args.verify_all:
-        import hmac as hmac_mod
-        from .hmac_util import compute_file_hmac
-
-        slides = db.list_slides_for_verification()
-        print(f'Found {len(slides)} slides to verify')
-
-        verified = 0
-        failed = 0
-        missing = 0
-        for slide in slides:
-            slide_id = slide['slide_id']
-            stored_hmac = slide['hmac']
-            file_path = settings.storage_clinical_root / slide['relative_path']
-
-            if not file_path.exists():
-                print(f'  MISS {slide_id}: file not found')
-                missing += 1
-                continue
-
-            try:
-                actual_hmac = compute_file_hmac(file_path, settings.hmac_key)
-            except Exception as e:
-                print(f'  ERR  {slide_id}: {e}', file=sys.stderr)
-                failed += 1
-                continue
-
-            if hmac_mod.compare_digest(actual_hmac, stored_hmac):
-                db.update_slide_verified(slide_id)
-                verified += 1
-                print(f'  OK   {slide_id}')
+    engine = JobEngine()
+    try:
+        if args.resume_job:
+            job = engine.resume(args.resume_job, background=False)
+            if job is None:
+                print(f'Error: Unknown job: {args.resume_job}', file=sys.stderr)
+                return 1
+            if job.state != 'queued':
+                print(f'Error: Job {job.id} is still running', file=sys.stderr)
+                return 1
+            if job.kind != 'backfill-metadata' and not settings.hmac_key:
+                print('Error: --hmac-key is required for HMAC commands', file=sys.stderr)
+                return 1
+            print(f'Resuming {job.kind} job {job.id} after {job.checkpoint}')
+        else:
+            if args.backfill_hmac:
+                kind = 'backfill-hmac'
+            elif args.verify_all:
+                kind = 'verify-all'
+            elif args.spot_check:
+                kind = 'spot-check'
             else:
-                failed += 1
-                print(f'  FAIL {slide_id}: expected={stored_hmac[:16]}... actual={actual_hmac[:16]}...')
-
-        print(f'\nVerification complete: {verified} verified, {failed} failed, {missing} missing')
-        return 1 if failed else 0
-
-    if args.backfill_metadata:
-        from .routes.ingest import _extract_metadata
-
-        slides = db.list_slides_missing_metadata()
-        print(f'Found {len(slides)} slides with NULL metadata')
-
-        processed = 0
-        skipped = 0
-        errors = 0
-        for slide in slides:
-            slide_id = slide['slide_id']
-            file_path = settings.storage_clinical_root / slide['relative_path']
-
-            if not file_path.exists():
-                print(f'  SKIP {slide_id}: file not found')
-                skipped += 1
-                continue
-
-            try:
-                meta = _extract_metadata(file_path)
-                if not meta.get('width_px'):
-                    print(f'  SKIP {slide_id}: no dimensions extracted')
-                    skipped += 1
-                    continue
-
-                db.update_slide_metadata(
-                    slide_id,
-                    width_px=meta.get('width_px'),
-                    height_px=meta.get('height_px'),
-                    magnification=meta.get('magnification'),
-                    mpp_x=meta.get('mpp_x'),
-                    mpp_y=meta.get('mpp_y'),
-                    scanner=meta.get('scanner'),
-                )
-                processed += 1
-                w = meta.get('width_px')
-                h = meta.get('height_px')
-                mag = meta.get('magnification')
-                print(f'  OK   {slide_id}: {w}x{h} @ {mag}x')
-            except Exception as e:
-                print(f'  ERR  {slide_id}: {e}', file=sys.stderr)
-                errors += 1
-
-        print(f'\nMetadata backfill complete: {processed} processed, {skipped} skipped, {errors} errors')
-        return 1 if errors else 0
-
-    return 0
+                kind = 'backfill-metadata'
+            job = engine.create(kind)
+            print(f'Started {kind} job {job.id} ({engine.max_workers} workers)')
+
+        try:
+            engine.run(job, on_result=lambda status, entry: _print_job_result(
+                job.kind, status, entry))
+        except KeyboardInterrupt:
+            print(f'\nInterrupted; continue with --resume-job {job.id}', file=sys.stderr)
+            return 130
+    finally:
+        engine.shutdown()
+
+    info = job.to_dict(details=False)
+    summary = info['summary']
+    if info['state'] == 'failed':
+        print(f'Error: {info["error"]}', file=sys.stderr)
+        return 1
+    if job.kind in ('verify-all', 'spot-check'):
+        label = 'Verification' if job.kind == 'verify-all' else 'Spot check'
+        print(f'\n{label} complete: {summary["verified"]} verified, '
+              f'{summary["failed"]} failed, {summary["missing"]} missing')
+        return 1 if summary['failed'] else 0
+    label = 'Backfill' if job.kind == 'backfill-hmac' else 'Metadata backfill'
+    print(f'\n{label} complete: {summary["processed"]} processed, '
+          f'{summary["skipped"]} skipped, {summary["errors"]} errors')
+    return 1 if summary['errors'] else 0
 
 
 def main() -> int:
@@ -203,9 +178,11 @@ Examples:
     parser.add_argument(
         '--cache-backend',
         type=str,
-        choices=['python', 'memcached', 'redis'],
+        choices=['python', 'memcached', 'redis', 'tiered', 'disk'],
         default=None,
-        help='Cache backend (default: auto-select)',
+        help='Cache backend (default: auto-select).  "tiered" keeps hot tiles in '
+        'process in front of memcached or redis; "disk" keeps tiles in a local '
+        'directory across restarts',
     )
     parser.add_argument(
         '--source-cache-size',
@@ -213,6 +190,31 @@ Examples:
         default=10,
         help='Maximum number of tile sources to keep open (default: 10)',
     )
+    parser.add_argument(
+        '--tile-cache-dir',
+        type=Path,
+        default=None,
+        help='Directory for the persistent encoded-tile cache (default: disabled)',
+    )
+    parser.add_argument(
+        '--derived-image-dir',
+        type=Path,
+        default=None,
+        help='Directory for stored slide thumbnails, labels and macros (default: disabled)',
+    )
+    parser.add_argument(
+        '--stats-dir',
+        type=Path,
+        default=None,
+        help='Directory for persisted per-slide statistics and histograms '
+        '(default: kept in memory only)',
+    )
+    parser.add_argument(
+        '--tile-workers',
+        type=int,
+        default=None,
+        help='Threads for tile decode/encode work (default: min(32, CPU count + 4))',
+    )
     parser.add_argument(
         '--jpeg-quality',
         type=int,
@@ -242,6 +244,11 @@ Examples:
         action='store_true',
         help='Disable Swagger/OpenAPI documentation',
     )
+    parser.add_argument(
+        '--metrics',
+        action='store_true',
+        help='Expose Prometheus metrics at /metrics and add Server-Timing headers',
+    )
     parser.add_argument(
         '--db-url',
         type=str,
@@ -282,6 +289,20 @@ Examples:
         help='Verify all slides by recomputing HMACs, print summary, and exit '
         '(requires --db-url, --clinical-root, --hmac-key)',
     )
+    parser.add_argument(
+        '--spot-check',
+        action='store_true',
+        help='Verify a random sample of chunks of every slide with a chunked HMAC '
+        'manifest, print summary, and exit (requires --db-url, --clinical-root, --hmac-key)',
+    )
+    parser.add_argument(
+        '--hmac-chunk-size',
+        type=int,
+        default=None,
+        metavar='BYTES',
+        help='Record chunked HMAC manifests with this chunk size on ingest, backfill and '
+        'verify, enabling --spot-check (default: disabled)',
+    )
     parser.add_argument(
         '--backfill-metadata',
         action='store_true',
@@ -289,6 +310,20 @@ Examples:
         'for slides with NULL width_px, print summary, and exit '
         '(requires --db-url, --clinical-root)',
     )
+    parser.add_argument(
+        '--resume-job',
+        type=str,
+        default=None,
+        metavar='JOB_ID',
+        help='Resume an interrupted verify or backfill job from its database checkpoint, '
+        'print summary, and exit (requires --db-url, --clinical-root)',
+    )
+    parser.add_argument(
+        '--job-workers',
+        type=int,
+        default=None,
+        help='Processes for verify/backfill jobs (default: min(4, CPU count))',
+    )
     parser.add_argument(
         '--version',
         '-v',
@@ -334,11 +369,17 @@ Examples:
         'workers': args.workers,
         'cache_backend': args.cache_backend,
         'source_cache_size': args.source_cache_size,
+        'tile_workers': args.tile_workers,
+        'job_workers': args.job_workers,
+        'tile_disk_cache_dir': args.tile_cache_dir,
+        'derived_image_dir': args.derived_image_dir,
+        'stats_dir': args.stats_dir,
         'jpeg_quality': args.jpeg_quality,
         'default_encoding': args.default_encoding,
         'api_prefix': args.api_prefix,
         'cors_enabled': not args.no_cors,
         'docs_enabled': not args.no_docs,
+        'metrics_enabled': args.metrics,
     }
 
     if args.db_url:
@@ -349,11 +390,14 @@ Examples:
         config_kwargs['storage_edu_root'] = args.edu_root.resolve()
     if args.hmac_key:
         config_kwargs['hmac_key'] = args.hmac_key
+    if args.hmac_chunk_size:
+        config_kwargs['hmac_chunk_size'] = args.hmac_chunk_size
 
     configure_settings(**config_kwargs)
 
     # Handle offline commands (mutually exclusive with server startup)
-    if args.backfill_hmac or args.verify_all or args.backfill_metadata:
+    if (args.backfill_hmac or args.verify_all or args.spot_check or args.backfill_metadata
+            or args.resume_job):
         return _run_offline_command(args)
 
     # Create and run the app
@@ -398,9 +442,22 @@ Examples:
                 'LARGE_IMAGE_SERVER_API_PREFIX': args.api_prefix,
                 'LARGE_IMAGE_SERVER_CORS_ENABLED': str(not args.no_cors).lower(),
                 'LARGE_IMAGE_SERVER_DOCS_ENABLED': str(not args.no_docs).lower(),
+                'LARGE_IMAGE_SERVER_METRICS_ENABLED': str(args.metrics).lower(),
             }
             if args.cache_backend:
                 _env_map['LARGE_IMAGE_SERVER_CACHE_BACKEND'] = args.cache_backend
+            if args.tile_cache_dir:
+                _env_map['LARGE_IMAGE_SERVER_TILE_DISK_CACHE_DIR'] = str(
+                    args.tile_cache_dir.resolve())
+            if args.derived_image_dir:
+                _env_map['LARGE_IMAGE_SERVER_DERIVED_IMAGE_DIR'] = str(
+                    args.derived_image_dir.resolve())
+            if args.stats_dir:
+                _env_map['LARGE_IMAGE_SERVER_STATS_DIR'] = str(args.stats_dir.resolve())
+            if args.tile_workers:
+                _env_map['LARGE_IMAGE_SERVER_TILE_WORKERS'] = str(args.tile_workers)
+            if args.job_workers:
+                _env_map['LARGE_IMAGE_SERVER_JOB_WORKERS'] = str(args.job_workers)
             if args.db_url:
                 _env_map['LARGE_IMAGE_SERVER_STORAGE_DB_URL'] = args.db_url
             if args.clinical_root:
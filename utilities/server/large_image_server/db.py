@@ -4,20 +4,81 @@ Provides query and transactional write functions against the wsi schema in
 PostgreSQL. Uses psycopg v3 with connection pooling. All queries use
 parameterized SQL.
 
+Read queries used by the API are written once as query generators (``_q_*``)
+that yield fetch requests and return a result.  ``_run`` executes them on the
+synchronous pool for worker threads and offline commands; ``_arun`` executes
+them on an ``AsyncConnectionPool`` so that ``async def`` routes never block
+the event loop.  Public functions come in pairs, e.g. ``get_case`` and
+``get_case_async``.
+
 When ``storage_db_url`` is not configured the module is inert — all public
 functions return ``None`` or empty lists so callers can fall back to the
 JSON/filesystem code path.
 """
 
 import atexit
+import contextlib
+import json
 import logging
 import threading
-from typing import Any
+import time
+from collections.abc import Generator
+from typing import Any, TypeVar
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
 _pool = None
 _pool_lock = threading.Lock()
+_async_pool = None
+_async_pool_opened = False
+_async_pool_lock = threading.Lock()
+
+
+class _WaitGauge:
+    """Tracks how long callers wait to check a connection out of a pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+    def record(self, elapsed: float | None) -> None:
+        with self._lock:
+            if elapsed is None:
+                self.errors += 1
+                return
+            self.count += 1
+            self.total += elapsed
+            self.max = max(self.max, elapsed)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                'checkouts': self.count,
+                'errors': self.errors,
+                'wait_seconds': {
+                    'avg': self.total / self.count if self.count else 0.0,
+                    'max': self.max,
+                },
+            }
+
+
+_pool_wait = _WaitGauge()
+_async_pool_wait = _WaitGauge()
+
+
+def _pool_kwargs(settings) -> dict[str, Any]:
+    return {
+        'conninfo': settings.storage_db_url,
+        'min_size': settings.storage_db_pool_min_size,
+        'max_size': max(settings.storage_db_pool_max_size, settings.storage_db_pool_min_size),
+        'timeout': settings.storage_db_pool_timeout,
+        'kwargs': {'autocommit': True},
+    }
 
 
 def _get_pool():
@@ -46,18 +107,43 @@ def _get_pool():
             )
             return None
 
-        _pool = ConnectionPool(
-            conninfo=settings.storage_db_url,
-            min_size=1,
-            max_size=4,
-            open=True,
-            kwargs={'autocommit': True},
-        )
+        _pool = ConnectionPool(open=True, **_pool_kwargs(settings))
         atexit.register(_shutdown_pool)
         logger.info('WSI database pool opened: %s', settings.storage_db_url.split('@')[-1])
         return _pool
 
 
+async def _get_async_pool():
+    """Lazily create and open the async connection pool from settings."""
+    global _async_pool, _async_pool_opened
+    if _async_pool is None:
+        with _async_pool_lock:
+            if _async_pool is None:
+                from .config import get_settings
+                settings = get_settings()
+
+                if not settings.storage_db_url:
+                    return None
+
+                try:
+                    from psycopg_pool import AsyncConnectionPool
+                except ImportError:
+                    logger.warning(
+                        'psycopg_pool not installed — install with: '
+                        'pip install large-image-server[db]'
+                    )
+                    return None
+
+                # Opening needs a running event loop, so it is deferred to here
+                _async_pool = AsyncConnectionPool(open=False, **_pool_kwargs(settings))
+    if not _async_pool_opened:
+        # AsyncConnectionPool.open() is idempotent, so racing openers are harmless
+        await _async_pool.open()
+        _async_pool_opened = True
+        logger.info('WSI async database pool opened')
+    return _async_pool
+
+
 def _shutdown_pool():
     """Close the pool at interpreter shutdown."""
     global _pool
@@ -69,22 +155,96 @@ def _shutdown_pool():
         _pool = None
 
 
+async def close_async_pool() -> None:
+    """Close the async pool; call from the application's shutdown hook."""
+    global _async_pool, _async_pool_opened
+    pool, _async_pool, _async_pool_opened = _async_pool, None, False
+    if pool is not None:
+        try:
+            await pool.close()
+        except Exception:
+            pass
+
+
 def is_configured() -> bool:
     """Return True if database storage is configured and available."""
     return _get_pool() is not None
 
 
+def pool_stats() -> dict[str, Any]:
+    """Get connection pool sizing and checkout wait-time metrics.
+
+    Returns:
+        Dictionary with ``configured`` and, for each pool that has been
+        created (``sync`` and ``async``), our checkout wait gauge plus the
+        pool's own counters from psycopg_pool.
+    """
+    info: dict[str, Any] = {'configured': _get_pool() is not None}
+    for name, pool, gauge in (
+            ('sync', _pool, _pool_wait), ('async', _async_pool, _async_pool_wait)):
+        if pool is None:
+            continue
+        entry = gauge.stats()
+        with contextlib.suppress(Exception):
+            entry['pool'] = pool.get_stats()
+        info[name] = entry
+    return info
+
+
 # ---------------------------------------------------------------------------
 # Query helpers
 # ---------------------------------------------------------------------------
 
-def _fetchone(sql: str, params: tuple = ()) -> dict[str, Any] | None:
+def _prepare(prepare: bool) -> bool | None:
+    """Map a query's prepare hint to psycopg's ``prepare`` argument.
+
+    None leaves the decision to psycopg (prepare after a few executions);
+    True prepares on first use.  Prepared statements can be disabled for
+    transaction-pooling proxies such as PgBouncer.
+    """
+    if not prepare:
+        return None
+    from .config import get_settings
+    return True if get_settings().storage_db_prepare else False
+
+
+@contextlib.contextmanager
+def _connection(pool):
+    """Check a connection out of the pool, recording the wait."""
+    start = time.perf_counter()
+    acquired = False
+    try:
+        with pool.connection() as conn:
+            acquired = True
+            _pool_wait.record(time.perf_counter() - start)
+            yield conn
+    finally:
+        if not acquired:
+            _pool_wait.record(None)
+
+
+@contextlib.asynccontextmanager
+async def _async_connection(pool):
+    """Check a connection out of the async pool, recording the wait."""
+    start = time.perf_counter()
+    acquired = False
+    try:
+        async with pool.connection() as conn:
+            acquired = True
+            _async_pool_wait.record(time.perf_counter() - start)
+            yield conn
+    finally:
+        if not acquired:
+            _async_pool_wait.record(None)
+
+
+def _fetchone(sql: str, params: tuple = (), prepare: bool = False) -> dict[str, Any] | None:
     pool = _get_pool()
     if pool is None:
         return None
-    with pool.connection() as conn:
+    with _connection(pool) as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, params)
+            cur.execute(sql, params, prepare=_prepare(prepare))
             row = cur.fetchone()
             if row is None:
                 return None
@@ -92,30 +252,146 @@ def _fetchone(sql: str, params: tuple = ()) -> dict[str, Any] | None:
             return dict(zip(cols, row))
 
 
-def _fetchall(sql: str, params: tuple = ()) -> list[dict[str, Any]]:
+def _fetchall(sql: str, params: tuple = (), prepare: bool = False) -> list[dict[str, Any]]:
     pool = _get_pool()
     if pool is None:
         return []
-    with pool.connection() as conn:
+    with _connection(pool) as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, params)
+            cur.execute(sql, params, prepare=_prepare(prepare))
             cols = [desc.name for desc in cur.description]
             return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+async def _afetchone(sql: str, params: tuple = (), prepare: bool = False) -> dict[str, Any] | None:
+    pool = await _get_async_pool()
+    if pool is None:
+        return None
+    async with _async_connection(pool) as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params, prepare=_prepare(prepare))
+            row = await cur.fetchone()
+            if row is None:
+                return None
+            cols = [desc.name for desc in cur.description]
+            return dict(zip(cols, row))
+
+
+async def _afetchall(sql: str, params: tuple = (), prepare: bool = False) -> list[dict[str, Any]]:
+    pool = await _get_async_pool()
+    if pool is None:
+        return []
+    async with _async_connection(pool) as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params, prepare=_prepare(prepare))
+            cols = [desc.name for desc in cur.description]
+            return [dict(zip(cols, row)) for row in await cur.fetchall()]
+
+
+# A fetch request yielded by a query generator: (kind, sql, params, prepare)
+# where kind is 'one' or 'all'.
+_Fetch = tuple[str, str, tuple, bool]
+_Query = Generator[_Fetch, Any, T]
+
+
+def _one(sql: str, params: tuple = (), prepare: bool = False) -> _Fetch:
+    return ('one', sql, params, prepare)
+
+
+def _all(sql: str, params: tuple = (), prepare: bool = False) -> _Fetch:
+    return ('all', sql, params, prepare)
+
+
+def _run(query: _Query[T]) -> T:
+    """Execute a query generator on the synchronous pool."""
+    try:
+        kind, sql, params, prepare = next(query)
+        while True:
+            fetch = _fetchone if kind == 'one' else _fetchall
+            kind, sql, params, prepare = query.send(fetch(sql, params, prepare=prepare))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def _arun(query: _Query[T]) -> T:
+    """Execute a query generator on the async pool."""
+    try:
+        kind, sql, params, prepare = next(query)
+        while True:
+            fetch = _afetchone if kind == 'one' else _afetchall
+            kind, sql, params, prepare = query.send(await fetch(sql, params, prepare=prepare))
+    except StopIteration as stop:
+        return stop.value
+
+
 # ---------------------------------------------------------------------------
-# Public API — called by routes/cases.py and source_manager.py
+# Relative-path index — suffix lookups without LIKE scans
 # ---------------------------------------------------------------------------
 
-def get_slide_by_id(slide_id: str) -> dict[str, Any] | None:
-    """Look up a slide by its unique slide_id.
-
-    Searches clinical (wsi) schema first, then educational (wsi_edu).
-    Returns dict with keys: slide_id, relative_path, format, stain,
-    level_label, case_id, collection ('clinical' or 'educational').
+# File name -> [(relative_path, slide_id), ...], clinical rows before educational
+_path_index: dict[str, list[tuple[str, str]]] | None = None
+_path_index_loaded = 0.0
+_path_index_lock = threading.Lock()
+# A miss reloads the index (to see slides ingested by other workers) at most
+# this often
+_PATH_INDEX_MISS_RELOAD = 10.0
+
+
+def _load_path_index() -> dict[str, list[tuple[str, str]]]:
+    index: dict[str, list[tuple[str, str]]] = {}
+    for schema in ('wsi', 'wsi_edu'):
+        rows = _fetchall(f'SELECT slide_id, relative_path FROM {schema}.slides')
+        for row in rows:
+            rel = row['relative_path']
+            if rel:
+                index.setdefault(rel.rsplit('/', 1)[-1], []).append((rel, row['slide_id']))
+    return index
+
+
+def find_slide_id_by_path_suffix(image_id: str) -> str | None:
+    """Find the slide whose relative_path ends with ``image_id``.
+
+    Uses an in-process index keyed by file name, loaded with one query per
+    schema and refreshed after ``path_cache_ttl`` seconds, so resolution does
+    not scan ``slides`` with ``LIKE``.  The suffix must include the whole file
+    name.
     """
+    global _path_index, _path_index_loaded
+    from .config import get_settings
+
+    if _get_pool() is None:
+        return None
+    filename = image_id.rsplit('/', 1)[-1]
+    ttl = get_settings().path_cache_ttl
+    for attempt in range(2):
+        with _path_index_lock:
+            age = time.monotonic() - _path_index_loaded
+            if _path_index is None or age > ttl or (attempt and age > _PATH_INDEX_MISS_RELOAD):
+                _path_index = _load_path_index()
+                _path_index_loaded = time.monotonic()
+            elif attempt:
+                return None
+            candidates = _path_index.get(filename, ())
+        for rel, slide_id in candidates:
+            if rel.endswith(image_id):
+                return slide_id
+    return None
+
+
+def invalidate_path_index() -> None:
+    """Drop the relative-path index; the next suffix lookup reloads it."""
+    global _path_index
+    with _path_index_lock:
+        _path_index = None
+
+
+# ---------------------------------------------------------------------------
+# Public API — called by routes/cases.py and source_manager.py
+# ---------------------------------------------------------------------------
+
+def _q_slide_by_id(slide_id: str) -> _Query[dict[str, Any] | None]:
     # Try clinical schema first
-    result = _fetchone(
+    result = yield _one(
         """
         SELECT s.slide_id,
                s.relative_path,
@@ -136,12 +412,13 @@ def get_slide_by_id(slide_id: str) -> dict[str, Any] | None:
          WHERE s.slide_id = %s
         """,
         (slide_id,),
+        prepare=True,
     )
     if result:
         return result
 
     # Fallback to educational schema
-    return _fetchone(
+    return (yield _one(
         """
         SELECT s.slide_id,
                s.relative_path,
@@ -162,7 +439,23 @@ def get_slide_by_id(slide_id: str) -> dict[str, Any] | None:
          WHERE s.slide_id = %s
         """,
         (slide_id,),
-    )
+        prepare=True,
+    ))
+
+
+def get_slide_by_id(slide_id: str) -> dict[str, Any] | None:
+    """Look up a slide by its unique slide_id.
+
+    Searches clinical (wsi) schema first, then educational (wsi_edu).
+    Returns dict with keys: slide_id, relative_path, format, stain,
+    level_label, case_id, collection ('clinical' or 'educational').
+    """
+    return _run(_q_slide_by_id(slide_id))
+
+
+async def get_slide_by_id_async(slide_id: str) -> dict[str, Any] | None:
+    """Async version of get_slide_by_id."""
+    return await _arun(_q_slide_by_id(slide_id))
 
 
 def get_patient_by_mrn(mrn: str) -> dict | None:
@@ -213,66 +506,66 @@ def resolve_slide_path(image_id: str) -> dict[str, Any] | None:
     # 3. Try matching by relative_path suffix (clinical first, then edu)
     #    image_id "S26-0001/S26-0001_A1_S1.svs" matches
     #    relative_path "2026/S26-0001/S26-0001_A1_S1.svs"
-    result = _fetchone(
-        """
-        SELECT s.slide_id,
-               s.relative_path,
-               s.format,
-               s.stain,
-               s.level_label,
-               s.magnification,
-               s.width_px,
-               s.height_px,
-               s.mpp_x,
-               s.mpp_y,
-               c.case_id,
-               'clinical' AS collection
-          FROM wsi.slides s
-          JOIN wsi.blocks b ON b.id = s.block_id
-          JOIN wsi.parts  p ON p.id = b.part_id
-          JOIN wsi.cases  c ON c.id = p.case_id
-         WHERE s.relative_path LIKE '%%' || %s
-         LIMIT 1
-        """,
-        (image_id,),
-    )
-    if result:
-        return result
+    slide_id = find_slide_id_by_path_suffix(image_id)
+    if slide_id:
+        return get_slide_by_id(slide_id)
+    return None
 
-    return _fetchone(
-        """
-        SELECT s.slide_id,
-               s.relative_path,
-               s.format,
-               s.stain,
-               s.level_label,
-               s.magnification,
-               s.width_px,
-               s.height_px,
-               s.mpp_x,
-               s.mpp_y,
-               c.case_id,
-               'educational' AS collection
-          FROM wsi_edu.slides s
-          JOIN wsi_edu.blocks b ON b.id = s.block_id
-          JOIN wsi_edu.parts  p ON p.id = b.part_id
-          JOIN wsi_edu.cases  c ON c.id = p.case_id
-         WHERE s.relative_path LIKE '%%' || %s
-         LIMIT 1
-        """,
-        (image_id,),
-    )
+
+# Case summary columns shared by the case list and search.  The first part's
+# diagnosis and the slide count come from lateral subqueries so that a page of
+# cases costs one round-trip rather than one per case.
+_CASE_SUMMARY_SQL = """
+        SELECT c.case_id,
+               c.specimen_type,
+               c.clinical_history,
+               c.accession_date,
+               c.status,
+               c.priority,
+               pt.mrn AS patient_mrn,
+               pt.display_name AS patient_name,
+               pt.dob AS patient_dob,
+               pt.sex AS patient_sex,
+               dx.final_diagnosis AS diagnosis,
+               sc.slide_count
+          FROM wsi.cases c
+          LEFT JOIN core.patients pt ON pt.id = c.patient_id
+          LEFT JOIN LATERAL (
+                SELECT p.final_diagnosis
+                  FROM wsi.parts p
+                 WHERE p.case_id = c.id
+                 ORDER BY p.part_label
+                 LIMIT 1
+          ) dx ON true
+          CROSS JOIN LATERAL (
+                SELECT count(s.id) AS slide_count
+                  FROM wsi.parts p
+                  JOIN wsi.blocks b ON b.part_id = p.id
+                  JOIN wsi.slides s ON s.block_id = b.id
+                 WHERE p.case_id = c.id
+          ) sc
+"""
 
 
-def list_cases(
+def _case_summary(r: dict[str, Any]) -> dict[str, Any]:
+    """Format a _CASE_SUMMARY_SQL row for the /cases and /worklist endpoints."""
+    return {
+        'caseId': r['case_id'],
+        'patientName': r.get('patient_name') or '',
+        'patientId': r.get('patient_mrn') or '',
+        'accessionDate': str(r['accession_date']) if r['accession_date'] else None,
+        'diagnosis': r.get('diagnosis'),
+        'specimenType': r['specimen_type'],
+        'status': r['status'],
+        'priority': r['priority'],
+        'slideCount': r['slide_count'],
+    }
+
+
+def _q_list_cases(
     status: str | None = None,
     priority: str | None = None,
-) -> list[dict[str, Any]]:
-    """List cases with summary info and slide count.
-
-    Returns list of dicts matching the JSON-derived format used by the
-    /cases and /worklist endpoints.
-    """
+) -> _Query[list[dict[str, Any]]]:
     conditions = ['1=1']
     params: list[Any] = []
 
@@ -285,26 +578,9 @@ def list_cases(
 
     where = ' AND '.join(conditions)
 
-    rows = _fetchall(
-        f"""
-        SELECT c.case_id,
-               c.specimen_type,
-               c.clinical_history,
-               c.accession_date,
-               c.status,
-               c.priority,
-               pt.mrn AS patient_mrn,
-               pt.display_name AS patient_name,
-               pt.dob AS patient_dob,
-               pt.sex AS patient_sex,
-               count(s.id) AS slide_count
-          FROM wsi.cases c
-          LEFT JOIN core.patients pt ON pt.id = c.patient_id
-          LEFT JOIN wsi.parts  p ON p.case_id = c.id
-          LEFT JOIN wsi.blocks b ON b.part_id = p.id
-          LEFT JOIN wsi.slides s ON s.block_id = b.id
+    rows = yield _all(
+        _CASE_SUMMARY_SQL + f"""
          WHERE {where}
-         GROUP BY c.id, pt.mrn, pt.display_name, pt.dob, pt.sex
          ORDER BY
             CASE c.priority
                 WHEN 'stat' THEN 0
@@ -314,50 +590,34 @@ def list_cases(
             c.accession_date
         """,
         tuple(params),
+        prepare=True,
     )
+    return [_case_summary(r) for r in rows]
 
-    result = []
-    for r in rows:
-        # Extract diagnosis from first part's final_diagnosis
-        diagnosis = _get_case_diagnosis(r['case_id'])
-        result.append({
-            'caseId': r['case_id'],
-            'patientName': r.get('patient_name') or '',
-            'patientId': r.get('patient_mrn') or '',
-            'accessionDate': str(r['accession_date']) if r['accession_date'] else None,
-            'diagnosis': diagnosis,
-            'specimenType': r['specimen_type'],
-            'status': r['status'],
-            'priority': r['priority'],
-            'slideCount': r['slide_count'],
-        })
-    return result
 
+def list_cases(
+    status: str | None = None,
+    priority: str | None = None,
+) -> list[dict[str, Any]]:
+    """List cases with summary info and slide count.
 
-def _get_case_diagnosis(case_id: str) -> str | None:
-    """Get the first part's final_diagnosis for a case."""
-    row = _fetchone(
-        """
-        SELECT p.final_diagnosis
-          FROM wsi.parts p
-          JOIN wsi.cases c ON c.id = p.case_id
-         WHERE c.case_id = %s
-         ORDER BY p.part_label
-         LIMIT 1
-        """,
-        (case_id,),
-    )
-    return row['final_diagnosis'] if row else None
+    Returns list of dicts matching the JSON-derived format used by the
+    /cases and /worklist endpoints.
+    """
+    return _run(_q_list_cases(status=status, priority=priority))
 
 
-def get_case(case_id: str) -> dict[str, Any] | None:
-    """Get full case details with nested parts -> blocks -> slides.
+async def list_cases_async(
+    status: str | None = None,
+    priority: str | None = None,
+) -> list[dict[str, Any]]:
+    """Async version of list_cases."""
+    return await _arun(_q_list_cases(status=status, priority=priority))
 
-    Searches clinical (wsi) schema first, then educational (wsi_edu).
-    Returns a dict matching the JSON format expected by the API.
-    """
+
+def _q_case(case_id: str) -> _Query[dict[str, Any] | None]:
     # Try clinical schema first
-    case_row = _fetchone(
+    case_row = yield _one(
         """
         SELECT c.id AS uuid, c.case_id, c.collection, c.specimen_type,
                c.clinical_history, c.accession_date, c.status, c.priority,
@@ -370,10 +630,10 @@ def get_case(case_id: str) -> dict[str, Any] | None:
         (case_id,),
     )
     if case_row is not None:
-        return _build_case_response(case_row, schema='wsi')
+        return (yield from _q_case_response(case_row, schema='wsi'))
 
     # Fallback to educational schema (no patient join)
-    case_row = _fetchone(
+    case_row = yield _one(
         """
         SELECT c.id AS uuid, c.case_id, c.collection, c.specimen_type,
                c.clinical_history, c.accession_date, c.status,
@@ -386,17 +646,31 @@ def get_case(case_id: str) -> dict[str, Any] | None:
         (case_id,),
     )
     if case_row is not None:
-        return _build_case_response(case_row, schema='wsi_edu')
+        return (yield from _q_case_response(case_row, schema='wsi_edu'))
 
     return None
 
 
-def _build_case_response(
+def get_case(case_id: str) -> dict[str, Any] | None:
+    """Get full case details with nested parts -> blocks -> slides.
+
+    Searches clinical (wsi) schema first, then educational (wsi_edu).
+    Returns a dict matching the JSON format expected by the API.
+    """
+    return _run(_q_case(case_id))
+
+
+async def get_case_async(case_id: str) -> dict[str, Any] | None:
+    """Async version of get_case."""
+    return await _arun(_q_case(case_id))
+
+
+def _q_case_response(
     case_row: dict[str, Any],
     schema: str = 'wsi',
-) -> dict[str, Any]:
+) -> _Query[dict[str, Any]]:
     """Build case response dict from a case row and its slides."""
-    slides = _fetchall(
+    slides = yield _all(
         f"""
         SELECT s.slide_id, s.relative_path, s.format, s.stain,
                s.level_label, s.magnification, s.width_px, s.height_px,
@@ -447,22 +721,46 @@ def _build_case_response(
     }
 
 
-def get_case_slides(case_id: str) -> list[dict[str, Any]] | None:
-    """Get slides for a case. Returns None if case not found."""
-    case = get_case(case_id)
+def _q_case_slides(case_id: str) -> _Query[list[dict[str, Any]] | None]:
+    case = yield from _q_case(case_id)
     if case is None:
         return None
     return case.get('slides', [])
 
 
-def get_slide_with_context(slide_id: str) -> dict[str, Any] | None:
-    """Get slide details with case context.
+def get_case_slides(case_id: str) -> list[dict[str, Any]] | None:
+    """Get slides for a case. Returns None if case not found."""
+    return _run(_q_case_slides(case_id))
 
-    Searches clinical (wsi) first, then educational (wsi_edu).
-    Returns dict matching the format of the /slides/{id} endpoint.
+
+async def get_case_slides_async(case_id: str) -> list[dict[str, Any]] | None:
+    """Async version of get_case_slides."""
+    return await _arun(_q_case_slides(case_id))
+
+
+def list_case_slide_files(case_id: str | None = None) -> list[dict[str, Any]]:
+    """List the clinical slides of one case, or of every case, in one query.
+
+    Fields: slide_id, relative_path, case_id.
     """
+    where = 'WHERE c.case_id = %s' if case_id else ''
+    return _fetchall(
+        f"""
+        SELECT s.slide_id, s.relative_path, c.case_id
+          FROM wsi.slides s
+          JOIN wsi.blocks b ON b.id = s.block_id
+          JOIN wsi.parts  p ON p.id = b.part_id
+          JOIN wsi.cases  c ON c.id = p.case_id
+         {where}
+         ORDER BY c.case_id, p.part_label, b.block_label, s.slide_id
+        """,
+        (case_id,) if case_id else (),
+    )
+
+
+def _q_slide_with_context(slide_id: str) -> _Query[dict[str, Any] | None]:
     # Try clinical schema
-    row = _fetchone(
+    row = yield _one(
         """
         SELECT s.slide_id, s.relative_path, s.format, s.stain,
                s.level_label, s.magnification, s.width_px, s.height_px,
@@ -484,7 +782,7 @@ def get_slide_with_context(slide_id: str) -> dict[str, Any] | None:
 
     # Fallback to educational schema
     if row is None:
-        row = _fetchone(
+        row = yield _one(
             """
             SELECT s.slide_id, s.relative_path, s.format, s.stain,
                    s.level_label, s.magnification, s.width_px, s.height_px,
@@ -531,6 +829,106 @@ def get_slide_with_context(slide_id: str) -> dict[str, Any] | None:
     }
 
 
+def get_slide_with_context(slide_id: str) -> dict[str, Any] | None:
+    """Get slide details with case context.
+
+    Searches clinical (wsi) first, then educational (wsi_edu).
+    Returns dict matching the format of the /slides/{id} endpoint.
+    """
+    return _run(_q_slide_with_context(slide_id))
+
+
+async def get_slide_with_context_async(slide_id: str) -> dict[str, Any] | None:
+    """Async version of get_slide_with_context."""
+    return await _arun(_q_slide_with_context(slide_id))
+
+
+def _q_slides_for_cases(case_ids: list[str]) -> _Query[dict[str, list[dict[str, Any]]]]:
+    result: dict[str, list[dict[str, Any]]] = {case_id: [] for case_id in case_ids}
+    if not case_ids:
+        return result
+    rows = yield _all(
+        """
+        SELECT c.case_id, s.slide_id, s.stain, s.relative_path
+          FROM wsi.slides s
+          JOIN wsi.blocks b ON b.id = s.block_id
+          JOIN wsi.parts  p ON p.id = b.part_id
+          JOIN wsi.cases  c ON c.id = p.case_id
+         WHERE c.case_id = ANY(%s)
+         ORDER BY c.case_id, s.slide_id
+        """,
+        (list(case_ids),),
+        prepare=True,
+    )
+    for s in rows:
+        result.setdefault(s['case_id'], []).append({
+            'slideId': s['slide_id'],
+            'stain': s['stain'],
+            'filename': s['relative_path'].rsplit('/', 1)[-1] if s['relative_path'] else '',
+        })
+    return result
+
+
+def get_slides_for_cases(case_ids: list[str]) -> dict[str, list[dict[str, Any]]]:
+    """Get slide summaries for many cases in one query.
+
+    Returns a dict mapping every requested case_id to a list of slides with
+    slideId, stain, and filename (empty if the case has no slides).
+    """
+    return _run(_q_slides_for_cases(case_ids))
+
+
+async def get_slides_for_cases_async(case_ids: list[str]) -> dict[str, list[dict[str, Any]]]:
+    """Async version of get_slides_for_cases."""
+    return await _arun(_q_slides_for_cases(case_ids))
+
+
+def _q_worklist_cases(
+    status: str | None = None,
+    priority: str | None = None,
+) -> _Query[list[dict[str, Any]]]:
+    cases = yield from _q_list_cases(status=status, priority=priority)
+    slides = yield from _q_slides_for_cases([case['caseId'] for case in cases])
+    for case in cases:
+        case['slides'] = slides.get(case['caseId'], [])
+    return cases
+
+
+# Worklist results are cached briefly: the worklist screen is reloaded often
+# and only changes on ingest, which calls invalidate_worklist_cache().
+_worklist_cache: dict[tuple, tuple[float, list[dict[str, Any]]]] = {}
+_worklist_generation = 0
+_worklist_lock = threading.Lock()
+
+
+def _cached_worklist(key: tuple) -> tuple[list[dict[str, Any]] | None, int]:
+    """Return a fresh cached worklist (or None) and the current generation."""
+    with _worklist_lock:
+        entry = _worklist_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1], _worklist_generation
+        return None, _worklist_generation
+
+
+def _store_worklist(key: tuple, generation: int, cases: list[dict[str, Any]]) -> None:
+    """Cache a worklist unless the cache was invalidated while it was queried."""
+    from .config import get_settings
+    ttl = get_settings().worklist_cache_ttl
+    if ttl <= 0:
+        return
+    with _worklist_lock:
+        if generation == _worklist_generation:
+            _worklist_cache[key] = (time.monotonic() + ttl, cases)
+
+
+def invalidate_worklist_cache() -> None:
+    """Drop cached worklists; call after cases or slides change."""
+    global _worklist_generation
+    with _worklist_lock:
+        _worklist_generation += 1
+        _worklist_cache.clear()
+
+
 def get_worklist_cases(
     status: str | None = None,
     priority: str | None = None,
@@ -538,77 +936,50 @@ def get_worklist_cases(
     """Get cases formatted as worklist entries with slide summaries.
 
     Each case includes a 'slides' list with slideId, stain, and filename.
+    Results are cached for ``worklist_cache_ttl`` seconds; callers must not
+    modify them.
     """
-    cases = list_cases(status=status, priority=priority)
+    key = (status, priority)
+    cases, generation = _cached_worklist(key)
+    if cases is None:
+        cases = _run(_q_worklist_cases(status=status, priority=priority))
+        _store_worklist(key, generation, cases)
+    return cases
 
-    for case in cases:
-        slides = _fetchall(
-            """
-            SELECT s.slide_id, s.stain, s.relative_path
-              FROM wsi.slides s
-              JOIN wsi.blocks b ON b.id = s.block_id
-              JOIN wsi.parts  p ON p.id = b.part_id
-              JOIN wsi.cases  c ON c.id = p.case_id
-             WHERE c.case_id = %s
-             ORDER BY s.slide_id
-            """,
-            (case['caseId'],),
-        )
-        case['slides'] = [
-            {
-                'slideId': s['slide_id'],
-                'stain': s['stain'],
-                'filename': s['relative_path'].rsplit('/', 1)[-1] if s['relative_path'] else '',
-            }
-            for s in slides
-        ]
 
+async def get_worklist_cases_async(
+    status: str | None = None,
+    priority: str | None = None,
+) -> list[dict[str, Any]]:
+    """Async version of get_worklist_cases."""
+    key = (status, priority)
+    cases, generation = _cached_worklist(key)
+    if cases is None:
+        cases = await _arun(_q_worklist_cases(status=status, priority=priority))
+        _store_worklist(key, generation, cases)
     return cases
 
 
-def search_cases(query: str, limit: int = 20) -> list[dict[str, Any]]:
-    """Search cases by case_id (case-insensitive substring match)."""
-    rows = _fetchall(
-        """
-        SELECT c.case_id,
-               c.specimen_type,
-               c.clinical_history,
-               c.accession_date,
-               c.status,
-               c.priority,
-               pt.mrn AS patient_mrn,
-               pt.display_name AS patient_name,
-               pt.dob AS patient_dob,
-               pt.sex AS patient_sex,
-               count(s.id) AS slide_count
-          FROM wsi.cases c
-          LEFT JOIN core.patients pt ON pt.id = c.patient_id
-          LEFT JOIN wsi.parts  p ON p.case_id = c.id
-          LEFT JOIN wsi.blocks b ON b.part_id = p.id
-          LEFT JOIN wsi.slides s ON s.block_id = b.id
+def _q_search_cases(query: str, limit: int = 20) -> _Query[list[dict[str, Any]]]:
+    rows = yield _all(
+        _CASE_SUMMARY_SQL + """
          WHERE c.case_id ILIKE '%%' || %s || '%%'
-         GROUP BY c.id, pt.mrn, pt.display_name, pt.dob, pt.sex
          ORDER BY c.case_id
          LIMIT %s
         """,
         (query, limit),
     )
+    return [_case_summary(r) for r in rows]
 
-    result = []
-    for r in rows:
-        diagnosis = _get_case_diagnosis(r['case_id'])
-        result.append({
-            'caseId': r['case_id'],
-            'patientName': r.get('patient_name') or '',
-            'patientId': r.get('patient_mrn') or '',
-            'accessionDate': str(r['accession_date']) if r['accession_date'] else None,
-            'diagnosis': diagnosis,
-            'specimenType': r['specimen_type'],
-            'status': r['status'],
-            'priority': r['priority'],
-            'slideCount': r['slide_count'],
-        })
-    return result
+
+def search_cases(query: str, limit: int = 20) -> list[dict[str, Any]]:
+    """Search cases by case_id (case-insensitive substring match)."""
+    return _run(_q_search_cases(query, limit=limit))
+
+
+async def search_cases_async(query: str, limit: int = 20) -> list[dict[str, Any]]:
+    """Async version of search_cases."""
+    return await _arun(_q_search_cases(query, limit=limit))
 
 
 # ---------------------------------------------------------------------------
@@ -858,9 +1229,12 @@ def update_slide_verified(slide_id: str) -> bool:
             return cur.rowcount > 0
 
 
-def list_slides_missing_hmac() -> list[dict[str, Any]]:
+def list_slides_missing_hmac(after: str | None = None) -> list[dict[str, Any]]:
     """Return slides where hmac IS NULL (need backfill).
 
+    If after is given, only slides whose slide_id sorts after it are
+    returned, so that an interrupted backfill can resume.
+
     Fields: slide_id, relative_path.
     """
     return _fetchall(
@@ -868,16 +1242,22 @@ def list_slides_missing_hmac() -> list[dict[str, Any]]:
         SELECT s.slide_id, s.relative_path
           FROM wsi.slides s
          WHERE s.hmac IS NULL
+           AND (%s::text IS NULL OR s.slide_id > %s)
          ORDER BY s.slide_id
         """,
+        (after, after),
     )
 
 
-def list_slides_for_verification(stale_hours: int | None = None) -> list[dict[str, Any]]:
+def list_slides_for_verification(
+    stale_hours: int | None = None,
+    after: str | None = None,
+) -> list[dict[str, Any]]:
     """Return slides needing verification.
 
     Always includes slides with NULL verified_at. If stale_hours is given,
-    also includes slides verified more than that many hours ago.
+    also includes slides verified more than that many hours ago.  If after
+    is given, only slides whose slide_id sorts after it are returned.
 
     Fields: slide_id, relative_path, hmac, verified_at.
     """
@@ -889,9 +1269,10 @@ def list_slides_for_verification(stale_hours: int | None = None) -> list[dict[st
              WHERE s.hmac IS NOT NULL
                AND (s.verified_at IS NULL
                     OR s.verified_at < now() - make_interval(hours => %s))
+               AND (%s::text IS NULL OR s.slide_id > %s)
              ORDER BY s.slide_id
             """,
-            (stale_hours,),
+            (stale_hours, after, after),
         )
     return _fetchall(
         """
@@ -899,8 +1280,10 @@ def list_slides_for_verification(stale_hours: int | None = None) -> list[dict[st
           FROM wsi.slides s
          WHERE s.hmac IS NOT NULL
            AND s.verified_at IS NULL
+           AND (%s::text IS NULL OR s.slide_id > %s)
          ORDER BY s.slide_id
         """,
+        (after, after),
     )
 
 
@@ -918,9 +1301,11 @@ def update_slide_hmac(slide_id: str, hmac_hex: str) -> bool:
             return cur.rowcount > 0
 
 
-def list_slides_missing_metadata() -> list[dict[str, Any]]:
+def list_slides_missing_metadata(after: str | None = None) -> list[dict[str, Any]]:
     """Return slides where width_px IS NULL (need metadata backfill).
 
+    If after is given, only slides whose slide_id sorts after it are returned.
+
     Fields: slide_id, relative_path.
     """
     return _fetchall(
@@ -928,8 +1313,10 @@ def list_slides_missing_metadata() -> list[dict[str, Any]]:
         SELECT s.slide_id, s.relative_path
           FROM wsi.slides s
          WHERE s.width_px IS NULL
+           AND (%s::text IS NULL OR s.slide_id > %s)
          ORDER BY s.slide_id
         """,
+        (after, after),
     )
 
 
@@ -976,6 +1363,200 @@ def get_slide_hmac(slide_id: str) -> dict[str, Any] | None:
     )
 
 
+# ---------------------------------------------------------------------------
+# Tables created on first use: admin job checkpoints (see jobs.py) and
+# chunked HMAC manifests (see hmac_util.py)
+# ---------------------------------------------------------------------------
+
+_ADMIN_JOBS_DDL = """
+CREATE TABLE IF NOT EXISTS wsi.admin_jobs (
+    job_id      text PRIMARY KEY,
+    kind        text NOT NULL,
+    params      jsonb NOT NULL DEFAULT '{}',
+    state       text NOT NULL,
+    error       text,
+    checkpoint  text,
+    total       integer,
+    done        integer NOT NULL DEFAULT 0,
+    summary     jsonb NOT NULL DEFAULT '{}',
+    results     jsonb NOT NULL DEFAULT '{}',
+    created_at  timestamptz NOT NULL DEFAULT now(),
+    updated_at  timestamptz NOT NULL DEFAULT now()
+)
+"""
+
+_HMAC_MANIFESTS_DDL = """
+CREATE TABLE IF NOT EXISTS wsi.slide_hmac_manifests (
+    slide_id    text PRIMARY KEY,
+    manifest    jsonb NOT NULL,
+    created_at  timestamptz NOT NULL DEFAULT now()
+)
+"""
+
+_LAZY_TABLES = {
+    'wsi.admin_jobs': _ADMIN_JOBS_DDL,
+    'wsi.slide_hmac_manifests': _HMAC_MANIFESTS_DDL,
+}
+_ready_tables: set[str] = set()
+
+
+def _ensure_table(name: str) -> bool:
+    """Create a lazily created table if needed.
+
+    Returns False if the database is not configured.
+    """
+    if name in _ready_tables:
+        return True
+    pool = _get_pool()
+    if pool is None:
+        return False
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_LAZY_TABLES[name])
+    _ready_tables.add(name)
+    return True
+
+
+def save_admin_job(
+    job_id: str,
+    kind: str,
+    params: dict[str, Any],
+    state: str,
+    error: str | None,
+    checkpoint: str | None,
+    total: int | None,
+    done: int,
+    summary: dict[str, int],
+    results: dict[str, list[dict[str, Any]]],
+) -> bool:
+    """Insert or update an admin job's progress checkpoint.
+
+    The wsi.admin_jobs table is created on first use.  Returns True if the
+    checkpoint was written.
+    """
+    if not _ensure_table('wsi.admin_jobs'):
+        return False
+    with _get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO wsi.admin_jobs (job_id, kind, params, state, error,
+                    checkpoint, total, done, summary, results)
+                VALUES (%s, %s, %s::jsonb, %s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)
+                ON CONFLICT (job_id) DO UPDATE
+                   SET state = EXCLUDED.state,
+                       error = EXCLUDED.error,
+                       checkpoint = EXCLUDED.checkpoint,
+                       total = EXCLUDED.total,
+                       done = EXCLUDED.done,
+                       summary = EXCLUDED.summary,
+                       results = EXCLUDED.results,
+                       updated_at = now()
+                """,
+                (
+                    job_id, kind, json.dumps(params), state, error, checkpoint,
+                    total, done, json.dumps(summary), json.dumps(results),
+                ),
+            )
+            return True
+
+
+def get_admin_job(job_id: str) -> dict[str, Any] | None:
+    """Get an admin job's last checkpoint, or None if unknown."""
+    if not _ensure_table('wsi.admin_jobs'):
+        return None
+    return _fetchone(
+        """
+        SELECT job_id, kind, params, state, error, checkpoint, total, done,
+               summary, results, created_at, updated_at
+          FROM wsi.admin_jobs
+         WHERE job_id = %s
+        """,
+        (job_id,),
+    )
+
+
+def list_admin_jobs(limit: int = 50) -> list[dict[str, Any]]:
+    """List admin job checkpoints, most recently updated first.
+
+    Fields: job_id, kind, params, state, error, checkpoint, total, done,
+    summary, created_at, updated_at.
+    """
+    if not _ensure_table('wsi.admin_jobs'):
+        return []
+    return _fetchall(
+        """
+        SELECT job_id, kind, params, state, error, checkpoint, total, done,
+               summary, created_at, updated_at
+          FROM wsi.admin_jobs
+         ORDER BY updated_at DESC
+         LIMIT %s
+        """,
+        (limit,),
+    )
+
+
+def save_slide_hmac_manifest(slide_id: str, manifest: dict[str, Any], replace: bool = True) -> bool:
+    """Store a slide's chunked HMAC manifest.
+
+    Args:
+        slide_id: Slide ID.
+        manifest: Manifest from hmac_util.
+        replace: Overwrite an existing manifest; otherwise keep it.
+
+    Returns:
+        True if the manifest was written.
+    """
+    if not _ensure_table('wsi.slide_hmac_manifests'):
+        return False
+    conflict = (
+        'DO UPDATE SET manifest = EXCLUDED.manifest, created_at = now()'
+        if replace else 'DO NOTHING')
+    with _get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO wsi.slide_hmac_manifests (slide_id, manifest)
+                VALUES (%s, %s::jsonb)
+                ON CONFLICT (slide_id) {conflict}
+                """,
+                (slide_id, json.dumps(manifest)),
+            )
+            return cur.rowcount > 0
+
+
+def get_slide_hmac_manifest(slide_id: str) -> dict[str, Any] | None:
+    """Get a slide's chunked HMAC manifest, or None if it has none."""
+    if not _ensure_table('wsi.slide_hmac_manifests'):
+        return None
+    row = _fetchone(
+        'SELECT manifest FROM wsi.slide_hmac_manifests WHERE slide_id = %s',
+        (slide_id,),
+    )
+    return row['manifest'] if row else None
+
+
+def list_slides_for_spot_check(after: str | None = None) -> list[dict[str, Any]]:
+    """Return clinical slides that have a chunked HMAC manifest.
+
+    If after is given, only slides whose slide_id sorts after it are returned.
+
+    Fields: slide_id, relative_path, manifest.
+    """
+    if not _ensure_table('wsi.slide_hmac_manifests'):
+        return []
+    return _fetchall(
+        """
+        SELECT s.slide_id, s.relative_path, m.manifest
+          FROM wsi.slides s
+          JOIN wsi.slide_hmac_manifests m ON m.slide_id = s.slide_id
+         WHERE (%s::text IS NULL OR s.slide_id > %s)
+         ORDER BY s.slide_id
+        """,
+        (after, after),
+    )
+
+
 # ---------------------------------------------------------------------------
 # Educational (wsi_edu) write helpers — transactional ingestion (SDS-EDU-001)
 # ---------------------------------------------------------------------------
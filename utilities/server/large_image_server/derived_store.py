@@ -0,0 +1,161 @@
+"""Persistent on-disk store of derived slide images.
+
+Thumbnails, labels and macros are rendered from the slide (or, for labels,
+drawn) on every request unless stored.  ``DerivedImageStore`` keeps each
+rendered image as a plain image file so that requests are answered with a
+direct file send, without opening the source.
+
+- Keys hash the slide's file identity, the image kind and the requested
+  size, so re-ingesting a slide yields new keys; stale entries age out.
+- Files are ``<dir>/<key[:2]>/<key>.<ext>``, where ``<ext>`` is ``jpeg`` or
+  ``png``, with a ``.gen`` infix for images generated rather than embedded
+  in the slide file.  An empty ``<key>.none`` file records that the slide
+  has no such image (such as a slide without a macro), so the source is not
+  opened again to find out.
+- Writes, the byte budget and eviction are shared with the tile cache
+  (``DiskStore``); several processes may share a directory.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from .config import get_settings
+from .tile_cache import DiskStore
+
+_EXTENSIONS = {'image/jpeg': 'jpeg', 'image/png': 'png'}
+_MEDIA_TYPES = {ext: media_type for media_type, ext in _EXTENSIONS.items()}
+_MISSING_SUFFIX = '.none'
+
+
+class DerivedImageStore(DiskStore):
+    """A byte-budgeted store of thumbnails, labels and macros on disk."""
+
+    _suffixes = (*(f'.{ext}' for ext in _MEDIA_TYPES), _MISSING_SUFFIX)
+
+    @staticmethod
+    def make_key(
+        identity: str,
+        kind: str,
+        width: int | None = None,
+        height: int | None = None,
+    ) -> str:
+        """Build a key for one derived image.
+
+        Args:
+            identity: File identity of the slide, from ``file_identity``.
+            kind: Image kind ('thumbnail', 'label' or 'macro').
+            width: Requested maximum width, if the kind is sized.
+            height: Requested maximum height, if the kind is sized.
+
+        Returns:
+            Hex digest key.
+        """
+        parts = (identity, kind, width, height)
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def _candidates(self, key: str):
+        for generated in (False, True):
+            for ext in _MEDIA_TYPES:
+                yield self._path(key, ext, generated), ext, generated
+        yield self._missing_path(key), None, False
+
+    def _missing_path(self, key: str) -> Path:
+        return self._dir / key[:2] / f'{key}{_MISSING_SUFFIX}'
+
+    def _path(self, key: str, ext: str, generated: bool) -> Path:
+        return self._dir / key[:2] / f'{key}{".gen" if generated else ""}.{ext}'
+
+    def get(self, key: str) -> tuple[Path, str, bool] | None:
+        """Find a stored image.
+
+        Args:
+            key: Key from make_key.
+
+        Returns:
+            (path, media type, generated), or None on a miss.  The media type
+            is None if the slide is known to have no such image.
+        """
+        for path, ext, generated in self._candidates(key):
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            self._touch(path, mtime)
+            with self._lock:
+                self._hits += 1
+            return path, _MEDIA_TYPES[ext] if ext else None, generated
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def put(
+        self, key: str, data: bytes, media_type: str, generated: bool = False,
+    ) -> Path | None:
+        """Store an image, evicting old images if over budget.
+
+        Errors are logged rather than raised; the store is best effort.
+
+        Args:
+            key: Key from make_key.
+            data: Encoded image.
+            media_type: 'image/jpeg' or 'image/png'; other types are not stored.
+            generated: Whether the image was generated rather than embedded.
+
+        Returns:
+            Path of the stored file, or None if it was not stored.
+        """
+        ext = _EXTENSIONS.get(media_type)
+        if ext is None or not isinstance(data, bytes):
+            return None
+        path = self._path(key, ext, generated)
+        return path if self._publish(path, [data]) else None
+
+    def put_missing(self, key: str) -> None:
+        """Record that the slide has no image for a key.
+
+        Args:
+            key: Key from make_key.
+        """
+        self._publish(self._missing_path(key), [])
+
+
+# Global derived image store instance; False until first configured
+_derived_store: DerivedImageStore | None | bool = False
+_derived_store_lock = threading.Lock()
+
+
+def get_derived_store() -> DerivedImageStore | None:
+    """Get the global derived image store, or None if it is not configured."""
+    global _derived_store
+    if _derived_store is False:
+        with _derived_store_lock:
+            if _derived_store is False:
+                settings = get_settings()
+                _derived_store = None
+                if settings.derived_image_dir:
+                    _derived_store = DerivedImageStore(
+                        settings.derived_image_dir,
+                        settings.derived_image_bytes,
+                    )
+    return _derived_store  # type: ignore[return-value]
+
+
+def configure_derived_store(
+    cache_dir: Path | None = None, **kwargs: Any,
+) -> DerivedImageStore | None:
+    """Configure and return a new derived image store instance.
+
+    Args:
+        cache_dir: Store directory. If None, uses settings; the store is
+            disabled if neither is set.
+        **kwargs: Additional arguments passed to DerivedImageStore.
+    """
+    global _derived_store
+    settings = get_settings()
+    cache_dir = cache_dir or settings.derived_image_dir
+    kwargs.setdefault('max_bytes', settings.derived_image_bytes)
+    _derived_store = DerivedImageStore(cache_dir, **kwargs) if cache_dir else None
+    return _derived_store
@@ -4,33 +4,93 @@ Provides streaming HMAC computation for large slide files and a
 constant-time verification helper. The secret key is never stored
 in the database or version control — it is supplied via environment
 variable or CLI flag.
+
+Besides the linear HMAC over the whole file, a file can have a chunked
+HMAC manifest: the file is split into fixed-size chunks, each chunk has its
+own HMAC (keyed over the chunk index and its bytes), and a root HMAC covers
+the file size, chunk size and every chunk digest.  Chunks can be hashed in
+parallel, and a spot check verifies a random sample of chunks instead of
+reading the whole file.
 """
 
 import hashlib
 import hmac
+import os
+import random
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any
 
 _CHUNK_SIZE = 65536  # 64 KB
+_WRITE_BUFFER_SIZE = 4 * 1024 * 1024  # 4 MB
+_SYNC_BYTES = 256 * 1024 * 1024  # 256 MB
+_READINTO_SIZE = 8 * 1024 * 1024  # 8 MB
+MANIFEST_CHUNK_SIZE = 64 * 1024 * 1024  # 64 MB
+_MANIFEST_VERSION = 1
 
 
-def compute_file_hmac(file_path: Path, key: str) -> str:
+def compute_file_hmac(
+    file_path: Path,
+    key: str,
+    max_bytes_per_second: float | None = None,
+) -> str:
     """Compute HMAC-SHA256 of a file, reading in 64 KB chunks.
 
     Args:
         file_path: Path to the file.
         key: Secret key string.
+        max_bytes_per_second: If set, sleep as needed so the file is read no
+            faster than this, leaving disk bandwidth for other work.
 
     Returns:
         Hex-encoded HMAC digest.
     """
     mac = hmac.new(key.encode(), digestmod=hashlib.sha256)
+    _read_file(file_path, [mac.update], max_bytes_per_second)
+    return mac.hexdigest()
+
+
+def compute_file_hmac_and_manifest(
+    file_path: Path,
+    key: str,
+    chunk_size: int = MANIFEST_CHUNK_SIZE,
+    max_bytes_per_second: float | None = None,
+) -> tuple[str, dict[str, Any]]:
+    """Compute a file's linear HMAC and its chunked manifest in one read.
+
+    Args:
+        file_path: Path to the file.
+        key: Secret key string.
+        chunk_size: Manifest chunk size in bytes.
+        max_bytes_per_second: If set, limit the read rate.
+
+    Returns:
+        (hex-encoded linear HMAC, manifest).
+    """
+    mac = hmac.new(key.encode(), digestmod=hashlib.sha256)
+    chunked = ChunkedHmac(key, chunk_size)
+    _read_file(file_path, [mac.update, chunked.update], max_bytes_per_second)
+    return mac.hexdigest(), chunked.manifest()
+
+
+def _read_file(file_path: Path, sinks: list, max_bytes_per_second: float | None) -> None:
+    """Feed a file to each sink in 64 KB pieces, optionally rate limited."""
+    start = time.monotonic()
+    total = 0
     with open(file_path, 'rb') as f:
         while True:
             chunk = f.read(_CHUNK_SIZE)
             if not chunk:
                 break
-            mac.update(chunk)
-    return mac.hexdigest()
+            for sink in sinks:
+                sink(chunk)
+            if max_bytes_per_second:
+                total += len(chunk)
+                ahead = total / max_bytes_per_second - (time.monotonic() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
 
 
 def verify_file_hmac(file_path: Path, key: str, expected_hmac: str) -> bool:
@@ -48,3 +108,277 @@ def verify_file_hmac(file_path: Path, key: str, expected_hmac: str) -> bool:
     """
     actual = compute_file_hmac(file_path, key)
     return hmac.compare_digest(actual, expected_hmac)
+
+
+class HmacFileWriter:
+    """Write a file and compute its HMAC-SHA256 in the same pass.
+
+    Writes go through a large buffer.  Data is flushed to disk with
+    ``os.fsync`` every ``sync_bytes`` bytes, so that a multi-gigabyte upload
+    does not leave gigabytes of dirty pages to sync at the end, and once more
+    on close.  hashlib releases the GIL for large updates, so ``write`` can be
+    called from a worker thread without stalling the event loop.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        key: str,
+        buffer_size: int = _WRITE_BUFFER_SIZE,
+        sync_bytes: int = _SYNC_BYTES,
+        chunk_size: int | None = None,
+    ):
+        """Create (or truncate) the file.
+
+        Args:
+            file_path: Path to write.
+            key: Secret key string.
+            buffer_size: Write buffer size in bytes.
+            sync_bytes: Bytes written between fsyncs.
+            chunk_size: If set, also build a chunked HMAC manifest with this
+                chunk size, available as ``manifest`` after close.
+        """
+        self._file = open(file_path, 'wb', buffering=buffer_size)
+        self._mac = hmac.new(key.encode(), digestmod=hashlib.sha256)
+        self._chunked = ChunkedHmac(key, chunk_size) if chunk_size else None
+        self._sync_bytes = sync_bytes
+        self._unsynced = 0
+        self.size = 0
+        self.manifest: dict[str, Any] | None = None
+
+    def write(self, data: bytes) -> None:
+        """Append data to the file and the HMAC."""
+        self._mac.update(data)
+        if self._chunked is not None:
+            self._chunked.update(data)
+        self._file.write(data)
+        self.size += len(data)
+        self._unsynced += len(data)
+        if self._unsynced >= self._sync_bytes:
+            self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self) -> str:
+        """Sync and close the file.
+
+        Returns:
+            Hex-encoded HMAC digest of everything written.
+        """
+        try:
+            self._sync()
+        finally:
+            self._file.close()
+        if self._chunked is not None:
+            self.manifest = self._chunked.manifest()
+        return self._mac.hexdigest()
+
+    def abort(self) -> None:
+        """Close the file without syncing; the caller removes it."""
+        self._file.close()
+
+
+# ---------------------------------------------------------------------------
+# Chunked HMAC manifests
+# ---------------------------------------------------------------------------
+
+def _chunk_mac(key: bytes, index: int) -> 'hmac.HMAC':
+    """Start the HMAC of one chunk; the index is keyed in so chunks cannot be reordered."""
+    return hmac.new(key, struct.pack('>Q', index), hashlib.sha256)
+
+
+def _manifest_root(key: bytes, size: int, chunk_size: int, chunks: list[str]) -> str:
+    mac = hmac.new(key, struct.pack('>IQQ', _MANIFEST_VERSION, size, chunk_size), hashlib.sha256)
+    for digest in chunks:
+        mac.update(bytes.fromhex(digest))
+    return mac.hexdigest()
+
+
+def _make_manifest(key: bytes, size: int, chunk_size: int, chunks: list[str]) -> dict[str, Any]:
+    return {
+        'version': _MANIFEST_VERSION,
+        'size': size,
+        'chunkSize': chunk_size,
+        'root': _manifest_root(key, size, chunk_size, chunks),
+        'chunks': chunks,
+    }
+
+
+class ChunkedHmac:
+    """Build a chunked HMAC manifest from data fed in order."""
+
+    def __init__(self, key: str, chunk_size: int = MANIFEST_CHUNK_SIZE):
+        """Initialize an empty manifest.
+
+        Args:
+            key: Secret key string.
+            chunk_size: Chunk size in bytes.
+        """
+        self._key = key.encode()
+        self._chunk_size = chunk_size
+        self._chunks: list[str] = []
+        self._mac: hmac.HMAC | None = None
+        self._filled = 0
+        self.size = 0
+
+    def update(self, data: bytes) -> None:
+        """Append data."""
+        view = memoryview(data)
+        while view:
+            if self._mac is None:
+                self._mac = _chunk_mac(self._key, len(self._chunks))
+            take = min(len(view), self._chunk_size - self._filled)
+            self._mac.update(view[:take])
+            self._filled += take
+            self.size += take
+            view = view[take:]
+            if self._filled == self._chunk_size:
+                self._chunks.append(self._mac.hexdigest())
+                self._mac = None
+                self._filled = 0
+
+    def manifest(self) -> dict[str, Any]:
+        """Finish the last chunk and return the manifest.
+
+        Returns:
+            Dictionary with version, size, chunkSize, root (hex) and chunks
+            (list of hex chunk digests).
+        """
+        chunks = list(self._chunks)
+        if self._mac is not None:
+            chunks.append(self._mac.hexdigest())
+        return _make_manifest(self._key, self.size, self._chunk_size, chunks)
+
+
+def _hash_chunk(
+    file_path: Path,
+    key: bytes,
+    index: int,
+    chunk_size: int,
+    max_bytes_per_second: float | None,
+) -> str:
+    """HMAC one chunk of a file, reading with readinto into a reused buffer."""
+    mac = _chunk_mac(key, index)
+    buffer = bytearray(min(chunk_size, _READINTO_SIZE))
+    view = memoryview(buffer)
+    remaining = chunk_size
+    start = time.monotonic()
+    total = 0
+    with open(file_path, 'rb', buffering=0) as f:
+        f.seek(index * chunk_size)
+        while remaining:
+            count = f.readinto(view[:min(remaining, len(buffer))])
+            if not count:
+                break
+            mac.update(view[:count])
+            remaining -= count
+            if max_bytes_per_second:
+                total += count
+                ahead = total / max_bytes_per_second - (time.monotonic() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+    return mac.hexdigest()
+
+
+def _hash_chunks(
+    file_path: Path,
+    key: bytes,
+    indices: list[int],
+    chunk_size: int,
+    workers: int | None,
+    max_bytes_per_second: float | None,
+) -> list[str]:
+    """HMAC the given chunks concurrently; hashlib releases the GIL while hashing."""
+    workers = max(1, min(workers or min(4, os.cpu_count() or 1), len(indices) or 1))
+    rate = max_bytes_per_second / workers if max_bytes_per_second else None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(
+            lambda index: _hash_chunk(file_path, key, index, chunk_size, rate), indices))
+
+
+def compute_chunked_hmac(
+    file_path: Path,
+    key: str,
+    chunk_size: int = MANIFEST_CHUNK_SIZE,
+    workers: int | None = None,
+    max_bytes_per_second: float | None = None,
+) -> dict[str, Any]:
+    """Compute a file's chunked HMAC manifest, hashing chunks concurrently.
+
+    Args:
+        file_path: Path to the file.
+        key: Secret key string.
+        chunk_size: Chunk size in bytes.
+        workers: Chunks hashed at once (default: min(4, CPU count)).
+        max_bytes_per_second: If set, limit the total read rate.
+
+    Returns:
+        Manifest as from ChunkedHmac.manifest.
+    """
+    size = os.stat(file_path).st_size
+    count = -(-size // chunk_size)
+    chunks = _hash_chunks(
+        file_path, key.encode(), list(range(count)), chunk_size, workers, max_bytes_per_second)
+    return _make_manifest(key.encode(), size, chunk_size, chunks)
+
+
+def verify_chunked_hmac(
+    file_path: Path,
+    key: str,
+    manifest: dict[str, Any],
+    sample: int | None = None,
+    workers: int | None = None,
+    max_bytes_per_second: float | None = None,
+    rng: random.Random | None = None,
+) -> dict[str, Any]:
+    """Verify a file against its chunked HMAC manifest.
+
+    The manifest's root is checked first, so a manifest altered without the
+    key is rejected before any chunk is read.  The file size is compared
+    with the manifest, which catches truncation and appended data.
+
+    Args:
+        file_path: Path to the file.
+        key: Secret key string.
+        manifest: Manifest from compute_chunked_hmac or ChunkedHmac.
+        sample: Number of randomly chosen chunks to verify (a spot check).
+            If None, every chunk is verified.
+        workers: Chunks hashed at once (default: min(4, CPU count)).
+        max_bytes_per_second: If set, limit the total read rate.
+        rng: Random number generator used to choose the sample.
+
+    Returns:
+        Dictionary with ok (bool), size (actual bytes), checked (chunk
+        indices read), mismatched (chunk indices that failed), and
+        rootValid and sizeValid flags.
+    """
+    key_bytes = key.encode()
+    chunks = manifest['chunks']
+    chunk_size = manifest['chunkSize']
+    root_valid = hmac.compare_digest(
+        _manifest_root(key_bytes, manifest['size'], chunk_size, chunks), manifest['root'])
+    size = os.stat(file_path).st_size
+    size_valid = size == manifest['size']
+    indices = list(range(len(chunks)))
+    if sample is not None and sample < len(indices):
+        indices = sorted((rng or random.SystemRandom()).sample(indices, sample))
+    mismatched = []
+    if root_valid and size_valid:
+        digests = _hash_chunks(
+            file_path, key_bytes, indices, chunk_size, workers, max_bytes_per_second)
+        mismatched = [
+            index for index, digest in zip(indices, digests)
+            if not hmac.compare_digest(digest, chunks[index])]
+    else:
+        indices = []
+    return {
+        'ok': root_valid and size_valid and not mismatched,
+        'size': size,
+        'checked': indices,
+        'mismatched': mismatched,
+        'rootValid': root_valid,
+        'sizeValid': size_valid,
+    }
@@ -0,0 +1,706 @@
+"""Background admin jobs: HMAC verification and slide backfills.
+
+``verify-all``, ``spot-check``, ``backfill-hmac`` and ``backfill-metadata``
+touch every slide in the archive, hashing multi-gigabyte files or opening them with
+large_image, so they run as jobs rather than inside the request that
+starts them:
+
+- File work runs on a process pool shared by all jobs (``job_workers``), so
+  hashing and decoding do not compete with tile serving for the GIL.
+  Database reads and writes stay in the calling process.
+- Each job keeps at most ``max_inflight`` files in the pool and may cap the
+  bytes per second it hashes, leaving disk and CPU for tile requests.
+- Slides are processed in slide_id order.  Progress, counts and
+  non-success results are checkpointed to ``wsi.admin_jobs`` together with
+  the slide_id up to which every slide is done, so an interrupted or
+  cancelled job can be resumed, and progress can be read from any server
+  process.
+
+When ``hmac_chunk_size`` is set, HMAC jobs also record a chunked HMAC
+manifest for each slide (see hmac_util).  ``spot-check`` jobs then verify a
+random sample of chunks of every slide that has one, covering the archive
+at a fraction of the I/O of ``verify-all``.
+
+The offline ``--verify-all``/``--spot-check``/``--backfill-*`` commands run
+the same jobs in the foreground with ``JobEngine.run``.
+"""
+
+import hmac as hmac_mod
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from typing import Any
+
+from . import db
+from .config import ServerSettings, get_settings
+from .hmac_util import compute_file_hmac, compute_file_hmac_and_manifest, verify_chunked_hmac
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between checkpoint writes while a job runs
+_CHECKPOINT_INTERVAL = 5.0
+
+# A checkpoint still marked running that is older than this belongs to a
+# process that has gone away
+_STALE_AFTER = 60.0
+
+
+def default_job_workers() -> int:
+    """Get the default size of the job process pool."""
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+# ---------------------------------------------------------------------------
+# Per-file work.  These run in pool processes, so they take plain arguments
+# and must not touch the database.
+# ---------------------------------------------------------------------------
+
+def _hmac_task(
+    path: str,
+    key: str,
+    max_bytes_per_second: float | None,
+    chunk_size: int | None = None,
+) -> dict[str, Any]:
+    file_path = Path(path)
+    try:
+        size = file_path.stat().st_size
+    except FileNotFoundError:
+        return {'missing': True}
+    if chunk_size:
+        # Build the chunked manifest from the same read
+        hmac_hex, manifest = compute_file_hmac_and_manifest(
+            file_path, key, chunk_size, max_bytes_per_second=max_bytes_per_second)
+        return {'hmac': hmac_hex, 'size': size, 'manifest': manifest}
+    hmac_hex = compute_file_hmac(file_path, key, max_bytes_per_second=max_bytes_per_second)
+    return {'hmac': hmac_hex, 'size': size}
+
+
+def _spot_check_task(
+    path: str,
+    key: str,
+    manifest: dict[str, Any],
+    sample: int,
+    max_bytes_per_second: float | None,
+) -> dict[str, Any]:
+    file_path = Path(path)
+    if not file_path.exists():
+        return {'missing': True}
+    return verify_chunked_hmac(
+        file_path, key, manifest, sample=sample, max_bytes_per_second=max_bytes_per_second)
+
+
+def _metadata_task(path: str) -> dict[str, Any]:
+    file_path = Path(path)
+    if not file_path.exists():
+        return {'missing': True}
+    from .routes.ingest import _extract_metadata
+    return {'metadata': _extract_metadata(file_path)}
+
+
+# ---------------------------------------------------------------------------
+# Job kinds
+# ---------------------------------------------------------------------------
+
+class _JobKind:
+    """How one kind of job lists, processes, and records slides."""
+
+    def __init__(
+        self,
+        statuses: tuple[str, ...],
+        kept: dict[str, str],
+        list_slides: Callable[[dict[str, Any], str | None], list[dict[str, Any]]],
+        task: Callable[[dict[str, Any], dict[str, Any], ServerSettings, float | None], tuple],
+        record: Callable[[dict[str, Any], dict[str, Any]], tuple[str, dict[str, Any]]],
+        error: Callable[[dict[str, Any], Exception], tuple[str, dict[str, Any]]],
+    ):
+        """Describe a job kind.
+
+        Args:
+            statuses: Per-slide result statuses, in the order they are reported.
+            kept: Statuses whose entries are kept, mapped to their key in the
+                job's results.  Other statuses are only counted.
+            list_slides: Called with the job parameters and checkpoint; lists
+                the slides still to process in slide_id order.
+            task: Called with a slide row, the job parameters, settings, and
+                the per-file read rate; returns ``(function, *args)`` to run
+                in the pool.
+            record: Called with a slide row and the task's result; updates
+                the database and returns ``(status, entry)``.
+            error: Called with a slide row and the exception raised by its
+                task or record; returns ``(status, entry)``.
+        """
+        self.statuses = statuses
+        self.kept = kept
+        self.list_slides = list_slides
+        self.task = task
+        self.record = record
+        self.error = error
+
+
+def _slide_path(settings: ServerSettings, slide: dict[str, Any]) -> str:
+    return str(settings.storage_clinical_root / slide['relative_path'])
+
+
+def _record_verify(slide: dict[str, Any], result: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    slide_id = slide['slide_id']
+    if result.get('missing'):
+        return 'missing', {'slideId': slide_id, 'relativePath': slide['relative_path']}
+    stored_hmac = slide['hmac']
+    actual_hmac = result['hmac']
+    if hmac_mod.compare_digest(actual_hmac, stored_hmac):
+        db.update_slide_verified(slide_id)
+        if result.get('manifest'):
+            # The file matches its ingest HMAC, so its chunks can be trusted
+            db.save_slide_hmac_manifest(slide_id, result['manifest'], replace=False)
+        return 'verified', {'slideId': slide_id}
+    logger.warning(
+        'HMAC mismatch for slide %s: expected=%s actual=%s size=%s',
+        slide_id, stored_hmac, actual_hmac, result['size'],
+    )
+    return 'failed', {
+        'slideId': slide_id,
+        'expected': stored_hmac,
+        'actual': actual_hmac,
+        'sizeBytes': result['size'],
+    }
+
+
+def _error_verify(slide: dict[str, Any], exc: Exception) -> tuple[str, dict[str, Any]]:
+    return 'failed', {
+        'slideId': slide['slide_id'],
+        'expected': slide['hmac'],
+        'actual': f'error: {exc}',
+        'sizeBytes': None,
+    }
+
+
+def _record_backfill_hmac(
+    slide: dict[str, Any], result: dict[str, Any],
+) -> tuple[str, dict[str, Any]]:
+    slide_id = slide['slide_id']
+    if result.get('missing'):
+        return 'skipped', {'slideId': slide_id, 'reason': 'file not found'}
+    db.update_slide_hmac(slide_id, result['hmac'])
+    if result.get('manifest'):
+        db.save_slide_hmac_manifest(slide_id, result['manifest'])
+    return 'processed', {'slideId': slide_id, 'hmac': result['hmac']}
+
+
+def _record_spot_check(
+    slide: dict[str, Any], result: dict[str, Any],
+) -> tuple[str, dict[str, Any]]:
+    slide_id = slide['slide_id']
+    if result.get('missing'):
+        return 'missing', {'slideId': slide_id, 'relativePath': slide['relative_path']}
+    if result['ok']:
+        return 'verified', {'slideId': slide_id, 'checkedChunks': len(result['checked'])}
+    logger.warning(
+        'Spot check failed for slide %s: chunks=%s size=%s root_valid=%s',
+        slide_id, result['mismatched'], result['size'], result['rootValid'],
+    )
+    return 'failed', {
+        'slideId': slide_id,
+        'mismatchedChunks': result['mismatched'],
+        'sizeBytes': result['size'],
+        'expectedSizeBytes': slide['manifest']['size'],
+        'manifestValid': result['rootValid'],
+    }
+
+
+def _error_spot_check(slide: dict[str, Any], exc: Exception) -> tuple[str, dict[str, Any]]:
+    return 'failed', {'slideId': slide['slide_id'], 'error': str(exc)}
+
+
+def _record_backfill_metadata(
+    slide: dict[str, Any], result: dict[str, Any],
+) -> tuple[str, dict[str, Any]]:
+    slide_id = slide['slide_id']
+    if result.get('missing'):
+        return 'skipped', {'slideId': slide_id, 'reason': 'file not found'}
+    meta = result['metadata']
+    if not meta.get('width_px'):
+        return 'skipped', {'slideId': slide_id, 'reason': 'no dimensions extracted'}
+    db.update_slide_metadata(
+        slide_id,
+        width_px=meta.get('width_px'),
+        height_px=meta.get('height_px'),
+        magnification=meta.get('magnification'),
+        mpp_x=meta.get('mpp_x'),
+        mpp_y=meta.get('mpp_y'),
+        scanner=meta.get('scanner'),
+    )
+    return 'processed', {'slideId': slide_id, 'metadata': meta}
+
+
+def _error_backfill(slide: dict[str, Any], exc: Exception) -> tuple[str, dict[str, Any]]:
+    return 'errors', {'slideId': slide['slide_id'], 'error': str(exc)}
+
+
+JOB_KINDS: dict[str, _JobKind] = {
+    'verify-all': _JobKind(
+        statuses=('verified', 'failed', 'missing'),
+        kept={'failed': 'failures', 'missing': 'missing'},
+        list_slides=lambda params, after: db.list_slides_for_verification(
+            stale_hours=params.get('stale_hours'), after=after),
+        task=lambda slide, params, settings, rate: (
+            _hmac_task, _slide_path(settings, slide), settings.hmac_key, rate,
+            settings.hmac_chunk_size),
+        record=_record_verify,
+        error=_error_verify,
+    ),
+    'backfill-hmac': _JobKind(
+        statuses=('processed', 'skipped', 'errors'),
+        kept={'skipped': 'skipped', 'errors': 'errors'},
+        list_slides=lambda params, after: db.list_slides_missing_hmac(after=after),
+        task=lambda slide, params, settings, rate: (
+            _hmac_task, _slide_path(settings, slide), settings.hmac_key, rate,
+            settings.hmac_chunk_size),
+        record=_record_backfill_hmac,
+        error=_error_backfill,
+    ),
+    'backfill-metadata': _JobKind(
+        statuses=('processed', 'skipped', 'errors'),
+        kept={'skipped': 'skipped', 'errors': 'errors'},
+        list_slides=lambda params, after: db.list_slides_missing_metadata(after=after),
+        task=lambda slide, params, settings, rate: (_metadata_task, _slide_path(settings, slide)),
+        record=_record_backfill_metadata,
+        error=_error_backfill,
+    ),
+    'spot-check': _JobKind(
+        statuses=('verified', 'failed', 'missing'),
+        kept={'failed': 'failures', 'missing': 'missing'},
+        list_slides=lambda params, after: db.list_slides_for_spot_check(after=after),
+        task=lambda slide, params, settings, rate: (
+            _spot_check_task, _slide_path(settings, slide), settings.hmac_key,
+            slide['manifest'], params.get('sample') or settings.hmac_spot_check_chunks, rate),
+        record=_record_spot_check,
+        error=_error_spot_check,
+    ),
+}
+
+
+# ---------------------------------------------------------------------------
+# Jobs and the engine
+# ---------------------------------------------------------------------------
+
+class AdminJob:
+    """Progress and results of one admin job."""
+
+    def __init__(self, kind: str, params: dict[str, Any] | None = None, job_id: str | None = None):
+        """Initialize a queued job.
+
+        Args:
+            kind: One of JOB_KINDS.
+            params: Job parameters, such as stale_hours, max_inflight, and
+                max_bytes_per_second.
+            job_id: Job ID; a new one is generated if None.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f'Unknown job kind: {kind}')
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.params = dict(params or {})
+        self.state = 'queued'
+        self.error: str | None = None
+        self.total: int | None = None
+        self.done = 0
+        self.checkpoint: str | None = None
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        # When a job loaded from the database was last checkpointed
+        self.updated_at: float | None = None
+        spec = JOB_KINDS[kind]
+        self._summary = {status: 0 for status in spec.statuses}
+        self._results: dict[str, list[dict[str, Any]]] = {key: [] for key in spec.kept.values()}
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_row(cls, row: dict[str, Any]) -> 'AdminJob':
+        """Rebuild a job from its database checkpoint."""
+        job = cls(row['kind'], row.get('params'), job_id=row['job_id'])
+        job.state = row['state']
+        job.error = row.get('error')
+        job.total = row.get('total')
+        job.done = row.get('done') or 0
+        job.checkpoint = row.get('checkpoint')
+        if row.get('updated_at') is not None:
+            job.updated_at = row['updated_at'].timestamp()
+        job._summary.update(row.get('summary') or {})
+        for key, entries in (row.get('results') or {}).items():
+            job._results[key] = list(entries)
+        return job
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation has been requested."""
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job has stopped running."""
+        return self.state in ('completed', 'cancelled', 'failed', 'interrupted')
+
+    def cancel(self) -> None:
+        """Request cancellation.  Files already in the pool finish first."""
+        self._cancel.set()
+
+    def _reopen(self) -> None:
+        """Prepare a stopped job to resume from its checkpoint."""
+        with self._lock:
+            self.state = 'queued'
+            self.error = None
+            self.finished_at = None
+            self._cancel.clear()
+
+    def _record(self, status: str, entry: dict[str, Any]) -> None:
+        key = JOB_KINDS[self.kind].kept.get(status)
+        with self._lock:
+            self._summary[status] += 1
+            self.done += 1
+            if key is not None:
+                self._results[key].append(entry)
+
+    def _finish(self, state: str, error: str | None = None) -> None:
+        with self._lock:
+            self.state = state
+            self.error = error
+            self.finished_at = time.time()
+
+    def checkpoint_row(self) -> dict[str, Any]:
+        """Get the job's state as keyword arguments for db.save_admin_job."""
+        with self._lock:
+            return {
+                'job_id': self.id,
+                'kind': self.kind,
+                'params': self.params,
+                'state': self.state,
+                'error': self.error,
+                'checkpoint': self.checkpoint,
+                'total': self.total,
+                'done': self.done,
+                'summary': dict(self._summary),
+                'results': {key: list(entries) for key, entries in self._results.items()},
+            }
+
+    def to_dict(self, details: bool = True) -> dict[str, Any]:
+        """Get the job's state and progress.
+
+        Args:
+            details: Include the kept per-slide results (failures, missing,
+                skipped, errors).
+
+        Returns:
+            Dictionary with the job ID, kind, state, parameters, progress,
+            per-status summary and, optionally, results.
+        """
+        with self._lock:
+            end = self.finished_at or time.time()
+            info = {
+                'job_id': self.id,
+                'kind': self.kind,
+                'state': self.state,
+                'params': dict(self.params),
+                'error': self.error,
+                'total': self.total,
+                'done': self.done,
+                'checkpoint': self.checkpoint,
+                'elapsed_seconds': round(end - self.started_at, 2) if self.started_at else 0.0,
+                'summary': dict(self._summary),
+            }
+            if details:
+                info['results'] = {key: list(entries) for key, entries in self._results.items()}
+            return info
+
+
+class JobEngine:
+    """Runs admin jobs against a shared process pool and keeps recent jobs."""
+
+    def __init__(self, max_workers: int | None = None, processes: bool = True, max_jobs: int = 50):
+        """Initialize the engine.
+
+        Args:
+            max_workers: Pool size shared by all jobs. If None, uses
+                settings, falling back to default_job_workers().
+            processes: Run file work in worker processes.  If False, threads
+                are used instead (mainly for tests).
+            max_jobs: Number of jobs to remember in memory; the oldest
+                finished jobs are forgotten first.  Checkpoints remain in the
+                database.
+        """
+        if max_workers is None:
+            max_workers = get_settings().job_workers or default_job_workers()
+        self._max_workers = max_workers
+        self._processes = processes
+        self._max_jobs = max_jobs
+        self._executor: Executor | None = None
+        self._jobs: OrderedDict[str, AdminJob] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self) -> int:
+        """Get the pool size."""
+        return self._max_workers
+
+    def _pool(self) -> Executor:
+        """Get the worker pool, starting it on first use."""
+        with self._lock:
+            if self._executor is None:
+                if self._processes:
+                    # Spawn rather than fork: the server process has threads
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self._max_workers,
+                        mp_context=multiprocessing.get_context('spawn'))
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers, thread_name_prefix='large_image_job')
+            return self._executor
+
+    def create(self, kind: str, params: dict[str, Any] | None = None) -> AdminJob:
+        """Create and remember a job without running it.
+
+        Args:
+            kind: One of JOB_KINDS.
+            params: Job parameters.
+
+        Returns:
+            The queued job.
+        """
+        job = AdminJob(kind, params)
+        self._remember(job)
+        return job
+
+    def start(self, kind: str, params: dict[str, Any] | None = None) -> AdminJob:
+        """Create a job and run it on a background thread.
+
+        Args:
+            kind: One of JOB_KINDS.
+            params: Job parameters.
+
+        Returns:
+            The queued job.
+        """
+        job = self.create(kind, params)
+        self._launch(job)
+        return job
+
+    def resume(self, job_id: str, background: bool = True) -> AdminJob | None:
+        """Resume a stopped job from its checkpoint.
+
+        Args:
+            job_id: Job ID.
+            background: Run on a background thread; otherwise the caller
+                runs the returned job with ``run``.
+
+        Returns:
+            The job, or None if it is unknown.  A job that is still running,
+            here or in another server process, is returned unchanged.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            job = self.get(job_id)
+            if job is None:
+                return None
+            if not job.finished and time.time() - (job.updated_at or 0) < _STALE_AFTER:
+                return job
+        elif not job.finished:
+            return job
+        job._reopen()
+        self._remember(job)
+        if background:
+            self._launch(job)
+        return job
+
+    def _remember(self, job: AdminJob) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._jobs.move_to_end(job.id)
+            excess = len(self._jobs) - self._max_jobs
+            for old_id in [old_id for old_id, old in self._jobs.items() if old.finished]:
+                if excess <= 0:
+                    break
+                del self._jobs[old_id]
+                excess -= 1
+
+    def _launch(self, job: AdminJob) -> None:
+        threading.Thread(
+            target=self._run_logged, args=(job,), daemon=True,
+            name=f'large_image_job_{job.id[:8]}').start()
+
+    def _run_logged(self, job: AdminJob) -> None:
+        try:
+            self.run(job)
+        except Exception:
+            logger.exception('Admin job %s failed', job.id)
+
+    def get(self, job_id: str) -> AdminJob | None:
+        """Get a job by ID, from memory or from its database checkpoint."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            row = db.get_admin_job(job_id)
+        except Exception as e:
+            logger.warning('Could not load admin job %s: %s', job_id, e)
+            return None
+        return AdminJob.from_row(row) if row else None
+
+    def jobs(self) -> list[AdminJob]:
+        """Get the jobs this engine remembers, newest first."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def history(self, limit: int = 50) -> list[AdminJob]:
+        """Get this engine's jobs followed by other jobs checkpointed in the database.
+
+        Jobs loaded from the database carry counts but no per-slide results.
+        """
+        jobs = self.jobs()
+        seen = {job.id for job in jobs}
+        try:
+            rows = db.list_admin_jobs(limit)
+        except Exception as e:
+            logger.warning('Could not list admin job checkpoints: %s', e)
+            rows = []
+        jobs.extend(AdminJob.from_row(row) for row in rows if row['job_id'] not in seen)
+        return jobs
+
+    def _save(self, job: AdminJob) -> None:
+        """Write a checkpoint; failures are logged, not raised."""
+        try:
+            db.save_admin_job(**job.checkpoint_row())
+        except Exception as e:
+            logger.warning('Could not checkpoint admin job %s: %s', job.id, e)
+
+    def run(
+        self,
+        job: AdminJob,
+        on_result: Callable[[str, dict[str, Any]], None] | None = None,
+    ) -> AdminJob:
+        """Run a job in the calling thread until it finishes or is cancelled.
+
+        Args:
+            job: Job from create or resume.
+            on_result: Called with ``(status, entry)`` as each slide finishes.
+
+        Returns:
+            The job.
+        """
+        spec = JOB_KINDS[job.kind]
+        settings = get_settings()
+        job.started_at = time.time()
+        if job.cancelled:
+            job._finish('cancelled')
+            self._save(job)
+            return job
+        job.state = 'running'
+        try:
+            slides = spec.list_slides(job.params, job.checkpoint)
+        except Exception as e:
+            logger.exception('Failed to list slides for admin job %s', job.id)
+            job._finish('failed', str(e))
+            self._save(job)
+            return job
+        job.total = job.done + len(slides)
+        self._save(job)
+
+        max_inflight = job.params.get('max_inflight') or settings.job_max_inflight
+        rate = job.params.get('max_bytes_per_second') or settings.job_max_bytes_per_second
+        # The job's read rate is shared by its files in flight
+        file_rate = rate / max_inflight if rate else None
+
+        remaining = iter(slides)
+        pending: dict[Any, dict[str, Any]] = {}
+        # Slide IDs in submission order; the checkpoint advances past a
+        # slide once it and everything submitted before it are done
+        order: deque[str] = deque()
+        completed: set[str] = set()
+        last_save = time.monotonic()
+        try:
+            while True:
+                while not job.cancelled and len(pending) < max_inflight:
+                    slide = next(remaining, None)
+                    if slide is None:
+                        break
+                    func, *args = spec.task(slide, job.params, settings, file_rate)
+                    pending[self._pool().submit(func, *args)] = slide
+                    order.append(slide['slide_id'])
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    slide = pending.pop(future)
+                    try:
+                        status, entry = spec.record(slide, future.result())
+                    except Exception as e:
+                        logger.error('Admin job %s: %s failed: %s', job.id, slide['slide_id'], e)
+                        status, entry = spec.error(slide, e)
+                    job._record(status, entry)
+                    completed.add(slide['slide_id'])
+                    if on_result is not None:
+                        on_result(status, entry)
+                while order and order[0] in completed:
+                    completed.discard(order[0])
+                    job.checkpoint = order.popleft()
+                if time.monotonic() - last_save >= _CHECKPOINT_INTERVAL:
+                    self._save(job)
+                    last_save = time.monotonic()
+        except BaseException:
+            # Interrupted (e.g. Ctrl-C in the offline command); keep the checkpoint
+            for future in pending:
+                future.cancel()
+            job._finish('interrupted')
+            self._save(job)
+            raise
+        job._finish('cancelled' if job.cancelled else 'completed')
+        self._save(job)
+        return job
+
+    def shutdown(self) -> None:
+        """Cancel running jobs and stop the worker pool."""
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global job engine instance
+_job_engine: JobEngine | None = None
+
+
+def get_job_engine() -> JobEngine:
+    """Get the global admin job engine instance."""
+    global _job_engine
+    if _job_engine is None:
+        _job_engine = JobEngine()
+    return _job_engine
+
+
+def configure_job_engine(**kwargs) -> JobEngine:
+    """Configure and return a new admin job engine instance.
+
+    Args:
+        **kwargs: Arguments passed to JobEngine.
+    """
+    global _job_engine
+    if _job_engine is not None:
+        _job_engine.shutdown()
+    _job_engine = JobEngine(**kwargs)
+    return _job_engine
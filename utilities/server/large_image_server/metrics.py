@@ -0,0 +1,396 @@
+"""Prometheus metrics and Server-Timing headers.
+
+With ``metrics_enabled`` set, ``MetricsMiddleware`` times every request
+and the server exposes ``GET /metrics`` in the Prometheus text format:
+
+- ``large_image_http_request_duration_seconds``: latency histogram per
+  method, route template and status.
+- ``large_image_stage_duration_seconds``: time spent in each tile pipeline
+  stage per source class, from large_image's timing hooks (see
+  ``large_image.timing``).  ``read`` is an uncached ``getTile`` less the
+  decode, style and encode stages nested in it.
+- ``large_image_tile_cache_requests_total``: large_image tile cache lookups
+  per cache class and result (``hit``, ``miss``, or ``coalesced`` for a miss
+  that waited for a concurrent caller's computation).
+- Source manager, disk tile cache, executor and store counters, read from
+  their ``stats()``/``cache_info()`` when scraped.
+
+Each response also gets a ``Server-Timing`` header with the time its
+request spent in each stage.  Tile work runs on executor threads; the tile
+executor carries the request's context there so stage times are attributed
+to the right request.
+
+Nothing is registered with large_image while metrics are disabled, so the
+timing hooks stay no-ops.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from starlette.datastructures import MutableHeaders
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# large_image stage names reported under a different name
+_STAGE_NAMES = {'getTile': 'read'}
+
+# Stage times of the current request, by stage name
+_request_timings: contextvars.ContextVar[dict[str, float] | None] = contextvars.ContextVar(
+    'large_image_server_request_timings', default=None)
+
+
+def _label_text(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ''
+    pairs = (
+        '{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values))
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    """A monotonically increasing count per label set."""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        """Initialize the counter.
+
+        Args:
+            name: Metric name.
+            documentation: Help text.
+            labels: Label names.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple[str, ...] = (), amount: float = 1) -> None:
+        """Increment the count for a label set."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple[str, ...] = ()) -> float:
+        """Get the count for a label set."""
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        """Render in the Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(
+            f'{self.name}{_label_text(self.labels, labels)} {value}' for labels, value in values)
+        return lines
+
+
+class Histogram:
+    """A distribution of observed values per label set."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        """Initialize the histogram.
+
+        Args:
+            name: Metric name.
+            documentation: Help text.
+            labels: Label names.
+            buckets: Sorted upper bounds of the buckets; +Inf is implied.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._values: dict[tuple[str, ...], list[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        """Record one value for a label set."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, labels: tuple[str, ...]) -> int:
+        """Get the number of values recorded for a label set."""
+        with self._lock:
+            entry = self._values.get(labels)
+            return sum(entry[0]) if entry else 0
+
+    def render(self) -> list[str]:
+        """Render in the Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            values = sorted((labels, (list(entry[0]), entry[1]))
+                            for labels, entry in self._values.items())
+        names = (*self.labels, 'le')
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{_label_text(names, (*labels, str(bound)))} {cumulative}')
+            lines.append(f'{self.name}_sum{_label_text(self.labels, labels)} {total}')
+            lines.append(f'{self.name}_count{_label_text(self.labels, labels)} {cumulative}')
+        return lines
+
+
+def _gauge_lines(
+    name: str, documentation: str, kind: str, samples: Iterable[tuple[dict[str, str], Any]],
+) -> list[str]:
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+    for labels, value in samples:
+        if value is None:
+            continue
+        lines.append(
+            f'{name}{_label_text(tuple(labels), tuple(labels.values()))} {float(value)}')
+    return lines
+
+
+class ServerMetrics:
+    """Request and tile pipeline metrics for one process."""
+
+    def __init__(self) -> None:
+        """Initialize empty metrics."""
+        self.requests = Histogram(
+            'large_image_http_request_duration_seconds',
+            'HTTP request latency by method, route and status.',
+            ('method', 'route', 'status'))
+        self.stages = Histogram(
+            'large_image_stage_duration_seconds',
+            'Time spent in each tile pipeline stage, excluding nested stages.',
+            ('stage', 'source'))
+        self.cache_requests = Counter(
+            'large_image_tile_cache_requests_total',
+            'large_image tile cache lookups by method, cache class and result.',
+            ('method', 'cache', 'result'))
+
+    def observe_stage(self, record: dict[str, Any]) -> None:
+        """Record a finished large_image stage (a ``large_image.timing`` observer)."""
+        stage = record['stage']
+        if 'cached' in record:
+            result = ('coalesced' if record.get('coalesced') else
+                      'hit' if record['cached'] else 'miss')
+            self.cache_requests.inc((stage, record.get('cache') or '', result))
+            if record['cached']:
+                stage = 'cache'
+        stage = _STAGE_NAMES.get(stage, stage)
+        seconds = record['selfSeconds']
+        self.stages.observe((stage, record.get('source') or ''), seconds)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    def render(self, collected: dict[str, Any] | None = None) -> str:
+        """Render all metrics in the Prometheus text format.
+
+        Args:
+            collected: Current component statistics, as from
+                ``collect_component_stats``.
+
+        Returns:
+            The exposition text.
+        """
+        lines = self.requests.render() + self.stages.render() + self.cache_requests.render()
+        for name, documentation, kind, samples in _component_metrics(collected or {}):
+            lines.extend(_gauge_lines(name, documentation, kind, samples))
+        return '\n'.join(lines) + '\n'
+
+
+def _component_metrics(collected: dict[str, Any]) -> list[tuple[str, str, str, list]]:
+    """Describe component statistics as metric families."""
+    families = []
+    sources = collected.get('source_manager')
+    if sources is not None:
+        families.extend([
+            ('large_image_source_cache_requests_total',
+             'Source manager cache lookups by kind (base or styled) and result.', 'counter', [
+                 ({'kind': 'base', 'result': 'hit'}, sources.get('hits')),
+                 ({'kind': 'base', 'result': 'miss'}, sources.get('misses')),
+                 ({'kind': 'styled', 'result': 'hit'}, sources.get('styled_hits')),
+                 ({'kind': 'styled', 'result': 'miss'}, sources.get('styled_misses')),
+             ]),
+            ('large_image_source_cache_evictions_total',
+             'Sources evicted from the source manager cache by kind.', 'counter', [
+                 ({'kind': 'base'}, sources.get('evictions')),
+                 ({'kind': 'styled'}, sources.get('styled_evictions')),
+             ]),
+            ('large_image_source_cache_entries', 'Open sources cached by kind.', 'gauge', [
+                ({'kind': 'base'}, sources.get('cached_sources')),
+                ({'kind': 'styled'}, sources.get('cached_styled_sources')),
+            ]),
+        ])
+    stores = [
+        (backend, collected[key]) for backend, key in (
+            ('disk', 'tile_disk_cache'), ('derived', 'derived_image_store'))
+        if collected.get(key) is not None]
+    if stores:
+        families.extend([
+            ('large_image_server_store_requests_total',
+             'Server disk store lookups by store and result.', 'counter',
+             [({'store': backend, 'result': result}, stats.get(key))
+              for backend, stats in stores
+              for result, key in (('hit', 'hits'), ('miss', 'misses'))]),
+            ('large_image_server_store_bytes', 'Estimated bytes used by each disk store.',
+             'gauge', [({'store': backend}, stats.get('estimated_bytes'))
+                       for backend, stats in stores]),
+            ('large_image_server_store_evictions_total', 'Files evicted from each disk store.',
+             'counter', [({'store': backend}, stats.get('evictions'))
+                         for backend, stats in stores]),
+        ])
+    stats_store = collected.get('stats_store')
+    if stats_store is not None:
+        families.append((
+            'large_image_stats_store_requests_total',
+            'Statistics store lookups by result.', 'counter', [
+                ({'result': 'hit'}, stats_store.get('hits')),
+                ({'result': 'miss'}, stats_store.get('misses')),
+            ]))
+    executor = collected.get('executor')
+    if executor is not None:
+        families.extend([
+            ('large_image_executor_queue_depth', 'Tile jobs waiting for a worker.', 'gauge',
+             [({}, executor.get('queue_depth'))]),
+            ('large_image_executor_active', 'Tile jobs running.', 'gauge',
+             [({}, executor.get('active'))]),
+            ('large_image_executor_jobs_total', 'Finished tile jobs by result.', 'counter', [
+                ({'result': 'completed'}, executor.get('completed')),
+                ({'result': 'failed'}, executor.get('failed')),
+            ]),
+        ])
+    return families
+
+
+def collect_component_stats(source_manager: Any) -> dict[str, Any]:
+    """Read the statistics of the server's caches, stores and executor.
+
+    Args:
+        source_manager: The source manager in use.
+
+    Returns:
+        Dictionary of component name to its statistics; components that are
+        not configured are omitted.
+    """
+    from .derived_store import get_derived_store
+    from .stats_store import get_stats_store
+    from .tile_cache import get_tile_cache
+    from .tile_executor import get_tile_executor
+
+    collected: dict[str, Any] = {
+        'source_manager': source_manager.cache_info(),
+        'stats_store': get_stats_store().stats(),
+        'executor': get_tile_executor().stats(),
+    }
+    tile_cache = get_tile_cache()
+    if tile_cache is not None:
+        collected['tile_disk_cache'] = tile_cache.stats()
+    derived_store = get_derived_store()
+    if derived_store is not None:
+        collected['derived_image_store'] = derived_store.stats()
+    return collected
+
+
+def server_timing(timings: dict[str, float], total: float) -> str:
+    """Format stage times as a Server-Timing header value.
+
+    Args:
+        timings: Seconds per stage.
+        total: Seconds for the whole request.
+
+    Returns:
+        Header value, e.g. ``decode;dur=3.2, encode;dur=1.1, total;dur=5.0``.
+    """
+    parts = [f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in timings.items()]
+    parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and adding Server-Timing."""
+
+    def __init__(self, app: Any, metrics: ServerMetrics, timing_allow_origin: str | None = None):
+        """Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            metrics: Metrics to record into.
+            timing_allow_origin: If set, sent as Timing-Allow-Origin so
+                browsers expose Server-Timing to cross-origin viewers.
+        """
+        self.app = app
+        self.metrics = metrics
+        self.timing_allow_origin = timing_allow_origin
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        timings: dict[str, float] = {}
+        token = _request_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message: dict) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    'Server-Timing', server_timing(dict(timings), time.perf_counter() - started))
+                if self.timing_allow_origin:
+                    headers.append('Timing-Allow-Origin', self.timing_allow_origin)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+            self.metrics.requests.observe(
+                (scope['method'], route, str(status)), time.perf_counter() - started)
+
+
+# Global metrics instance; None while metrics are disabled
+_metrics: ServerMetrics | None = None
+
+
+def get_metrics() -> ServerMetrics | None:
+    """Get the global metrics instance, or None if metrics are disabled."""
+    return _metrics
+
+
+def configure_metrics(enabled: bool) -> ServerMetrics | None:
+    """Enable or disable metrics, (un)registering the large_image observer.
+
+    Args:
+        enabled: Whether to collect metrics.
+
+    Returns:
+        The new metrics instance, or None if disabled.
+    """
+    global _metrics
+    from large_image import timing
+
+    if _metrics is not None:
+        timing.removeObserver(_metrics.observe_stage)
+    _metrics = ServerMetrics() if enabled else None
+    if _metrics is not None:
+        timing.addObserver(_metrics.observe_stage)
+    return _metrics
@@ -68,6 +68,24 @@ class OutputRequest(BaseModel):
     maxHeight: int | None = Field(default=None, description='Maximum output height')
 
 
+class TileRequest(BaseModel):
+    """Coordinates of one tile in a batch request."""
+
+    z: int = Field(description='Zoom level (0 = lowest resolution)')
+    x: int = Field(description='Tile X coordinate')
+    y: int = Field(description='Tile Y coordinate')
+    frame: int = Field(default=0, description='Frame index')
+
+
+class TileBatchRequest(BaseModel):
+    """Batch tile request for one image."""
+
+    tiles: list[TileRequest] = Field(description='Tiles to fetch')
+    format: str = Field(default='jpeg', description='Output format (png, jpeg, tiff)')
+    style: dict[str, Any] | None = Field(default=None, description='Style configuration')
+    v: str | None = Field(default=None, description='Version token')
+
+
 class StyleBand(BaseModel):
     """Style specification for a single band."""
 
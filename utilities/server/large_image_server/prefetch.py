@@ -0,0 +1,320 @@
+"""Low-priority background tile prefetching.
+
+A viewer that has just fetched one tile is likely to fetch its neighbours
+next: the tiles around it when panning, its four children when zooming in,
+and its parent when zooming out.  ``TilePrefetcher`` renders those tiles on
+a few background threads so that they are already in the tile caches (the
+disk tile cache when configured, and large_image's tile cache) by the time
+they are requested.
+
+Prefetching never competes with real requests:
+
+- Jobs run on the prefetcher's own threads, which pause while the tile
+  executor has requests waiting.
+- Each client has a budget of pending jobs; when it is exceeded the oldest
+  predictions are dropped.
+- A client's pending jobs are cancelled when its viewport moves to another
+  image, zoom level, frame, encoding, or style.
+"""
+
+import functools
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from fastapi import Request
+
+from .config import get_settings
+from .source_manager import style_hash
+from .tile_executor import get_tile_executor
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait between checks while foreground tile work is queued
+_IDLE_POLL = 0.05
+
+
+def neighbour_tiles(z: int, x: int, y: int) -> list[tuple[int, int, int]]:
+    """List the tiles a viewer is likely to request after (z, x, y).
+
+    Args:
+        z: Level.
+        x: Column.
+        y: Row.
+
+    Returns:
+        (z, x, y) tuples, most likely first: the ring of eight tiles around
+        the tile, its four children, then its parent.  Tiles with negative
+        coordinates are omitted; tiles past the far edge of the level are
+        left to fail when rendered.
+    """
+    tiles = [
+        (z, x + dx, y + dy)
+        for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+        if (dx or dy) and x + dx >= 0 and y + dy >= 0
+    ]
+    tiles.extend((z + 1, 2 * x + dx, 2 * y + dy) for dy in (0, 1) for dx in (0, 1))
+    if z > 0:
+        tiles.append((z - 1, x // 2, y // 2))
+    return tiles
+
+
+def client_id(request: Request) -> str:
+    """Identify the client a request came from for prefetch budgeting.
+
+    Viewers may send an ``X-Client-Id`` header to distinguish several
+    viewers behind one address; otherwise the remote address is used.
+    """
+    explicit = request.headers.get('x-client-id')
+    if explicit:
+        return explicit
+    return request.client.host if request.client else 'anonymous'
+
+
+class _ClientQueue:
+    """Pending prefetch jobs for one client."""
+
+    def __init__(self, context: Hashable):
+        self.context = context
+        # key -> job; the most recently scheduled jobs are at the end
+        self.jobs: OrderedDict[Hashable, Callable[[], Any]] = OrderedDict()
+
+
+class TilePrefetcher:
+    """Renders predicted tiles on background threads.
+
+    Jobs are grouped by client.  Workers take jobs round-robin across
+    clients and newest-first within a client, since the most recent request
+    is the best predictor of the next one.
+    """
+
+    def __init__(self, max_workers: int | None = None, client_budget: int | None = None):
+        """Initialize the prefetcher.
+
+        Args:
+            max_workers: Number of prefetch threads. If None, uses settings.
+                0 disables prefetching.
+            client_budget: Maximum pending jobs per client. If None, uses
+                settings.
+        """
+        settings = get_settings()
+        if max_workers is None:
+            max_workers = settings.prefetch_workers
+        if client_budget is None:
+            client_budget = settings.prefetch_client_budget
+        self._max_workers = max_workers
+        self._client_budget = client_budget
+        self._cond = threading.Condition()
+        self._clients: OrderedDict[str, _ClientQueue] = OrderedDict()
+        self._threads: list[threading.Thread] = []
+        self._stopped = False
+        self._scheduled = 0
+        self._completed = 0
+        self._failed = 0
+        self._dropped = 0
+        self._cancelled = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether prefetching is enabled."""
+        return self._max_workers > 0 and not self._stopped
+
+    def schedule(
+        self,
+        client: str,
+        context: Hashable,
+        jobs: list[tuple[Hashable, Callable[[], Any]]],
+        served: Hashable | None = None,
+    ) -> int:
+        """Queue prefetch jobs for a client.
+
+        Args:
+            client: Client identifier.
+            context: What the client is looking at.  If it differs from the
+                context of the client's pending jobs, those are cancelled.
+            jobs: (key, callable) pairs, highest priority first.  A key that
+                is already pending is moved up rather than queued twice.
+            served: Key of a tile that is being served right now and so no
+                longer needs prefetching.
+
+        Returns:
+            Number of jobs pending for the client.
+        """
+        if not self.enabled:
+            return 0
+        with self._cond:
+            queue = self._clients.get(client)
+            if queue is None or queue.context != context:
+                if queue is not None:
+                    self._cancelled += len(queue.jobs)
+                queue = self._clients[client] = _ClientQueue(context)
+            if served is not None:
+                queue.jobs.pop(served, None)
+            for key, job in reversed(jobs):
+                if key in queue.jobs:
+                    queue.jobs.move_to_end(key)
+                else:
+                    queue.jobs[key] = job
+                    self._scheduled += 1
+            while len(queue.jobs) > self._client_budget:
+                queue.jobs.popitem(last=False)
+                self._dropped += 1
+            pending = len(queue.jobs)
+            if not pending:
+                del self._clients[client]
+            self._start_workers()
+            self._cond.notify(min(pending, self._max_workers))
+            return pending
+
+    def schedule_neighbours(
+        self,
+        client: str,
+        render: Callable[..., Any],
+        source_manager: Any,
+        image_id: str,
+        z: int,
+        x: int,
+        y: int,
+        **render_kwargs: Any,
+    ) -> int:
+        """Queue the neighbours, children, and parent of a served tile.
+
+        Args:
+            client: Client identifier.
+            render: Blocking tile renderer called as
+                ``render(source_manager, image_id, z, x, y, **render_kwargs)``.
+            source_manager: Source manager to render with.
+            image_id: Image identifier.
+            z: Level of the served tile.
+            x: Column of the served tile.
+            y: Row of the served tile.
+            **render_kwargs: Encoding, frame, style, and so on.
+
+        Returns:
+            Number of jobs pending for the client.
+        """
+        if not self.enabled:
+            return 0
+        context = (
+            render.__qualname__, image_id, z,
+            tuple(sorted(
+                (k, style_hash(v) if k == 'style' else v)
+                for k, v in render_kwargs.items())))
+        jobs = [
+            (tile, functools.partial(render, source_manager, image_id, *tile, **render_kwargs))
+            for tile in neighbour_tiles(z, x, y)]
+        return self.schedule(client, context, jobs, served=(z, x, y))
+
+    def cancel(self, client: str) -> int:
+        """Cancel a client's pending jobs.
+
+        Returns:
+            Number of jobs cancelled.
+        """
+        with self._cond:
+            queue = self._clients.pop(client, None)
+            count = len(queue.jobs) if queue is not None else 0
+            self._cancelled += count
+            return count
+
+    def _start_workers(self) -> None:
+        """Start worker threads on first use; must hold ``self._cond``."""
+        while len(self._threads) < self._max_workers:
+            thread = threading.Thread(
+                target=self._worker, daemon=True,
+                name=f'large_image_prefetch_{len(self._threads)}')
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job(self) -> Callable[[], Any] | None:
+        """Wait for and take the next job, or None once stopped."""
+        with self._cond:
+            while not self._stopped and not self._clients:
+                self._cond.wait()
+            if self._stopped:
+                return None
+            client, queue = next(iter(self._clients.items()))
+            _, job = queue.jobs.popitem(last=True)
+            if queue.jobs:
+                self._clients.move_to_end(client)
+            else:
+                del self._clients[client]
+            return job
+
+    def _wait_for_idle(self) -> None:
+        """Yield to foreground tile requests."""
+        executor = get_tile_executor()
+        with self._cond:
+            while not self._stopped and executor.queue_depth:
+                self._cond.wait(_IDLE_POLL)
+
+    def _worker(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._wait_for_idle()
+            try:
+                job()
+            except Exception as e:
+                # Predictions past the edge of an image fail routinely
+                logger.debug('Prefetch job failed: %s', e)
+                with self._cond:
+                    self._failed += 1
+            else:
+                with self._cond:
+                    self._completed += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Get prefetch counters.
+
+        Returns:
+            Dictionary with the configuration, pending job and client counts,
+            and scheduled/completed/failed/dropped/cancelled counters.
+        """
+        with self._cond:
+            return {
+                'max_workers': self._max_workers,
+                'client_budget': self._client_budget,
+                'clients': len(self._clients),
+                'pending': sum(len(queue.jobs) for queue in self._clients.values()),
+                'scheduled': self._scheduled,
+                'completed': self._completed,
+                'failed': self._failed,
+                'dropped': self._dropped,
+                'cancelled': self._cancelled,
+            }
+
+    def shutdown(self) -> None:
+        """Drop pending jobs and stop the worker threads."""
+        with self._cond:
+            self._stopped = True
+            self._clients.clear()
+            self._cond.notify_all()
+
+
+# Global prefetcher instance
+_prefetcher: TilePrefetcher | None = None
+
+
+def get_prefetcher() -> TilePrefetcher:
+    """Get the global tile prefetcher instance."""
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = TilePrefetcher()
+    return _prefetcher
+
+
+def configure_prefetcher(**kwargs) -> TilePrefetcher:
+    """Configure and return a new tile prefetcher instance.
+
+    Args:
+        **kwargs: Arguments passed to TilePrefetcher.
+    """
+    global _prefetcher
+    if _prefetcher is not None:
+        _prefetcher.shutdown()
+    _prefetcher = TilePrefetcher(**kwargs)
+    return _prefetcher
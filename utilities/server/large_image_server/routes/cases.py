@@ -1,16 +1,30 @@
 """Case management endpoints for pathology workflow."""
 
+import functools
 import io
+import logging
+from pathlib import Path
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
 
 from .. import db
+from ..derived_store import get_derived_store
+from ..prefetch import TilePrefetcher, client_id, get_prefetcher
 from ..source_manager import SourceManager, get_source_manager
+from ..tile_cache import file_identity
+from ..tile_executor import TileExecutor, get_tile_executor
+from ..warm import WarmJobManager, get_warm_manager
+from .deepzoom import dzi_base_tiles, render_dzi_tile
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Default thumbnail size, also stored ahead of time at ingest
+THUMBNAIL_SIZE = 256
+
 
 def _generate_label_image(slide_id: str, width: int = 400, height: int = 150) -> bytes:
     """Generate a simple label image with slide ID text.
@@ -71,7 +85,127 @@ def _generate_label_image(slide_id: str, width: int = 400, height: int = 150) ->
     return output.getvalue()
 
 
-def _resolve_slide_image_path(slide_id: str) -> str | None:
+def _render_derived_image(
+    source_manager: SourceManager,
+    image_id: str,
+    kind: str,
+    width: int | None,
+    height: int | None,
+) -> tuple[bytes, str, bool] | None:
+    """Render a thumbnail, label or macro from the slide.  Blocking.
+
+    Embedded associated images are preferred.  Otherwise thumbnails are
+    generated from the pyramid and labels are drawn; macros cannot be
+    synthesized.
+
+    Returns:
+        (image data, media type, generated), or None if the slide has no
+        macro image.
+    """
+    if kind == 'thumbnail':
+        source = source_manager.get_source(image_id)
+        if 'thumbnail' in source.getAssociatedImagesList():
+            image_data, mime_type = source.getAssociatedImage('thumbnail')
+            return image_data, mime_type or 'image/jpeg', False
+        image_data, mime_type = source.getThumbnail(width=width, height=height, encoding='JPEG')
+        return image_data, mime_type or 'image/jpeg', True
+
+    try:
+        source = source_manager.get_source(image_id)
+        if kind in source.getAssociatedImagesList():
+            image_data, mime_type = source.getAssociatedImage(kind)
+            return image_data, mime_type or 'image/jpeg', False
+    except Exception:
+        pass  # Fall through to a generated label
+    if kind == 'label':
+        return _generate_label_image(image_id), 'image/png', True
+    # Macro images cannot be synthesized - they show physical slide context
+    return None
+
+
+def load_derived_image(
+    source_manager: SourceManager,
+    image_id: str,
+    kind: str,
+    width: int | None = None,
+    height: int | None = None,
+) -> tuple[bytes | Path, str, bool] | None:
+    """Get a thumbnail, label or macro, using the derived image store.
+
+    Blocking; run on the tile executor.  Stored images are returned as a
+    path so they can be sent directly; on a miss the image is rendered and
+    stored.
+
+    Args:
+        source_manager: Source manager used to resolve and open the slide.
+        image_id: Slide identifier.
+        kind: 'thumbnail', 'label' or 'macro'.
+        width: Maximum thumbnail width.
+        height: Maximum thumbnail height.
+
+    Returns:
+        (image data or stored file path, media type, generated), or None if
+        the slide has no macro image.
+    """
+    store = get_derived_store()
+    key = None
+    if store is not None:
+        try:
+            identity = file_identity(source_manager.get_source_path(image_id))
+        except (OSError, ValueError):
+            identity = None  # A label can still be generated
+        if identity is not None:
+            key = store.make_key(identity, kind, width, height)
+            stored = store.get(key)
+            if stored is not None:
+                return None if stored[1] is None else stored
+    rendered = _render_derived_image(source_manager, image_id, kind, width, height)
+    if key is not None:
+        if rendered is None:
+            store.put_missing(key)
+        else:
+            store.put(key, *rendered)
+    return rendered
+
+
+def populate_derived_images(source_manager: SourceManager, image_id: str) -> None:
+    """Store a newly ingested slide's default thumbnail, label and macro.
+
+    Blocking; failures are logged and the images are rendered on first
+    request instead.
+    """
+    if get_derived_store() is None:
+        return
+    for kind, size in (('thumbnail', THUMBNAIL_SIZE), ('label', None), ('macro', None)):
+        try:
+            load_derived_image(source_manager, image_id, kind, size, size)
+        except Exception as e:
+            logger.warning('Could not store %s for %s: %s', kind, image_id, e)
+
+
+async def _derived_image_response(
+    tile_executor: TileExecutor,
+    source_manager: SourceManager,
+    image_id: str,
+    kind: str,
+    width: int | None = None,
+    height: int | None = None,
+) -> Response | None:
+    """Build the response for a thumbnail, label or macro (None if unavailable)."""
+    result = await tile_executor.run(
+        image_id, load_derived_image, source_manager, image_id, kind, width, height)
+    if result is None:
+        return None
+    content, media_type, generated = result
+    headers = {'Cache-Control': 'public, max-age=86400'}
+    if generated:
+        headers['X-Generated'] = 'true'  # Indicate this is not embedded in the slide
+    if isinstance(content, Path):
+        return FileResponse(content, media_type=media_type, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+async def _resolve_slide_image_path(slide_id: str) -> str | None:
     """Resolve the image path for a slide via DB lookup.
 
     Returns the slide_id if the slide exists in the database.
@@ -81,12 +215,31 @@ def _resolve_slide_image_path(slide_id: str) -> str | None:
     Returns:
         Image path string suitable for SourceManager, or None if slide not found.
     """
-    slide_row = db.get_slide_by_id(slide_id)
+    slide_row = await db.get_slide_by_id_async(slide_id)
     if slide_row is None:
         return None
     return slide_id
 
 
+def _prefetch_base_levels(
+    prefetcher: TilePrefetcher,
+    client: str,
+    context: tuple,
+    source_manager: SourceManager,
+    image_id: str,
+) -> None:
+    """Queue the DeepZoom tiles of a slide's two lowest pyramid levels.
+
+    Blocking (opens the source); runs as a prefetch job.
+    """
+    metadata = source_manager.get_source(image_id).getMetadata()
+    prefetcher.schedule(client, context, [
+        ((image_id, *tile),
+         functools.partial(render_dzi_tile, source_manager, image_id, *tile, 'JPEG'))
+        for tile in dzi_base_tiles(metadata, levels=2)
+    ])
+
+
 @router.get(
     '/cases',
     summary='List all cases',
@@ -98,7 +251,7 @@ async def list_cases() -> list[dict[str, Any]]:
     Returns:
         List of cases with basic info (no slides detail).
     """
-    return db.list_cases()
+    return await db.list_cases_async()
 
 
 @router.get(
@@ -117,7 +270,7 @@ async def search_cases(
     Returns:
         List of matching cases (max 20).
     """
-    return db.search_cases(q)
+    return await db.search_cases_async(q)
 
 
 @router.get(
@@ -126,18 +279,33 @@ async def search_cases(
     description='Get full details for a specific case including all slides.',
     responses={404: {'description': 'Case not found'}},
 )
-async def get_case(case_id: str) -> dict[str, Any]:
+async def get_case(
+    case_id: str,
+    request: Request,
+    source_manager: SourceManager = Depends(get_source_manager),
+    prefetcher: TilePrefetcher = Depends(get_prefetcher),
+) -> dict[str, Any]:
     """Get full case details.
 
+    Opening a case schedules background prefetch of the lowest two pyramid
+    levels of each of its slides, so the viewer's first view is warm.
+
     Args:
         case_id: The case identifier (e.g., "S26-0001").
 
     Returns:
         Complete case information including all slides.
     """
-    case = db.get_case(case_id)
+    case = await db.get_case_async(case_id)
     if case is None:
         raise HTTPException(status_code=404, detail=f'Case not found: {case_id}')
+    client = f'{client_id(request)}:case'
+    context = ('case', case_id)
+    prefetcher.schedule(client, context, [
+        (slide['slideId'], functools.partial(
+            _prefetch_base_levels, prefetcher, client, context, source_manager, slide['slideId']))
+        for slide in case.get('slides') or [] if slide.get('slideId')
+    ])
     return case
 
 
@@ -156,7 +324,7 @@ async def get_case_slides(case_id: str) -> list[dict[str, Any]]:
     Returns:
         List of slides in the case.
     """
-    slides = db.get_case_slides(case_id)
+    slides = await db.get_case_slides_async(case_id)
     if slides is None:
         raise HTTPException(status_code=404, detail=f'Case not found: {case_id}')
     return slides
@@ -177,7 +345,7 @@ async def get_slide(slide_id: str) -> dict[str, Any]:
     Returns:
         Slide information with case context.
     """
-    slide = db.get_slide_with_context(slide_id)
+    slide = await db.get_slide_with_context_async(slide_id)
     if slide is None:
         raise HTTPException(status_code=404, detail=f'Slide not found: {slide_id}')
     return slide
@@ -201,7 +369,7 @@ async def get_slide_file_path(
     Returns:
         File path information.
     """
-    slide_row = db.get_slide_by_id(slide_id)
+    slide_row = await db.get_slide_by_id_async(slide_id)
     if slide_row is None:
         raise HTTPException(status_code=404, detail=f'Slide not found: {slide_id}')
     image_path = slide_row['relative_path']
@@ -229,6 +397,7 @@ async def get_slide_file_path(
 async def get_slide_label(
     slide_id: str,
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
 ) -> Response:
     """Get the label image for a slide.
 
@@ -242,35 +411,11 @@ async def get_slide_label(
     Returns:
         Label image (PNG or JPEG).
     """
-    image_path = _resolve_slide_image_path(slide_id)
+    image_path = await _resolve_slide_image_path(slide_id)
     if image_path is None:
         raise HTTPException(status_code=404, detail=f'Slide not found: {slide_id}')
 
-    # Try to extract embedded label from source file
-    try:
-        source = source_manager.get_source(image_path)
-        assoc_list = source.getAssociatedImagesList()
-
-        if 'label' in assoc_list:
-            image_data, mime_type = source.getAssociatedImage('label')
-            return Response(
-                content=image_data,
-                media_type=mime_type or 'image/jpeg',
-                headers={'Cache-Control': 'public, max-age=86400'},
-            )
-    except Exception:
-        pass  # Fall through to generated label
-
-    # Generate a placeholder label
-    label_data = _generate_label_image(slide_id)
-    return Response(
-        content=label_data,
-        media_type='image/png',
-        headers={
-            'Cache-Control': 'public, max-age=86400',
-            'X-Generated': 'true',  # Indicate this is a generated label
-        },
-    )
+    return await _derived_image_response(tile_executor, source_manager, image_path, 'label')
 
 
 @router.get(
@@ -286,6 +431,7 @@ async def get_slide_label(
 async def get_slide_macro(
     slide_id: str,
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
 ) -> Response:
     """Get the macro image for a slide.
 
@@ -298,31 +444,18 @@ async def get_slide_macro(
     Returns:
         Macro image (PNG or JPEG).
     """
-    image_path = _resolve_slide_image_path(slide_id)
+    image_path = await _resolve_slide_image_path(slide_id)
     if image_path is None:
         raise HTTPException(status_code=404, detail=f'Slide not found: {slide_id}')
 
-    # Try to extract embedded macro from source file
-    try:
-        source = source_manager.get_source(image_path)
-        assoc_list = source.getAssociatedImagesList()
-
-        if 'macro' in assoc_list:
-            image_data, mime_type = source.getAssociatedImage('macro')
-            return Response(
-                content=image_data,
-                media_type=mime_type or 'image/jpeg',
-                headers={'Cache-Control': 'public, max-age=86400'},
-            )
-    except Exception:
-        pass
-
-    # Macro images cannot be synthesized - they show physical slide context
-    raise HTTPException(
-        status_code=404,
-        detail=f'Macro image not available for slide: {slide_id}. '
-        'Macro images must be embedded in the source file.',
-    )
+    response = await _derived_image_response(tile_executor, source_manager, image_path, 'macro')
+    if response is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f'Macro image not available for slide: {slide_id}. '
+            'Macro images must be embedded in the source file.',
+        )
+    return response
 
 
 @router.get(
@@ -337,9 +470,10 @@ async def get_slide_macro(
 )
 async def get_slide_thumbnail(
     slide_id: str,
-    width: int = 256,
-    height: int = 256,
+    width: int = THUMBNAIL_SIZE,
+    height: int = THUMBNAIL_SIZE,
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
 ) -> Response:
     """Get a thumbnail image for a slide.
 
@@ -355,38 +489,13 @@ async def get_slide_thumbnail(
     Returns:
         Thumbnail image (PNG or JPEG).
     """
-    image_path = _resolve_slide_image_path(slide_id)
+    image_path = await _resolve_slide_image_path(slide_id)
     if image_path is None:
         raise HTTPException(status_code=404, detail=f'Slide not found: {slide_id}')
 
     try:
-        source = source_manager.get_source(image_path)
-
-        # First try embedded thumbnail
-        assoc_list = source.getAssociatedImagesList()
-        if 'thumbnail' in assoc_list:
-            image_data, mime_type = source.getAssociatedImage('thumbnail')
-            return Response(
-                content=image_data,
-                media_type=mime_type or 'image/jpeg',
-                headers={'Cache-Control': 'public, max-age=86400'},
-            )
-
-        # Generate from pyramid
-        image_data, mime_type = source.getThumbnail(
-            width=width,
-            height=height,
-            encoding='JPEG',
-        )
-        return Response(
-            content=image_data,
-            media_type=mime_type or 'image/jpeg',
-            headers={
-                'Cache-Control': 'public, max-age=86400',
-                'X-Generated': 'true',
-            },
-        )
-
+        return await _derived_image_response(
+            tile_executor, source_manager, image_path, 'thumbnail', width, height)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -415,7 +524,7 @@ async def list_slide_associated_images(
     Returns:
         Dictionary with available images and their sources.
     """
-    image_path = _resolve_slide_image_path(slide_id)
+    image_path = await _resolve_slide_image_path(slide_id)
     if image_path is None:
         raise HTTPException(status_code=404, detail=f'Slide not found: {slide_id}')
 
@@ -462,25 +571,24 @@ async def get_worklist(
     Returns:
         List of cases matching the filters.
     """
-    return db.get_worklist_cases(status=status, priority=priority)
-
-
-# Extensions that benefit from pre-warming (slow to index on first load)
-SLOW_EXTENSIONS = {'.dcm', '.dicom'}
+    return await db.get_worklist_cases_async(status=status, priority=priority)
 
 
 @router.post(
     '/warm',
+    status_code=202,
     summary='Pre-warm tile sources',
-    description='Pre-load tile sources to avoid first-access delays. '
-    'DICOM files particularly benefit from pre-warming.',
+    description='Start a background job that pre-loads tile sources to avoid '
+    'first-access delays. DICOM files particularly benefit from pre-warming. '
+    'Poll GET /warm/{job_id} for progress.',
 )
 async def warm_sources(
     case_id: str | None = None,
     all_sources: bool = False,
     source_manager: SourceManager = Depends(get_source_manager),
+    warm_manager: WarmJobManager = Depends(get_warm_manager),
 ) -> dict[str, Any]:
-    """Pre-warm tile sources by loading them into cache.
+    """Start a job that pre-warms tile sources by loading them into cache.
 
     DICOM WSI files have significant first-load overhead due to frame indexing.
     Pre-warming loads them in advance so viewing is instant.
@@ -491,70 +599,72 @@ async def warm_sources(
                     slow-loading formats (DICOM).
 
     Returns:
-        Summary of warmed sources.
+        The queued job.
     """
-    import time
-
-    results = {'warmed': [], 'failed': [], 'skipped': []}
-
-    slides_to_warm = []
-    cases = db.list_cases()
-    for case in cases:
-        if case_id and case.get('caseId') != case_id:
-            continue
-        case_slides = db.get_case_slides(case['caseId']) or []
-        for slide in case_slides:
-            slides_to_warm.append({
-                'slideId': slide.get('slideId'),
-                'filename': slide.get('filename', ''),
-                'imagePath': slide.get('slideId'),  # SourceManager resolves via DB
-            })
-
-    for entry in slides_to_warm:
-        filename = entry['filename']
-        ext = '.' + filename.split('.')[-1].lower() if '.' in filename else ''
-
-        if not all_sources and ext not in SLOW_EXTENSIONS:
-            results['skipped'].append({
-                'slideId': entry['slideId'],
-                'reason': f'extension {ext} not in warm list',
-            })
-            continue
+    job = warm_manager.start(source_manager, case_id=case_id, all_sources=all_sources)
+    return job.to_dict()
 
-        try:
-            start = time.time()
-            source_manager.get_source(entry['imagePath'])
-            elapsed = time.time() - start
-
-            results['warmed'].append({
-                'slideId': entry['slideId'],
-                'path': entry['imagePath'],
-                'time_seconds': round(elapsed, 2),
-            })
-        except Exception as e:
-            results['failed'].append({
-                'slideId': entry['slideId'],
-                'path': entry['imagePath'],
-                'error': str(e),
-            })
 
+@router.get(
+    '/warm/status',
+    summary='Get warm status',
+    description='List recent warm jobs and check which sources are currently cached.',
+)
+async def warm_status(
+    source_manager: SourceManager = Depends(get_source_manager),
+    warm_manager: WarmJobManager = Depends(get_warm_manager),
+) -> dict[str, Any]:
+    """Get the state of recent warm jobs and the current source cache status."""
     return {
-        'summary': {
-            'warmed': len(results['warmed']),
-            'failed': len(results['failed']),
-            'skipped': len(results['skipped']),
-        },
-        'details': results,
+        'jobs': [job.to_dict(details=False) for job in warm_manager.jobs()],
+        'cache': source_manager.cache_info(),
     }
 
 
 @router.get(
-    '/warm/status',
-    summary='Get source cache status',
-    description='Check which sources are currently cached.',
+    '/warm/{job_id}',
+    summary='Get warm job progress',
+    description='Get the state, progress, and per-slide timing of a warm job.',
+    responses={404: {'description': 'Job not found'}},
 )
-async def warm_status(
-    source_manager: SourceManager = Depends(get_source_manager),
+async def get_warm_job(
+    job_id: str,
+    warm_manager: WarmJobManager = Depends(get_warm_manager),
+) -> dict[str, Any]:
+    """Get a warm job's progress.
+
+    Args:
+        job_id: Job ID returned by POST /warm.
+
+    Returns:
+        Job state, summary counts, and per-slide details.
+    """
+    job = warm_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'Warm job not found: {job_id}')
+    return job.to_dict()
+
+
+@router.delete(
+    '/warm/{job_id}',
+    summary='Cancel warm job',
+    description='Cancel a warm job. Slides that are already opening finish.',
+    responses={404: {'description': 'Job not found'}},
+)
+async def cancel_warm_job(
+    job_id: str,
+    warm_manager: WarmJobManager = Depends(get_warm_manager),
 ) -> dict[str, Any]:
-    """Get the current source cache status."""
-    return source_manager.cache_info()
+    """Cancel a warm job.
+
+    Args:
+        job_id: Job ID returned by POST /warm.
+
+    Returns:
+        The job's state after the cancellation request.
+    """
+    job = warm_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'Warm job not found: {job_id}')
+    job.cancel()
+    return job.to_dict(details=False)
@@ -4,12 +4,17 @@ import json
 import math
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
 
 from large_image.exceptions import TileSourceError, TileSourceXYZRangeError
 
+from ..config import get_settings
 from ..models import ErrorResponse
+from ..prefetch import TilePrefetcher, client_id, get_prefetcher
 from ..source_manager import SourceManager, get_source_manager
+from ..tile_cache import DiskTileCache, file_identity, get_tile_cache
+from ..tile_executor import TileExecutor, get_tile_executor
+from .tiles import etag_matches, tile_headers
 
 router = APIRouter()
 
@@ -24,6 +29,110 @@ def parse_style(style: str | None) -> dict | None:
         raise HTTPException(status_code=400, detail=f'Invalid style JSON: {e}') from e
 
 
+def _get_metadata(source_manager: SourceManager, image_id: str) -> dict:
+    """Open the source and return its metadata.  Blocking; run on the tile executor."""
+    return source_manager.get_source(image_id).getMetadata()
+
+
+def dzi_level_offset(metadata: dict) -> int:
+    """Get the difference between DeepZoom and large_image level numbers.
+
+    DeepZoom numbering: level 0 = 1x1 pixel, level N = 2^N pixels on longest side
+    large_image numbering: level 0 = lowest res, level (levels-1) = full res
+
+    The mapping is:
+      DeepZoom max level (dz_max_level) = full resolution
+      large_image max level (levels-1) = full resolution
+
+    So: li_level = level - dz_max_level + (levels - 1)
+        li_level = level - (dz_max_level - levels + 1)
+    """
+    max_dim = max(metadata['sizeX'], metadata['sizeY'])
+    dz_max_level = math.ceil(math.log2(max_dim)) if max_dim > 0 else 0
+    return dz_max_level - (metadata['levels'] - 1)
+
+
+def dzi_base_tiles(metadata: dict, levels: int = 2) -> list[tuple[int, int, int]]:
+    """List the DeepZoom tiles of the lowest large_image pyramid levels.
+
+    Args:
+        metadata: Tile source metadata.
+        levels: Number of pyramid levels, starting from the lowest resolution.
+
+    Returns:
+        (level, col, row) tuples in DeepZoom numbering.
+    """
+    level_offset = dzi_level_offset(metadata)
+    tiles = []
+    for li_level in range(min(levels, metadata['levels'])):
+        scale = 2 ** (metadata['levels'] - 1 - li_level)
+        cols = math.ceil(math.ceil(metadata['sizeX'] / scale) / metadata['tileWidth'])
+        rows = math.ceil(math.ceil(metadata['sizeY'] / scale) / metadata['tileHeight'])
+        tiles.extend(
+            (li_level + level_offset, col, row)
+            for row in range(rows) for col in range(cols))
+    return tiles
+
+
+def render_dzi_tile(
+    source_manager: SourceManager,
+    image_id: str,
+    level: int,
+    col: int,
+    row: int,
+    encoding: str,
+    frame: int = 0,
+    style: dict | None = None,
+    if_none_match: str | None = None,
+    version: str | None = None,
+) -> tuple[dict[str, str], bytes | None]:
+    """Open the source and encode one DeepZoom tile.  Blocking; run on the tile executor.
+
+    Conditional requests and disk tile cache hits are answered without
+    opening the source; see ``tiles.render_tile``.
+
+    Returns:
+        Response headers and the tile bytes.  The bytes are None if
+        ``if_none_match`` matches the current ETag.
+    """
+    settings = get_settings()
+    identity = file_identity(source_manager.get_source_path(image_id))
+    key = DiskTileCache.make_key(
+        identity, 'dzi', level, col, row, frame, encoding,
+        settings.jpeg_quality, settings.jpeg_subsampling, style)
+    headers = tile_headers(key, identity, version)
+    if etag_matches(if_none_match, headers['ETag']):
+        return headers, None
+    tile_cache = get_tile_cache()
+    if tile_cache is not None:
+        tile_data = tile_cache.get(key)
+        if tile_data is not None:
+            return headers, tile_data
+    source = source_manager.get_source(
+        image_id,
+        style=style,
+        encoding=encoding,
+    )
+    metadata = source.getMetadata()
+
+    # Convert DeepZoom level to large_image level
+    li_level = level - dzi_level_offset(metadata)
+
+    # Clamp to valid range
+    if li_level < 0:
+        # Request is for a level smaller than our smallest tile
+        # Return a scaled version of the lowest level tile
+        li_level = 0
+    elif li_level >= metadata['levels']:
+        li_level = metadata['levels'] - 1
+
+    # applyStyle=False returns raw pixel values without ICC color management
+    tile_data = source.getTile(col, row, li_level, frame=frame, applyStyle=False)
+    if tile_cache is not None:
+        tile_cache.put(key, tile_data)
+    return headers, tile_data
+
+
 @router.get(
     '/deepzoom/{image_id:path}.dzi',
     summary='Get DeepZoom descriptor',
@@ -38,6 +147,7 @@ async def get_dzi_descriptor(
     image_id: str,
     format: Annotated[str, Query(description='Tile format')] = 'jpeg',
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
 ) -> Response:
     """Get DeepZoom Image (DZI) descriptor XML.
 
@@ -53,8 +163,7 @@ async def get_dzi_descriptor(
         DZI XML descriptor.
     """
     try:
-        source = source_manager.get_source(image_id)
-        metadata = source.getMetadata()
+        metadata = await tile_executor.run(image_id, _get_metadata, source_manager, image_id)
 
         # DeepZoom uses 0 overlap by default
         overlap = 0
@@ -99,12 +208,23 @@ async def get_dzi_tile(
     col: int,
     row: int,
     format: str,
+    request: Request,
     frame: Annotated[int, Query(description='Frame index')] = 0,
     style: Annotated[str | None, Query(description='JSON style')] = None,
+    v: Annotated[
+        str | None,
+        Query(description='Version token from /tiles/{image_id}/version; '
+              'makes the response immutable'),
+    ] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
+    prefetcher: TilePrefetcher = Depends(get_prefetcher),
 ) -> Response:
     """Get a DeepZoom tile.
 
+    Serving a tile schedules its neighbours for background prefetch.
+
     DeepZoom levels are numbered differently than large_image levels:
     - DeepZoom level 0 is a 1x1 pixel image
     - Each level doubles in size
@@ -120,9 +240,13 @@ async def get_dzi_tile(
         format: Tile format (jpeg, png).
         frame: Frame index for multi-frame images.
         style: JSON style configuration.
+        v: Optional version token. OpenSeaDragon copies the query string of
+            the .dzi URL onto tile URLs, so ``slide.dzi?v=<token>`` versions
+            every tile.
+        if_none_match: Entity tags of the client's cached copy.
 
     Returns:
-        Tile image data.
+        Tile image data, or 304 Not Modified if the client's copy is current.
     """
     format_lower = format.lower()
     if format_lower not in ('jpeg', 'jpg', 'png'):
@@ -133,51 +257,31 @@ async def get_dzi_tile(
 
     try:
         parsed_style = parse_style(style)
-        source = source_manager.get_source(
+        headers, tile_data = await tile_executor.run(
             image_id,
+            render_dzi_tile,
+            source_manager,
+            image_id,
+            level,
+            col,
+            row,
+            encoding,
+            frame=frame,
             style=parsed_style,
-            encoding=encoding,
+            if_none_match=if_none_match,
+            version=v,
         )
-        metadata = source.getMetadata()
-
-        # Convert DeepZoom level to large_image level
-        #
-        # DeepZoom numbering: level 0 = 1x1 pixel, level N = 2^N pixels on longest side
-        # large_image numbering: level 0 = lowest res, level (levels-1) = full res
-        #
-        # The mapping is:
-        #   DeepZoom max level (dz_max_level) = full resolution
-        #   large_image max level (levels-1) = full resolution
-        #
-        # So: li_level = level - dz_max_level + (levels - 1)
-        #     li_level = level - (dz_max_level - levels + 1)
-        #
-        max_dim = max(metadata['sizeX'], metadata['sizeY'])
-        dz_max_level = math.ceil(math.log2(max_dim)) if max_dim > 0 else 0
-
-        # Calculate the level offset between DeepZoom and large_image
-        level_offset = dz_max_level - (metadata['levels'] - 1)
-
-        # Convert DeepZoom level to large_image level
-        li_level = level - level_offset
-
-        # Clamp to valid range
-        if li_level < 0:
-            # Request is for a level smaller than our smallest tile
-            # Return a scaled version of the lowest level tile
-            li_level = 0
-        elif li_level >= metadata['levels']:
-            li_level = metadata['levels'] - 1
-
-        # applyStyle=False returns raw pixel values without ICC color management
-        tile_data = source.getTile(col, row, li_level, frame=frame, applyStyle=False)
+        if tile_data is None:
+            # The client already holds this view, so there is nothing to prefetch
+            return Response(status_code=304, headers=headers)
+        prefetcher.schedule_neighbours(
+            client_id(request), render_dzi_tile, source_manager, image_id, level, col, row,
+            encoding=encoding, frame=frame, style=parsed_style)
 
         return Response(
             content=tile_data,
             media_type=mime_type,
-            headers={
-                'Cache-Control': 'public, max-age=3600',
-            },
+            headers=headers,
         )
 
     except FileNotFoundError as e:
@@ -200,6 +304,7 @@ async def get_dzi_info(
     image_id: str,
     format: Annotated[str, Query(description='Tile format')] = 'jpeg',
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
 ) -> dict:
     """Get DeepZoom info as JSON.
 
@@ -207,8 +312,7 @@ async def get_dzi_info(
     as JSON instead of XML, useful for programmatic access.
     """
     try:
-        source = source_manager.get_source(image_id)
-        metadata = source.getMetadata()
+        metadata = await tile_executor.run(image_id, _get_metadata, source_manager, image_id)
 
         return {
             'format': format,
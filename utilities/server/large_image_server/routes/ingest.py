@@ -5,23 +5,31 @@ filesystem, computes HMAC-SHA256, extracts metadata via large_image,
 and inserts database records transactionally.
 """
 
+import asyncio
 import logging
 import os
 import re
 from pathlib import Path
 
-from fastapi import APIRouter, Form, HTTPException, Query, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, Query, UploadFile
 
 from .. import db
 from ..config import get_settings
-import hmac as hmac_mod
-
-from ..hmac_util import compute_file_hmac, verify_file_hmac
+from ..derived_store import get_derived_store
+from ..hmac_util import HmacFileWriter, verify_chunked_hmac, verify_file_hmac
+from ..jobs import JobEngine, get_job_engine
+from ..source_manager import get_source_manager
+from ..stats_store import precompute_statistics
+from ..tile_executor import get_tile_executor
+from .cases import populate_derived_images
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix='/admin/ingest', tags=['Ingestion'])
 
+# Bytes read from an upload at a time; large reads keep per-chunk overhead low
+_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
 _CASE_ID_RE = re.compile(r'^[A-Za-z]+(\d{2})-\d+$')
 _EDU_CASE_ID_RE = re.compile(r'^EDU(\d{2})-\d{5}$')
 
@@ -59,6 +67,21 @@ def _extract_format(filename: str) -> str:
     return parts[1] if len(parts) > 1 else ''
 
 
+def _store_derived_data(background_tasks: BackgroundTasks, slide_id: str) -> None:
+    """Store the new slide's statistics, thumbnail, label and macro after responding."""
+    source_manager = get_source_manager()
+    background_tasks.add_task(precompute_statistics, source_manager, slide_id)
+    if get_derived_store() is not None:
+        background_tasks.add_task(populate_derived_images, source_manager, slide_id)
+
+
+def _invalidate_resolution(slide_id: str) -> None:
+    """Drop cached path resolutions and worklists after a slide is ingested."""
+    get_source_manager().invalidate_paths(slide_id)
+    db.invalidate_path_index()
+    db.invalidate_worklist_cache()
+
+
 def _extract_metadata(file_path: Path) -> dict:
     """Extract image metadata via large_image.
 
@@ -90,6 +113,43 @@ def _extract_metadata(file_path: Path) -> dict:
     return result
 
 
+async def _write_upload(
+    file: UploadFile, path: Path, key: str, chunk_size: int | None = None,
+) -> tuple[str, int, dict | None]:
+    """Stream an upload to disk, computing its HMAC in the same pass.
+
+    Writing and hashing run on worker threads, overlapped with reading the
+    next chunk of the upload, so the event loop never waits on disk.
+
+    Args:
+        file: Uploaded file.
+        path: Destination path.
+        key: HMAC secret key.
+        chunk_size: If set, also build a chunked HMAC manifest.
+
+    Returns:
+        (hex HMAC digest, size in bytes, manifest or None).
+    """
+    writer = await asyncio.to_thread(HmacFileWriter, path, key, chunk_size=chunk_size)
+    pending = None
+    try:
+        while True:
+            chunk = await file.read(_UPLOAD_CHUNK_SIZE)
+            if pending is not None:
+                await pending
+                pending = None
+            if not chunk:
+                break
+            pending = asyncio.ensure_future(asyncio.to_thread(writer.write, chunk))
+        hmac_hex = await asyncio.to_thread(writer.close)
+    except BaseException:
+        if pending is not None:
+            await asyncio.gather(pending, return_exceptions=True)
+        writer.abort()
+        raise
+    return hmac_hex, writer.size, writer.manifest
+
+
 @router.post(
     '/clinical',
     summary='Ingest a clinical slide',
@@ -104,6 +164,7 @@ def _extract_metadata(file_path: Path) -> dict:
 )
 async def ingest_clinical_slide(
     file: UploadFile,
+    background_tasks: BackgroundTasks,
     case_id: str = Form(...),
     part_label: str = Form(...),
     block_label: str = Form(...),
@@ -173,12 +234,8 @@ async def ingest_clinical_slide(
         target_path.parent.mkdir(parents=True, exist_ok=True)
 
         # Write to tmp file then rename (atomic on same filesystem)
-        with open(tmp_path, 'wb') as f:
-            while True:
-                chunk = await file.read(65536)
-                if not chunk:
-                    break
-                f.write(chunk)
+        hmac_hex, size_bytes, manifest = await _write_upload(
+            file, tmp_path, settings.hmac_key, settings.hmac_chunk_size)
 
         os.rename(tmp_path, target_path)
     except Exception as e:
@@ -191,11 +248,10 @@ async def ingest_clinical_slide(
             detail=f'Failed to write file: {e}',
         ) from e
 
-    # 7. Compute HMAC and extract metadata
+    # 7. Extract metadata (the HMAC was computed while writing)
     try:
-        size_bytes = target_path.stat().st_size
-        hmac_hex = compute_file_hmac(target_path, settings.hmac_key)
-        image_meta = _extract_metadata(target_path)
+        image_meta = await get_tile_executor().run(
+            str(target_path), _extract_metadata, target_path)
 
         # Resolve patient by MRN or UUID
         resolved_patient_id = None
@@ -246,6 +302,14 @@ async def ingest_clinical_slide(
             anatomic_site=anatomic_site,
             final_diagnosis=final_diagnosis,
         )
+        _invalidate_resolution(slide_id)
+        if manifest is not None:
+            try:
+                db.save_slide_hmac_manifest(slide_id, manifest)
+            except Exception as e:
+                # verify-all and backfill-hmac record it later
+                logger.warning('Could not store HMAC manifest for %s: %s', slide_id, e)
+        _store_derived_data(background_tasks, slide_id)
 
         return {
             'slideId': slide_row['slide_id'],
@@ -275,13 +339,22 @@ async def ingest_clinical_slide(
 @router.get(
     '/verify/{slide_id}',
     summary='Verify slide integrity',
-    description='Recompute HMAC for a slide and compare against stored value.',
+    description='Recompute HMAC for a slide and compare against stored value. With '
+    '`sample`, verify that many randomly chosen chunks against the slide\'s chunked HMAC '
+    'manifest instead of reading the whole file.',
     responses={
-        404: {'description': 'Slide not found'},
+        404: {'description': 'Slide, or its chunked HMAC manifest, not found'},
         503: {'description': 'HMAC key or clinical root not configured'},
     },
 )
-async def verify_slide(slide_id: str) -> dict:
+async def verify_slide(
+    slide_id: str,
+    sample: int | None = Query(
+        default=None,
+        ge=1,
+        description='Spot-check this many chunks using the stored chunked HMAC manifest',
+    ),
+) -> dict:
     """Verify a slide's HMAC integrity."""
     settings = get_settings()
 
@@ -305,7 +378,26 @@ async def verify_slide(slide_id: str) -> dict:
             detail=f'Slide file not found on disk: {slide_info["relative_path"]}',
         )
 
-    match = verify_file_hmac(file_path, settings.hmac_key, stored_hmac)
+    if sample is not None:
+        manifest = db.get_slide_hmac_manifest(slide_id)
+        if not manifest:
+            raise HTTPException(
+                status_code=404, detail=f'No HMAC manifest stored for slide: {slide_id}')
+        result = await asyncio.to_thread(
+            verify_chunked_hmac, file_path, settings.hmac_key, manifest, sample)
+        # A spot check does not prove the whole file, so verified_at is left alone
+        return {
+            'slideId': slide_id,
+            'verified': result['ok'],
+            'chunksChecked': len(result['checked']),
+            'chunksTotal': len(manifest['chunks']),
+            'mismatchedChunks': result['mismatched'],
+            'manifestValid': result['rootValid'],
+            'sizeValid': result['sizeValid'],
+        }
+
+    match = await asyncio.to_thread(
+        verify_file_hmac, file_path, settings.hmac_key, stored_hmac)
 
     if match:
         db.update_slide_verified(slide_id)
@@ -318,60 +410,65 @@ async def verify_slide(slide_id: str) -> dict:
     }
 
 
-@router.post(
-    '/backfill-hmac',
-    summary='Backfill HMACs for seeded slides',
-    description='Compute HMAC-SHA256 for all slides with NULL hmac. '
-    'Intended for slides loaded via SQL seed before the ingestion API.',
-    responses={
-        503: {'description': 'Database, HMAC key, or clinical root not configured'},
-    },
-)
-async def backfill_hmac() -> dict:
-    """Compute and store HMACs for slides that have none."""
+def _require_job_storage(need_hmac: bool) -> None:
+    """Raise 503 unless the database, clinical root and (optionally) HMAC key are set."""
     settings = get_settings()
-
     if not db.is_configured():
         raise HTTPException(status_code=503, detail='Database not configured')
-    if not settings.hmac_key:
+    if need_hmac and not settings.hmac_key:
         raise HTTPException(status_code=503, detail='HMAC key not configured')
     if not settings.storage_clinical_root:
         raise HTTPException(status_code=503, detail='Clinical storage root not configured')
 
-    slides = db.list_slides_missing_hmac()
-    processed = 0
-    skipped = []
-    errors = []
 
-    for slide in slides:
-        slide_id = slide['slide_id']
-        rel_path = slide['relative_path']
-        file_path = settings.storage_clinical_root / rel_path
+def _job_params(**params) -> dict:
+    """Drop unset job parameters so settings supply the defaults."""
+    return {key: value for key, value in params.items() if value is not None}
 
-        if not file_path.exists():
-            skipped.append({'slideId': slide_id, 'reason': 'file not found'})
-            continue
 
-        try:
-            hmac_hex = compute_file_hmac(file_path, settings.hmac_key)
-            db.update_slide_hmac(slide_id, hmac_hex)
-            processed += 1
-        except Exception as e:
-            logger.error('Backfill HMAC failed for %s: %s', slide_id, e)
-            errors.append({'slideId': slide_id, 'error': str(e)})
+_MAX_INFLIGHT_QUERY = Query(
+    default=None,
+    ge=1,
+    description='Files this job may process at once (default: job_max_inflight setting)',
+)
+_MAX_BYTES_QUERY = Query(
+    default=None,
+    ge=1,
+    description='Read rate limit for this job in bytes per second '
+    '(default: job_max_bytes_per_second setting)',
+)
 
-    return {
-        'processed': processed,
-        'skipped': skipped,
-        'errors': errors,
-    }
+
+@router.post(
+    '/backfill-hmac',
+    summary='Backfill HMACs for seeded slides',
+    description='Start a background job that computes HMAC-SHA256 for all slides with '
+    'NULL hmac. Intended for slides loaded via SQL seed before the ingestion API. '
+    'Poll GET /admin/ingest/jobs/{job_id} for progress.',
+    status_code=202,
+    responses={
+        503: {'description': 'Database, HMAC key, or clinical root not configured'},
+    },
+)
+async def backfill_hmac(
+    max_inflight: int | None = _MAX_INFLIGHT_QUERY,
+    max_bytes_per_second: int | None = _MAX_BYTES_QUERY,
+    engine: JobEngine = Depends(get_job_engine),
+) -> dict:
+    """Start a job computing and storing HMACs for slides that have none."""
+    _require_job_storage(need_hmac=True)
+    job = engine.start('backfill-hmac', _job_params(
+        max_inflight=max_inflight, max_bytes_per_second=max_bytes_per_second))
+    return job.to_dict()
 
 
 @router.post(
     '/verify-all',
     summary='Verify all slide HMACs (batch sweep)',
-    description='Background sweep per SDS-STR-001 §5.2. Recomputes HMAC for all '
-    'slides and compares against stored values. Updates verified_at on match.',
+    description='Background sweep per SDS-STR-001 §5.2. Starts a job that recomputes '
+    'HMAC for all slides and compares against stored values, updating verified_at on '
+    'match. Poll GET /admin/ingest/jobs/{job_id} for progress and failures.',
+    status_code=202,
     responses={
         503: {'description': 'Database, HMAC key, or clinical root not configured'},
     },
@@ -381,139 +478,135 @@ async def verify_all(
         default=None,
         description='Only re-verify slides not verified within this many hours',
     ),
+    max_inflight: int | None = _MAX_INFLIGHT_QUERY,
+    max_bytes_per_second: int | None = _MAX_BYTES_QUERY,
+    engine: JobEngine = Depends(get_job_engine),
 ) -> dict:
-    """Verify HMAC integrity for all slides needing verification."""
-    settings = get_settings()
-
-    if not db.is_configured():
-        raise HTTPException(status_code=503, detail='Database not configured')
-    if not settings.hmac_key:
-        raise HTTPException(status_code=503, detail='HMAC key not configured')
-    if not settings.storage_clinical_root:
-        raise HTTPException(status_code=503, detail='Clinical storage root not configured')
-
-    slides = db.list_slides_for_verification(stale_hours=stale_hours)
-    verified = 0
-    failed = 0
-    missing_count = 0
-    failures = []
-    missing = []
+    """Start a job verifying HMAC integrity for all slides needing verification."""
+    _require_job_storage(need_hmac=True)
+    job = engine.start('verify-all', _job_params(
+        stale_hours=stale_hours,
+        max_inflight=max_inflight,
+        max_bytes_per_second=max_bytes_per_second,
+    ))
+    return job.to_dict()
 
-    for slide in slides:
-        slide_id = slide['slide_id']
-        rel_path = slide['relative_path']
-        stored_hmac = slide['hmac']
-        file_path = settings.storage_clinical_root / rel_path
 
-        if not file_path.exists():
-            missing_count += 1
-            missing.append({'slideId': slide_id, 'relativePath': rel_path})
-            continue
-
-        try:
-            actual_hmac = compute_file_hmac(file_path, settings.hmac_key)
-        except Exception as e:
-            logger.error('Verify-all: failed to compute HMAC for %s: %s', slide_id, e)
-            failed += 1
-            failures.append({
-                'slideId': slide_id,
-                'expected': stored_hmac,
-                'actual': f'error: {e}',
-                'sizeBytes': None,
-            })
-            continue
-
-        if hmac_mod.compare_digest(actual_hmac, stored_hmac):
-            db.update_slide_verified(slide_id)
-            verified += 1
-        else:
-            failed += 1
-            try:
-                size_bytes = file_path.stat().st_size
-            except OSError:
-                size_bytes = None
-            logger.warning(
-                'HMAC mismatch for slide %s: expected=%s actual=%s size=%s',
-                slide_id, stored_hmac, actual_hmac, size_bytes,
-            )
-            failures.append({
-                'slideId': slide_id,
-                'expected': stored_hmac,
-                'actual': actual_hmac,
-                'sizeBytes': size_bytes,
-            })
-
-    total = verified + failed + missing_count
-    return {
-        'summary': {
-            'verified': verified,
-            'failed': failed,
-            'missing': missing_count,
-            'total': total,
-        },
-        'failures': failures,
-        'missing': missing,
-    }
+@router.post(
+    '/spot-check',
+    summary='Spot-check slide HMACs',
+    description='Start a background job that verifies a random sample of chunks of every '
+    'slide with a chunked HMAC manifest (recorded at ingest, or by verify-all and '
+    'backfill-hmac when hmac_chunk_size is set). Reads a fraction of each file, so it can '
+    'run far more often than verify-all. Poll GET /admin/ingest/jobs/{job_id} for progress.',
+    status_code=202,
+    responses={
+        503: {'description': 'Database, HMAC key, or clinical root not configured'},
+    },
+)
+async def spot_check(
+    sample: int | None = Query(
+        default=None,
+        ge=1,
+        description='Chunks verified per slide (default: hmac_spot_check_chunks setting)',
+    ),
+    max_inflight: int | None = _MAX_INFLIGHT_QUERY,
+    max_bytes_per_second: int | None = _MAX_BYTES_QUERY,
+    engine: JobEngine = Depends(get_job_engine),
+) -> dict:
+    """Start a job spot-checking chunked HMACs for all slides that have a manifest."""
+    _require_job_storage(need_hmac=True)
+    job = engine.start('spot-check', _job_params(
+        sample=sample,
+        max_inflight=max_inflight,
+        max_bytes_per_second=max_bytes_per_second,
+    ))
+    return job.to_dict()
 
 
 @router.post(
     '/backfill-metadata',
     summary='Backfill image metadata for seeded slides',
-    description='Extract width_px, height_px, magnification, mpp_x, mpp_y, and scanner '
-    'from slide files for all slides with NULL width_px. '
+    description='Start a background job that extracts width_px, height_px, magnification, '
+    'mpp_x, mpp_y, and scanner from slide files for all slides with NULL width_px. '
     'Intended for slides loaded via SQL seed before the ingestion API.',
+    status_code=202,
     responses={
         503: {'description': 'Database or clinical root not configured'},
     },
 )
-async def backfill_metadata() -> dict:
-    """Extract and store image metadata for slides that have none."""
-    settings = get_settings()
+async def backfill_metadata(
+    max_inflight: int | None = _MAX_INFLIGHT_QUERY,
+    engine: JobEngine = Depends(get_job_engine),
+) -> dict:
+    """Start a job extracting and storing image metadata for slides that have none."""
+    _require_job_storage(need_hmac=False)
+    job = engine.start('backfill-metadata', _job_params(max_inflight=max_inflight))
+    return job.to_dict()
 
-    if not db.is_configured():
-        raise HTTPException(status_code=503, detail='Database not configured')
-    if not settings.storage_clinical_root:
-        raise HTTPException(status_code=503, detail='Clinical storage root not configured')
 
-    slides = db.list_slides_missing_metadata()
-    processed = 0
-    skipped = []
-    errors = []
+@router.get(
+    '/jobs',
+    summary='List admin jobs',
+    description='List verify and backfill jobs: those known to this process, then '
+    'checkpoints of others recorded in the database.',
+)
+async def list_jobs(engine: JobEngine = Depends(get_job_engine)) -> dict:
+    """List recent admin jobs without per-slide results."""
+    return {'jobs': [job.to_dict(details=False) for job in engine.history()]}
 
-    for slide in slides:
-        slide_id = slide['slide_id']
-        rel_path = slide['relative_path']
-        file_path = settings.storage_clinical_root / rel_path
 
-        if not file_path.exists():
-            skipped.append({'slideId': slide_id, 'reason': 'file not found'})
-            continue
+@router.get(
+    '/jobs/{job_id}',
+    summary='Get admin job progress',
+    description='Progress, per-status counts and partial results of a verify or backfill job.',
+    responses={404: {'description': 'Job not found'}},
+)
+async def get_job(
+    job_id: str,
+    details: bool = Query(default=True, description='Include per-slide results'),
+    engine: JobEngine = Depends(get_job_engine),
+) -> dict:
+    """Get a job's progress."""
+    job = engine.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'Job not found: {job_id}')
+    return job.to_dict(details=details)
+
+
+@router.delete(
+    '/jobs/{job_id}',
+    summary='Cancel an admin job',
+    description='Stop a running job after the files in progress finish. '
+    'It can be resumed later from its checkpoint.',
+    responses={404: {'description': 'Job not found'}},
+)
+async def cancel_job(job_id: str, engine: JobEngine = Depends(get_job_engine)) -> dict:
+    """Cancel a job."""
+    job = engine.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'Job not found: {job_id}')
+    job.cancel()
+    return job.to_dict(details=False)
 
-        try:
-            meta = _extract_metadata(file_path)
-            if not meta.get('width_px'):
-                skipped.append({'slideId': slide_id, 'reason': 'no dimensions extracted'})
-                continue
-
-            db.update_slide_metadata(
-                slide_id,
-                width_px=meta.get('width_px'),
-                height_px=meta.get('height_px'),
-                magnification=meta.get('magnification'),
-                mpp_x=meta.get('mpp_x'),
-                mpp_y=meta.get('mpp_y'),
-                scanner=meta.get('scanner'),
-            )
-            processed += 1
-        except Exception as e:
-            logger.error('Backfill metadata failed for %s: %s', slide_id, e)
-            errors.append({'slideId': slide_id, 'error': str(e)})
 
-    return {
-        'processed': processed,
-        'skipped': skipped,
-        'errors': errors,
-    }
+@router.post(
+    '/jobs/{job_id}/resume',
+    summary='Resume an admin job',
+    description='Continue a cancelled, failed, or interrupted job from its last checkpoint.',
+    status_code=202,
+    responses={
+        404: {'description': 'Job not found'},
+        503: {'description': 'Database, HMAC key, or clinical root not configured'},
+    },
+)
+async def resume_job(job_id: str, engine: JobEngine = Depends(get_job_engine)) -> dict:
+    """Resume a stopped job."""
+    job = engine.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'Job not found: {job_id}')
+    _require_job_storage(need_hmac=job.kind != 'backfill-metadata')
+    return engine.resume(job_id).to_dict(details=False)
 
 
 # ---------------------------------------------------------------------------
@@ -535,6 +628,7 @@ async def backfill_metadata() -> dict:
 )
 async def ingest_educational_slide(
     file: UploadFile,
+    background_tasks: BackgroundTasks,
     case_id: str | None = Form(default=None),
     part_label: str = Form(default='A'),
     block_label: str = Form(default='1'),
@@ -621,12 +715,7 @@ async def ingest_educational_slide(
             staging_dir.mkdir(parents=True, exist_ok=True)
             write_path = staging_dir / f'{slide_id}.tmp'
 
-        with open(write_path, 'wb') as f:
-            while True:
-                chunk = await file.read(65536)
-                if not chunk:
-                    break
-                f.write(chunk)
+        hmac_hex, size_bytes, _ = await _write_upload(file, write_path, settings.hmac_key)
 
         if target_path:
             os.rename(write_path, target_path)
@@ -642,11 +731,10 @@ async def ingest_educational_slide(
             detail=f'Failed to write file: {e}',
         ) from e
 
-    # 8. Compute HMAC and extract metadata
+    # 8. Extract metadata (the HMAC was computed while writing)
     try:
-        size_bytes = hmac_source.stat().st_size
-        hmac_hex = compute_file_hmac(hmac_source, settings.hmac_key)
-        image_meta = _extract_metadata(hmac_source)
+        image_meta = await get_tile_executor().run(
+            str(hmac_source), _extract_metadata, hmac_source)
 
         # Build source lineage
         source_lineage = {'type': source_type or 'external_upload'}
@@ -700,6 +788,8 @@ async def ingest_educational_slide(
                     'WHERE slide_id = %s',
                     (final_relative_path, slide_id),
                 )
+        _invalidate_resolution(slide_id)
+        _store_derived_data(background_tasks, slide_id)
 
         return {
             'slideId': slide_row['slide_id'],
@@ -9,6 +9,8 @@ from large_image.exceptions import TileSourceError
 
 from ..models import ErrorResponse
 from ..source_manager import SourceManager, get_source_manager
+from ..stats_store import slide_statistics
+from ..tile_executor import TileExecutor, get_tile_executor
 
 router = APIRouter()
 
@@ -32,6 +34,121 @@ def parse_style(style: str | None) -> dict | None:
         raise HTTPException(status_code=400, detail=f'Invalid style JSON: {e}') from e
 
 
+def _render_thumbnail(
+    source_manager: SourceManager,
+    image_id: str,
+    width: int,
+    height: int,
+    encoding: str,
+    frame: int = 0,
+    style: dict | None = None,
+) -> tuple[bytes, str]:
+    """Open the source and encode a thumbnail.  Blocking; run on the tile executor."""
+    source = source_manager.get_source(
+        image_id,
+        style=style,
+        encoding=encoding,
+    )
+    return source.getThumbnail(
+        width=width,
+        height=height,
+        encoding=encoding,
+        frame=frame,
+    )
+
+
+def _render_region(
+    source_manager: SourceManager,
+    image_id: str,
+    region: dict,
+    output: dict | None,
+    encoding: str,
+    frame: int = 0,
+    style: dict | None = None,
+) -> tuple[bytes, str]:
+    """Open the source and encode a region.  Blocking; run on the tile executor."""
+    source = source_manager.get_source(
+        image_id,
+        style=style,
+        encoding=encoding,
+    )
+    return source.getRegion(
+        region=region,
+        output=output,
+        encoding=encoding,
+        frame=frame,
+    )
+
+
+def _read_pixel(source_manager: SourceManager, image_id: str, region: dict, frame: int):
+    """Open the source and read a region as numpy.  Blocking; run on the tile executor."""
+    import large_image
+
+    source = source_manager.get_source(image_id)
+    result, _ = source.getRegion(
+        region=region,
+        format=large_image.constants.TILE_FORMAT_NUMPY,
+        frame=frame,
+    )
+    return result
+
+
+def _compute_histogram(
+    source_manager: SourceManager,
+    image_id: str,
+    frame: int,
+    bins: int,
+    level: int | None = None,
+    approximate: bool = False,
+) -> dict:
+    """Get the image's histogram.  Blocking; run on the tile executor."""
+    source = source_manager.get_source(image_id)
+
+    # Use the tile source's histogram method if available, via the statistics store
+    if hasattr(source, 'histogram'):
+        return slide_statistics(
+            source_manager, image_id, frame=frame, level=level, bins=bins,
+            approximate=approximate)
+    else:
+        # Fallback: compute from thumbnail
+        import large_image
+        import numpy as np
+
+        thumb, _ = source.getThumbnail(
+            width=1024,
+            height=1024,
+            frame=frame,
+            format=large_image.constants.TILE_FORMAT_NUMPY,
+        )
+
+        histograms = []
+        if len(thumb.shape) == 2:
+            # Grayscale
+            counts, edges = np.histogram(thumb.flatten(), bins=bins)
+            histograms.append({
+                'bin_edges': edges.tolist(),
+                'hist': counts.tolist(),
+                'samples': int(thumb.size),
+            })
+        else:
+            # Multi-channel
+            for i in range(thumb.shape[-1]):
+                channel = thumb[..., i]
+                counts, edges = np.histogram(channel.flatten(), bins=bins)
+                histograms.append({
+                    'bin_edges': edges.tolist(),
+                    'hist': counts.tolist(),
+                    'samples': int(channel.size),
+                    'channel': i,
+                })
+
+        return {
+            'frame': frame,
+            'bins': bins,
+            'histograms': histograms,
+        }
+
+
 @router.get(
     '/thumbnail/{image_id:path}',
     summary='Get image thumbnail',
@@ -50,6 +167,7 @@ async def get_thumbnail(
     frame: Annotated[int, Query(description='Frame index')] = 0,
     style: Annotated[str | None, Query(description='JSON style')] = None,
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
 ) -> Response:
     """Get a thumbnail of the image.
 
@@ -77,17 +195,16 @@ async def get_thumbnail(
 
     try:
         parsed_style = parse_style(style)
-        source = source_manager.get_source(
+        image_data, actual_mime = await tile_executor.run(
             image_id,
-            style=parsed_style,
-            encoding=encoding_upper,
-        )
-
-        image_data, actual_mime = source.getThumbnail(
-            width=width,
-            height=height,
-            encoding=encoding_upper,
+            _render_thumbnail,
+            source_manager,
+            image_id,
+            width,
+            height,
+            encoding_upper,
             frame=frame,
+            style=parsed_style,
         )
 
         return Response(
@@ -138,6 +255,7 @@ async def get_region(
     frame: Annotated[int, Query(description='Frame index')] = 0,
     style: Annotated[str | None, Query(description='JSON style')] = None,
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
 ) -> Response:
     """Extract a region from the image.
 
@@ -185,11 +303,6 @@ async def get_region(
 
     try:
         parsed_style = parse_style(style)
-        source = source_manager.get_source(
-            image_id,
-            style=parsed_style,
-            encoding=encoding_upper,
-        )
 
         # Build region specification
         region = {'left': left, 'top': top, 'units': units}
@@ -209,11 +322,16 @@ async def get_region(
         if max_height is not None:
             output['maxHeight'] = max_height
 
-        image_data, actual_mime = source.getRegion(
-            region=region,
-            output=output if output else None,
-            encoding=encoding_upper,
+        image_data, actual_mime = await tile_executor.run(
+            image_id,
+            _render_region,
+            source_manager,
+            image_id,
+            region,
+            output if output else None,
+            encoding_upper,
             frame=frame,
+            style=parsed_style,
         )
 
         return Response(
@@ -246,6 +364,7 @@ async def get_pixel(
     units: Annotated[str, Query(description='Coordinate units')] = 'base_pixels',
     frame: Annotated[int, Query(description='Frame index')] = 0,
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
 ) -> dict:
     """Get the pixel value at a specific location.
 
@@ -260,8 +379,6 @@ async def get_pixel(
         Pixel value information.
     """
     try:
-        source = source_manager.get_source(image_id)
-
         # Get a 1x1 region at the specified location
         region = {
             'left': x,
@@ -271,12 +388,8 @@ async def get_pixel(
             'units': units,
         }
 
-        import large_image
-
-        result, _ = source.getRegion(
-            region=region,
-            format=large_image.constants.TILE_FORMAT_NUMPY,
-            frame=frame,
+        result = await tile_executor.run(
+            image_id, _read_pixel, source_manager, image_id, region, frame,
         )
 
         # Extract pixel value
@@ -302,7 +415,8 @@ async def get_pixel(
 @router.get(
     '/histogram/{image_id:path}',
     summary='Get image histogram',
-    description='Get histogram data for the image or a specific region.',
+    description='Get per-band statistics and histograms of the image.  Results are '
+    'computed once per slide, frame, level and bin count and then reused.',
     responses={
         404: {'model': ErrorResponse},
         400: {'model': ErrorResponse},
@@ -312,7 +426,13 @@ async def get_histogram(
     image_id: str,
     frame: Annotated[int, Query(description='Frame index')] = 0,
     bins: Annotated[int, Query(description='Number of histogram bins', ge=2, le=1024)] = 256,
+    level: Annotated[int | None, Query(
+        description='Pyramid level to analyse (default: the highest level at most '
+        '2048 pixels across)', ge=0)] = None,
+    approximate: Annotated[bool, Query(
+        description='Analyse only the lowest pyramid level (fast)')] = False,
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
 ) -> dict:
     """Get histogram data for the image.
 
@@ -320,59 +440,17 @@ async def get_histogram(
         image_id: Image identifier.
         frame: Frame index.
         bins: Number of histogram bins.
+        level: Pyramid level to analyse.
+        approximate: Analyse only the lowest pyramid level.
 
     Returns:
         Histogram data including bin edges and counts.
     """
     try:
-        source = source_manager.get_source(image_id)
-
-        # Get histogram using the tile source's histogram method if available
-        if hasattr(source, 'histogram'):
-            hist_data = source.histogram(
-                frame=frame,
-                bins=bins,
-                output={'maxWidth': 2048, 'maxHeight': 2048},
-            )
-            return hist_data
-        else:
-            # Fallback: compute from thumbnail
-            import large_image
-            import numpy as np
-
-            thumb, _ = source.getThumbnail(
-                width=1024,
-                height=1024,
-                frame=frame,
-                format=large_image.constants.TILE_FORMAT_NUMPY,
-            )
-
-            histograms = []
-            if len(thumb.shape) == 2:
-                # Grayscale
-                counts, edges = np.histogram(thumb.flatten(), bins=bins)
-                histograms.append({
-                    'bin_edges': edges.tolist(),
-                    'hist': counts.tolist(),
-                    'samples': int(thumb.size),
-                })
-            else:
-                # Multi-channel
-                for i in range(thumb.shape[-1]):
-                    channel = thumb[..., i]
-                    counts, edges = np.histogram(channel.flatten(), bins=bins)
-                    histograms.append({
-                        'bin_edges': edges.tolist(),
-                        'hist': counts.tolist(),
-                        'samples': int(channel.size),
-                        'channel': i,
-                    })
-
-            return {
-                'frame': frame,
-                'bins': bins,
-                'histograms': histograms,
-            }
+        return await tile_executor.run(
+            image_id, _compute_histogram, source_manager, image_id, frame, bins,
+            level, approximate,
+        )
 
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e)) from e
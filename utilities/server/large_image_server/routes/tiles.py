@@ -1,17 +1,32 @@
 """XYZ tile endpoints."""
 
+import asyncio
 import json
+import logging
+import struct
+from collections.abc import AsyncIterator
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from large_image.exceptions import TileSourceError, TileSourceXYZRangeError
 
-from ..models import ErrorResponse
+from ..config import get_settings
+from ..models import ErrorResponse, TileBatchRequest, TileRequest
+from ..prefetch import TilePrefetcher, client_id, get_prefetcher
 from ..source_manager import SourceManager, get_source_manager
+from ..tile_cache import DiskTileCache, file_identity, get_tile_cache, version_token
+from ..tile_executor import TileExecutor, get_tile_executor
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Cache lifetimes (seconds) for unversioned and versioned tile URLs
+TILE_MAX_AGE = 3600
+IMMUTABLE_MAX_AGE = 31536000
+
 # MIME type mapping
 MIME_TYPES = {
     'png': 'image/png',
@@ -21,6 +36,29 @@ MIME_TYPES = {
     'tif': 'image/tiff',
 }
 
+# Batch responses are a sequence of frames, each this header (request index,
+# HTTP-style status, payload length) followed by the payload: tile bytes on
+# 200, otherwise a UTF-8 error message.  Frames arrive in completion order.
+BATCH_FRAME_HEADER = struct.Struct('>IHI')
+BATCH_MEDIA_TYPE = 'application/vnd.large-image.tile-batch'
+
+
+def format_encoding(format: str) -> str:
+    """Map a tile format extension to a large_image encoding.
+
+    Raises:
+        HTTPException: If the format is not supported.
+    """
+    format_lower = format.lower()
+    if format_lower not in MIME_TYPES:
+        raise HTTPException(status_code=400, detail=f'Unsupported format: {format}')
+    encoding = format_lower.upper()
+    if encoding == 'JPG':
+        encoding = 'JPEG'
+    elif encoding == 'TIF':
+        encoding = 'TIFF'
+    return encoding
+
 
 def parse_style(style: str | None) -> dict | None:
     """Parse style parameter from JSON string."""
@@ -32,6 +70,232 @@ def parse_style(style: str | None) -> dict | None:
         raise HTTPException(status_code=400, detail=f'Invalid style JSON: {e}') from e
 
 
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag.
+
+    Args:
+        if_none_match: Header value; a comma-separated list of entity tags
+            (weak tags compare by their opaque value) or ``*``.
+        etag: Quoted strong ETag of the current representation.
+
+    Returns:
+        True if the client's copy is current.
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+def tile_headers(key: str, identity: str, version: str | None) -> dict[str, str]:
+    """Build validator and caching headers for a tile response.
+
+    Args:
+        key: Tile cache key, which covers the file identity and all render
+            parameters.
+        identity: File identity of the slide.
+        version: Version token from the request URL, if any.
+
+    Returns:
+        ETag and Cache-Control headers.  Responses are immutable only when
+        the URL carries the slide's current version token.
+    """
+    if version is not None and version == version_token(identity):
+        cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        cache_control = f'public, max-age={TILE_MAX_AGE}'
+    return {'ETag': f'"{key}"', 'Cache-Control': cache_control}
+
+
+def render_tile(
+    source_manager: SourceManager,
+    image_id: str,
+    z: int,
+    x: int,
+    y: int,
+    encoding: str,
+    frame: int = 0,
+    style: dict | None = None,
+    if_none_match: str | None = None,
+    version: str | None = None,
+) -> tuple[dict[str, str], bytes | None]:
+    """Open the source and encode one tile.  Blocking; run on the tile executor.
+
+    The ETag is derived from the slide's file identity and the render
+    parameters, so conditional requests are answered without opening the
+    source.  When the disk tile cache is enabled, cached tiles are also
+    returned without opening the source.
+
+    Returns:
+        Response headers and the tile bytes.  The bytes are None if
+        ``if_none_match`` matches the current ETag.
+    """
+    settings = get_settings()
+    identity = file_identity(source_manager.get_source_path(image_id))
+    key = DiskTileCache.make_key(
+        identity, 'xyz', z, x, y, frame, encoding,
+        settings.jpeg_quality, settings.jpeg_subsampling, style)
+    headers = tile_headers(key, identity, version)
+    if etag_matches(if_none_match, headers['ETag']):
+        return headers, None
+    tile_cache = get_tile_cache()
+    if tile_cache is not None:
+        tile_data = tile_cache.get(key)
+        if tile_data is not None:
+            return headers, tile_data
+    source = source_manager.get_source(
+        image_id,
+        style=style,
+        encoding=encoding,
+    )
+    # applyStyle=False returns raw pixel values without ICC color management
+    tile_data = source.getTile(x, y, z, frame=frame, applyStyle=False)
+    if tile_cache is not None:
+        tile_cache.put(key, tile_data)
+    return headers, tile_data
+
+
+@router.get(
+    '/tiles/{image_id:path}/version',
+    summary='Get tile version token',
+    description='Get a token identifying the current contents of an image. '
+    'Tile URLs that include it as ?v=<token> are served as immutable.',
+    responses={
+        404: {'model': ErrorResponse},
+    },
+)
+async def get_tile_version(
+    image_id: str,
+    source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
+) -> dict:
+    """Get the version token for an image's tiles.
+
+    Args:
+        image_id: Image identifier.
+
+    Returns:
+        The version token.
+    """
+    try:
+        identity = await tile_executor.run(
+            image_id, lambda: file_identity(source_manager.get_source_path(image_id)))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    return {'version': version_token(identity)}
+
+
+async def _render_batch_tile(
+    tile_executor: TileExecutor,
+    source_manager: SourceManager,
+    image_id: str,
+    index: int,
+    tile: TileRequest,
+    encoding: str,
+    style: dict | None,
+    version: str | None,
+) -> tuple[int, int, bytes]:
+    """Render one tile of a batch, converting errors to a status and message."""
+    try:
+        _, tile_data = await tile_executor.run(
+            image_id,
+            render_tile,
+            source_manager,
+            image_id,
+            tile.z,
+            tile.x,
+            tile.y,
+            encoding,
+            frame=tile.frame,
+            style=style,
+            version=version,
+        )
+        return index, 200, tile_data
+    except TileSourceXYZRangeError:
+        return index, 404, f'Tile out of range: z={tile.z}, x={tile.x}, y={tile.y}'.encode()
+    except FileNotFoundError as e:
+        return index, 404, str(e).encode()
+    except TileSourceError as e:
+        return index, 400, str(e).encode()
+    except Exception:
+        logger.exception('Failed to render batch tile %s of %s', tile, image_id)
+        return index, 500, b'Internal error'
+
+
+async def _stream_batch(tasks: list[asyncio.Task]) -> AsyncIterator[bytes]:
+    """Yield batch frames as tiles finish; cancel the rest if the client goes away."""
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, status, payload = await next_done
+            yield BATCH_FRAME_HEADER.pack(index, status, len(payload)) + payload
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post(
+    '/tiles/{image_id:path}/batch',
+    summary='Get multiple tiles',
+    description='Get many tiles of one image in a single response. Tiles are '
+    'rendered concurrently and streamed as each one is ready. Each frame is a '
+    'big-endian header (uint32 request index, uint16 status, uint32 length) '
+    'followed by the tile bytes, or a UTF-8 error message if status is not 200.',
+    response_class=StreamingResponse,
+    responses={
+        200: {'content': {BATCH_MEDIA_TYPE: {}}},
+        404: {'model': ErrorResponse, 'description': 'Image not found'},
+        400: {'model': ErrorResponse, 'description': 'Invalid parameters'},
+    },
+)
+async def get_tile_batch(
+    image_id: str,
+    batch: TileBatchRequest,
+    source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
+) -> StreamingResponse:
+    """Get multiple tiles of one image.
+
+    The image is resolved once up front so a missing image is a plain 404;
+    per-tile failures are reported in that tile's frame.
+
+    Args:
+        image_id: Image identifier.
+        batch: Tile coordinates, format, style and version token.
+
+    Returns:
+        A stream of length-prefixed tile frames.
+    """
+    encoding = format_encoding(batch.format)
+    max_tiles = get_settings().tile_batch_max_tiles
+    if len(batch.tiles) > max_tiles:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Too many tiles: {len(batch.tiles)} (maximum {max_tiles})',
+        )
+    try:
+        await tile_executor.run(image_id, source_manager.get_source_path, image_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+
+    tasks = [
+        asyncio.ensure_future(_render_batch_tile(
+            tile_executor, source_manager, image_id, index, tile, encoding,
+            batch.style, batch.v))
+        for index, tile in enumerate(batch.tiles)
+    ]
+    return StreamingResponse(
+        _stream_batch(tasks),
+        media_type=BATCH_MEDIA_TYPE,
+        headers={
+            'Cache-Control': 'no-store',
+            'X-Tile-Format': MIME_TYPES[batch.format.lower()],
+        },
+    )
+
+
 @router.get(
     '/tiles/{image_id:path}/{z}/{x}/{y}.{format}',
     summary='Get XYZ tile',
@@ -49,15 +313,26 @@ async def get_tile(
     x: int,
     y: int,
     format: str,
+    request: Request,
     frame: Annotated[int, Query(description='Frame index for multi-frame images')] = 0,
     style: Annotated[
         str | None,
         Query(description='JSON style configuration'),
     ] = None,
+    v: Annotated[
+        str | None,
+        Query(description='Version token from /tiles/{image_id}/version; '
+              'makes the response immutable'),
+    ] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
+    prefetcher: TilePrefetcher = Depends(get_prefetcher),
 ) -> Response:
     """Get a tile at the specified XYZ coordinates.
 
+    Serving a tile schedules its neighbours for background prefetch.
+
     Args:
         image_id: Image identifier (filename or path relative to image directory).
         z: Zoom level (0 = lowest resolution).
@@ -66,37 +341,42 @@ async def get_tile(
         format: Output format (png, jpeg, tiff).
         frame: Frame index for multi-frame images.
         style: JSON style configuration for color mapping.
+        v: Optional version token.
+        if_none_match: Entity tags of the client's cached copy.
 
     Returns:
-        Tile image data.
+        Tile image data, or 304 Not Modified if the client's copy is current.
     """
     format_lower = format.lower()
-    if format_lower not in MIME_TYPES:
-        raise HTTPException(status_code=400, detail=f'Unsupported format: {format}')
-
-    encoding = format_lower.upper()
-    if encoding == 'JPG':
-        encoding = 'JPEG'
-    elif encoding == 'TIF':
-        encoding = 'TIFF'
+    encoding = format_encoding(format)
 
     try:
         parsed_style = parse_style(style)
-        source = source_manager.get_source(
+        headers, tile_data = await tile_executor.run(
+            image_id,
+            render_tile,
+            source_manager,
             image_id,
+            z,
+            x,
+            y,
+            encoding,
+            frame=frame,
             style=parsed_style,
-            encoding=encoding,
+            if_none_match=if_none_match,
+            version=v,
         )
-
-        # applyStyle=False returns raw pixel values without ICC color management
-        tile_data = source.getTile(x, y, z, frame=frame, applyStyle=False)
+        if tile_data is None:
+            # The client already holds this view, so there is nothing to prefetch
+            return Response(status_code=304, headers=headers)
+        prefetcher.schedule_neighbours(
+            client_id(request), render_tile, source_manager, image_id, z, x, y,
+            encoding=encoding, frame=frame, style=parsed_style)
 
         return Response(
             content=tile_data,
             media_type=MIME_TYPES[format_lower],
-            headers={
-                'Cache-Control': 'public, max-age=3600',
-            },
+            headers=headers,
         )
 
     except FileNotFoundError as e:
@@ -122,13 +402,18 @@ async def get_tile(
 )
 async def get_tile_query(
     image_id: str,
+    request: Request,
     z: Annotated[int, Query(description='Zoom level')],
     x: Annotated[int, Query(description='Tile X coordinate')],
     y: Annotated[int, Query(description='Tile Y coordinate')],
     encoding: Annotated[str, Query(description='Output format')] = 'PNG',
     frame: Annotated[int, Query(description='Frame index')] = 0,
     style: Annotated[str | None, Query(description='JSON style')] = None,
+    v: Annotated[str | None, Query(description='Version token')] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
     source_manager: SourceManager = Depends(get_source_manager),
+    tile_executor: TileExecutor = Depends(get_tile_executor),
+    prefetcher: TilePrefetcher = Depends(get_prefetcher),
 ) -> Response:
     """Get a tile using query parameters (Jupyter-compatible endpoint)."""
     format_map = {'PNG': 'png', 'JPEG': 'jpeg', 'TIFF': 'tiff'}
@@ -142,5 +427,10 @@ async def get_tile_query(
         format=format_ext,
         frame=frame,
         style=style,
+        v=v,
+        if_none_match=if_none_match,
+        request=request,
         source_manager=source_manager,
+        tile_executor=tile_executor,
+        prefetcher=prefetcher,
     )
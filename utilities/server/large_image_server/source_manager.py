@@ -1,16 +1,23 @@
 """Tile source management with caching."""
 
+import hashlib
+import json
+import logging
 import threading
 import time
 from collections import OrderedDict
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Any
 
 import large_image
+from large_image import timing
 from large_image.exceptions import TileSourceError
 
 from .config import get_settings
 
+logger = logging.getLogger(__name__)
+
 
 class SourceManager:
     """Manages tile sources with LRU caching.
@@ -32,8 +39,24 @@ class SourceManager:
         self._image_dir = image_dir or settings.image_dir
         self._max_sources = max_sources or settings.source_cache_size
         self._sources: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        # (path, encoding, style hash) -> (styled source, last access)
+        self._styled_sources: OrderedDict[tuple[str, str, str], tuple[Any, float]] = OrderedDict()
+        self._max_styled_sources = settings.styled_source_cache_size
         self._lock = threading.RLock()
+        # In-flight opens, so concurrent requests for one slide share a single open
+        self._opening: dict[str, Future] = {}
+        # Incremented whenever cached state is invalidated; opens and path
+        # lookups that straddle an invalidation don't repopulate the caches
+        self._generation = 0
+        # image_id -> (resolved path, expiry on the monotonic clock)
+        self._paths: OrderedDict[str, tuple[Path, float]] = OrderedDict()
+        self._path_cache_size = settings.path_cache_size
+        self._path_cache_ttl = settings.path_cache_ttl
         self._allowed_extensions = settings.allowed_extensions
+        self._counters = {
+            'hits': 0, 'misses': 0, 'evictions': 0,
+            'styled_hits': 0, 'styled_misses': 0, 'styled_evictions': 0,
+        }
 
     @property
     def image_dir(self) -> Path:
@@ -46,9 +69,55 @@ class SourceManager:
         with self._lock:
             self._image_dir = value
             self._sources.clear()
+            self._styled_sources.clear()
+            self._paths.clear()
+            self._generation += 1
 
     def _resolve_image_path(self, image_id: str) -> Path:
-        """Resolve an image ID to a file path.
+        """Resolve an image ID to a file path, using the resolution cache.
+
+        Successful resolutions are kept in a bounded LRU for
+        ``path_cache_ttl`` seconds, so repeated tile requests for one image
+        do no database queries or filesystem stats.  Failures are not cached.
+        Use ``invalidate_paths`` when a slide's location changes.
+
+        Args:
+            image_id: Image identifier (filename, relative path, or slide_id).
+
+        Returns:
+            Absolute path to the image file.
+
+        Raises:
+            FileNotFoundError: If the image file doesn't exist.
+        """
+        if not self._path_cache_size or self._path_cache_ttl <= 0:
+            return self._lookup_image_path(image_id)
+
+        with self._lock:
+            entry = self._paths.get(image_id)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self._paths.move_to_end(image_id)
+                    return entry[0]
+                del self._paths[image_id]
+            generation = self._generation
+
+        span = timing.start('resolve')
+        try:
+            path = self._lookup_image_path(image_id)
+        finally:
+            timing.finish(span)
+
+        with self._lock:
+            if generation == self._generation:
+                self._paths[image_id] = (path, time.monotonic() + self._path_cache_ttl)
+                self._paths.move_to_end(image_id)
+                while len(self._paths) > self._path_cache_size:
+                    self._paths.popitem(last=False)
+        return path
+
+    def _lookup_image_path(self, image_id: str) -> Path:
+        """Resolve an image ID to a file path without the resolution cache.
 
         Resolution order:
         1. Database lookup (if storage_db_url is configured) — query wsi.slides
@@ -143,62 +212,201 @@ class SourceManager:
             FileNotFoundError: If the image doesn't exist.
             TileSourceError: If the image can't be opened.
         """
-        settings = get_settings()
         path = self._resolve_image_path(image_id)
         self._validate_extension(path)
 
-        # Build cache key including style
-        cache_key = str(path)
         if style:
-            # Style sources can't be cached the same way
-            cache_key = None
+            return self._get_styled_source(image_id, path, style, encoding, **kwargs)
 
+        cache_key = str(path)
         with self._lock:
-            # Check cache (only for non-styled sources)
-            if cache_key and cache_key in self._sources:
+            # Check cache
+            if cache_key in self._sources:
                 source, _ = self._sources[cache_key]
                 # Move to end (most recently used)
                 self._sources.move_to_end(cache_key)
                 self._sources[cache_key] = (source, time.time())
+                self._counters['hits'] += 1
                 return source
 
-            # Open new source
-            open_kwargs = {
-                'encoding': encoding or settings.default_encoding,
-                'jpegQuality': settings.jpeg_quality,
-                'jpegSubsampling': settings.jpeg_subsampling,
-            }
-
-            # Handle style with ICC color management disabled by default.
-            # ICC profile application transforms colors in ways that don't match
-            # what viewers like QuPath display, so we disable it unless the
-            # caller explicitly enables it.
-            if style:
-                # If caller provided a style, merge ICC disable unless they set it
-                if isinstance(style, dict) and 'icc' not in style:
-                    style = {**style, 'icc': False}
-                open_kwargs['style'] = style
-                open_kwargs['noCache'] = True
+            # Join an open already in progress for this key, or start one.
+            # The lock is not held while opening, so other slides are not
+            # blocked behind a slow open.
+            future = self._opening.get(cache_key)
+            if future is not None:
+                owner = False
             else:
-                # No style provided - just disable ICC
-                open_kwargs['style'] = {'icc': False}
+                owner = True
+                future = self._opening[cache_key] = Future()
+                generation = self._generation
+            self._counters['hits' if not owner else 'misses'] += 1
 
-            open_kwargs.update(kwargs)
+        if not owner:
+            # Re-raises the opener's exception, if any
+            return future.result()
 
-            try:
-                source = large_image.open(str(path), **open_kwargs)
-            except Exception as e:
-                raise TileSourceError(f'Failed to open image: {e}') from e
+        try:
+            source = self._open_source(path, style, encoding, **kwargs)
+        except BaseException as e:
+            # Drop the in-flight entry so the next request retries the open
+            with self._lock:
+                if self._opening.get(cache_key) is future:
+                    del self._opening[cache_key]
+            future.set_exception(e)
+            raise
 
-            # Cache non-styled sources
-            if cache_key:
+        with self._lock:
+            if self._opening.get(cache_key) is future:
+                del self._opening[cache_key]
+            # Don't repopulate a cache that was cleared while we were opening
+            if generation == self._generation:
                 # Evict oldest if at capacity
                 while len(self._sources) >= self._max_sources:
                     self._sources.popitem(last=False)
+                    self._counters['evictions'] += 1
 
                 self._sources[cache_key] = (source, time.time())
+        future.set_result(source)
+        return source
+
+    def _get_styled_source(
+        self,
+        image_id: str,
+        path: Path,
+        style: dict | str,
+        encoding: str | None,
+        **kwargs,
+    ) -> Any:
+        """Get a styled tile source, deriving it from the cached unstyled source.
+
+        Styled sources are cached under the path, encoding, and a canonical
+        hash of the style, so key order in the style JSON doesn't matter.  A
+        new styled source is a shallow copy of the open unstyled source with
+        the style applied, the same way ``LruCacheMetaclass`` derives styled
+        sources, so the file is not reopened or reparsed.
+
+        Args:
+            image_id: Image identifier.
+            path: Resolved path to the image file.
+            style: Style configuration.
+            encoding: Optional encoding (JPEG, PNG, TIFF).
+            **kwargs: Additional arguments passed to large_image.open().
+
+        Returns:
+            TileSource instance.
+        """
+        settings = get_settings()
+        style = _with_icc_default(style)
+        if kwargs or not self._max_styled_sources:
+            return self._open_source(path, style, encoding, **kwargs)
+        encoding = encoding or settings.default_encoding
+        cache_key = (str(path), encoding, style_hash(style))
+
+        with self._lock:
+            if cache_key in self._styled_sources:
+                source, _ = self._styled_sources[cache_key]
+                self._styled_sources.move_to_end(cache_key)
+                self._styled_sources[cache_key] = (source, time.time())
+                self._counters['styled_hits'] += 1
+                return source
+            self._counters['styled_misses'] += 1
+            generation = self._generation
+
+        base = self.get_source(image_id, encoding=encoding)
+        if not hasattr(base, '_setStyle') or not hasattr(base, '_sourceLock'):
+            return self._open_source(path, style, encoding)
+        self._seed_band_ranges(image_id, base, style)
+        source = _derive_styled_source(base, style, {
+            'encoding': encoding,
+            'jpegQuality': settings.jpeg_quality,
+            'jpegSubsampling': settings.jpeg_subsampling,
+        })
+
+        with self._lock:
+            if generation == self._generation:
+                while len(self._styled_sources) >= self._max_styled_sources:
+                    self._styled_sources.popitem(last=False)
+                    self._counters['styled_evictions'] += 1
+                self._styled_sources[cache_key] = (source, time.time())
+        return source
+
+    def _seed_band_ranges(self, image_id: str, base: Any, style: dict | str) -> None:
+        """Fill a source's auto-range statistics from the statistics store.
+
+        Styled copies share the unstyled source's ``_bandRanges``, so seeding
+        it keeps large_image from scanning the image for 'auto', 'min' and
+        'max' style ranges.  Statistics are taken from the level large_image
+        would scan, so tiles match an unseeded render, and are computed and
+        stored on first use.
+        """
+        ranges = getattr(base, '_bandRanges', None)
+        if not isinstance(ranges, dict):
+            return
+        from .stats_store import auto_range_level, band_ranges, slide_statistics
+
+        for frame in _auto_range_frames(style):
+            if frame in ranges:
+                continue
+            try:
+                level = auto_range_level(base.getMetadata())
+                seeded = band_ranges(slide_statistics(self, image_id, frame=frame, level=level))
+            except Exception as e:
+                logger.warning('Could not get statistics for %s frame %s: %s', image_id, frame, e)
+                continue
+            if seeded:
+                ranges.setdefault(frame, seeded)
 
-            return source
+    def _open_source(
+        self,
+        path: Path,
+        style: dict | str | None,
+        encoding: str | None,
+        **kwargs,
+    ) -> Any:
+        """Open a tile source without touching the cache.
+
+        Args:
+            path: Resolved path to the image file.
+            style: Optional style configuration.
+            encoding: Optional encoding (JPEG, PNG, TIFF).
+            **kwargs: Additional arguments passed to large_image.open().
+
+        Returns:
+            TileSource instance.
+
+        Raises:
+            TileSourceError: If the image can't be opened.
+        """
+        settings = get_settings()
+        open_kwargs = {
+            'encoding': encoding or settings.default_encoding,
+            'jpegQuality': settings.jpeg_quality,
+            'jpegSubsampling': settings.jpeg_subsampling,
+        }
+
+        # Handle style with ICC color management disabled by default.
+        # ICC profile application transforms colors in ways that don't match
+        # what viewers like QuPath display, so we disable it unless the
+        # caller explicitly enables it.
+        if style:
+            # If caller provided a style, merge ICC disable unless they set it
+            open_kwargs['style'] = _with_icc_default(style)
+            open_kwargs['noCache'] = True
+        else:
+            # No style provided - just disable ICC
+            open_kwargs['style'] = {'icc': False}
+
+        open_kwargs.update(kwargs)
+
+        span = timing.start('open')
+        source = None
+        try:
+            source = large_image.open(str(path), **open_kwargs)
+        except Exception as e:
+            raise TileSourceError(f'Failed to open image: {e}') from e
+        finally:
+            timing.finish(span, source)
+        return source
 
     def get_source_path(self, image_id: str) -> Path:
         """Get the resolved path for an image ID.
@@ -245,36 +453,189 @@ class SourceManager:
             return False
 
         with self._lock:
+            for key in [key for key in self._styled_sources if key[0] == cache_key]:
+                del self._styled_sources[key]
             if cache_key in self._sources:
                 del self._sources[cache_key]
                 return True
         return False
 
+    def invalidate_paths(self, image_id: str | None = None) -> int:
+        """Drop cached image path resolutions.
+
+        Args:
+            image_id: Image identifier or slide_id to invalidate. Entries are
+                dropped if their key, their key's file name stem, or their
+                resolved file's stem matches. If None, all entries are dropped.
+
+        Returns:
+            Number of entries removed.
+        """
+        with self._lock:
+            if image_id is None:
+                count = len(self._paths)
+                self._paths.clear()
+                self._generation += 1
+                return count
+            target = _strip_suffixes(image_id)
+            stale = [
+                key for key, (path, _) in self._paths.items()
+                if key == image_id or _strip_suffixes(key) == target
+                or _strip_suffixes(path.name) == target]
+            for key in stale:
+                del self._paths[key]
+            # In-flight lookups may have read the old location
+            self._generation += 1
+            return len(stale)
+
     def clear_cache(self) -> int:
-        """Clear all cached sources.
+        """Clear all cached sources and path resolutions.
 
         Returns:
-            Number of sources that were cached.
+            Number of unstyled and styled sources that were cached.
         """
         with self._lock:
-            count = len(self._sources)
+            count = len(self._sources) + len(self._styled_sources)
             self._sources.clear()
+            self._styled_sources.clear()
+            self._paths.clear()
+            self._generation += 1
             return count
 
     def cache_info(self) -> dict[str, Any]:
         """Get information about the source cache.
 
         Returns:
-            Dictionary with cache statistics.
+            Dictionary with cache statistics, including hit, miss and
+            eviction counters for unstyled and styled sources.
         """
         with self._lock:
             return {
                 'cached_sources': len(self._sources),
                 'max_sources': self._max_sources,
                 'sources': list(self._sources.keys()),
+                'cached_styled_sources': len(self._styled_sources),
+                'max_styled_sources': self._max_styled_sources,
+                'opening': list(self._opening.keys()),
+                'cached_paths': len(self._paths),
+                **self._counters,
             }
 
 
+def style_hash(style: dict | str | None) -> str:
+    """Return a canonical hash of a style.
+
+    Dictionaries (and JSON strings that parse to one) hash the same
+    regardless of key order or whitespace.
+
+    Args:
+        style: Style configuration.
+
+    Returns:
+        Hex digest of the canonical style JSON; an empty string for no style.
+    """
+    if not style:
+        return ''
+    if isinstance(style, str):
+        try:
+            style = json.loads(style)
+        except json.JSONDecodeError:
+            return hashlib.sha256(style.encode()).hexdigest()
+    canonical = json.dumps(style, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _auto_range_frames(style: dict | str) -> list[int]:
+    """Return the frames whose statistics a style's min/max values need.
+
+    Band min and max default to 'auto'.  Ranges are resolved per tile frame,
+    so this covers frame 0 and any frames named by the bands; other frames
+    fall back to large_image's own scan.
+
+    Args:
+        style: Style configuration.
+
+    Returns:
+        Sorted frame indices, empty if the style uses only fixed ranges.
+    """
+    if isinstance(style, str):
+        try:
+            style = json.loads(style)
+        except json.JSONDecodeError:
+            return []
+    if not isinstance(style, dict):
+        return []
+    bands = style.get('bands')
+    if bands is None:
+        band_keys = {'band', 'min', 'max', 'palette', 'scheme', 'nodata', 'frame'}
+        bands = [style] if band_keys & set(style) else []
+    frames = set()
+    for band in bands:
+        if not isinstance(band, dict):
+            continue
+        values = (band.get('min', 'auto'), band.get('max', 'auto'))
+        if any(isinstance(value, str) and value.split(':', 1)[0] in {'auto', 'min', 'max'}
+               for value in values):
+            frames.add(0)
+            if isinstance(band.get('frame'), int):
+                frames.add(band['frame'])
+    return sorted(frames)
+
+
+def _with_icc_default(style: dict | str) -> dict | str:
+    """Disable ICC color management in a style unless it says otherwise.
+
+    ICC profile application transforms colors in ways that don't match what
+    viewers like QuPath display.
+    """
+    if isinstance(style, dict) and 'icc' not in style:
+        return {**style, 'icc': False}
+    return style
+
+
+def _derive_styled_source(base: Any, style: dict | str, open_kwargs: dict[str, Any]) -> Any:
+    """Create a styled copy of an open tile source.
+
+    This mirrors how ``LruCacheMetaclass.__call__`` derives styled sources:
+    the copy shares the base's file handles and parsed structure, gets its
+    own lock and class key (so memoized tiles don't collide), and refers to
+    the truly unstyled source via ``_unstyledInstance``.
+
+    Args:
+        base: An open tile source.
+        style: Style to apply.
+        open_kwargs: Encoding options for the styled source.
+
+    Returns:
+        The styled tile source.
+    """
+    cls = base.__class__
+    args, kwargs = getattr(base, '_initValues', ((), {}))
+    kwargs = {**kwargs, **open_kwargs, 'style': style}
+    source = cls.__new__(cls)
+    with base._sourceLock:
+        source.__dict__ = base.__dict__.copy()
+        source._sourceLock = threading.RLock()
+    source.encoding = open_kwargs['encoding']
+    source.jpegQuality = int(open_kwargs['jpegQuality'])
+    source.jpegSubsampling = int(open_kwargs['jpegSubsampling'])
+    source._classkey = cls.__name__ + ' ' + cls.getLRUHash(*args, **kwargs)
+    source._initValues = (args, kwargs)
+    source._unstyledInstance = getattr(base, '_unstyledInstance', base)
+    source._derivedSource = True
+    # Has to be after setting the _unstyledInstance
+    source._setStyle(style)
+    return source
+
+
+def _strip_suffixes(image_id: str) -> str:
+    """Return the file name of an image ID with all extensions removed."""
+    stem = image_id.replace('%2F', '/').rsplit('/', 1)[-1]
+    while '.' in stem:
+        stem = stem.rsplit('.', 1)[0]
+    return stem
+
+
 # Global source manager instance
 _source_manager: SourceManager | None = None
 
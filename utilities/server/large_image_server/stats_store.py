@@ -0,0 +1,399 @@
+"""Per-slide pixel statistics: min/max/mean/stdev and histograms.
+
+``TileSource.histogram`` reads every tile of the requested level twice, and
+large_image's auto-range styling (``min``/``max`` of ``'auto'``) runs its
+own scan whenever a styled source is created.  ``StatisticsStore`` keeps the
+result for each (slide, frame, level, bins) so that the scan runs once:
+
+- Entries are keyed by the slide's file identity, so a replaced file gets
+  new statistics.
+- Recent entries are kept in memory; with ``stats_dir`` set they are also
+  written as JSON files (sharing the tile cache's budget and eviction
+  logic) and survive restarts.
+- Concurrent requests for the same missing entry share one computation.
+- An approximate mode reads only the lowest (smallest) pyramid level.
+
+Styled sources are seeded from the store (see SourceManager), so auto-range
+styles reuse the statistics of the level large_image would scan instead of
+scanning the image.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any
+
+from .config import get_settings
+from .tile_cache import DiskStore, file_identity
+
+logger = logging.getLogger(__name__)
+
+# Largest side of the level analysed by default, matching the previous
+# histogram output size
+DEFAULT_ANALYSIS_SIZE = 2048
+# Largest side of the region large_image scans for auto-range styles
+# (TileSource._scanForMinMax)
+AUTO_RANGE_SIZE = 1024
+
+
+class _StatsFiles(DiskStore):
+    """Statistics entries as JSON files on disk."""
+
+    _suffixes = ('.json',)
+
+    def _path(self, key: str) -> Path:
+        return self._dir / key[:2] / f'{key}.json'
+
+    def read(self, key: str) -> dict[str, Any] | None:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fptr:
+                data = fptr.read()
+                mtime = os.fstat(fptr.fileno()).st_mtime
+            stats = json.loads(data)
+        except (OSError, ValueError):
+            return None
+        self._touch(path, mtime)
+        return stats
+
+    def write(self, key: str, stats: dict[str, Any]) -> None:
+        self._publish(self._path(key), [json.dumps(stats).encode()])
+
+
+class StatisticsStore:
+    """Memory- and optionally disk-backed store of slide statistics."""
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        max_bytes: int | None = None,
+        max_entries: int | None = None,
+    ):
+        """Initialize the store.
+
+        Args:
+            cache_dir: Directory for persisted entries. If None, entries are
+                kept in memory only.
+            max_bytes: Byte budget for persisted entries. If None, uses
+                settings.
+            max_entries: Entries kept in memory. If None, uses settings.
+        """
+        settings = get_settings()
+        if max_bytes is None:
+            max_bytes = settings.stats_bytes
+        if max_entries is None:
+            max_entries = settings.stats_cache_size
+        self._files = _StatsFiles(cache_dir, max_bytes) if cache_dir else None
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._computing: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._computed = 0
+
+    @staticmethod
+    def make_key(identity: str, frame: int, level: int, bins: int) -> str:
+        """Build a key for one set of statistics.
+
+        Args:
+            identity: File identity of the slide, from ``file_identity``.
+            frame: Frame index.
+            level: Pyramid level analysed.
+            bins: Histogram bins.
+
+        Returns:
+            Hex digest key.
+        """
+        return hashlib.sha256(repr((identity, frame, level, bins)).encode()).hexdigest()
+
+    def _remember(self, key: str, stats: dict[str, Any]) -> None:
+        if not self._max_entries:
+            return
+        with self._lock:
+            self._entries[key] = stats
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Get stored statistics, or None on a miss."""
+        with self._lock:
+            stats = self._entries.get(key)
+            if stats is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return stats
+        stats = self._files.read(key) if self._files is not None else None
+        if stats is not None:
+            self._remember(key, stats)
+        with self._lock:
+            if stats is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return stats
+
+    def put(self, key: str, stats: dict[str, Any]) -> None:
+        """Store statistics (JSON-serializable)."""
+        self._remember(key, stats)
+        if self._files is not None:
+            self._files.write(key, stats)
+
+    def get_or_compute(self, key: str, compute: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        """Get stored statistics, computing and storing them on a miss.
+
+        Concurrent callers for the same key wait for a single computation.
+
+        Args:
+            key: Key from make_key.
+            compute: Blocking callable returning the statistics.
+
+        Returns:
+            The statistics.
+        """
+        stats = self.get(key)
+        if stats is not None:
+            return stats
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            future = self._computing.get(key)
+            owner = future is None
+            if owner:
+                future = self._computing[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            stats = compute()
+            self.put(key, stats)
+        except BaseException as e:
+            with self._lock:
+                del self._computing[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._computing[key]
+            self._computed += 1
+        future.set_result(stats)
+        return stats
+
+    def clear(self) -> int:
+        """Forget all entries, in memory and on disk.
+
+        Returns:
+            Number of entries removed.
+        """
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        if self._files is not None:
+            count = max(count, self._files.clear())
+        return count
+
+    def stats(self) -> dict[str, Any]:
+        """Get store statistics for this process.
+
+        Returns:
+            Dictionary with the in-memory entry count and limit,
+            hit/miss/compute counters and, if persisted, the disk store's
+            statistics.
+        """
+        with self._lock:
+            info: dict[str, Any] = {
+                'entries': len(self._entries),
+                'max_entries': self._max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'computed': self._computed,
+            }
+        if self._files is not None:
+            info['disk'] = self._files.stats()
+        return info
+
+
+def analysis_level(metadata: dict[str, Any], max_size: int = DEFAULT_ANALYSIS_SIZE) -> int:
+    """Get the highest pyramid level that fits within max_size pixels.
+
+    Args:
+        metadata: Tile source metadata.
+        max_size: Maximum width and height of the level.
+
+    Returns:
+        Level index (0 is the lowest, smallest level).
+    """
+    levels = metadata['levels']
+    largest = max(metadata['sizeX'], metadata['sizeY'])
+    scale = max(0, math.ceil(math.log2(max(largest / max_size, 1))))
+    return max(0, levels - 1 - scale)
+
+
+def auto_range_level(metadata: dict[str, Any]) -> int:
+    """Get the pyramid level large_image scans for auto-range styles.
+
+    The scan reads at most AUTO_RANGE_SIZE pixels without resampling, which
+    uses the smallest level at least that large.
+
+    Args:
+        metadata: Tile source metadata.
+
+    Returns:
+        Level index (0 is the lowest, smallest level).
+    """
+    largest = max(metadata['sizeX'], metadata['sizeY'])
+    scale = max(0, math.floor(math.log2(max(largest / AUTO_RANGE_SIZE, 1))))
+    return max(0, metadata['levels'] - 1 - scale)
+
+
+def _level_output(metadata: dict[str, Any], level: int) -> dict[str, int]:
+    scale = 2 ** (metadata['levels'] - 1 - level)
+    return {
+        'maxWidth': max(1, math.ceil(metadata['sizeX'] / scale)),
+        'maxHeight': max(1, math.ceil(metadata['sizeY'] / scale)),
+    }
+
+
+def _jsonable(value: Any) -> Any:
+    """Convert numpy arrays and scalars in histogram results to plain Python."""
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return value
+
+
+def compute_statistics(source: Any, frame: int, level: int, bins: int) -> dict[str, Any]:
+    """Compute per-band statistics and histograms of one pyramid level.
+
+    Blocking.
+
+    Args:
+        source: Unstyled tile source.
+        frame: Frame index.
+        level: Pyramid level to analyse.
+        bins: Histogram bins.
+
+    Returns:
+        Dictionary with frame, level and bins, per-band min, max, mean and
+        stdev lists, and a histogram entry per band (hist, bin_edges,
+        samples, ...), all JSON-serializable.
+    """
+    hist_data = source.histogram(
+        frame=frame,
+        bins=bins,
+        output=_level_output(source.getMetadata(), level),
+        resample=False,
+    )
+    return {'frame': frame, 'level': level, 'bins': bins, **_jsonable(hist_data or {})}
+
+
+def slide_statistics(
+    source_manager: Any,
+    image_id: str,
+    frame: int = 0,
+    level: int | None = None,
+    bins: int = 256,
+    approximate: bool = False,
+) -> dict[str, Any]:
+    """Get a slide's statistics from the store, computing them on a miss.
+
+    Blocking; run on the tile executor.
+
+    Args:
+        source_manager: Source manager used to resolve and open the slide.
+        image_id: Image identifier.
+        frame: Frame index.
+        level: Pyramid level to analyse. If None, the highest level that
+            fits within DEFAULT_ANALYSIS_SIZE.
+        bins: Histogram bins.
+        approximate: Analyse only the lowest pyramid level; overrides level.
+
+    Returns:
+        Statistics as from compute_statistics.
+    """
+    source = source_manager.get_source(image_id)
+    metadata = source.getMetadata()
+    if approximate:
+        level = 0
+    elif level is None:
+        level = analysis_level(metadata)
+    level = min(max(level, 0), metadata['levels'] - 1)
+    identity = file_identity(source_manager.get_source_path(image_id))
+    key = StatisticsStore.make_key(identity, frame, level, bins)
+    return get_stats_store().get_or_compute(
+        key, lambda: compute_statistics(source, frame, level, bins))
+
+
+def precompute_statistics(source_manager: Any, image_id: str) -> None:
+    """Compute and store the frame 0 statistics used by auto-range styles.
+
+    Blocking; failures are logged and the statistics are computed on first
+    use instead.
+    """
+    try:
+        metadata = source_manager.get_source(image_id).getMetadata()
+        slide_statistics(source_manager, image_id, level=auto_range_level(metadata))
+    except Exception as e:
+        logger.warning('Could not compute statistics for %s: %s', image_id, e)
+
+
+def band_ranges(stats: dict[str, Any]) -> dict[str, Any] | None:
+    """Convert stored statistics to large_image's auto-range format.
+
+    Args:
+        stats: Statistics from slide_statistics.
+
+    Returns:
+        A value for a tile source's ``_bandRanges[frame]``, or None if the
+        statistics have no per-band values.
+    """
+    import numpy as np
+
+    if not stats.get('min'):
+        return None
+    ranges: dict[str, Any] = {
+        key: np.array(stats[key]) for key in ('min', 'max', 'mean', 'stdev') if key in stats}
+    if stats.get('histogram'):
+        ranges['histogram'] = [
+            {**entry,
+             'hist': np.array(entry['hist']),
+             'bin_edges': np.array(entry['bin_edges'])}
+            for entry in stats['histogram'] if entry.get('hist') is not None]
+    return ranges
+
+
+# Global statistics store instance
+_stats_store: StatisticsStore | None = None
+_stats_store_lock = threading.Lock()
+
+
+def get_stats_store() -> StatisticsStore:
+    """Get the global statistics store instance."""
+    global _stats_store
+    if _stats_store is None:
+        with _stats_store_lock:
+            if _stats_store is None:
+                _stats_store = StatisticsStore(get_settings().stats_dir)
+    return _stats_store
+
+
+def configure_stats_store(cache_dir: Path | None = None, **kwargs: Any) -> StatisticsStore:
+    """Configure and return a new statistics store instance.
+
+    Args:
+        cache_dir: Directory for persisted entries. If None, uses settings;
+            entries are kept in memory only if neither is set.
+        **kwargs: Additional arguments passed to StatisticsStore.
+    """
+    global _stats_store
+    _stats_store = StatisticsStore(cache_dir or get_settings().stats_dir, **kwargs)
+    return _stats_store
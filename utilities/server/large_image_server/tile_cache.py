@@ -0,0 +1,297 @@
+"""Persistent on-disk cache of encoded tiles.
+
+The in-process and memcached/redis tile caches in large_image start cold
+whenever the server restarts or scales out.  ``DiskTileCache`` keeps encoded
+tile bytes on local disk so that popular slides are served without opening
+or decoding the source image.
+
+Layout and guarantees:
+
+- Each tile is one file, ``<dir>/<key[:2]>/<key>.tile``, holding a small
+  header (magic and payload length) followed by the encoded bytes.
+- Writes go to a temporary file in the same directory and are published
+  with ``os.replace``, so readers never see a partial tile.  Truncated files
+  left by a crash fail the header check and are discarded.
+- Any number of processes may share a cache directory.  Reads take no
+  locks; eviction is serialized across processes with an ``flock`` on
+  ``<dir>/.evict.lock`` where available.
+- File mtimes act as a clock: hits touch the file at most once per
+  ``touch_interval`` seconds and eviction removes the least recently touched
+  files until the cache is below its low-water mark.
+
+``DiskStore`` builds on large_image's ``DiskFileStore`` for the budget,
+write and eviction logic, so that the library's disk cache and the server's
+other on-disk caches (see derived_store) share it.
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any
+
+from large_image.cache_util.diskcache import DiskFileStore
+
+from .config import get_settings
+from .source_manager import style_hash
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'LITC'
+_HEADER = struct.Struct('>4sQ')
+_SUFFIX = '.tile'
+
+
+def file_identity(path: Path) -> str:
+    """Return a string that changes whenever a file's contents may have.
+
+    Args:
+        path: Path to the image file.
+
+    Returns:
+        The file's size and modification time in nanoseconds.
+    """
+    stat = os.stat(path)
+    return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+
+def version_token(identity: str) -> str:
+    """Return a short URL-safe token for a file identity.
+
+    Tile URLs may carry this token (``?v=...``) so that responses for the
+    current file contents can be cached as immutable.
+
+    Args:
+        identity: File identity from file_identity.
+
+    Returns:
+        A 16 character hex token.
+    """
+    return hashlib.sha256(identity.encode()).hexdigest()[:16]
+
+
+class DiskStore:
+    """Byte budget, atomic writes and LRU eviction for a directory of files.
+
+    The files are managed by large_image's ``DiskFileStore``, which also
+    backs its disk tile cache.  Subclasses choose the file names (sharded by
+    the first two characters of a hex key, ending in one of ``_suffixes``)
+    and the file format.
+    """
+
+    _suffixes: tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int,
+        low_water: float = 0.9,
+        touch_interval: float = 60.0,
+    ):
+        """Initialize the store.
+
+        Args:
+            cache_dir: Directory for cached files. Created if missing.
+            max_bytes: Byte budget for the cached files.
+            low_water: Eviction removes files until the cache is at most this
+                fraction of max_bytes.
+            touch_interval: Minimum seconds between mtime updates of a file
+                on cache hits.
+        """
+        self._dir = Path(cache_dir)
+        self._files = DiskFileStore(
+            str(self._dir), max_bytes, self._suffixes, low_water, touch_interval)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+
+    @property
+    def cache_dir(self) -> Path:
+        """Get the cache directory."""
+        return self._dir
+
+    def _touch(self, path: Path, mtime: float) -> None:
+        """Mark a file as recently used, at most once per touch interval."""
+        self._files.touch(path, mtime)
+
+    def _publish(self, path: Path, parts: list[bytes]) -> bool:
+        """Write a file atomically, evicting old files if over budget.
+
+        Errors are logged rather than raised; the store is best effort.
+
+        Args:
+            path: Destination path.
+            parts: Byte strings written in order.
+
+        Returns:
+            True if the file was written.
+        """
+        try:
+            written = self._files.publish(path, parts)
+        except OSError as e:
+            logger.warning('Failed to write cache entry %s: %s', path.name, e)
+            return False
+        if written:
+            with self._lock:
+                self._writes += 1
+        return written
+
+    def clear(self) -> int:
+        """Remove all cached files.
+
+        Returns:
+            Number of files removed.
+        """
+        return self._files.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Get cache statistics for this process.
+
+        Returns:
+            Dictionary with the cache directory, byte budget, estimated size,
+            and hit/miss/write/eviction counters.
+        """
+        with self._lock:
+            return {
+                'cache_dir': str(self._dir),
+                'max_bytes': self._files.maxsize,
+                'estimated_bytes': self._files.estimatedSize,
+                'hits': self._hits,
+                'misses': self._misses,
+                'writes': self._writes,
+                'evictions': self._files.evictions,
+            }
+
+
+class DiskTileCache(DiskStore):
+    """A byte-budgeted, multi-process-safe cache of encoded tiles on disk."""
+
+    _suffixes = (_SUFFIX,)
+
+    @staticmethod
+    def make_key(
+        identity: str,
+        kind: str,
+        z: int,
+        x: int,
+        y: int,
+        frame: int,
+        encoding: str,
+        quality: int,
+        subsampling: int,
+        style: dict | str | None = None,
+    ) -> str:
+        """Build a cache key for one tile.
+
+        Args:
+            identity: File identity, such as ``file_identity(path)`` or a
+                stored HMAC.
+            kind: Tile addressing scheme (e.g. 'xyz' or 'dzi'); the same
+                numbers mean different tiles in different schemes.
+            z: Level.
+            x: Column.
+            y: Row.
+            frame: Frame index.
+            encoding: Output encoding.
+            quality: JPEG quality.
+            subsampling: JPEG chroma subsampling.
+            style: Style applied to the tile.
+
+        Returns:
+            Hex digest key.
+        """
+        parts = (identity, kind, z, x, y, frame, encoding, quality, subsampling,
+                 style_hash(style))
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self._dir / key[:2] / f'{key}{_SUFFIX}'
+
+    def get(self, key: str) -> bytes | None:
+        """Get cached tile bytes.
+
+        Args:
+            key: Key from make_key.
+
+        Returns:
+            The encoded tile, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fptr:
+                header = fptr.read(_HEADER.size)
+                data = fptr.read()
+                mtime = os.fstat(fptr.fileno()).st_mtime
+        except OSError:
+            with self._lock:
+                self._misses += 1
+            return None
+        if len(header) != _HEADER.size:
+            magic, length = None, -1
+        else:
+            magic, length = _HEADER.unpack(header)
+        if magic != _MAGIC or length != len(data):
+            # Left behind by a crash or written by something else
+            with contextlib.suppress(OSError):
+                self._files.remove(path)
+            with self._lock:
+                self._misses += 1
+            return None
+        self._touch(path, mtime)
+        with self._lock:
+            self._hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store tile bytes, evicting old tiles if over budget.
+
+        Errors are logged rather than raised; the cache is best effort.
+
+        Args:
+            key: Key from make_key.
+            data: Encoded tile.
+        """
+        if not isinstance(data, bytes):
+            return
+        self._publish(self._path(key), [_HEADER.pack(_MAGIC, len(data)), data])
+
+
+# Global disk tile cache instance; False until first configured
+_tile_cache: DiskTileCache | None | bool = False
+_tile_cache_lock = threading.Lock()
+
+
+def get_tile_cache() -> DiskTileCache | None:
+    """Get the global disk tile cache, or None if it is not configured."""
+    global _tile_cache
+    if _tile_cache is False:
+        with _tile_cache_lock:
+            if _tile_cache is False:
+                settings = get_settings()
+                _tile_cache = None
+                if settings.tile_disk_cache_dir:
+                    _tile_cache = DiskTileCache(
+                        settings.tile_disk_cache_dir,
+                        settings.tile_disk_cache_bytes,
+                    )
+    return _tile_cache  # type: ignore[return-value]
+
+
+def configure_tile_cache(cache_dir: Path | None = None, **kwargs) -> DiskTileCache | None:
+    """Configure and return a new disk tile cache instance.
+
+    Args:
+        cache_dir: Cache directory. If None, uses settings; the cache is
+            disabled if neither is set.
+        **kwargs: Additional arguments passed to DiskTileCache.
+    """
+    global _tile_cache
+    settings = get_settings()
+    cache_dir = cache_dir or settings.tile_disk_cache_dir
+    kwargs.setdefault('max_bytes', settings.tile_disk_cache_bytes)
+    _tile_cache = DiskTileCache(cache_dir, **kwargs) if cache_dir else None
+    return _tile_cache
@@ -0,0 +1,218 @@
+"""Bounded executor for blocking tile work.
+
+Tile sources decode, style, and encode synchronously.  Running that work
+directly inside an ``async def`` route stalls every other request on the
+uvicorn worker's event loop, so routes hand it to a ``TileExecutor`` instead.
+The executor runs jobs on a dedicated thread pool, limits how many jobs a
+single image may have in flight, and keeps queue-depth and latency gauges.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from .config import get_settings
+
+T = TypeVar('T')
+
+
+class TileExecutor:
+    """Runs blocking tile work off the event loop.
+
+    Jobs are keyed by image so that one slow slide cannot occupy every
+    worker thread.  Jobs for the same key beyond ``per_source_limit`` wait
+    on the event loop (not in a worker thread) until a slot frees up.
+    """
+
+    def __init__(self, max_workers: int | None = None, per_source_limit: int | None = None):
+        """Initialize the executor.
+
+        Args:
+            max_workers: Number of worker threads. If None, uses settings,
+                falling back to the ThreadPoolExecutor default.
+            per_source_limit: Maximum concurrent jobs per key. If None, uses
+                settings. 0 disables the limit.
+        """
+        settings = get_settings()
+        if max_workers is None:
+            max_workers = settings.tile_workers
+        if per_source_limit is None:
+            per_source_limit = settings.tile_source_concurrency
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='large_image_tile')
+        self._max_workers = self._executor._max_workers
+        self._per_source_limit = per_source_limit
+        self._lock = threading.Lock()
+        # key -> [semaphore, number of jobs using it]
+        self._semaphores: dict[str, list[Any]] = {}
+        self._pending = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait = {'count': 0, 'total': 0.0, 'max': 0.0}
+        self._run = {'count': 0, 'total': 0.0, 'max': 0.0}
+
+    @property
+    def max_workers(self) -> int:
+        """Get the number of worker threads."""
+        return self._max_workers
+
+    @property
+    def per_source_limit(self) -> int:
+        """Get the per-key concurrency limit (0 for unlimited)."""
+        return self._per_source_limit
+
+    @property
+    def queue_depth(self) -> int:
+        """Get the number of jobs waiting for a worker thread."""
+        return self._pending
+
+    def _acquire_slot(self, key: str) -> list[Any] | None:
+        if not self._per_source_limit:
+            return None
+        with self._lock:
+            entry = self._semaphores.get(key)
+            if entry is None:
+                entry = self._semaphores[key] = [asyncio.Semaphore(self._per_source_limit), 0]
+            entry[1] += 1
+            return entry
+
+    def _release_slot(self, key: str, entry: list[Any] | None) -> None:
+        if entry is None:
+            return
+        with self._lock:
+            entry[1] -= 1
+            if not entry[1] and self._semaphores.get(key) is entry:
+                del self._semaphores[key]
+
+    @staticmethod
+    def _record(gauge: dict[str, Any], elapsed: float) -> None:
+        gauge['count'] += 1
+        gauge['total'] += elapsed
+        gauge['max'] = max(gauge['max'], elapsed)
+
+    def _claim(self, state: dict[str, bool]) -> bool:
+        """Mark a job as dequeued exactly once; must hold ``self._lock``."""
+        if state['dequeued']:
+            return False
+        state['dequeued'] = True
+        self._pending -= 1
+        return True
+
+    def _call(self, state: dict[str, bool], queued_at: float, call: Callable[[], T]) -> T:
+        started = time.perf_counter()
+        with self._lock:
+            self._claim(state)
+            self._active += 1
+            self._record(self._wait, started - queued_at)
+        ok = False
+        try:
+            result = call()
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self._active -= 1
+                if ok:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+                self._record(self._run, time.perf_counter() - started)
+
+    async def run(self, key: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run ``func(*args, **kwargs)`` on the tile pool and await its result.
+
+        Args:
+            key: Concurrency key, normally the image identifier.
+            func: Blocking callable.
+            *args: Positional arguments for func.
+            **kwargs: Keyword arguments for func.
+
+        Returns:
+            The value returned by func.  Exceptions raised by func propagate.
+        """
+        # Run in a copy of the caller's context so per-request state (such as
+        # Server-Timing stage times) follows the job onto the worker thread
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        state = {'dequeued': False}
+        queued_at = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+        entry = self._acquire_slot(key)
+        try:
+            if entry is not None:
+                async with entry[0]:
+                    return await asyncio.get_running_loop().run_in_executor(
+                        self._executor, self._call, state, queued_at, call)
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._call, state, queued_at, call)
+        finally:
+            with self._lock:
+                self._claim(state)
+            self._release_slot(key, entry)
+
+    def stats(self) -> dict[str, Any]:
+        """Get queue-depth and latency gauges.
+
+        Returns:
+            Dictionary with worker configuration, current queue depth and
+            active job count, completion counters, and wait/run latency
+            summaries in seconds.
+        """
+        with self._lock:
+            return {
+                'max_workers': self._max_workers,
+                'per_source_limit': self._per_source_limit,
+                'queue_depth': self._pending,
+                'active': self._active,
+                'completed': self._completed,
+                'failed': self._failed,
+                'busy_sources': len(self._semaphores),
+                'wait_seconds': {
+                    'avg': (self._wait['total'] / self._wait['count']
+                            if self._wait['count'] else 0.0),
+                    'max': self._wait['max'],
+                },
+                'run_seconds': {
+                    'avg': self._run['total'] / self._run['count'] if self._run['count'] else 0.0,
+                    'max': self._run['max'],
+                },
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop accepting work and release the worker threads.
+
+        Args:
+            wait: If True, block until running jobs finish.
+        """
+        self._executor.shutdown(wait=wait)
+
+
+# Global tile executor instance
+_tile_executor: TileExecutor | None = None
+
+
+def get_tile_executor() -> TileExecutor:
+    """Get the global tile executor instance."""
+    global _tile_executor
+    if _tile_executor is None:
+        _tile_executor = TileExecutor()
+    return _tile_executor
+
+
+def configure_tile_executor(**kwargs) -> TileExecutor:
+    """Configure and return a new tile executor instance.
+
+    Any previous executor is shut down without waiting; jobs it is already
+    running still complete.
+    """
+    global _tile_executor
+    if _tile_executor is not None:
+        _tile_executor.shutdown(wait=False)
+    _tile_executor = TileExecutor(**kwargs)
+    return _tile_executor
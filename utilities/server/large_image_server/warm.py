@@ -0,0 +1,276 @@
+"""Background tile source warming jobs.
+
+Opening a slide for the first time can take seconds (DICOM WSI files in
+particular must index every frame).  A warm job opens a set of slides ahead
+of time so that the viewer finds them in the source cache.  Jobs run on a
+bounded thread pool shared by all jobs, open slow formats first, record
+per-slide timing, and can be cancelled; their progress is polled with
+``GET /warm/{job_id}``.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from . import db
+from .config import get_settings
+from .source_manager import SourceManager
+
+logger = logging.getLogger(__name__)
+
+# Extensions that benefit from pre-warming (slow to index on first load)
+SLOW_EXTENSIONS = {'.dcm', '.dicom'}
+
+# Per-slide result statuses, in the order they are reported
+_STATUSES = ('warmed', 'failed', 'skipped', 'cancelled')
+
+
+def _extension(filename: str) -> str:
+    return '.' + filename.split('.')[-1].lower() if '.' in filename else ''
+
+
+class WarmJob:
+    """Progress and results of one warm job."""
+
+    def __init__(self, case_id: str | None, all_sources: bool):
+        """Initialize a queued job.
+
+        Args:
+            case_id: Case to warm, or None for every case.
+            all_sources: Warm every slide rather than only slow formats.
+        """
+        self.id = uuid.uuid4().hex
+        self.case_id = case_id
+        self.all_sources = all_sources
+        self.state = 'queued'
+        self.error: str | None = None
+        self.total: int | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._results: dict[str, list[dict[str, Any]]] = {status: [] for status in _STATUSES}
+        self._remaining = 0
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation has been requested."""
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job has stopped running."""
+        return self.state in ('completed', 'cancelled', 'failed')
+
+    def cancel(self) -> None:
+        """Request cancellation.  Slides that are already opening finish."""
+        self._cancel.set()
+
+    def _record(self, status: str, entry: dict[str, Any]) -> bool:
+        """Record one slide's result; return True if it was the last one."""
+        with self._lock:
+            self._results[status].append(entry)
+            self._remaining -= 1
+            return self._remaining <= 0
+
+    def _finish(self, state: str, error: str | None = None) -> None:
+        with self._lock:
+            self.state = state
+            self.error = error
+            self.finished_at = time.time()
+
+    def to_dict(self, details: bool = True) -> dict[str, Any]:
+        """Get the job's state and progress.
+
+        Args:
+            details: Include per-slide results.
+
+        Returns:
+            Dictionary with the job ID, state, timing, a per-status summary
+            and, optionally, per-slide details.
+        """
+        with self._lock:
+            end = self.finished_at or time.time()
+            info = {
+                'job_id': self.id,
+                'state': self.state,
+                'case_id': self.case_id,
+                'all_sources': self.all_sources,
+                'error': self.error,
+                'total': self.total,
+                'done': sum(len(entries) for entries in self._results.values()),
+                'elapsed_seconds': round(end - self.started_at, 2) if self.started_at else 0.0,
+                'summary': {status: len(entries) for status, entries in self._results.items()},
+            }
+            if details:
+                info['details'] = {
+                    status: list(entries) for status, entries in self._results.items()}
+            return info
+
+
+class WarmJobManager:
+    """Runs warm jobs on a bounded thread pool and keeps recent jobs."""
+
+    def __init__(self, max_workers: int | None = None, max_jobs: int = 50):
+        """Initialize the manager.
+
+        Args:
+            max_workers: Slides opened concurrently across all jobs. If None,
+                uses settings.
+            max_jobs: Number of jobs to remember; the oldest finished jobs
+                are forgotten first.
+        """
+        if max_workers is None:
+            max_workers = get_settings().warm_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='large_image_warm')
+        self._max_workers = max_workers
+        self._max_jobs = max_jobs
+        self._jobs: OrderedDict[str, WarmJob] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self) -> int:
+        """Get the number of slides opened concurrently."""
+        return self._max_workers
+
+    def start(
+        self,
+        source_manager: SourceManager,
+        case_id: str | None = None,
+        all_sources: bool = False,
+    ) -> WarmJob:
+        """Queue a warm job.
+
+        Args:
+            source_manager: Source manager whose cache is warmed.
+            case_id: Case to warm, or None for every case.
+            all_sources: Warm every slide rather than only slow formats.
+
+        Returns:
+            The queued job.
+        """
+        job = WarmJob(case_id, all_sources)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._plan, job, source_manager)
+        return job
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs; must hold ``self._lock``."""
+        excess = len(self._jobs) - self._max_jobs
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished]:
+            if excess <= 0:
+                break
+            del self._jobs[job_id]
+            excess -= 1
+
+    def get(self, job_id: str) -> WarmJob | None:
+        """Get a job by ID."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list[WarmJob]:
+        """Get the remembered jobs, newest first."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def _plan(self, job: WarmJob, source_manager: SourceManager) -> None:
+        """List the job's slides and queue one task per slide, slow formats first."""
+        job.started_at = time.time()
+        if job.cancelled:
+            job._finish('cancelled')
+            return
+        job.state = 'running'
+        try:
+            slides = db.list_case_slide_files(job.case_id)
+        except Exception as e:
+            logger.exception('Failed to list slides for warm job %s', job.id)
+            job._finish('failed', str(e))
+            return
+
+        entries = []
+        for slide in slides:
+            filename = (slide.get('relative_path') or '').rsplit('/', 1)[-1]
+            ext = _extension(filename)
+            entries.append((ext not in SLOW_EXTENSIONS, slide['slide_id'], ext))
+        entries.sort(key=lambda entry: entry[0])
+
+        job.total = len(entries)
+        job._remaining = len(entries)
+        if not entries:
+            job._finish('completed')
+            return
+        for _, slide_id, ext in entries:
+            if not job.all_sources and ext not in SLOW_EXTENSIONS:
+                self._done(job, job._record('skipped', {
+                    'slideId': slide_id,
+                    'reason': f'extension {ext} not in warm list',
+                }))
+            else:
+                self._executor.submit(self._warm_slide, job, source_manager, slide_id)
+
+    def _warm_slide(self, job: WarmJob, source_manager: SourceManager, slide_id: str) -> None:
+        if job.cancelled:
+            self._done(job, job._record('cancelled', {'slideId': slide_id}))
+            return
+        start = time.time()
+        try:
+            # SourceManager resolves slide IDs via the database
+            source_manager.get_source(slide_id)
+        except Exception as e:
+            last = job._record('failed', {
+                'slideId': slide_id,
+                'path': slide_id,
+                'error': str(e),
+            })
+        else:
+            last = job._record('warmed', {
+                'slideId': slide_id,
+                'path': slide_id,
+                'time_seconds': round(time.time() - start, 2),
+            })
+        self._done(job, last)
+
+    @staticmethod
+    def _done(job: WarmJob, last: bool) -> None:
+        if last:
+            job._finish('cancelled' if job.cancelled else 'completed')
+
+    def shutdown(self) -> None:
+        """Cancel running jobs and release the worker threads."""
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()
+        self._executor.shutdown(wait=False)
+
+
+# Global warm job manager instance
+_warm_manager: WarmJobManager | None = None
+
+
+def get_warm_manager() -> WarmJobManager:
+    """Get the global warm job manager instance."""
+    global _warm_manager
+    if _warm_manager is None:
+        _warm_manager = WarmJobManager()
+    return _warm_manager
+
+
+def configure_warm_manager(**kwargs) -> WarmJobManager:
+    """Configure and return a new warm job manager instance.
+
+    Args:
+        **kwargs: Arguments passed to WarmJobManager.
+    """
+    global _warm_manager
+    if _warm_manager is not None:
+        _warm_manager.shutdown()
+    _warm_manager = WarmJobManager(**kwargs)
+    return _warm_manager
@@ -4,6 +4,9 @@ import sys
 from pathlib import Path
 from unittest.mock import MagicMock
 
+# The on-disk stores build on large_image's disk cache, which is used as is;
+# it has to be imported before large_image is replaced by a mock below.
+import large_image.cache_util.diskcache  # noqa: F401
 import pytest
 
 # ---------------------------------------------------------------------------
@@ -27,17 +30,55 @@ sys.modules['large_image.exceptions'] = _mock_large_image.exceptions
 def _reset_server_globals():
     """Reset global singletons between tests.
 
-    ServerSettings and SourceManager are cached in module-level globals.
-    Each test should start from a clean state.
+    ServerSettings, SourceManager, TileExecutor, DiskTileCache,
+    DerivedImageStore, StatisticsStore, TilePrefetcher, WarmJobManager,
+    JobEngine, ServerMetrics, and the worklist query cache are held in
+    module-level globals.  Each test should start from a clean
+    state.
     """
     import large_image_server.config as _cfg
+    import large_image_server.db as _db
+    import large_image_server.derived_store as _ds
+    import large_image_server.jobs as _jobs
+    import large_image_server.metrics as _mt
+    import large_image_server.prefetch as _pf
     import large_image_server.source_manager as _sm
+    import large_image_server.stats_store as _ss
+    import large_image_server.tile_cache as _tc
+    import large_image_server.tile_executor as _te
+    import large_image_server.warm as _wm
 
     _cfg._settings = None
     _sm._source_manager = None
+    _ss._stats_store = None
+    _mt._metrics = None
+    _te._tile_executor = None
+    _tc._tile_cache = False
+    _ds._derived_store = False
+    _pf._prefetcher = None
+    _wm._warm_manager = None
+    _jobs._job_engine = None
+    _db.invalidate_worklist_cache()
     yield
     _cfg._settings = None
     _sm._source_manager = None
+    _ss._stats_store = None
+    _mt._metrics = None
+    if _te._tile_executor is not None:
+        _te._tile_executor.shutdown()
+    _te._tile_executor = None
+    _tc._tile_cache = False
+    _ds._derived_store = False
+    if _pf._prefetcher is not None:
+        _pf._prefetcher.shutdown()
+    _pf._prefetcher = None
+    if _wm._warm_manager is not None:
+        _wm._warm_manager.shutdown()
+    _wm._warm_manager = None
+    if _jobs._job_engine is not None:
+        _jobs._job_engine.shutdown()
+    _jobs._job_engine = None
+    _db.invalidate_worklist_cache()
 
 
 @pytest.fixture()
@@ -83,6 +124,7 @@ def tmp_image_dir(tmp_path):
 def app(tmp_image_dir, mock_source):
     """Create a FastAPI test app with dependency overrides."""
     from large_image_server import create_app
+    from large_image_server.prefetch import TilePrefetcher, get_prefetcher
     from large_image_server.source_manager import SourceManager, get_source_manager
 
     application = create_app(image_dir=str(tmp_image_dir))
@@ -99,6 +141,10 @@ def app(tmp_image_dir, mock_source):
     }
 
     application.dependency_overrides[get_source_manager] = lambda: mock_sm
+    # Background prefetch would make source call counts nondeterministic;
+    # tests that exercise it override this again
+    disabled_prefetcher = TilePrefetcher(max_workers=0)
+    application.dependency_overrides[get_prefetcher] = lambda: disabled_prefetcher
     yield application
     application.dependency_overrides.clear()
 
@@ -78,7 +78,7 @@ class TestCasesRoutes:
         from large_image_server import db as _db
 
         _patches = [
-            patch.object(_db, 'list_cases', return_value=[{
+            patch.object(_db, 'list_cases_async', return_value=[{
                 'caseId': 'S26-0001',
                 'patientName': 'MARTINEZ, ELENA R',
                 'patientId': 'PT-2026-0001',
@@ -89,19 +89,19 @@ class TestCasesRoutes:
                 'priority': 'routine',
                 'slideCount': 1,
             }]),
-            patch.object(_db, 'get_case', side_effect=lambda cid: (
+            patch.object(_db, 'get_case_async', side_effect=lambda cid: (
                 self.DB_CASE if cid == 'S26-0001' else None
             )),
-            patch.object(_db, 'get_case_slides', side_effect=lambda cid: (
+            patch.object(_db, 'get_case_slides_async', side_effect=lambda cid: (
                 self.DB_CASE['slides'] if cid == 'S26-0001' else None
             )),
-            patch.object(_db, 'get_slide_with_context', side_effect=lambda sid: (
+            patch.object(_db, 'get_slide_with_context_async', side_effect=lambda sid: (
                 self.DB_SLIDE_CONTEXT if sid == 'S26-0001_A1_S1' else None
             )),
-            patch.object(_db, 'get_slide_by_id', side_effect=lambda sid: (
+            patch.object(_db, 'get_slide_by_id_async', side_effect=lambda sid: (
                 self.DB_SLIDE_ROW if sid == 'S26-0001_A1_S1' else None
             )),
-            patch.object(_db, 'get_worklist_cases', return_value=[{
+            patch.object(_db, 'get_worklist_cases_async', return_value=[{
                 'caseId': 'S26-0001',
                 'patientName': 'MARTINEZ, ELENA R',
                 'patientId': 'PT-2026-0001',
@@ -117,7 +117,7 @@ class TestCasesRoutes:
                     'filename': 'S26-0001_A1_S1.svs',
                 }],
             }]),
-            patch.object(_db, 'search_cases', side_effect=lambda q, limit=20: [
+            patch.object(_db, 'search_cases_async', side_effect=lambda q, limit=20: [
                 c for c in [{
                     'caseId': 'S26-0001',
                     'patientName': 'MARTINEZ, ELENA R',
@@ -45,6 +45,7 @@ def _make_case_row(
     status='pending_review',
     priority='routine',
     slide_count=2,
+    diagnosis='Invasive ductal carcinoma',
 ):
     return {
         'case_id': case_id,
@@ -57,6 +58,7 @@ def _make_case_row(
         'patient_name': 'Thisovau Oquuski',
         'patient_dob': date(1967, 8, 24),
         'patient_sex': 'F',
+        'diagnosis': diagnosis,
         'slide_count': slide_count,
     }
 
@@ -150,19 +152,18 @@ class TestResolveSlidePathStrategy:
         assert result is row
         assert mock_get.call_args_list[1].args[0] == 'S26-0004_A3_S1'
 
-    @patch.object(db, '_fetchone')
+    @patch.object(db, 'find_slide_id_by_path_suffix')
     @patch.object(db, 'get_slide_by_id')
-    def test_relative_path_suffix_fallback(self, mock_get, mock_fetch):
-        """Strategy 3: LIKE match on relative_path suffix."""
+    def test_relative_path_suffix_fallback(self, mock_get, mock_find):
+        """Strategy 3: relative_path suffix match via the path index."""
         row = _make_slide_row()
-        mock_get.return_value = None  # strategies 1 & 2 miss
-        mock_fetch.return_value = row  # strategy 3 hits
+        mock_get.side_effect = [None, None, row]  # strategies 1 & 2 miss
+        mock_find.return_value = 'S26-0001_A1_S1'
 
         result = db.resolve_slide_path('S26-0001/S26-0001_A1_S1.svs')
         assert result is row
-        # _fetchone called with LIKE query
-        call_args = mock_fetch.call_args
-        assert 'LIKE' in call_args.args[0]
+        mock_find.assert_called_once_with('S26-0001/S26-0001_A1_S1.svs')
+        assert mock_get.call_args.args[0] == 'S26-0001_A1_S1'
 
     @patch.object(db, '_fetchone')
     @patch.object(db, 'get_slide_by_id')
@@ -175,18 +176,72 @@ class TestResolveSlidePathStrategy:
         assert result is None
 
 
+class TestPathIndex:
+    """Test the in-process relative_path suffix index."""
+
+    @pytest.fixture(autouse=True)
+    def _reset_index(self):
+        db.invalidate_path_index()
+        yield
+        db.invalidate_path_index()
+
+    @staticmethod
+    def _rows(sql, params=()):
+        if 'wsi_edu' in sql:
+            return [{'slide_id': 'EDU26-00001_A1_S1',
+                     'relative_path': '2026/EDU26-00001/EDU26-00001_A1_S1.svs'}]
+        return [
+            {'slide_id': 'S26-0001_A1_S1', 'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs'},
+            {'slide_id': 'S26-0002_A1_S1', 'relative_path': '2026/S26-0002/S26-0002_A1_S1.svs'},
+        ]
+
+    @patch.object(db, '_get_pool', return_value=MagicMock())
+    @patch.object(db, '_fetchall')
+    def test_suffix_lookup_without_like(self, mock_fetch, mock_pool):
+        mock_fetch.side_effect = self._rows
+        assert db.find_slide_id_by_path_suffix('S26-0002/S26-0002_A1_S1.svs') == 'S26-0002_A1_S1'
+        assert db.find_slide_id_by_path_suffix(
+            'EDU26-00001/EDU26-00001_A1_S1.svs') == 'EDU26-00001_A1_S1'
+        assert all('LIKE' not in c.args[0] for c in mock_fetch.call_args_list)
+        # One query per schema; the second lookup is served from the index
+        assert mock_fetch.call_count == 2
+
+    @patch.object(db, '_get_pool', return_value=MagicMock())
+    @patch.object(db, '_fetchall')
+    def test_miss_reload_is_rate_limited(self, mock_fetch, mock_pool):
+        mock_fetch.side_effect = self._rows
+        assert db.find_slide_id_by_path_suffix('other/unknown.svs') is None
+        assert db.find_slide_id_by_path_suffix('other/unknown.svs') is None
+        assert mock_fetch.call_count == 2
+
+    @patch.object(db, '_get_pool', return_value=MagicMock())
+    @patch.object(db, '_fetchall')
+    def test_invalidate_reloads(self, mock_fetch, mock_pool):
+        mock_fetch.side_effect = self._rows
+        db.find_slide_id_by_path_suffix('S26-0001/S26-0001_A1_S1.svs')
+        db.invalidate_path_index()
+        db.find_slide_id_by_path_suffix('S26-0001/S26-0001_A1_S1.svs')
+        assert mock_fetch.call_count == 4
+
+    def test_inert_without_db(self):
+        assert db.find_slide_id_by_path_suffix('S26-0001/S26-0001_A1_S1.svs') is None
+
+
 # ---------------------------------------------------------------------------
 # list_cases()
 # ---------------------------------------------------------------------------
 
 class TestListCases:
 
-    @patch.object(db, '_get_case_diagnosis', return_value='Invasive ductal carcinoma')
+    @patch.object(db, '_fetchone')
     @patch.object(db, '_fetchall')
-    def test_returns_formatted_cases(self, mock_fetch, mock_diag):
+    def test_returns_formatted_cases(self, mock_fetch, mock_one):
         mock_fetch.return_value = [_make_case_row()]
 
         cases = db.list_cases()
+        # Diagnosis and slide count come from the same query: no per-case lookups
+        assert mock_fetch.call_count == 1
+        mock_one.assert_not_called()
         assert len(cases) == 1
         c = cases[0]
         assert c['caseId'] == 'S26-0001'
@@ -194,18 +249,17 @@ class TestListCases:
         assert c['patientId'] == 'XN-000024'
         assert c['slideCount'] == 2
         assert c['status'] == 'pending_review'
+        assert c['diagnosis'] == 'Invasive ductal carcinoma'
 
-    @patch.object(db, '_get_case_diagnosis', return_value=None)
     @patch.object(db, '_fetchall')
-    def test_status_filter(self, mock_fetch, mock_diag):
+    def test_status_filter(self, mock_fetch):
         mock_fetch.return_value = []
         db.list_cases(status='signed_out')
         sql = mock_fetch.call_args.args[0]
         assert 'c.status = %s' in sql
 
-    @patch.object(db, '_get_case_diagnosis', return_value=None)
     @patch.object(db, '_fetchall')
-    def test_priority_filter(self, mock_fetch, mock_diag):
+    def test_priority_filter(self, mock_fetch):
         mock_fetch.return_value = []
         db.list_cases(priority='stat')
         sql = mock_fetch.call_args.args[0]
@@ -327,30 +381,156 @@ class TestGetSlideWithContext:
 
 class TestGetWorklistCases:
 
+    @staticmethod
+    def _rows():
+        return [
+            [_make_case_row(slide_count=1), _make_case_row(case_id='S26-0002', slide_count=0)],
+            [{
+                'case_id': 'S26-0001',
+                'slide_id': 'S26-0001_A1_S1',
+                'stain': 'H&E',
+                'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs',
+            }],
+        ]
+
     @patch.object(db, '_fetchall')
-    @patch.object(db, 'list_cases')
-    def test_includes_slides(self, mock_list, mock_fetch):
-        mock_list.return_value = [{
-            'caseId': 'S26-0001',
-            'patientName': 'DOE',
-            'patientId': 'PT-001',
-            'accessionDate': '2026-01-15',
-            'diagnosis': 'IDC',
-            'specimenType': 'Breast',
-            'status': 'pending_review',
-            'priority': 'routine',
-            'slideCount': 1,
-        }]
-        mock_fetch.return_value = [{
-            'slide_id': 'S26-0001_A1_S1',
-            'stain': 'H&E',
-            'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs',
-        }]
+    def test_includes_slides(self, mock_fetch):
+        mock_fetch.side_effect = self._rows()
 
         worklist = db.get_worklist_cases()
-        assert len(worklist) == 1
+        assert len(worklist) == 2
         assert worklist[0]['slides'][0]['slideId'] == 'S26-0001_A1_S1'
         assert worklist[0]['slides'][0]['filename'] == 'S26-0001_A1_S1.svs'
+        assert worklist[1]['slides'] == []
+        # One query for the cases and one for all of their slides
+        assert mock_fetch.call_count == 2
+        assert mock_fetch.call_args.args[1] == (['S26-0001', 'S26-0002'],)
+
+    @patch.object(db, '_fetchall')
+    def test_cached_until_invalidated(self, mock_fetch):
+        mock_fetch.side_effect = self._rows() + self._rows()
+
+        first = db.get_worklist_cases()
+        assert db.get_worklist_cases() is first
+        assert mock_fetch.call_count == 2
+        db.get_worklist_cases(status='signed_out')
+        assert mock_fetch.call_count == 4
+
+        db.invalidate_worklist_cache()
+        mock_fetch.side_effect = self._rows()
+        db.get_worklist_cases()
+        assert mock_fetch.call_count == 6
+
+    @patch.object(db, '_fetchall')
+    def test_cache_disabled(self, mock_fetch):
+        from large_image_server.config import configure_settings
+        configure_settings(image_dir='/tmp', worklist_cache_ttl=0)
+        mock_fetch.side_effect = self._rows() + self._rows()
+        db.get_worklist_cases()
+        db.get_worklist_cases()
+        assert mock_fetch.call_count == 4
+
+
+class TestGetSlidesForCases:
+
+    @patch.object(db, '_fetchall')
+    def test_groups_by_case(self, mock_fetch):
+        mock_fetch.return_value = [
+            {'case_id': 'C1', 'slide_id': 'S1', 'stain': 'H&E', 'relative_path': 'a/S1.svs'},
+            {'case_id': 'C1', 'slide_id': 'S2', 'stain': None, 'relative_path': None},
+        ]
+        slides = db.get_slides_for_cases(['C1', 'C2'])
+        assert [s['slideId'] for s in slides['C1']] == ['S1', 'S2']
+        assert slides['C1'][1]['filename'] == ''
+        assert slides['C2'] == []
+        assert 'ANY(%s)' in mock_fetch.call_args.args[0]
+
+    @patch.object(db, '_fetchall')
+    def test_no_cases_no_query(self, mock_fetch):
+        assert db.get_slides_for_cases([]) == {}
+        mock_fetch.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Async query layer and pool metrics
+# ---------------------------------------------------------------------------
+
+class TestAsyncQueries:
+
+    def test_async_matches_sync(self):
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        rows = [_make_case_row()]
+        with patch.object(db, '_fetchall', return_value=rows):
+            sync_result = db.list_cases(status='pending_review')
+        with patch.object(db, '_afetchall', AsyncMock(return_value=rows)) as mock_all:
+            async_result = asyncio.run(db.list_cases_async(status='pending_review'))
+        assert async_result == sync_result
+        assert mock_all.call_args.kwargs['prepare'] is True
+
+    def test_async_inert_without_db(self):
+        import asyncio
+        from large_image_server.config import configure_settings
+        configure_settings(image_dir='/tmp')
+        assert asyncio.run(db.get_case_async('S26-0001')) is None
+        assert asyncio.run(db.list_cases_async()) == []
+
+    @patch.object(db, '_fetchone')
+    def test_hot_queries_prepared(self, mock_one):
+        mock_one.return_value = _make_slide_row()
+        db.get_slide_by_id('S26-0001_A1_S1')
+        assert mock_one.call_args.kwargs['prepare'] is True
+
+    def test_prepare_can_be_disabled(self):
+        from large_image_server.config import configure_settings
+        configure_settings(storage_db_prepare=False)
+        assert db._prepare(True) is False
+        assert db._prepare(False) is None
+
+    def test_pool_stats_unconfigured(self):
+        from large_image_server.config import configure_settings
+        configure_settings(image_dir='/tmp')
+        assert db.pool_stats() == {'configured': False}
+
+    def test_wait_gauge(self):
+        gauge = db._WaitGauge()
+        gauge.record(0.5)
+        gauge.record(0.1)
+        gauge.record(None)
+        stats = gauge.stats()
+        assert stats['checkouts'] == 2
+        assert stats['errors'] == 1
+        assert stats['wait_seconds']['max'] == 0.5
+        assert stats['wait_seconds']['avg'] == pytest.approx(0.3)
+
+
+# ---------------------------------------------------------------------------
+# list_case_slide_files()
+# ---------------------------------------------------------------------------
+
+class TestListCaseSlideFiles:
+
+    @patch.object(db, '_fetchall')
+    def test_all_cases_in_one_query(self, mock_fetch):
+        mock_fetch.return_value = [
+            {'slide_id': 'S26-0001_A1_S1', 'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs',
+             'case_id': 'S26-0001'},
+        ]
+
+        result = db.list_case_slide_files()
+        assert result[0]['slide_id'] == 'S26-0001_A1_S1'
+        assert mock_fetch.call_count == 1
+        assert mock_fetch.call_args.args[1] == ()
+
+    @patch.object(db, '_fetchall')
+    def test_case_filter(self, mock_fetch):
+        mock_fetch.return_value = []
+
+        db.list_case_slide_files('S26-0001')
+        sql = mock_fetch.call_args.args[0]
+        assert 'c.case_id = %s' in sql
+        assert mock_fetch.call_args.args[1] == ('S26-0001',)
 
 
 # ---------------------------------------------------------------------------
@@ -407,7 +587,15 @@ class TestListSlidesForVerification:
         db.list_slides_for_verification(stale_hours=24)
         sql = mock_fetch.call_args.args[0]
         assert 'make_interval' in sql
-        assert mock_fetch.call_args.args[1] == (24,)
+        assert mock_fetch.call_args.args[1] == (24, None, None)
+
+    @patch.object(db, '_fetchall')
+    def test_resumes_after_checkpoint(self, mock_fetch):
+        mock_fetch.return_value = []
+
+        db.list_slides_for_verification(after='S26-0001_A1_S1')
+        assert 's.slide_id > %s' in mock_fetch.call_args.args[0]
+        assert mock_fetch.call_args.args[1] == ('S26-0001_A1_S1', 'S26-0001_A1_S1')
 
     def test_returns_empty_without_pool(self):
         from large_image_server.config import configure_settings
@@ -445,6 +633,45 @@ class TestUpdateSlideHmac:
         assert db.update_slide_hmac('X', 'a' * 64) is False
 
 
+# ---------------------------------------------------------------------------
+# Chunked HMAC manifests
+# ---------------------------------------------------------------------------
+
+class TestSlideHmacManifests:
+
+    @patch.object(db, '_ready_tables', {'wsi.slide_hmac_manifests'})
+    @patch.object(db, '_get_pool')
+    def test_save_keeps_existing(self, mock_pool):
+        mock_conn = MagicMock()
+        mock_cur = MagicMock()
+        mock_cur.rowcount = 0
+        mock_conn.__enter__ = lambda s: mock_conn
+        mock_conn.__exit__ = MagicMock(return_value=False)
+        mock_cur.__enter__ = lambda s: mock_cur
+        mock_cur.__exit__ = MagicMock(return_value=False)
+        mock_conn.cursor.return_value = mock_cur
+        mock_pool.return_value.connection.return_value = mock_conn
+
+        assert db.save_slide_hmac_manifest('S1', {'root': 'a'}, replace=False) is False
+        sql, params = mock_cur.execute.call_args.args
+        assert 'DO NOTHING' in sql
+        assert params == ('S1', '{"root": "a"}')
+
+    @patch.object(db, '_ready_tables', {'wsi.slide_hmac_manifests'})
+    @patch.object(db, '_fetchall')
+    def test_spot_check_listing(self, mock_fetch):
+        mock_fetch.return_value = []
+        db.list_slides_for_spot_check(after='S1')
+        assert 'JOIN wsi.slide_hmac_manifests' in mock_fetch.call_args.args[0]
+        assert mock_fetch.call_args.args[1] == ('S1', 'S1')
+
+    def test_without_pool(self):
+        from large_image_server.config import configure_settings
+        configure_settings(image_dir='/tmp')
+        assert db.get_slide_hmac_manifest('S1') is None
+        assert db.list_slides_for_spot_check() == []
+
+
 # ---------------------------------------------------------------------------
 # list_slides_missing_metadata()
 # ---------------------------------------------------------------------------
@@ -0,0 +1,135 @@
+"""Tests for stored thumbnails, labels and macros (large_image_server.derived_store)."""
+
+from unittest.mock import patch
+
+import pytest
+
+from large_image_server.derived_store import DerivedImageStore, configure_derived_store
+
+JPEG = b'\xff\xd8\xff' + b'\x00' * 50
+
+
+class TestDerivedImageStore:
+
+    def test_key_covers_kind_and_size(self):
+        base = DerivedImageStore.make_key('16:1', 'thumbnail', 256, 256)
+        assert DerivedImageStore.make_key('16:2', 'thumbnail', 256, 256) != base
+        assert DerivedImageStore.make_key('16:1', 'label') != base
+        assert DerivedImageStore.make_key('16:1', 'thumbnail', 512, 512) != base
+
+    def test_roundtrip_is_plain_image_file(self, tmp_path):
+        store = DerivedImageStore(tmp_path / 'derived', max_bytes=1 << 20)
+        key = DerivedImageStore.make_key('16:1', 'label')
+        assert store.get(key) is None
+        path = store.put(key, b'png-bytes', 'image/png', generated=True)
+        assert path.read_bytes() == b'png-bytes'
+        assert store.get(key) == (path, 'image/png', True)
+        assert store.stats()['hits'] == 1
+        assert store.stats()['misses'] == 1
+
+    def test_missing_marker(self, tmp_path):
+        store = DerivedImageStore(tmp_path / 'derived', max_bytes=1 << 20)
+        key = DerivedImageStore.make_key('16:1', 'macro')
+        store.put_missing(key)
+        path, media_type, generated = store.get(key)
+        assert media_type is None
+        assert path.stat().st_size == 0
+        assert store.stats()['estimated_bytes'] == 0
+        assert len(store._files.entries()) == 1
+
+    def test_unknown_media_type_not_stored(self, tmp_path):
+        store = DerivedImageStore(tmp_path / 'derived', max_bytes=1 << 20)
+        assert store.put('ab' * 32, b'data', 'image/tiff') is None
+
+    def test_byte_budget_evicts(self, tmp_path):
+        store = DerivedImageStore(tmp_path / 'derived', max_bytes=250, low_water=0.5)
+        for i in range(3):
+            store.put(DerivedImageStore.make_key('16:1', 'thumbnail', i, i), b'x' * 100,
+                      'image/jpeg')
+        store._files.evict()
+        assert store.stats()['estimated_bytes'] <= 125
+
+
+class TestDerivedImageRoutes:
+
+    @pytest.fixture()
+    def stored_client(self, app, tmp_path):
+        from fastapi.testclient import TestClient
+
+        configure_derived_store(tmp_path / 'derived', max_bytes=1 << 20)
+        with patch('large_image_server.db.get_slide_by_id_async',
+                   return_value={'slide_id': 'test-slide.svs'}):
+            yield TestClient(app)
+
+    @staticmethod
+    def _source_manager(app):
+        from large_image_server.source_manager import get_source_manager
+
+        return app.dependency_overrides[get_source_manager]()
+
+    def test_thumbnail_served_from_store(self, stored_client, app, mock_source):
+        mock_source.getAssociatedImagesList.return_value = []
+        mock_source.getThumbnail.return_value = (JPEG, 'image/jpeg')
+        first = stored_client.get('/slides/test-slide.svs/thumbnail')
+        assert first.status_code == 200
+        assert first.headers['X-Generated'] == 'true'
+
+        second = stored_client.get('/slides/test-slide.svs/thumbnail')
+        assert second.content == JPEG
+        assert second.headers['content-type'] == 'image/jpeg'
+        assert second.headers['X-Generated'] == 'true'
+        assert mock_source.getThumbnail.call_count == 1
+        assert self._source_manager(app).get_source.call_count == 1
+
+        stored_client.get('/slides/test-slide.svs/thumbnail?width=512&height=512')
+        assert mock_source.getThumbnail.call_count == 2
+
+    def test_generated_label_stored(self, stored_client, app, mock_source):
+        mock_source.getAssociatedImagesList.return_value = []
+        with patch('large_image_server.routes.cases._generate_label_image',
+                   return_value=b'\x89PNG label') as generate:
+            for _ in range(2):
+                response = stored_client.get('/slides/test-slide.svs/label')
+                assert response.content == b'\x89PNG label'
+                assert response.headers['content-type'] == 'image/png'
+        assert generate.call_count == 1
+
+    def test_missing_macro(self, stored_client, app, mock_source):
+        mock_source.getAssociatedImagesList.return_value = []
+        for _ in range(2):
+            assert stored_client.get('/slides/test-slide.svs/macro').status_code == 404
+        # The absence is stored, so the source is only opened once
+        assert self._source_manager(app).get_source.call_count == 1
+
+    def test_embedded_macro(self, stored_client, mock_source):
+        response = stored_client.get('/slides/test-slide.svs/macro')
+        assert response.status_code == 200
+        assert response.content == JPEG
+        assert 'X-Generated' not in response.headers
+        stored_client.get('/slides/test-slide.svs/macro')
+        assert mock_source.getAssociatedImage.call_count == 1
+
+    def test_populate_after_ingest(self, app, mock_source, tmp_path):
+        from large_image_server.routes.cases import populate_derived_images
+
+        store = configure_derived_store(tmp_path / 'derived', max_bytes=1 << 20)
+        populate_derived_images(self._source_manager(app), 'test-slide.svs')
+        assert store.stats()['writes'] == 3
+        assert store.stats()['misses'] == 3
+        mock_source.getAssociatedImage.assert_any_call('thumbnail')
+
+    def test_populate_skips_known_missing(self, app, mock_source, tmp_path):
+        from large_image_server.routes.cases import populate_derived_images
+
+        mock_source.getAssociatedImagesList.return_value = ['thumbnail', 'label']
+        store = configure_derived_store(tmp_path / 'derived', max_bytes=1 << 20)
+        source_manager = self._source_manager(app)
+        populate_derived_images(source_manager, 'test-slide.svs')
+        opened = source_manager.get_source.call_count
+        populate_derived_images(source_manager, 'test-slide.svs')
+        assert source_manager.get_source.call_count == opened
+        assert store.stats()['hits'] == 3
+
+    def test_cache_info_reports_store(self, stored_client):
+        info = stored_client.get('/cache').json()
+        assert info['derived_image_store']['max_bytes'] == 1 << 20
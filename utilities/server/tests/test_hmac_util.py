@@ -2,8 +2,18 @@
 
 import hashlib
 import hmac
+import json
+import random
 
-from large_image_server.hmac_util import compute_file_hmac, verify_file_hmac
+from large_image_server.hmac_util import (
+    ChunkedHmac,
+    HmacFileWriter,
+    compute_chunked_hmac,
+    compute_file_hmac,
+    compute_file_hmac_and_manifest,
+    verify_chunked_hmac,
+    verify_file_hmac,
+)
 
 
 class TestComputeFileHmac:
@@ -41,6 +51,19 @@ class TestComputeFileHmac:
         result = compute_file_hmac(f, key)
         assert result == expected
 
+    def test_throttled(self, tmp_path):
+        """A read rate limit slows hashing without changing the digest."""
+        import time
+
+        f = tmp_path / 'throttled.bin'
+        content = b'\xcd' * 131072
+        f.write_bytes(content)
+
+        expected = hmac.new(b'key', content, hashlib.sha256).hexdigest()
+        start = time.monotonic()
+        assert compute_file_hmac(f, 'key', max_bytes_per_second=524288) == expected
+        assert time.monotonic() - start >= 0.2
+
 
 class TestVerifyFileHmac:
 
@@ -70,3 +93,95 @@ class TestVerifyFileHmac:
 
         hmac_with_key1 = compute_file_hmac(f, 'key1')
         assert verify_file_hmac(f, 'key2', hmac_with_key1) is False
+
+
+class TestHmacFileWriter:
+
+    def test_matches_compute_file_hmac(self, tmp_path):
+        """Writing in chunks produces the same digest as hashing the file."""
+        f = tmp_path / 'written.bin'
+        writer = HmacFileWriter(f, 'key', sync_bytes=1000)
+        for i in range(5):
+            writer.write(bytes([i]) * 700)
+        digest = writer.close()
+
+        assert writer.size == 3500
+        assert f.read_bytes() == b''.join(bytes([i]) * 700 for i in range(5))
+        assert digest == compute_file_hmac(f, 'key')
+
+    def test_manifest(self, tmp_path):
+        f = tmp_path / 'written.bin'
+        writer = HmacFileWriter(f, 'key', chunk_size=1024)
+        writer.write(b'x' * 3000)
+        writer.close()
+        assert writer.manifest == compute_chunked_hmac(f, 'key', chunk_size=1024)
+
+
+class TestChunkedHmac:
+
+    @staticmethod
+    def _slide(tmp_path, size=10000):
+        f = tmp_path / 'slide.bin'
+        f.write_bytes(bytes(i % 251 for i in range(size)))
+        return f
+
+    def test_sequential_matches_parallel(self, tmp_path):
+        f = self._slide(tmp_path)
+        chunked = ChunkedHmac('key', chunk_size=1024)
+        data = f.read_bytes()
+        for start in range(0, len(data), 777):
+            chunked.update(data[start:start + 777])
+        manifest = compute_chunked_hmac(f, 'key', chunk_size=1024, workers=3)
+        assert chunked.manifest() == manifest
+        assert manifest['size'] == 10000
+        assert len(manifest['chunks']) == 10
+        first = hmac.new(b'key', (0).to_bytes(8, 'big') + data[:1024], hashlib.sha256)
+        assert manifest['chunks'][0] == first.hexdigest()
+
+    def test_single_pass_with_linear_hmac(self, tmp_path):
+        f = self._slide(tmp_path)
+        hmac_hex, manifest = compute_file_hmac_and_manifest(f, 'key', 1024)
+        assert hmac_hex == compute_file_hmac(f, 'key')
+        assert manifest == compute_chunked_hmac(f, 'key', chunk_size=1024)
+
+    def test_empty_file(self, tmp_path):
+        f = tmp_path / 'empty.bin'
+        f.write_bytes(b'')
+        manifest = compute_chunked_hmac(f, 'key', chunk_size=1024)
+        assert manifest['chunks'] == []
+        assert verify_chunked_hmac(f, 'key', manifest)['ok'] is True
+
+    def test_verify_detects_tampering(self, tmp_path):
+        f = self._slide(tmp_path)
+        manifest = compute_chunked_hmac(f, 'key', chunk_size=1024)
+        assert verify_chunked_hmac(f, 'key', manifest)['ok'] is True
+
+        data = bytearray(f.read_bytes())
+        data[5000] ^= 0xFF
+        f.write_bytes(bytes(data))
+        result = verify_chunked_hmac(f, 'key', manifest)
+        assert result['ok'] is False
+        assert result['mismatched'] == [4]
+
+    def test_spot_check_samples_chunks(self, tmp_path):
+        f = self._slide(tmp_path)
+        manifest = compute_chunked_hmac(f, 'key', chunk_size=1024)
+        result = verify_chunked_hmac(f, 'key', manifest, sample=3, rng=random.Random(1))
+        assert result['ok'] is True
+        assert len(result['checked']) == 3
+        assert result['checked'] == sorted(result['checked'])
+
+    def test_truncation_and_forged_manifest(self, tmp_path):
+        f = self._slide(tmp_path)
+        manifest = compute_chunked_hmac(f, 'key', chunk_size=1024)
+        forged = json.loads(json.dumps(manifest))
+        forged['chunks'][0] = 'ab' * 32
+        result = verify_chunked_hmac(f, 'key', forged)
+        assert result['rootValid'] is False
+        assert result['checked'] == []
+        assert verify_chunked_hmac(f, 'other', manifest)['rootValid'] is False
+
+        f.write_bytes(f.read_bytes()[:9000])
+        result = verify_chunked_hmac(f, 'key', manifest, sample=1)
+        assert result['ok'] is False
+        assert result['sizeValid'] is False
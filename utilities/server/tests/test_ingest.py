@@ -6,12 +6,15 @@ filesystem for slide storage.
 
 import hashlib
 import hmac as hmac_mod
+import time
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
 
+from large_image_server.config import get_settings
+from large_image_server.hmac_util import compute_chunked_hmac
 from large_image_server.routes.ingest import (
     _derive_slide_id,
     _extract_format,
@@ -93,9 +96,38 @@ def ingest_app(clinical_root):
 
 @pytest.fixture()
 def ingest_client(ingest_app):
+    from large_image_server.jobs import configure_job_engine
+
+    # Run job file work on threads so that patches apply
+    configure_job_engine(max_workers=2, processes=False)
     return TestClient(ingest_app)
 
 
+@pytest.fixture()
+def job_db():
+    """Mock the database as seen by both the admin routes and the job engine."""
+    mock_db = MagicMock()
+    mock_db.is_configured.return_value = True
+    with patch('large_image_server.routes.ingest.db', mock_db), \
+            patch('large_image_server.jobs.db', mock_db):
+        yield mock_db
+
+
+def _run_job(client, url: str) -> dict:
+    """Start an admin job and wait for it to finish."""
+    response = client.post(url)
+    assert response.status_code == 202
+    job_id = response.json()['job_id']
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        body = client.get(f'/admin/ingest/jobs/{job_id}').json()
+        if body['state'] not in ('queued', 'running'):
+            break
+        time.sleep(0.01)
+    assert body['state'] == 'completed'
+    return body
+
+
 def _make_slide_file(content: bytes = b'\x00' * 256) -> tuple[str, bytes]:
     """Return (filename, content) for a fake slide upload."""
     return 'S26-0001_A1_S1.svs', content
@@ -164,9 +196,36 @@ class TestIngestClinicalSlide:
         assert written.exists()
         assert written.read_bytes() == content
 
-        # Verify HMAC was passed to DB
-        call_kwargs = mock_db.ingest_slide_transactional.call_args
-        assert call_kwargs.kwargs['hmac_hex'] or call_kwargs[1].get('hmac_hex')
+        # HMAC and size were computed while the upload was written
+        call_kwargs = mock_db.ingest_slide_transactional.call_args.kwargs
+        expected = hmac_mod.new(b'test-secret-key', content, hashlib.sha256).hexdigest()
+        assert call_kwargs['hmac_hex'] == expected
+        assert call_kwargs['size_bytes'] == len(content)
+        assert not (written.parent / 'S26-0001_A1_S1.svs.tmp').exists()
+
+        # Cached path resolutions for the slide were dropped
+        mock_db.invalidate_path_index.assert_called_once()
+        mock_db.save_slide_hmac_manifest.assert_not_called()
+
+    @patch('large_image_server.routes.ingest._extract_metadata', return_value={})
+    @patch('large_image_server.routes.ingest.db')
+    def test_records_chunked_manifest(self, mock_db, mock_meta, ingest_client, clinical_root):
+        """With hmac_chunk_size set, the manifest is built while writing and stored."""
+        get_settings().hmac_chunk_size = 65536
+        mock_db.get_slide_by_id.return_value = None
+        mock_db.ingest_slide_transactional.return_value = _slide_row_result()
+
+        filename, content = _make_slide_file()
+        response = ingest_client.post(
+            '/admin/ingest/clinical',
+            files={'file': (filename, content)},
+            data={'case_id': 'S26-0001', 'part_label': 'A', 'block_label': '1'},
+        )
+
+        assert response.status_code == 201
+        written = clinical_root / '2026' / 'S26-0001' / 'S26-0001_A1_S1.svs'
+        mock_db.save_slide_hmac_manifest.assert_called_once_with(
+            'S26-0001_A1_S1', compute_chunked_hmac(written, 'test-secret-key', 65536))
 
     @patch('large_image_server.routes.ingest.db')
     def test_duplicate_slide_rejected(self, mock_db, ingest_client):
@@ -481,6 +540,51 @@ class TestVerifySlide:
         response = ingest_client.get('/admin/ingest/verify/NONEXISTENT')
         assert response.status_code == 404
 
+    @patch('large_image_server.routes.ingest.db')
+    def test_verify_spot_check(self, mock_db, ingest_client, clinical_root):
+        """With sample, chunks are checked against the stored manifest."""
+        slide_file = clinical_root / 'S26-0001_A1_S1.svs'
+        slide_file.write_bytes(b'test slide content' * 1000)
+        manifest = compute_chunked_hmac(slide_file, 'test-secret-key', chunk_size=1024)
+        mock_db.get_slide_hmac.return_value = {
+            'slide_id': 'S26-0001_A1_S1',
+            'relative_path': 'S26-0001_A1_S1.svs',
+            'hmac': 'a' * 64,
+        }
+        mock_db.get_slide_hmac_manifest.return_value = manifest
+
+        body = ingest_client.get('/admin/ingest/verify/S26-0001_A1_S1?sample=4').json()
+        assert body['verified'] is True
+        assert body['chunksChecked'] == 4
+        assert body['chunksTotal'] == 18
+        mock_db.update_slide_verified.assert_not_called()
+
+        mock_db.get_slide_hmac_manifest.return_value = None
+        response = ingest_client.get('/admin/ingest/verify/S26-0001_A1_S1?sample=4')
+        assert response.status_code == 404
+
+
+# ---------------------------------------------------------------------------
+# POST /admin/ingest/spot-check tests
+# ---------------------------------------------------------------------------
+
+class TestSpotCheck:
+
+    def test_spot_check_job(self, job_db, ingest_client, clinical_root):
+        slide_file = clinical_root / 'S26-0001_A1_S1.svs'
+        slide_file.write_bytes(b'content' * 1000)
+        job_db.list_slides_for_spot_check.return_value = [{
+            'slide_id': 'S26-0001_A1_S1',
+            'relative_path': 'S26-0001_A1_S1.svs',
+            'manifest': compute_chunked_hmac(slide_file, 'test-secret-key', chunk_size=1024),
+        }]
+
+        body = _run_job(ingest_client, '/admin/ingest/spot-check?sample=2')
+
+        assert body['kind'] == 'spot-check'
+        assert body['params']['sample'] == 2
+        assert body['summary'] == {'verified': 1, 'failed': 0, 'missing': 0}
+
 
 # ---------------------------------------------------------------------------
 # POST /admin/ingest/backfill-hmac tests
@@ -488,9 +592,8 @@ class TestVerifySlide:
 
 class TestBackfillHmac:
 
-    @patch('large_image_server.routes.ingest.compute_file_hmac')
-    @patch('large_image_server.routes.ingest.db')
-    def test_backfill_happy_path(self, mock_db, mock_compute, ingest_client, clinical_root):
+    @patch('large_image_server.jobs.compute_file_hmac')
+    def test_backfill_happy_path(self, mock_compute, job_db, ingest_client, clinical_root):
         """Slides with NULL hmac get computed and stored."""
         # Create slide files on disk
         for name in ('S26-0001_A1_S1.svs', 'S26-0001_A2_S1.svs'):
@@ -498,39 +601,33 @@ class TestBackfillHmac:
             d.mkdir(parents=True, exist_ok=True)
             (d / name).write_bytes(b'\x00' * 64)
 
-        mock_db.is_configured.return_value = True
-        mock_db.list_slides_missing_hmac.return_value = [
+        job_db.list_slides_missing_hmac.return_value = [
             {'slide_id': 'S26-0001_A1_S1', 'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs'},
             {'slide_id': 'S26-0001_A2_S1', 'relative_path': '2026/S26-0001/S26-0001_A2_S1.svs'},
         ]
         mock_compute.return_value = 'b' * 64
-        mock_db.update_slide_hmac.return_value = True
+        job_db.update_slide_hmac.return_value = True
 
-        response = ingest_client.post('/admin/ingest/backfill-hmac')
+        body = _run_job(ingest_client, '/admin/ingest/backfill-hmac')
 
-        assert response.status_code == 200
-        body = response.json()
-        assert body['processed'] == 2
-        assert body['skipped'] == []
-        assert body['errors'] == []
-        assert mock_db.update_slide_hmac.call_count == 2
+        assert body['summary'] == {'processed': 2, 'skipped': 0, 'errors': 0}
+        assert body['results'] == {'skipped': [], 'errors': []}
+        assert job_db.update_slide_hmac.call_count == 2
+        assert body['checkpoint'] == 'S26-0001_A2_S1'
 
-    @patch('large_image_server.routes.ingest.db')
-    def test_backfill_skips_missing_files(self, mock_db, ingest_client, clinical_root):
+    def test_backfill_skips_missing_files(self, job_db, ingest_client, clinical_root):
         """Slide in DB but file not on disk -> skipped."""
-        mock_db.is_configured.return_value = True
-        mock_db.list_slides_missing_hmac.return_value = [
+        job_db.list_slides_missing_hmac.return_value = [
             {'slide_id': 'S26-0001_A1_S1', 'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs'},
         ]
 
-        response = ingest_client.post('/admin/ingest/backfill-hmac')
+        body = _run_job(ingest_client, '/admin/ingest/backfill-hmac')
 
-        assert response.status_code == 200
-        body = response.json()
-        assert body['processed'] == 0
-        assert len(body['skipped']) == 1
-        assert body['skipped'][0]['slideId'] == 'S26-0001_A1_S1'
-        assert body['skipped'][0]['reason'] == 'file not found'
+        assert body['summary']['processed'] == 0
+        skipped = body['results']['skipped']
+        assert len(skipped) == 1
+        assert skipped[0]['slideId'] == 'S26-0001_A1_S1'
+        assert skipped[0]['reason'] == 'file not found'
 
     def test_backfill_db_not_configured(self, clinical_root):
         """No --db-url -> 503."""
@@ -554,9 +651,8 @@ class TestBackfillHmac:
 
 class TestVerifyAll:
 
-    @patch('large_image_server.routes.ingest.compute_file_hmac')
-    @patch('large_image_server.routes.ingest.db')
-    def test_verify_all_happy_path(self, mock_db, mock_compute, ingest_client, clinical_root):
+    @patch('large_image_server.jobs.compute_file_hmac')
+    def test_verify_all_happy_path(self, mock_compute, job_db, ingest_client, clinical_root):
         """All slides pass verification."""
         stored_hmac = 'c' * 64
         slide_dir = clinical_root / '2026' / 'S26-0001'
@@ -564,8 +660,7 @@ class TestVerifyAll:
         (slide_dir / 'S26-0001_A1_S1.svs').write_bytes(b'content1')
         (slide_dir / 'S26-0001_A2_S1.svs').write_bytes(b'content2')
 
-        mock_db.is_configured.return_value = True
-        mock_db.list_slides_for_verification.return_value = [
+        job_db.list_slides_for_verification.return_value = [
             {
                 'slide_id': 'S26-0001_A1_S1',
                 'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs',
@@ -580,28 +675,24 @@ class TestVerifyAll:
             },
         ]
         mock_compute.return_value = stored_hmac
-        mock_db.update_slide_verified.return_value = True
+        job_db.update_slide_verified.return_value = True
 
-        response = ingest_client.post('/admin/ingest/verify-all')
+        body = _run_job(ingest_client, '/admin/ingest/verify-all?stale_hours=24')
 
-        assert response.status_code == 200
-        body = response.json()
-        assert body['summary']['verified'] == 2
-        assert body['summary']['failed'] == 0
-        assert body['summary']['missing'] == 0
-        assert body['failures'] == []
-        assert body['missing'] == []
+        assert body['summary'] == {'verified': 2, 'failed': 0, 'missing': 0}
+        assert body['total'] == 2
+        assert body['results'] == {'failures': [], 'missing': []}
+        assert job_db.list_slides_for_verification.call_args.kwargs == {
+            'stale_hours': 24, 'after': None}
 
-    @patch('large_image_server.routes.ingest.compute_file_hmac')
-    @patch('large_image_server.routes.ingest.db')
-    def test_verify_all_detects_mismatch(self, mock_db, mock_compute, ingest_client, clinical_root):
+    @patch('large_image_server.jobs.compute_file_hmac')
+    def test_verify_all_detects_mismatch(self, mock_compute, job_db, ingest_client, clinical_root):
         """Tampered file is reported in failures."""
         slide_dir = clinical_root / '2026' / 'S26-0001'
         slide_dir.mkdir(parents=True, exist_ok=True)
         (slide_dir / 'S26-0001_A1_S1.svs').write_bytes(b'tampered content')
 
-        mock_db.is_configured.return_value = True
-        mock_db.list_slides_for_verification.return_value = [
+        job_db.list_slides_for_verification.return_value = [
             {
                 'slide_id': 'S26-0001_A1_S1',
                 'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs',
@@ -611,22 +702,20 @@ class TestVerifyAll:
         ]
         mock_compute.return_value = 'b' * 64  # different from stored
 
-        response = ingest_client.post('/admin/ingest/verify-all')
+        body = _run_job(ingest_client, '/admin/ingest/verify-all')
 
-        assert response.status_code == 200
-        body = response.json()
         assert body['summary']['verified'] == 0
         assert body['summary']['failed'] == 1
-        assert len(body['failures']) == 1
-        assert body['failures'][0]['slideId'] == 'S26-0001_A1_S1'
-        assert body['failures'][0]['expected'] == 'a' * 64
-        assert body['failures'][0]['actual'] == 'b' * 64
-
-    @patch('large_image_server.routes.ingest.db')
-    def test_verify_all_handles_missing_file(self, mock_db, ingest_client, clinical_root):
+        failures = body['results']['failures']
+        assert len(failures) == 1
+        assert failures[0]['slideId'] == 'S26-0001_A1_S1'
+        assert failures[0]['expected'] == 'a' * 64
+        assert failures[0]['actual'] == 'b' * 64
+        assert failures[0]['sizeBytes'] == len(b'tampered content')
+
+    def test_verify_all_handles_missing_file(self, job_db, ingest_client, clinical_root):
         """Missing file on disk is reported in missing list."""
-        mock_db.is_configured.return_value = True
-        mock_db.list_slides_for_verification.return_value = [
+        job_db.list_slides_for_verification.return_value = [
             {
                 'slide_id': 'S26-0001_A1_S1',
                 'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs',
@@ -635,14 +724,26 @@ class TestVerifyAll:
             },
         ]
 
-        response = ingest_client.post('/admin/ingest/verify-all')
+        body = _run_job(ingest_client, '/admin/ingest/verify-all')
 
-        assert response.status_code == 200
-        body = response.json()
         assert body['summary']['missing'] == 1
         assert body['summary']['verified'] == 0
-        assert len(body['missing']) == 1
-        assert body['missing'][0]['slideId'] == 'S26-0001_A1_S1'
+        assert len(body['results']['missing']) == 1
+        assert body['results']['missing'][0]['slideId'] == 'S26-0001_A1_S1'
+
+    def test_verify_all_hmac_key_not_configured(self, clinical_root):
+        """No HMAC key -> 503 before any job starts."""
+        from large_image_server import create_app
+
+        app = create_app(
+            image_dir=str(clinical_root),
+            storage_clinical_root=clinical_root,
+        )
+        with patch('large_image_server.routes.ingest.db') as mock_db:
+            mock_db.is_configured.return_value = True
+            response = TestClient(app).post('/admin/ingest/verify-all')
+        assert response.status_code == 503
+        assert 'HMAC key not configured' in response.json()['detail']
 
 
 # ---------------------------------------------------------------------------
@@ -652,16 +753,14 @@ class TestVerifyAll:
 class TestBackfillMetadata:
 
     @patch('large_image_server.routes.ingest._extract_metadata')
-    @patch('large_image_server.routes.ingest.db')
-    def test_backfill_metadata_happy_path(self, mock_db, mock_meta, ingest_client, clinical_root):
+    def test_backfill_metadata_happy_path(self, mock_meta, job_db, ingest_client, clinical_root):
         """Slides with NULL metadata get populated from files."""
         slide_dir = clinical_root / '2026' / 'S26-0001'
         slide_dir.mkdir(parents=True, exist_ok=True)
         (slide_dir / 'S26-0001_A1_S1.svs').write_bytes(b'\x00' * 64)
         (slide_dir / 'S26-0001_A1_S2.svs').write_bytes(b'\x00' * 64)
 
-        mock_db.is_configured.return_value = True
-        mock_db.list_slides_missing_metadata.return_value = [
+        job_db.list_slides_missing_metadata.return_value = [
             {'slide_id': 'S26-0001_A1_S1', 'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs'},
             {'slide_id': 'S26-0001_A1_S2', 'relative_path': '2026/S26-0001/S26-0001_A1_S2.svs'},
         ]
@@ -673,56 +772,46 @@ class TestBackfillMetadata:
             'mpp_y': 0.25,
             'scanner': None,
         }
-        mock_db.update_slide_metadata.return_value = True
+        job_db.update_slide_metadata.return_value = True
 
-        response = ingest_client.post('/admin/ingest/backfill-metadata')
+        body = _run_job(ingest_client, '/admin/ingest/backfill-metadata')
 
-        assert response.status_code == 200
-        body = response.json()
-        assert body['processed'] == 2
-        assert body['skipped'] == []
-        assert body['errors'] == []
-        assert mock_db.update_slide_metadata.call_count == 2
-        call_kwargs = mock_db.update_slide_metadata.call_args_list[0]
+        assert body['summary'] == {'processed': 2, 'skipped': 0, 'errors': 0}
+        assert body['results'] == {'skipped': [], 'errors': []}
+        assert job_db.update_slide_metadata.call_count == 2
+        call_kwargs = job_db.update_slide_metadata.call_args_list[0]
         assert call_kwargs.kwargs['width_px'] == 50000
 
-    @patch('large_image_server.routes.ingest.db')
-    def test_backfill_metadata_skips_missing_files(self, mock_db, ingest_client, clinical_root):
+    def test_backfill_metadata_skips_missing_files(self, job_db, ingest_client, clinical_root):
         """Slide in DB but file not on disk -> skipped."""
-        mock_db.is_configured.return_value = True
-        mock_db.list_slides_missing_metadata.return_value = [
+        job_db.list_slides_missing_metadata.return_value = [
             {'slide_id': 'S26-0001_A1_S1', 'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs'},
         ]
 
-        response = ingest_client.post('/admin/ingest/backfill-metadata')
+        body = _run_job(ingest_client, '/admin/ingest/backfill-metadata')
 
-        assert response.status_code == 200
-        body = response.json()
-        assert body['processed'] == 0
-        assert len(body['skipped']) == 1
-        assert body['skipped'][0]['reason'] == 'file not found'
+        assert body['summary']['processed'] == 0
+        assert len(body['results']['skipped']) == 1
+        assert body['results']['skipped'][0]['reason'] == 'file not found'
 
     @patch('large_image_server.routes.ingest._extract_metadata')
-    @patch('large_image_server.routes.ingest.db')
-    def test_backfill_metadata_skips_no_dimensions(self, mock_db, mock_meta, ingest_client, clinical_root):
+    def test_backfill_metadata_skips_no_dimensions(
+            self, mock_meta, job_db, ingest_client, clinical_root):
         """File exists but large_image cannot extract dimensions -> skipped."""
         slide_dir = clinical_root / '2026' / 'S26-0001'
         slide_dir.mkdir(parents=True, exist_ok=True)
         (slide_dir / 'S26-0001_A1_S1.svs').write_bytes(b'\x00' * 64)
 
-        mock_db.is_configured.return_value = True
-        mock_db.list_slides_missing_metadata.return_value = [
+        job_db.list_slides_missing_metadata.return_value = [
             {'slide_id': 'S26-0001_A1_S1', 'relative_path': '2026/S26-0001/S26-0001_A1_S1.svs'},
         ]
         mock_meta.return_value = {}  # no dimensions extracted
 
-        response = ingest_client.post('/admin/ingest/backfill-metadata')
+        body = _run_job(ingest_client, '/admin/ingest/backfill-metadata')
 
-        assert response.status_code == 200
-        body = response.json()
-        assert body['processed'] == 0
-        assert len(body['skipped']) == 1
-        assert body['skipped'][0]['reason'] == 'no dimensions extracted'
+        assert body['summary']['processed'] == 0
+        assert len(body['results']['skipped']) == 1
+        assert body['results']['skipped'][0]['reason'] == 'no dimensions extracted'
 
     def test_backfill_metadata_db_not_configured(self, clinical_root):
         """No --db-url -> 503."""
@@ -0,0 +1,261 @@
+"""Tests for the admin job engine (large_image_server.jobs)."""
+
+import hashlib
+import hmac
+import threading
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from large_image_server.config import configure_settings
+from large_image_server.hmac_util import compute_chunked_hmac
+from large_image_server.jobs import AdminJob, JobEngine, configure_job_engine
+
+
+def _slides(count):
+    return [
+        {'slide_id': f'S{i}', 'relative_path': f'2026/C1/S{i}.svs', 'hmac': 'a' * 64}
+        for i in range(count)]
+
+
+@pytest.fixture()
+def clinical_root(tmp_path):
+    configure_settings(
+        image_dir=tmp_path, storage_clinical_root=tmp_path, hmac_key='key')
+    return tmp_path
+
+
+@pytest.fixture()
+def job_db():
+    with patch('large_image_server.jobs.db') as mock_db:
+        mock_db.get_admin_job.return_value = None
+        yield mock_db
+
+
+def _wait_finished(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    return job.finished
+
+
+class TestJobEngine:
+
+    def test_unknown_kind(self):
+        with pytest.raises(ValueError, match='Unknown job kind'):
+            AdminJob('reindex')
+
+    def test_checkpoints_progress(self, clinical_root, job_db):
+        job_db.list_slides_missing_hmac.return_value = _slides(3)
+        engine = JobEngine(max_workers=2, processes=False)
+        job = engine.create('backfill-hmac')
+        with patch('large_image_server.jobs._hmac_task', return_value={'hmac': 'b' * 64}):
+            engine.run(job)
+
+        info = job.to_dict()
+        assert info['state'] == 'completed'
+        assert info['summary'] == {'processed': 3, 'skipped': 0, 'errors': 0}
+        assert info['checkpoint'] == 'S2'
+        final = job_db.save_admin_job.call_args.kwargs
+        assert final['state'] == 'completed'
+        assert final['done'] == 3
+        assert final['checkpoint'] == 'S2'
+        engine.shutdown()
+
+    def test_errors_recorded(self, clinical_root, job_db):
+        job_db.list_slides_missing_hmac.return_value = _slides(2)
+        job_db.update_slide_hmac.side_effect = [True, RuntimeError('db down')]
+        engine = JobEngine(max_workers=1, processes=False)
+        job = engine.create('backfill-hmac', {'max_inflight': 1})
+        results = []
+        with patch('large_image_server.jobs._hmac_task', return_value={'hmac': 'b' * 64}):
+            engine.run(job, on_result=lambda status, entry: results.append(status))
+        assert results == ['processed', 'errors']
+        assert job.to_dict()['results']['errors'] == [{'slideId': 'S1', 'error': 'db down'}]
+        engine.shutdown()
+
+    def test_inflight_and_rate_limits(self, clinical_root, job_db):
+        job_db.list_slides_for_verification.return_value = _slides(6)
+        engine = JobEngine(max_workers=4, processes=False)
+        job = engine.create('verify-all', {'max_inflight': 2, 'max_bytes_per_second': 1000})
+        lock = threading.Lock()
+        running = []
+        peak = []
+        rates = []
+
+        def task(path, key, rate, chunk_size):
+            with lock:
+                running.append(path)
+                peak.append(len(running))
+                rates.append(rate)
+            time.sleep(0.02)
+            with lock:
+                running.remove(path)
+            return {'hmac': 'a' * 64, 'size': 1}
+
+        with patch('large_image_server.jobs._hmac_task', task):
+            engine.run(job)
+        assert max(peak) == 2
+        assert set(rates) == {500}
+        assert job.to_dict()['summary']['verified'] == 6
+        engine.shutdown()
+
+    def test_spot_check(self, clinical_root, job_db):
+        good = clinical_root / 'S0.svs'
+        bad = clinical_root / 'S1.svs'
+        for path in (good, bad):
+            path.write_bytes(b'slide bytes' * 500)
+        job_db.list_slides_for_spot_check.return_value = [
+            {'slide_id': 'S0', 'relative_path': 'S0.svs',
+             'manifest': compute_chunked_hmac(good, 'key', chunk_size=1024)},
+            {'slide_id': 'S1', 'relative_path': 'S1.svs',
+             'manifest': compute_chunked_hmac(bad, 'key', chunk_size=1024)},
+            {'slide_id': 'S2', 'relative_path': 'S2.svs', 'manifest': {}},
+        ]
+        bad.write_bytes(b'X' + bad.read_bytes()[1:])
+        engine = JobEngine(max_workers=2, processes=False)
+        job = engine.create('spot-check', {'sample': 10})
+        engine.run(job)
+
+        info = job.to_dict()
+        assert info['summary'] == {'verified': 1, 'failed': 1, 'missing': 1}
+        failure = info['results']['failures'][0]
+        assert failure['slideId'] == 'S1'
+        assert failure['mismatchedChunks'] == [0]
+        engine.shutdown()
+
+    def test_verify_records_manifest(self, clinical_root, job_db):
+        content = b'slide bytes'
+        (clinical_root / 'S0.svs').write_bytes(content)
+        expected = hmac.new(b'key', content, hashlib.sha256).hexdigest()
+        job_db.list_slides_for_verification.return_value = [
+            {'slide_id': 'S0', 'relative_path': 'S0.svs', 'hmac': expected}]
+        configure_settings(
+            image_dir=clinical_root, storage_clinical_root=clinical_root, hmac_key='key',
+            hmac_chunk_size=65536)
+        engine = JobEngine(max_workers=1, processes=False)
+        engine.run(engine.create('verify-all'))
+        job_db.save_slide_hmac_manifest.assert_called_once_with(
+            'S0', compute_chunked_hmac(clinical_root / 'S0.svs', 'key', 65536), replace=False)
+        engine.shutdown()
+
+    def test_cancel_and_resume(self, clinical_root, job_db):
+        job_db.list_slides_missing_metadata.side_effect = lambda after: [
+            slide for slide in _slides(4) if after is None or slide['slide_id'] > after]
+        engine = JobEngine(max_workers=1, processes=False)
+        release = threading.Event()
+
+        def task(path):
+            release.wait(5)
+            return {'metadata': {'width_px': 10}}
+
+        with patch('large_image_server.jobs._metadata_task', task):
+            job = engine.start('backfill-metadata', {'max_inflight': 1})
+            deadline = time.time() + 5
+            while job.state != 'running' and time.time() < deadline:
+                time.sleep(0.01)
+            job.cancel()
+            release.set()
+            assert _wait_finished(job)
+            assert job.state == 'cancelled'
+            assert job.done == 1
+            assert job.checkpoint == 'S0'
+
+            assert engine.resume(job.id) is job
+            assert _wait_finished(job)
+        assert job.state == 'completed'
+        assert job.done == 4
+        assert job.total == 4
+        assert job_db.list_slides_missing_metadata.call_args.kwargs == {'after': 'S0'}
+        engine.shutdown()
+
+    def test_resume_from_database(self, clinical_root, job_db):
+        row = {
+            'job_id': 'abc',
+            'kind': 'verify-all',
+            'params': {'stale_hours': 24},
+            'state': 'running',
+            'error': None,
+            'checkpoint': 'S1',
+            'total': 4,
+            'done': 2,
+            'summary': {'verified': 1, 'failed': 0, 'missing': 1},
+            'results': {'failures': [], 'missing': [{'slideId': 'S0'}]},
+            'updated_at': datetime(2020, 1, 1, tzinfo=timezone.utc),
+        }
+        job_db.get_admin_job.return_value = row
+        job_db.list_slides_for_verification.return_value = _slides(4)[2:]
+        engine = JobEngine(max_workers=1, processes=False)
+
+        job = engine.resume('abc', background=False)
+        assert job.state == 'queued'
+        with patch('large_image_server.jobs._hmac_task',
+                   return_value={'hmac': 'a' * 64, 'size': 1}):
+            engine.run(job)
+        info = job.to_dict()
+        assert info['summary'] == {'verified': 3, 'failed': 0, 'missing': 1}
+        assert info['results']['missing'] == [{'slideId': 'S0'}]
+        assert info['total'] == 4
+        assert job_db.list_slides_for_verification.call_args.kwargs == {
+            'stale_hours': 24, 'after': 'S1'}
+        engine.shutdown()
+
+    def test_recent_checkpoint_is_not_resumed(self, job_db):
+        job_db.get_admin_job.return_value = {
+            'job_id': 'abc', 'kind': 'backfill-hmac', 'state': 'running',
+            'updated_at': datetime.now(timezone.utc)}
+        engine = JobEngine(max_workers=1, processes=False)
+        assert engine.resume('abc').state == 'running'
+
+    def test_process_pool(self, clinical_root, job_db):
+        content = b'slide bytes'
+        (clinical_root / 'S0.svs').write_bytes(content)
+        job_db.list_slides_missing_hmac.return_value = [
+            {'slide_id': 'S0', 'relative_path': 'S0.svs'}]
+        engine = JobEngine(max_workers=1)
+        engine.run(engine.create('backfill-hmac'))
+        expected = hmac.new(b'key', content, hashlib.sha256).hexdigest()
+        job_db.update_slide_hmac.assert_called_once_with('S0', expected)
+        engine.shutdown()
+
+
+class TestJobRoutes:
+
+    @pytest.fixture()
+    def client(self, tmp_path):
+        from large_image_server import create_app
+
+        app = create_app(image_dir=str(tmp_path))
+        configure_job_engine(max_workers=1, processes=False)
+        return TestClient(app)
+
+    def test_unknown_job(self, client, job_db):
+        assert client.get('/admin/ingest/jobs/nope').status_code == 404
+        assert client.delete('/admin/ingest/jobs/nope').status_code == 404
+        assert client.post('/admin/ingest/jobs/nope/resume').status_code == 404
+
+    def test_progress_from_database(self, client, job_db):
+        job_db.get_admin_job.return_value = {
+            'job_id': 'abc', 'kind': 'verify-all', 'state': 'completed', 'done': 5,
+            'summary': {'verified': 5}}
+        body = client.get('/admin/ingest/jobs/abc').json()
+        assert body['state'] == 'completed'
+        assert body['summary'] == {'verified': 5, 'failed': 0, 'missing': 0}
+
+    def test_list_merges_database(self, client, job_db):
+        job_db.list_admin_jobs.return_value = [
+            {'job_id': 'abc', 'kind': 'backfill-hmac', 'state': 'interrupted'}]
+        jobs = client.get('/admin/ingest/jobs').json()['jobs']
+        assert [job['job_id'] for job in jobs] == ['abc']
+        assert 'results' not in jobs[0]
+
+    def test_resume_requires_configuration(self, client, job_db):
+        job_db.get_admin_job.return_value = {
+            'job_id': 'abc', 'kind': 'verify-all', 'state': 'cancelled'}
+        job_db.is_configured.return_value = False
+        with patch('large_image_server.routes.ingest.db', job_db):
+            response = client.post('/admin/ingest/jobs/abc/resume')
+        assert response.status_code == 503
@@ -0,0 +1,121 @@
+"""Tests for Prometheus metrics and Server-Timing (large_image_server.metrics)."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from large_image_server.metrics import (
+    Counter,
+    Histogram,
+    ServerMetrics,
+    _request_timings,
+    get_metrics,
+    server_timing,
+)
+
+
+def _record(stage, seconds, **kwargs):
+    return {'stage': stage, 'source': 'TiffFileTileSource', 'seconds': seconds,
+            'selfSeconds': seconds, 'stack': (stage,), **kwargs}
+
+
+class TestPrimitives:
+
+    def test_counter_render(self):
+        counter = Counter('requests_total', 'Requests.', ('result',))
+        counter.inc(('hit',))
+        counter.inc(('hit',), 2)
+        assert counter.render() == [
+            '# HELP requests_total Requests.',
+            '# TYPE requests_total counter',
+            'requests_total{result="hit"} 3',
+        ]
+
+    def test_histogram_render(self):
+        histogram = Histogram('latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0))
+        histogram.observe(('/a"b',), 0.05)
+        histogram.observe(('/a"b',), 0.5)
+        histogram.observe(('/a"b',), 5)
+        lines = histogram.render()
+        assert 'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{route="/a\\"b",le="1.0"} 2' in lines
+        assert 'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 3' in lines
+        assert 'latency_seconds_count{route="/a\\"b"} 3' in lines
+        assert histogram.count(('/a"b',)) == 3
+
+    def test_server_timing(self):
+        assert server_timing({'decode': 0.0032}, 0.005) == 'decode;dur=3.20, total;dur=5.00'
+
+
+class TestObserveStage:
+
+    def test_stage_names_and_cache_results(self):
+        metrics = ServerMetrics()
+        timings = {}
+        token = _request_timings.set(timings)
+        try:
+            metrics.observe_stage(_record('getTile', 0.004, cached=False, cache='LRUCache'))
+            metrics.observe_stage(_record('getTile', 0.0001, cached=True, cache='LRUCache'))
+            metrics.observe_stage(_record(
+                'getTile', 0.001, cached=True, coalesced=True, cache='LRUCache'))
+            metrics.observe_stage(_record('encode', 0.002))
+        finally:
+            _request_timings.reset(token)
+        assert set(timings) == {'read', 'cache', 'encode'}
+        assert metrics.cache_requests.value(('getTile', 'LRUCache', 'hit')) == 1
+        assert metrics.cache_requests.value(('getTile', 'LRUCache', 'miss')) == 1
+        assert metrics.cache_requests.value(('getTile', 'LRUCache', 'coalesced')) == 1
+        assert metrics.stages.count(('read', 'TiffFileTileSource')) == 1
+
+    def test_outside_request(self):
+        metrics = ServerMetrics()
+        metrics.observe_stage(_record('style', 0.001))
+        assert metrics.stages.count(('style', 'TiffFileTileSource')) == 1
+
+
+class TestMetricsRoutes:
+
+    @pytest.fixture()
+    def metrics_app(self, tmp_image_dir, mock_source):
+        from large_image_server import create_app
+        from large_image_server.prefetch import TilePrefetcher, get_prefetcher
+        from large_image_server.source_manager import get_source_manager
+
+        application = create_app(image_dir=str(tmp_image_dir), metrics_enabled=True)
+        source_manager = get_source_manager()
+        source_manager.get_source = lambda *args, **kwargs: mock_source
+        application.dependency_overrides[get_source_manager] = lambda: source_manager
+        prefetcher = TilePrefetcher(max_workers=0)
+        application.dependency_overrides[get_prefetcher] = lambda: prefetcher
+        return application
+
+    def test_disabled(self, client):
+        assert client.get('/metrics').status_code == 404
+        assert 'Server-Timing' not in client.get('/health').headers
+        assert get_metrics() is None
+
+    def test_tile_timing(self, metrics_app, mock_source):
+        def get_tile(*args, **kwargs):
+            # Stand in for large_image's timing hooks on the worker thread
+            get_metrics().observe_stage(_record('getTile', 0.003, cached=False, cache='LRUCache'))
+            return b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+
+        mock_source.getTile.side_effect = get_tile
+        client = TestClient(metrics_app)
+        response = client.get('/tiles/test-slide.svs/0/0/0.png')
+        assert response.status_code == 200
+        timing = response.headers['Server-Timing']
+        assert timing.startswith('read;dur=3.00')
+        assert 'total;dur=' in timing
+
+        text = client.get('/metrics').text
+        assert ('large_image_http_request_duration_seconds_count{method="GET",'
+                'route="/tiles/{image_id:path}/{z}/{x}/{y}.{format}",status="200"} 1') in text
+        assert 'large_image_tile_cache_requests_total{method="getTile",cache="LRUCache",' \
+            'result="miss"} 1' in text
+        assert 'large_image_source_cache_entries{kind="base"}' in text
+        assert 'large_image_executor_jobs_total{result="completed"}' in text
+
+    def test_unmatched_route(self, metrics_app):
+        client = TestClient(metrics_app)
+        assert client.get('/nope').status_code == 404
+        assert 'route="unmatched",status="404"' in client.get('/metrics').text
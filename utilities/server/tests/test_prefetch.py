@@ -0,0 +1,148 @@
+"""Tests for background tile prefetching (large_image_server.prefetch)."""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from large_image_server.prefetch import TilePrefetcher, get_prefetcher, neighbour_tiles
+from large_image_server.tile_executor import get_tile_executor
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestNeighbourTiles:
+
+    def test_interior_tile(self):
+        tiles = neighbour_tiles(3, 5, 5)
+        assert len(tiles) == 13
+        assert tiles[:8] == [
+            (3, 4, 4), (3, 5, 4), (3, 6, 4), (3, 4, 5),
+            (3, 6, 5), (3, 4, 6), (3, 5, 6), (3, 6, 6)]
+        assert set(tiles[8:12]) == {(4, 10, 10), (4, 11, 10), (4, 10, 11), (4, 11, 11)}
+        assert tiles[12] == (2, 2, 2)
+
+    def test_corner_tile(self):
+        tiles = neighbour_tiles(0, 0, 0)
+        assert (0, 1, 1) in tiles
+        assert all(x >= 0 and y >= 0 for _, x, y in tiles)
+        assert all(z >= 0 for z, _, _ in tiles)
+
+
+class TestTilePrefetcher:
+
+    @staticmethod
+    def _paused():
+        """A prefetcher whose workers are held off by a busy tile executor."""
+        get_tile_executor()._pending = 1
+        return TilePrefetcher(max_workers=1, client_budget=4)
+
+    def teardown_method(self):
+        get_tile_executor()._pending = 0
+
+    def test_runs_jobs(self):
+        prefetcher = TilePrefetcher(max_workers=2, client_budget=10)
+        done = []
+        prefetcher.schedule('c', 'view', [(i, lambda i=i: done.append(i)) for i in range(5)])
+        assert _wait_for(lambda: prefetcher.stats()['completed'] == 5)
+        assert sorted(done) == list(range(5))
+        prefetcher.shutdown()
+
+    def test_disabled(self):
+        prefetcher = TilePrefetcher(max_workers=0)
+        assert prefetcher.schedule('c', 'view', [(1, lambda: None)]) == 0
+        assert prefetcher.stats()['scheduled'] == 0
+
+    def test_budget_drops_oldest(self):
+        prefetcher = self._paused()
+        prefetcher.schedule('c', 'view', [(i, lambda: None) for i in range(3)])
+        assert prefetcher.schedule('c', 'view', [(i, lambda: None) for i in range(3, 6)]) == 4
+        stats = prefetcher.stats()
+        assert stats['dropped'] == 2
+        assert stats['pending'] == 4
+        prefetcher.shutdown()
+
+    def test_budget_is_per_client(self):
+        prefetcher = self._paused()
+        prefetcher.schedule('a', 'view', [(i, lambda: None) for i in range(4)])
+        prefetcher.schedule('b', 'view', [(i, lambda: None) for i in range(4)])
+        assert prefetcher.stats()['pending'] == 8
+        prefetcher.shutdown()
+
+    def test_viewport_change_cancels(self):
+        prefetcher = self._paused()
+        prefetcher.schedule('c', ('slide', 1), [(i, lambda: None) for i in range(3)])
+        prefetcher.schedule('c', ('slide', 2), [(9, lambda: None)])
+        stats = prefetcher.stats()
+        assert stats['cancelled'] == 3
+        assert stats['pending'] == 1
+        assert prefetcher.cancel('c') == 1
+        prefetcher.shutdown()
+
+    def test_served_tile_not_prefetched(self):
+        prefetcher = self._paused()
+        prefetcher.schedule('c', 'view', [('a', lambda: None), ('b', lambda: None)])
+        prefetcher.schedule('c', 'view', [], served='a')
+        assert prefetcher.stats()['pending'] == 1
+        prefetcher.shutdown()
+
+    def test_yields_to_foreground_work(self):
+        prefetcher = self._paused()
+        ran = threading.Event()
+        prefetcher.schedule('c', 'view', [(1, ran.set)])
+        assert not ran.wait(0.2)
+        get_tile_executor()._pending = 0
+        assert ran.wait(5)
+        prefetcher.shutdown()
+
+
+class TestPrefetchRoutes:
+
+    @pytest.fixture()
+    def prefetcher(self, app):
+        prefetcher = TilePrefetcher(max_workers=2, client_budget=64)
+        app.dependency_overrides[get_prefetcher] = lambda: prefetcher
+        yield prefetcher
+        prefetcher.shutdown()
+
+    def test_tile_request_prefetches_neighbours(self, client, mock_source, prefetcher):
+        response = client.get('/tiles/test-slide.svs/3/5/5.png')
+        assert response.status_code == 200
+        assert _wait_for(lambda: prefetcher.stats()['completed'] == 13)
+        requested = {call.args[:3] for call in mock_source.getTile.call_args_list}
+        assert (4, 5, 3) in requested
+        assert (10, 10, 4) in requested
+        assert (2, 2, 2) in requested
+
+    def test_not_modified_does_not_prefetch(self, client, prefetcher):
+        response = client.get('/tiles/test-slide.svs/3/5/5.png')
+        assert _wait_for(lambda: prefetcher.stats()['completed'] == 13)
+        response = client.get(
+            '/tiles/test-slide.svs/3/5/5.png',
+            headers={'If-None-Match': response.headers['etag']})
+        assert response.status_code == 304
+        assert prefetcher.stats()['scheduled'] == 13
+
+    def test_dzi_tile_request_prefetches_neighbours(self, client, prefetcher):
+        response = client.get('/deepzoom/test-slide.svs_files/12/5_5.jpeg')
+        assert response.status_code == 200
+        assert _wait_for(lambda: prefetcher.stats()['completed'] == 13)
+
+    def test_case_open_prefetches_base_levels(self, client, mock_source, prefetcher):
+        case = {'caseId': 'S26-0001', 'slides': [{'slideId': 'S26-0001_A1_S1'}]}
+        with patch('large_image_server.db.get_case_async', return_value=case):
+            response = client.get('/cases/S26-0001')
+        assert response.status_code == 200
+        # One expansion job, then one tile at each of the two lowest levels
+        assert _wait_for(lambda: prefetcher.stats()['completed'] == 3)
+        requested = {call.args[:3] for call in mock_source.getTile.call_args_list}
+        assert requested == {(0, 0, 0), (0, 0, 1)}
+
+    def test_executor_reports_prefetch(self, client):
+        assert 'prefetch' in client.get('/executor').json()
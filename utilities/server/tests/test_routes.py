@@ -84,6 +84,69 @@ class TestTileRoutes:
         assert response.status_code == 200
 
 
+class TestTileBatchRoutes:
+    """Test the batched tile endpoint."""
+
+    @staticmethod
+    def _frames(body):
+        from large_image_server.routes.tiles import BATCH_FRAME_HEADER
+
+        frames, offset = {}, 0
+        while offset < len(body):
+            index, status, length = BATCH_FRAME_HEADER.unpack_from(body, offset)
+            offset += BATCH_FRAME_HEADER.size
+            frames[index] = (status, body[offset:offset + length])
+            offset += length
+        return frames
+
+    def test_batch_returns_every_tile(self, client, mock_source):
+        tiles = [{'z': 1, 'x': x, 'y': y} for x in range(3) for y in range(2)]
+        response = client.post(
+            '/tiles/test-slide.svs/batch', json={'tiles': tiles, 'format': 'png'})
+        assert response.status_code == 200
+        assert response.headers['X-Tile-Format'] == 'image/png'
+        frames = self._frames(response.content)
+        assert sorted(frames) == list(range(len(tiles)))
+        for status, payload in frames.values():
+            assert status == 200
+            assert payload == mock_source.getTile.return_value
+        assert mock_source.getTile.call_count == len(tiles)
+
+    def test_batch_reports_per_tile_errors(self, client, mock_source):
+        from large_image.exceptions import TileSourceXYZRangeError
+
+        def get_tile(x, y, z, **kwargs):
+            if x == 9:
+                raise TileSourceXYZRangeError('out of range')
+            return b'tile'
+
+        mock_source.getTile.side_effect = get_tile
+        response = client.post('/tiles/test-slide.svs/batch', json={
+            'tiles': [{'z': 0, 'x': 0, 'y': 0}, {'z': 0, 'x': 9, 'y': 0}]})
+        frames = self._frames(response.content)
+        assert frames[0] == (200, b'tile')
+        assert frames[1][0] == 404
+
+    def test_batch_missing_image(self, client, app):
+        from large_image_server.source_manager import get_source_manager
+
+        mock_sm = app.dependency_overrides[get_source_manager]()
+        mock_sm.get_source_path.side_effect = FileNotFoundError('not found')
+        response = client.post(
+            '/tiles/missing.svs/batch', json={'tiles': [{'z': 0, 'x': 0, 'y': 0}]})
+        assert response.status_code == 404
+
+    def test_batch_limits(self, client):
+        from large_image_server.config import get_settings
+
+        too_many = [{'z': 0, 'x': 0, 'y': 0}] * (get_settings().tile_batch_max_tiles + 1)
+        response = client.post('/tiles/test-slide.svs/batch', json={'tiles': too_many})
+        assert response.status_code == 400
+        response = client.post(
+            '/tiles/test-slide.svs/batch', json={'tiles': [], 'format': 'gif'})
+        assert response.status_code == 400
+
+
 class TestRegionRoutes:
     """Test region and thumbnail endpoints."""
 
@@ -0,0 +1,201 @@
+"""Tests for per-slide statistics (large_image_server.stats_store)."""
+
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from large_image_server.source_manager import (
+    SourceManager,
+    _auto_range_frames,
+    _derive_styled_source,
+)
+from large_image_server.stats_store import (
+    StatisticsStore,
+    analysis_level,
+    auto_range_level,
+    band_ranges,
+    configure_stats_store,
+)
+
+STATS = {
+    'frame': 0, 'level': 0, 'bins': 4,
+    'min': [0, 1, 2], 'max': [250, 251, 252], 'mean': [100.0, 101.0, 102.0],
+    'stdev': [10.0, 11.0, 12.0],
+    'histogram': [
+        {'hist': [1, 2, 3, 4], 'bin_edges': [0, 64, 128, 192, 256], 'samples': 10}] * 3,
+}
+
+
+class TestStatisticsStore:
+
+    def test_key_covers_parameters(self):
+        base = StatisticsStore.make_key('16:1', 0, 5, 256)
+        assert StatisticsStore.make_key('16:2', 0, 5, 256) != base
+        assert StatisticsStore.make_key('16:1', 1, 5, 256) != base
+        assert StatisticsStore.make_key('16:1', 0, 4, 256) != base
+        assert StatisticsStore.make_key('16:1', 0, 5, 128) != base
+
+    def test_memory_only(self):
+        store = StatisticsStore(max_entries=1)
+        store.put('a' * 64, STATS)
+        store.put('b' * 64, STATS)
+        assert store.get('a' * 64) is None
+        assert store.get('b' * 64) == STATS
+        assert 'disk' not in store.stats()
+
+    def test_persisted_across_instances(self, tmp_path):
+        StatisticsStore(tmp_path / 'stats', max_bytes=1 << 20).put('ab' * 32, STATS)
+        store = StatisticsStore(tmp_path / 'stats', max_bytes=1 << 20)
+        assert store.get('ab' * 32) == STATS
+        assert store.stats()['disk']['cache_dir'] == str(tmp_path / 'stats')
+        assert store.clear() == 1
+        assert store.get('ab' * 32) is None
+
+    def test_concurrent_misses_compute_once(self):
+        store = StatisticsStore()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return STATS
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(store.get_or_compute('k', compute)))
+            for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1
+        assert results == [STATS] * 4
+        assert store.stats()['computed'] == 1
+
+    def test_failed_compute_not_stored(self):
+        store = StatisticsStore()
+
+        def compute():
+            raise RuntimeError('unreadable')
+
+        with pytest.raises(RuntimeError):
+            store.get_or_compute('k', compute)
+        assert store.get_or_compute('k', lambda: STATS) == STATS
+
+
+class TestHelpers:
+
+    def test_analysis_level(self):
+        metadata = {'sizeX': 50000, 'sizeY': 40000, 'levels': 9}
+        assert analysis_level(metadata) == 3
+        assert analysis_level(metadata, 100000) == 8
+        assert analysis_level({'sizeX': 100, 'sizeY': 100, 'levels': 1}) == 0
+
+    def test_auto_range_level(self):
+        assert auto_range_level({'sizeX': 10000, 'sizeY': 7000, 'levels': 7}) == 3
+        assert auto_range_level({'sizeX': 2048, 'sizeY': 1000, 'levels': 5}) == 3
+        assert auto_range_level({'sizeX': 1000, 'sizeY': 800, 'levels': 3}) == 2
+
+    def test_band_ranges(self):
+        ranges = band_ranges(STATS)
+        assert isinstance(ranges['min'], np.ndarray)
+        assert ranges['max'].tolist() == [250, 251, 252]
+        assert ranges['histogram'][0]['hist'].tolist() == [1, 2, 3, 4]
+        assert band_ranges({'frame': 0}) is None
+
+    def test_auto_range_frames(self):
+        assert _auto_range_frames(None) == []
+        assert _auto_range_frames({'min': 0, 'max': 255}) == []
+        assert _auto_range_frames('{"min": "auto"}') == [0]
+        assert _auto_range_frames({'bands': [
+            {'band': 1, 'frame': 3, 'palette': '#f00'},
+            {'band': 2, 'frame': 5, 'min': 0, 'max': 10},
+        ]}) == [0, 3]
+
+
+class TestHistogramRoute:
+
+    @pytest.fixture()
+    def histogram_source(self, mock_source):
+        mock_source.histogram.return_value = {
+            'min': np.array([0, 1, 2]),
+            'max': np.array([250, 251, 252]),
+            'histogram': [{'hist': np.array([1, 2]), 'bin_edges': np.array([0, 128, 256])}],
+        }
+        return mock_source
+
+    def test_computed_once(self, client, histogram_source):
+        for _ in range(2):
+            response = client.get('/histogram/test-slide.svs?bins=2')
+            assert response.status_code == 200
+        body = response.json()
+        assert body['max'] == [250, 251, 252]
+        assert body['histogram'][0]['hist'] == [1, 2]
+        assert body['level'] == 4
+        assert histogram_source.histogram.call_count == 1
+        output = histogram_source.histogram.call_args.kwargs['output']
+        assert output == {'maxWidth': 1563, 'maxHeight': 1250}
+
+    def test_approximate_reads_lowest_level(self, client, histogram_source):
+        body = client.get('/histogram/test-slide.svs?approximate=true').json()
+        assert body['level'] == 0
+        assert histogram_source.histogram.call_args.kwargs['output'] == {
+            'maxWidth': 98, 'maxHeight': 79}
+
+    def test_persisted(self, client, histogram_source, tmp_path):
+        configure_stats_store(tmp_path / 'stats', max_bytes=1 << 20)
+        client.get('/histogram/test-slide.svs?level=2')
+        configure_stats_store(tmp_path / 'stats', max_bytes=1 << 20)
+        assert client.get('/histogram/test-slide.svs?level=2').json()['level'] == 2
+        assert histogram_source.histogram.call_count == 1
+
+    def test_cache_info_reports_store(self, client):
+        assert 'stats_store' in client.get('/cache').json()
+
+
+def _is_large_image_module(name):
+    return name.split('.')[0] == 'large_image' or name.startswith('large_image_source')
+
+
+@pytest.fixture()
+def real_test_source():
+    """The real large_image test source, in place of conftest's mock."""
+    mocked = {name: module for name, module in sys.modules.items()
+              if _is_large_image_module(name)}
+    for name in mocked:
+        del sys.modules[name]
+    try:
+        yield pytest.importorskip('large_image_source_test').TestTileSource
+    finally:
+        for name in [name for name in sys.modules if _is_large_image_module(name)]:
+            del sys.modules[name]
+        sys.modules.update(mocked)
+
+
+class TestAutoRangeSeeding:
+
+    def test_seeded_tile_matches_large_image(self, real_test_source, tmp_path):
+        params = {'sizeX': 10000, 'sizeY': 7000, 'tileWidth': 256, 'tileHeight': 256,
+                  'noCache': True}
+        style = {'min': 'min:0.05', 'max': 'max:0.05'}
+        expected = real_test_source(**params, style=style).getTile(
+            1, 1, 4, numpyAllowed='always')
+
+        configure_stats_store()
+        base = real_test_source(**params)
+        slide_path = tmp_path / 'slide.svs'
+        slide_path.write_bytes(b'slide')
+        source_manager = MagicMock()
+        source_manager.get_source.return_value = base
+        source_manager.get_source_path.return_value = slide_path
+        SourceManager._seed_band_ranges(source_manager, 'slide.svs', base, style)
+        assert 0 in base._bandRanges
+        base.histogram = MagicMock(side_effect=AssertionError('scanned the image'))
+        styled = _derive_styled_source(base, style, {
+            'encoding': 'PNG', 'jpegQuality': 95, 'jpegSubsampling': 0})
+        np.testing.assert_array_equal(
+            styled.getTile(1, 1, 4, numpyAllowed='always'), expected)
@@ -0,0 +1,205 @@
+"""Tests for the persistent disk tile cache (large_image_server.tile_cache)."""
+
+import os
+import time
+
+import pytest
+
+from large_image_server.tile_cache import DiskTileCache, configure_tile_cache, file_identity
+
+
+def _key(**overrides):
+    params = dict(
+        identity='16:1', kind='xyz', z=0, x=0, y=0, frame=0,
+        encoding='JPEG', quality=85, subsampling=1, style=None)
+    params.update(overrides)
+    return DiskTileCache.make_key(**params)
+
+
+def _wait_for_eviction(cache, timeout=5):
+    deadline = time.time() + timeout
+    while cache._files.evicting and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class TestMakeKey:
+
+    def test_components_change_key(self):
+        base = _key()
+        for override in (
+                {'identity': '16:2'}, {'kind': 'dzi'}, {'z': 1}, {'x': 1}, {'y': 1},
+                {'frame': 1}, {'encoding': 'PNG'}, {'quality': 90}, {'subsampling': 0},
+                {'style': {'band': 1}}):
+            assert _key(**override) != base, override
+
+    def test_style_order_independent(self):
+        assert _key(style={'min': 0, 'max': 255}) == _key(style={'max': 255, 'min': 0})
+
+    def test_file_identity_tracks_changes(self, tmp_path):
+        path = tmp_path / 'slide.svs'
+        path.write_bytes(b'\x00' * 4)
+        first = file_identity(path)
+        path.write_bytes(b'\x00' * 8)
+        assert file_identity(path) != first
+
+
+class TestDiskTileCache:
+
+    def test_roundtrip(self, tmp_path):
+        cache = DiskTileCache(tmp_path / 'cache', max_bytes=1 << 20)
+        assert cache.get(_key()) is None
+        cache.put(_key(), b'tile-bytes')
+        assert cache.get(_key()) == b'tile-bytes'
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['writes'] == 1
+
+    def test_shared_between_instances(self, tmp_path):
+        """A second process (here, instance) sees tiles written by the first."""
+        writer = DiskTileCache(tmp_path / 'cache', max_bytes=1 << 20)
+        writer.put(_key(), b'shared')
+        reader = DiskTileCache(tmp_path / 'cache', max_bytes=1 << 20)
+        assert reader.get(_key()) == b'shared'
+        assert reader.stats()['estimated_bytes'] > 0
+
+    def test_truncated_entry_discarded(self, tmp_path):
+        cache = DiskTileCache(tmp_path / 'cache', max_bytes=1 << 20)
+        cache.put(_key(), b'x' * 100)
+        path = cache._path(_key())
+        path.write_bytes(path.read_bytes()[:50])
+
+        assert cache.get(_key()) is None
+        assert not path.exists()
+
+    def test_no_temp_files_left(self, tmp_path):
+        cache = DiskTileCache(tmp_path / 'cache', max_bytes=1 << 20)
+        for x in range(5):
+            cache.put(_key(x=x), b'data')
+        leftovers = [
+            name for _, _, names in os.walk(cache.cache_dir)
+            for name in names if name.endswith('.tmp')]
+        assert leftovers == []
+
+    def test_byte_budget_evicts_oldest(self, tmp_path):
+        cache = DiskTileCache(tmp_path / 'cache', max_bytes=10_000, touch_interval=0)
+        now = time.time()
+        for x in range(9):
+            cache.put(_key(x=x), b'x' * 1000)
+            # Spread mtimes so eviction order is deterministic
+            os.utime(cache._path(_key(x=x)), (now - 100 + x, now - 100 + x))
+        # Touch the oldest so it counts as recently used
+        assert cache.get(_key(x=0)) is not None
+        for x in range(9, 15):
+            cache.put(_key(x=x), b'x' * 1000)
+            _wait_for_eviction(cache)
+
+        total = sum(os.path.getsize(p) for _, _, p in cache._files.entries())
+        assert total <= 10_000
+        assert cache.get(_key(x=0)) is not None
+        assert cache.get(_key(x=1)) is None
+        assert cache.get(_key(x=14)) is not None
+        assert cache.stats()['evictions'] > 0
+
+    def test_oversized_tile_not_stored(self, tmp_path):
+        cache = DiskTileCache(tmp_path / 'cache', max_bytes=100)
+        cache.put(_key(), b'x' * 200)
+        assert cache.get(_key()) is None
+
+    def test_clear(self, tmp_path):
+        cache = DiskTileCache(tmp_path / 'cache', max_bytes=1 << 20)
+        cache.put(_key(), b'a')
+        cache.put(_key(x=1), b'b')
+        assert cache.clear() == 2
+        assert cache.get(_key()) is None
+
+
+class TestTileRoutesUseDiskCache:
+
+    @pytest.fixture()
+    def cached_client(self, app, tmp_path):
+        from fastapi.testclient import TestClient
+
+        configure_tile_cache(tmp_path / 'tile-cache', max_bytes=1 << 20)
+        return TestClient(app)
+
+    def test_xyz_hit_skips_source(self, cached_client, app, mock_source):
+        from large_image_server.source_manager import get_source_manager
+
+        mock_sm = app.dependency_overrides[get_source_manager]()
+        first = cached_client.get('/tiles/test-slide.svs/0/0/0.png')
+        assert first.status_code == 200
+        assert mock_sm.get_source.call_count == 1
+
+        second = cached_client.get('/tiles/test-slide.svs/0/0/0.png')
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert mock_sm.get_source.call_count == 1
+
+    def test_dzi_and_xyz_do_not_collide(self, cached_client, app):
+        from large_image_server.source_manager import get_source_manager
+
+        mock_sm = app.dependency_overrides[get_source_manager]()
+        cached_client.get('/tiles/test-slide.svs/0/0/0.jpeg')
+        cached_client.get('/deepzoom/test-slide.svs_files/0/0_0.jpeg')
+        assert mock_sm.get_source.call_count == 2
+
+    def test_cache_info_reports_disk_cache(self, cached_client):
+        info = cached_client.get('/cache').json()
+        assert info['tile_disk_cache']['max_bytes'] == 1 << 20
+
+
+class TestConditionalTiles:
+
+    def test_etag_matches(self):
+        from large_image_server.routes.tiles import etag_matches
+
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('W/"abc"', '"abc"')
+        assert etag_matches('"x", "abc"', '"abc"')
+        assert etag_matches('*', '"abc"')
+        assert not etag_matches('"x"', '"abc"')
+        assert not etag_matches(None, '"abc"')
+
+    def test_if_none_match_returns_304_without_source(self, client, app):
+        from large_image_server.source_manager import get_source_manager
+
+        mock_sm = app.dependency_overrides[get_source_manager]()
+        first = client.get('/tiles/test-slide.svs/0/0/0.png')
+        etag = first.headers['ETag']
+        assert mock_sm.get_source.call_count == 1
+
+        second = client.get(
+            '/tiles/test-slide.svs/0/0/0.png', headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.headers['ETag'] == etag
+        assert second.content == b''
+        assert mock_sm.get_source.call_count == 1
+
+    def test_etag_varies_with_tile(self, client):
+        first = client.get('/tiles/test-slide.svs/0/0/0.png').headers['ETag']
+        assert client.get('/tiles/test-slide.svs/1/0/0.png').headers['ETag'] != first
+        assert client.get('/tiles/test-slide.svs/0/0/0.jpeg').headers['ETag'] != first
+
+    def test_version_token_makes_tile_immutable(self, client):
+        version = client.get('/tiles/test-slide.svs/version').json()['version']
+
+        current = client.get(f'/tiles/test-slide.svs/0/0/0.png?v={version}')
+        assert 'immutable' in current.headers['Cache-Control']
+
+        stale = client.get('/tiles/test-slide.svs/0/0/0.png?v=0000')
+        assert 'immutable' not in stale.headers['Cache-Control']
+        assert 'max-age=3600' in stale.headers['Cache-Control']
+
+    def test_version_changes_with_file(self, client, tmp_image_dir):
+        before = client.get('/tiles/test-slide.svs/version').json()['version']
+        (tmp_image_dir / 'test-slide.svs').write_bytes(b'changed contents')
+        after = client.get('/tiles/test-slide.svs/version').json()['version']
+        assert before != after
+
+    def test_dzi_tile_conditional(self, client):
+        url = '/deepzoom/test-slide.svs_files/0/0_0.jpeg'
+        first = client.get(url)
+        assert first.status_code == 200
+        second = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        assert second.status_code == 304
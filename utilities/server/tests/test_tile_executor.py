@@ -0,0 +1,159 @@
+"""Tests for the TileExecutor class."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from large_image_server.tile_executor import (
+    TileExecutor,
+    configure_tile_executor,
+    get_tile_executor,
+)
+
+
+class TestTileExecutorInit:
+    """Test TileExecutor initialization."""
+
+    def test_defaults_from_settings(self):
+        from large_image_server.config import configure_settings
+        configure_settings(tile_workers=3, tile_source_concurrency=2)
+
+        executor = TileExecutor()
+        assert executor.max_workers == 3
+        assert executor.per_source_limit == 2
+        executor.shutdown()
+
+    def test_explicit_args(self):
+        executor = TileExecutor(max_workers=5, per_source_limit=0)
+        assert executor.max_workers == 5
+        assert executor.per_source_limit == 0
+        executor.shutdown()
+
+    def test_configure_replaces_global(self):
+        first = get_tile_executor()
+        second = configure_tile_executor(max_workers=2)
+        assert second is not first
+        assert get_tile_executor() is second
+
+
+class TestTileExecutorRun:
+    """Test running jobs on the executor."""
+
+    def test_returns_result_off_loop_thread(self):
+        executor = TileExecutor(max_workers=2)
+
+        async def main():
+            return await executor.run('a', lambda x: (x * 2, threading.current_thread()), 21)
+
+        value, thread = asyncio.run(main())
+        assert value == 42
+        assert thread is not threading.current_thread()
+        stats = executor.stats()
+        assert stats['completed'] == 1
+        assert stats['queue_depth'] == 0
+        assert stats['active'] == 0
+        executor.shutdown()
+
+    def test_exception_propagates(self):
+        executor = TileExecutor(max_workers=2)
+
+        def fail():
+            raise FileNotFoundError('missing')
+
+        with pytest.raises(FileNotFoundError):
+            asyncio.run(executor.run('a', fail))
+        stats = executor.stats()
+        assert stats['failed'] == 1
+        assert stats['busy_sources'] == 0
+        executor.shutdown()
+
+    def test_event_loop_not_blocked(self):
+        executor = TileExecutor(max_workers=2)
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(executor.run('a', time.sleep, 0.2), ticker())
+
+        asyncio.run(main())
+        assert len(ticks) == 5
+        assert ticks[-1] - ticks[0] < 0.2
+        executor.shutdown()
+
+
+class TestPerSourceLimit:
+    """Test per-source concurrency limits."""
+
+    @staticmethod
+    def _tracked(counter, lock):
+        def job():
+            with lock:
+                counter['current'] += 1
+                counter['peak'] = max(counter['peak'], counter['current'])
+            time.sleep(0.05)
+            with lock:
+                counter['current'] -= 1
+        return job
+
+    def test_same_source_limited(self):
+        executor = TileExecutor(max_workers=8, per_source_limit=2)
+        counter = {'current': 0, 'peak': 0}
+        job = self._tracked(counter, threading.Lock())
+
+        async def main():
+            await asyncio.gather(*(executor.run('slide', job) for _ in range(6)))
+
+        asyncio.run(main())
+        assert counter['peak'] == 2
+        assert executor.stats()['completed'] == 6
+        executor.shutdown()
+
+    def test_different_sources_not_limited(self):
+        executor = TileExecutor(max_workers=8, per_source_limit=1)
+        counter = {'current': 0, 'peak': 0}
+        job = self._tracked(counter, threading.Lock())
+
+        async def main():
+            await asyncio.gather(*(executor.run(f'slide{i}', job) for i in range(4)))
+
+        asyncio.run(main())
+        assert counter['peak'] == 4
+        executor.shutdown()
+
+    def test_queue_depth_reported(self):
+        executor = TileExecutor(max_workers=1, per_source_limit=0)
+        release = threading.Event()
+        seen = {}
+
+        async def main():
+            jobs = [asyncio.ensure_future(executor.run('a', release.wait)) for _ in range(3)]
+            while executor.stats()['active'] < 1:
+                await asyncio.sleep(0.005)
+            seen.update(executor.stats())
+            release.set()
+            await asyncio.gather(*jobs)
+
+        asyncio.run(main())
+        assert seen['active'] == 1
+        assert seen['queue_depth'] == 2
+        stats = executor.stats()
+        assert stats['queue_depth'] == 0
+        assert stats['wait_seconds']['max'] > 0
+        executor.shutdown()
+
+
+class TestExecutorEndpoint:
+    """Test the executor stats endpoint and route integration."""
+
+    def test_tile_route_uses_executor(self, client):
+        resp = client.get('/tiles/test-slide.svs/0/0/0.png')
+        assert resp.status_code == 200
+        stats = client.get('/executor').json()
+        assert stats['completed'] >= 1
+        assert stats['queue_depth'] == 0
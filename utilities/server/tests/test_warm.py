@@ -0,0 +1,139 @@
+"""Tests for background source warming jobs (large_image_server.warm)."""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from large_image_server.warm import WarmJobManager
+
+SLIDES = [
+    {'slide_id': 'S1', 'relative_path': '2026/C1/S1.svs', 'case_id': 'C1'},
+    {'slide_id': 'S2', 'relative_path': '2026/C1/S2.dcm', 'case_id': 'C1'},
+    {'slide_id': 'S3', 'relative_path': '2026/C2/S3.dcm', 'case_id': 'C2'},
+]
+
+
+def _wait_finished(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    return job.finished
+
+
+@pytest.fixture()
+def list_slides():
+    with patch('large_image_server.db.list_case_slide_files', return_value=SLIDES) as mock:
+        yield mock
+
+
+class TestWarmJobManager:
+
+    def test_warms_slow_formats_only(self, list_slides):
+        manager = WarmJobManager(max_workers=2)
+        source_manager = MagicMock()
+        job = manager.start(source_manager)
+        assert _wait_finished(job)
+
+        info = job.to_dict()
+        assert info['state'] == 'completed'
+        assert info['total'] == 3
+        assert info['summary'] == {'warmed': 2, 'failed': 0, 'skipped': 1, 'cancelled': 0}
+        assert {e['slideId'] for e in info['details']['warmed']} == {'S2', 'S3'}
+        assert all('time_seconds' in e for e in info['details']['warmed'])
+        assert info['details']['skipped'][0]['slideId'] == 'S1'
+        list_slides.assert_called_once_with(None)
+        manager.shutdown()
+
+    def test_all_sources_opens_slow_formats_first(self, list_slides):
+        manager = WarmJobManager(max_workers=1)
+        opened = []
+        source_manager = MagicMock()
+        source_manager.get_source.side_effect = opened.append
+        job = manager.start(source_manager, all_sources=True)
+        assert _wait_finished(job)
+        assert opened[-1] == 'S1'
+        assert job.to_dict()['summary']['warmed'] == 3
+        manager.shutdown()
+
+    def test_failures_recorded(self, list_slides):
+        manager = WarmJobManager(max_workers=2)
+        source_manager = MagicMock()
+        source_manager.get_source.side_effect = FileNotFoundError('gone')
+        job = manager.start(source_manager, case_id='C1')
+        assert _wait_finished(job)
+        info = job.to_dict()
+        assert info['summary']['failed'] == 2
+        assert info['details']['failed'][0]['error'] == 'gone'
+        list_slides.assert_called_once_with('C1')
+        manager.shutdown()
+
+    def test_cancel_skips_pending_slides(self, list_slides):
+        manager = WarmJobManager(max_workers=1)
+        release = threading.Event()
+        source_manager = MagicMock()
+        source_manager.get_source.side_effect = lambda slide_id: release.wait(5)
+        job = manager.start(source_manager, all_sources=True)
+        deadline = time.time() + 5
+        while not source_manager.get_source.called and time.time() < deadline:
+            time.sleep(0.01)
+        job.cancel()
+        release.set()
+        assert _wait_finished(job)
+        info = job.to_dict()
+        assert info['state'] == 'cancelled'
+        assert info['summary']['warmed'] == 1
+        assert info['summary']['cancelled'] == 2
+        manager.shutdown()
+
+    def test_listing_failure_fails_job(self):
+        manager = WarmJobManager(max_workers=1)
+        with patch('large_image_server.db.list_case_slide_files',
+                   side_effect=RuntimeError('db down')):
+            job = manager.start(MagicMock())
+            assert _wait_finished(job)
+        assert job.state == 'failed'
+        assert job.error == 'db down'
+        manager.shutdown()
+
+    def test_old_finished_jobs_forgotten(self, list_slides):
+        manager = WarmJobManager(max_workers=2, max_jobs=2)
+        jobs = []
+        for _ in range(3):
+            jobs.append(manager.start(MagicMock()))
+            assert _wait_finished(jobs[-1])
+        assert manager.get(jobs[0].id) is None
+        assert [job.id for job in manager.jobs()] == [jobs[2].id, jobs[1].id]
+        manager.shutdown()
+
+
+class TestWarmRoutes:
+
+    def test_warm_returns_job_and_progress(self, client, list_slides):
+        response = client.post('/warm?all_sources=true')
+        assert response.status_code == 202
+        job_id = response.json()['job_id']
+
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            info = client.get(f'/warm/{job_id}').json()
+            if info['state'] == 'completed':
+                break
+            time.sleep(0.01)
+        assert info['state'] == 'completed'
+        assert info['summary']['warmed'] == 3
+
+        status = client.get('/warm/status').json()
+        assert status['jobs'][0]['job_id'] == job_id
+        assert 'cached_sources' in status['cache']
+
+    def test_unknown_job(self, client):
+        assert client.get('/warm/nope').status_code == 404
+        assert client.delete('/warm/nope').status_code == 404
+
+    def test_cancel_route(self, client, list_slides):
+        job_id = client.post('/warm').json()['job_id']
+        response = client.delete(f'/warm/{job_id}')
+        assert response.status_code == 200
+        assert response.json()['job_id'] == job_id